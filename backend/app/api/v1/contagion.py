@@ -43,9 +43,21 @@ async def identify_clusters(city: str, state: str, min_permits: int = 3, days_ba
 
 
 @router.post("/clusters/{cluster_id}/score")
-async def score_cluster(cluster_id: str, max_properties: int = 1000):
+async def score_cluster(
+    cluster_id: str,
+    max_properties: int = 1000,
+    aerial_top_n: Optional[int] = None,
+    imagery_budget: Optional[int] = None,
+    aerial_concurrency: Optional[int] = None,
+):
     try:
-        result = await ContagionAnalyzerService.score_cluster_properties(cluster_id, max_properties=max_properties)
+        result = await ContagionAnalyzerService.score_cluster_properties(
+            cluster_id,
+            max_properties=max_properties,
+            aerial_top_n=aerial_top_n,
+            imagery_budget=imagery_budget,
+            aerial_concurrency=aerial_concurrency,
+        )
     except ValueError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
 
@@ -12,7 +12,7 @@ from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
 from app.core.database import get_db
-from app.lib import EventPayload, emit_event
+from app.lib import EventPayload, emit_event, emit_telemetry_event
 
 router = APIRouter(prefix="/api/v1/shares", tags=["shares"])
 public_router = APIRouter(include_in_schema=False)
@@ -66,6 +66,7 @@ async def _emit_share_event(
     *,
     lead_id: Optional[str] = None,
     source: str = "api.share",
+    telemetry: bool = False,
 ) -> None:
     request_id = _viewer_request_id(request)
     event_payload = EventPayload(
@@ -76,6 +77,9 @@ async def _emit_share_event(
         payload={"token": token, **payload},
         request_id=request_id,
     )
+    if telemetry:
+        emit_telemetry_event(event_payload)
+        return
     emit_event(db.session, event_payload)
 
 
@@ -316,6 +320,7 @@ async def public_view(token: str, request: Request) -> HTMLResponse:
             {"pdf_url": pdf_url, "preview_url": preview_url},
             lead_id=str(share.get("lead_id")) if share.get("lead_id") is not None else None,
             source="public.viewer",
+            telemetry=True,
         )
         await db.commit()
 
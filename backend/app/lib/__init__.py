@@ -1,6 +1,6 @@
 """Helper libraries used across the application."""
 
-from .events import EventPayload, emit_event
+from .events import EventPayload, emit_event, emit_telemetry_event, flush_events, shutdown_telemetry_writer
 from .logging import request_id_middleware_factory
 from .tokens import (
     DEFAULTS,
@@ -22,8 +22,11 @@ __all__ = [
     "coerce_model_dict",
     "compose_context",
     "emit_event",
+    "emit_telemetry_event",
+    "flush_events",
     "request_id_middleware_factory",
     "resolve_structure",
     "resolve_template",
     "resolve_text",
+    "shutdown_telemetry_writer",
 ]
@@ -1,20 +1,32 @@
-"""Event emission helpers with durable persistence."""
+"""Event emission helpers with durable persistence.
+
+Events emitted through :func:`emit_event` are buffered on the owning session
+and written with one multi-row insert when the session commits (or when
+:func:`flush_events` is called). Non-critical telemetry can instead go through
+:func:`emit_telemetry_event`, which hands rows to a bounded background writer
+and never blocks the caller.
+"""
 
 from __future__ import annotations
 
 import json
 import logging
+import queue
+import threading
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 from pydantic import BaseModel, Field
+from sqlalchemy import event as sa_event, insert
 from sqlalchemy.orm import Session
 
 from app.models import EventLog
 
 log = logging.getLogger(__name__)
 
+_BUFFER_KEY = "fishmouth.pending_events"
+
 
 class EventPayload(BaseModel):
     """Pydantic payload persisted to the events table."""
@@ -64,31 +76,225 @@ def _resolve_session(db_session: Any) -> Session:
     raise TypeError("emit_event expects a SQLAlchemy Session or DatabaseSession")
 
 
-def emit_event(db_session: Any, event: EventPayload) -> str:
-    """Persist an event and return its ID."""
+def emit_event(db_session: Any, event: EventPayload, *, buffered: bool = True) -> str:
+    """Queue an event for persistence and return its ID.
+
+    Buffered events are inserted together just before the session commits and
+    are discarded if it rolls back. The event is validated here, but a database
+    error on the insert surfaces from the caller's ``commit()`` rather than
+    from this call. Pass ``buffered=False`` to insert and flush
+    immediately (for callers that must read the row back in the same
+    transaction).
+    """
+
+    row = _event_row(event)
+    session = _resolve_session(db_session)
+    if buffered:
+        if not session.in_transaction():
+            # Tie the buffer to a transaction so commit/rollback hooks fire.
+            session.begin()
+        session.info.setdefault(_BUFFER_KEY, []).append(row)
+    else:
+        session.add(EventLog(**row))
+        session.flush()
+
+    log.info("event.emit", extra={"event": {**event.model_dump(), "payload": row["payload"]}})
+    return row["id"]
+
+
+def flush_events(db_session: Any) -> int:
+    """Write any buffered events for the session with a single insert."""
+
+    session = _resolve_session(db_session)
+    rows: List[Dict[str, Any]] = session.info.pop(_BUFFER_KEY, None) or []
+    if rows:
+        session.execute(insert(EventLog), rows)
+    return len(rows)
+
+
+def pending_event_count(db_session: Any) -> int:
+    session = _resolve_session(db_session)
+    return len(session.info.get(_BUFFER_KEY) or [])
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _flush_before_commit(session: Session) -> None:
+    if session.info.get(_BUFFER_KEY):
+        flush_events(session)
+
+
+@sa_event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction: Any) -> None:
+    # Savepoint rollbacks leave the outer transaction (and its events) intact.
+    if not session.in_transaction():
+        session.info.pop(_BUFFER_KEY, None)
 
+
+def _event_row(event: EventPayload) -> Dict[str, Any]:
     if event.type not in ALLOWED_EVENT_TYPES:
         raise ValueError(f"Unsupported event type: {event.type}")
 
-    session = _resolve_session(db_session)
-    normalized_payload = _normalize_payload(event.payload)
-    record = EventLog(
-        id=event.id,
-        type=event.type,
-        source_service=event.source_service,
-        lead_id=event.lead_id,
-        report_id=event.report_id,
-        call_id=event.call_id,
-        actor=event.actor,
-        payload=normalized_payload,
-        request_id=event.request_id,
-        created_at=event.created_at,
-    )
-    session.add(record)
-    session.flush()
-
-    log.info("event.emit", extra={"event": {**event.model_dump(), "payload": normalized_payload}})
-    return record.id
+    return {
+        "id": event.id,
+        "type": event.type,
+        "source_service": event.source_service,
+        "lead_id": event.lead_id,
+        "report_id": event.report_id,
+        "call_id": event.call_id,
+        "actor": event.actor,
+        "payload": _normalize_payload(event.payload),
+        "request_id": event.request_id,
+        "created_at": event.created_at,
+    }
+
+
+class TelemetryEventWriter:
+    """Background thread that drains telemetry events in multi-row inserts.
+
+    The queue is bounded: when it is full new events are dropped (and counted)
+    rather than slowing down the request that produced them. The thread is a
+    daemon, so the application must call :func:`shutdown_telemetry_writer` on
+    shutdown to write what is still queued.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_queue: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        # Counters are updated by request threads and the writer thread
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                log.warning("event.telemetry.dropped", extra={"dropped": dropped})
+            return False
+        self.start()
+        return True
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-event-writer", daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every queued event has been written (or dropped on error)."""
+
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+        with self._queue.all_tasks_done:
+            if timeout is None:
+                while self._queue.unfinished_tasks:
+                    self._queue.all_tasks_done.wait()
+            else:
+                self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._drain()
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        try:
+            batch = [self._queue.get(timeout=self._flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self._batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        factory = self._session_factory
+        if factory is None:
+            from database import SessionLocal
+
+            factory = SessionLocal
+        session = factory()
+        try:
+            session.execute(insert(EventLog), rows)
+            session.commit()
+            with self._stats_lock:
+                self.written += len(rows)
+        except Exception as exc:  # noqa: BLE001 - telemetry is best-effort
+            session.rollback()
+            with self._stats_lock:
+                self.failed += len(rows)
+            log.warning("event.telemetry.write_failed", extra={"error": str(exc), "rows": len(rows)})
+        finally:
+            session.close()
+
+
+_telemetry_writer: Optional[TelemetryEventWriter] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry_writer() -> TelemetryEventWriter:
+    global _telemetry_writer
+    if _telemetry_writer is None:
+        with _telemetry_lock:
+            if _telemetry_writer is None:
+                _telemetry_writer = TelemetryEventWriter()
+    return _telemetry_writer
+
+
+def shutdown_telemetry_writer(timeout: float = 5.0) -> None:
+    """Write queued telemetry events and stop the writer thread, if one was started."""
+
+    writer = _telemetry_writer
+    if writer is None:
+        return
+    writer.flush(timeout)
+    writer.close(timeout)
+
+
+def emit_telemetry_event(event: EventPayload) -> bool:
+    """Persist a non-critical event asynchronously; returns ``False`` if dropped."""
+
+    row = _event_row(event)
+    log.info("event.emit", extra={"event": {**event.model_dump(), "payload": row["payload"]}})
+    return get_telemetry_writer().submit(row)
 
 
 def _normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
@@ -19,10 +20,20 @@ from shapely.geometry import shape
 
 logger = logging.getLogger(__name__)
 
+# Urgency tier boundaries used by ``_classify_urgency``.
+URGENCY_TIER_THRESHOLDS: Tuple[int, ...] = (90, 70, 50)
+
 
 class ContagionAnalyzerService:
     """Identify contagion clusters and score nearby properties."""
 
+    # Aerial analysis is expensive; it only runs for the highest scoring
+    # properties and those sitting close to a tier boundary.
+    DEFAULT_AERIAL_TOP_N = 50
+    DEFAULT_IMAGERY_BUDGET = 100
+    DEFAULT_AERIAL_CONCURRENCY = 4
+    TIER_MARGIN = 5
+
     @classmethod
     async def identify_clusters(
         cls,
@@ -159,7 +170,18 @@ class ContagionAnalyzerService:
         cls,
         cluster_id: str,
         max_properties: int = 1000,
+        aerial_top_n: Optional[int] = None,
+        imagery_budget: Optional[int] = None,
+        aerial_concurrency: Optional[int] = None,
     ) -> Dict[str, object]:
+        """Score every property around a cluster.
+
+        Spatial, age and financial scores are computed for all properties
+        first. Aerial analysis then runs concurrently (at most
+        ``aerial_concurrency`` at a time) for the ``aerial_top_n`` highest
+        scores plus any property within ``TIER_MARGIN`` points of an urgency
+        tier boundary, capped at ``imagery_budget`` analyses per cluster.
+        """
         db = await get_db()
         try:
             cluster = await db.fetch_one(
@@ -198,18 +220,39 @@ class ContagionAnalyzerService:
                 },
             )
 
-            pipeline = EnhancedRoofAnalysisPipeline()
+            # Phase 1: cheap spatial / financial scoring for every property.
             scores: List[Dict[str, object]] = []
-            try:
-                for property_row in properties:
-                    try:
-                        score = await cls._calculate_property_score(db, property_row, cluster, pipeline)
-                        scores.append(score)
-                    except Exception as exc:  # noqa: BLE001
-                        logger.exception("contagion.score_error", property_id=property_row["id"], error=str(exc))
-                        continue
-            finally:
-                await pipeline.aclose()
+            property_lookup: Dict[object, Dict[str, object]] = {}
+            for property_row in properties:
+                try:
+                    score = await cls._calculate_property_score(db, property_row, cluster)
+                    scores.append(score)
+                    property_lookup[property_row["id"]] = property_row
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("contagion.score_error property_id=%s error=%s", property_row["id"], exc)
+                    continue
+
+            # Phase 2: bounded, concurrent aerial analysis for the shortlist.
+            candidates = cls._select_aerial_candidates(
+                scores,
+                property_lookup,
+                top_n=cls.DEFAULT_AERIAL_TOP_N if aerial_top_n is None else aerial_top_n,
+                budget=cls.DEFAULT_IMAGERY_BUDGET if imagery_budget is None else imagery_budget,
+            )
+            aerial_stats = {"aerial_candidates": len(candidates), "aerial_analyzed": 0, "aerial_failed": 0}
+            if candidates:
+                pipeline = EnhancedRoofAnalysisPipeline()
+                try:
+                    aerial_stats.update(
+                        await cls._run_aerial_phase(
+                            pipeline,
+                            candidates,
+                            property_lookup,
+                            concurrency=aerial_concurrency or cls.DEFAULT_AERIAL_CONCURRENCY,
+                        )
+                    )
+                finally:
+                    await pipeline.aclose()
 
             if scores:
                 stmt = insert(PropertyScore).values(scores)
@@ -229,6 +272,7 @@ class ContagionAnalyzerService:
                         "image_quality": stmt.excluded.image_quality,
                         "confidence": stmt.excluded.confidence,
                         "overlays_url": stmt.excluded.overlays_url,
+                        "data_sources_used": stmt.excluded.data_sources_used,
                         "last_updated_at": datetime.utcnow(),
                     },
                 )
@@ -253,6 +297,7 @@ class ContagionAnalyzerService:
                 "ultra_hot": sum(1 for s in scores if (s.get("total_urgency_score") or 0) >= 90),
                 "hot": sum(1 for s in scores if 70 <= (s.get("total_urgency_score") or 0) < 90),
                 "warm": sum(1 for s in scores if 50 <= (s.get("total_urgency_score") or 0) < 70),
+                **aerial_stats,
             }
         finally:
             await db.close()
@@ -412,7 +457,6 @@ class ContagionAnalyzerService:
         db,
         property_data: Dict[str, object],
         cluster: Dict[str, object],
-        pipeline: Optional[EnhancedRoofAnalysisPipeline] = None,
     ) -> Dict[str, object]:
         property_geom = sa.text(
             "ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography"
@@ -491,55 +535,6 @@ class ContagionAnalyzerService:
         financial_score = cls._score_financial(property_data)
         visual_score = cls._score_visual(property_data)
 
-        image_quality_score: Optional[float] = None
-        overlay_url: Optional[str] = None
-        imagery_confidence: Optional[float] = None
-        aerial_image_url: Optional[str] = property_data.get("aerial_image_url")
-        has_aerial_analysis = False
-
-        if (
-            pipeline
-            and property_data.get("latitude") is not None
-            and property_data.get("longitude") is not None
-        ):
-            try:
-                lat = float(property_data["latitude"])
-                lng = float(property_data["longitude"])
-                profile = PropertyProfile(
-                    year_built=property_data.get("year_built"),
-                    property_type=property_data.get("property_type"),
-                    lot_size_sqft=property_data.get("lot_size_sqft"),
-                    roof_material=property_data.get("roof_material"),
-                    bedrooms=property_data.get("bedrooms"),
-                    bathrooms=property_data.get("bathrooms"),
-                    square_feet=property_data.get("square_feet"),
-                    property_value=property_data.get("estimated_value"),
-                    last_roof_replacement_year=None,
-                    source="contagion",
-                )
-                enhanced = await pipeline.analyze_roof_with_quality_control(
-                    property_id=str(property_data["id"]),
-                    latitude=lat,
-                    longitude=lng,
-                    property_profile=profile,
-                    enable_street_view=False,
-                )
-                has_aerial_analysis = True
-                image_quality_score = enhanced.imagery.quality.overall_score
-                imagery_confidence = enhanced.roof_analysis.confidence
-                aerial_image_url = enhanced.imagery.public_url
-                overlay_url = enhanced.anomaly_bundle.heatmap_url
-                if enhanced.anomaly_bundle.heatmap_bytes:
-                    overlay_url = save_overlay_png(
-                        f"property-{property_data['id']}", enhanced.anomaly_bundle.heatmap_bytes
-                    )
-            except Exception as exc:  # noqa: BLE001
-                logger.debug(
-                    "contagion.imagery_fetch_failed",
-                    property_id=property_data.get("id"),
-                    error=str(exc),
-                )
-
         total_score = (contagion_score or 0) + age_match_score + financial_score + visual_score
         urgency_tier, recommended_action = cls._classify_urgency(total_score)
         confidence_level = cls._confidence_level(property_data, contagion_score)
@@ -563,18 +558,125 @@ class ContagionAnalyzerService:
             "home_value": property_data.get("estimated_value"),
             "estimated_equity_percent": property_data.get("equity_percent"),
             "visual_score": visual_score,
-            "has_aerial_analysis": has_aerial_analysis,
-            "aerial_image_url": aerial_image_url,
-            "image_quality": image_quality_score,
-            "confidence": imagery_confidence,
-            "overlays_url": overlay_url,
+            "has_aerial_analysis": False,
+            "aerial_image_url": property_data.get("aerial_image_url"),
+            "image_quality": None,
+            "confidence": None,
+            "overlays_url": None,
             "total_urgency_score": total_score,
             "urgency_tier": urgency_tier,
             "confidence_level": confidence_level,
             "recommended_action": recommended_action,
             "scored_at": datetime.utcnow(),
             "scoring_version": "v1.5",
-            "data_sources_used": None,
+            "data_sources_used": {"aerial": "skipped"},
+        }
+
+    @classmethod
+    def _select_aerial_candidates(
+        cls,
+        scores: List[Dict[str, object]],
+        property_lookup: Dict[object, Dict[str, object]],
+        top_n: int,
+        budget: int,
+    ) -> List[Dict[str, object]]:
+        """Pick which scored properties earn an aerial analysis.
+
+        Properties without coordinates cannot be imaged and are left out. Of
+        the rest, the ``top_n`` highest totals are always considered;
+        properties whose total sits within ``TIER_MARGIN`` of a tier threshold
+        are added next, closest to the boundary first. The result never
+        exceeds ``budget``.
+        """
+
+        if budget <= 0 or not scores:
+            return []
+
+        def locatable(score: Dict[str, object]) -> bool:
+            property_data = property_lookup.get(score["property_id"]) or {}
+            return property_data.get("latitude") is not None and property_data.get("longitude") is not None
+
+        ranked = sorted(filter(locatable, scores), key=lambda s: s.get("total_urgency_score") or 0, reverse=True)
+        selected = ranked[: max(0, top_n)]
+        chosen = {id(score) for score in selected}
+
+        def boundary_distance(score: Dict[str, object]) -> int:
+            total = score.get("total_urgency_score") or 0
+            return min(abs(total - threshold) for threshold in URGENCY_TIER_THRESHOLDS)
+
+        borderline = [
+            score
+            for score in ranked
+            if id(score) not in chosen and boundary_distance(score) <= cls.TIER_MARGIN
+        ]
+        borderline.sort(key=boundary_distance)
+        selected.extend(borderline)
+        return selected[:budget]
+
+    @classmethod
+    async def _run_aerial_phase(
+        cls,
+        pipeline: EnhancedRoofAnalysisPipeline,
+        candidates: List[Dict[str, object]],
+        property_lookup: Dict[object, Dict[str, object]],
+        concurrency: int,
+    ) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def analyze(score: Dict[str, object]) -> bool:
+            property_data = property_lookup.get(score["property_id"])
+            if not property_data:
+                return False
+            async with semaphore:
+                try:
+                    aerial = await cls._analyze_aerial(pipeline, property_data)
+                except Exception as exc:  # noqa: BLE001
+                    logger.debug("contagion.imagery_fetch_failed property_id=%s error=%s", property_data.get("id"), exc)
+                    score["data_sources_used"] = {"aerial": "failed"}
+                    return False
+            score.update(aerial)
+            score["data_sources_used"] = {"aerial": "analyzed"}
+            return True
+
+        results = await asyncio.gather(*(analyze(score) for score in candidates))
+        analyzed = sum(1 for ok in results if ok)
+        return {"aerial_analyzed": analyzed, "aerial_failed": len(results) - analyzed}
+
+    @staticmethod
+    async def _analyze_aerial(
+        pipeline: EnhancedRoofAnalysisPipeline,
+        property_data: Dict[str, object],
+    ) -> Dict[str, object]:
+        profile = PropertyProfile(
+            year_built=property_data.get("year_built"),
+            property_type=property_data.get("property_type"),
+            lot_size_sqft=property_data.get("lot_size_sqft"),
+            roof_material=property_data.get("roof_material"),
+            bedrooms=property_data.get("bedrooms"),
+            bathrooms=property_data.get("bathrooms"),
+            square_feet=property_data.get("square_feet"),
+            property_value=property_data.get("estimated_value"),
+            last_roof_replacement_year=None,
+            source="contagion",
+        )
+        enhanced = await pipeline.analyze_roof_with_quality_control(
+            property_id=str(property_data["id"]),
+            latitude=float(property_data["latitude"]),
+            longitude=float(property_data["longitude"]),
+            property_profile=profile,
+            enable_street_view=False,
+        )
+        overlay_url = enhanced.anomaly_bundle.heatmap_url
+        if enhanced.anomaly_bundle.heatmap_bytes:
+            overlay_url = save_overlay_png(
+                f"property-{property_data['id']}", enhanced.anomaly_bundle.heatmap_bytes
+            )
+        return {
+            "has_aerial_analysis": True,
+            "image_quality": enhanced.imagery.quality.overall_score,
+            "confidence": enhanced.roof_analysis.confidence,
+            "aerial_image_url": enhanced.imagery.public_url,
+            "overlays_url": overlay_url,
         }
 
     # ------------------------------------------------------------------
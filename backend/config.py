@@ -54,6 +54,9 @@ class StorageSettings(BaseSettings):
     s3_access_key_id: Optional[str] = Field(None, env="S3_ACCESS_KEY_ID")
     s3_secret_access_key: Optional[str] = Field(None, env="S3_SECRET_ACCESS_KEY")
     s3_endpoint_url: Optional[str] = Field(None, env="S3_ENDPOINT_URL")
+    cost_ledger_dir: Optional[Path] = Field(None, env="COST_LEDGER_DIR", description="Image-processor cost ledger (read-only)")
+    roof_analysis_cache_dir: Optional[Path] = Field(None, env="ROOF_ANALYSIS_CACHE_DIR", description="Disk tier for cached roof image features")
+    roof_analysis_cache_entries: int = Field(1024, ge=0, env="ROOF_ANALYSIS_CACHE_ENTRIES")
 
 
 class ProviderSettings(BaseSettings):
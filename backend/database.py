@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import hashlib
+import importlib
 import os
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
 
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import MetaData, create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -15,8 +20,14 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Records which revision of the schema guards / ORM metadata has been applied,
+# so process start-up can skip reflecting the whole schema.
+SCHEMA_VERSION_TABLE = "schema_guard_version"
+# pg_advisory_xact_lock key serialising schema reconciliation across workers
+SCHEMA_LOCK_KEY = 7_215_004_127
 
-def _ensure_schema() -> None:
+
+def _ensure_schema(engine: Engine = engine) -> None:
     inspector = inspect(engine)
     tables = set(inspector.get_table_names())
 
@@ -756,8 +767,130 @@ def _ensure_schema() -> None:
             )
 
 
+def schema_fingerprint(bind: Optional[Engine] = None, metadata: Optional[MetaData] = None) -> str:
+    """Hash the ORM schema (tables, columns and indexes) for the target dialect.
+
+    The schema guards only add columns/indexes the models declare, so any
+    model change that needs them alters the fingerprint and forces a single
+    full reconciliation on the next boot.
+    """
+
+    bind = bind if bind is not None else engine
+    if metadata is None:
+        importlib.import_module("models")  # registers every table on Base.metadata
+        metadata = Base.metadata
+    digest = hashlib.sha256(bind.dialect.name.encode("utf-8"))
+    for name in sorted(metadata.tables):
+        table = metadata.tables[name]
+        digest.update(f"\0{name}".encode("utf-8"))
+        for column in table.columns:
+            digest.update(
+                f"|{column.name}:{column.type!r}:{column.nullable}:{column.primary_key}".encode("utf-8")
+            )
+        for index in sorted(table.indexes, key=lambda item: item.name or ""):
+            columns = ",".join(column.name for column in index.columns)
+            digest.update(f"|index {index.name}:{columns}:{index.unique}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _read_fingerprint(connection: Connection, component: str) -> Optional[str]:
+    row = connection.execute(
+        text(f"SELECT fingerprint FROM {SCHEMA_VERSION_TABLE} WHERE component = :component"),
+        {"component": component},
+    ).first()
+    return row[0] if row else None
+
+
+def _stored_fingerprint(component: str, bind: Engine) -> Optional[str]:
+    try:
+        with bind.connect() as connection:
+            return _read_fingerprint(connection, component)
+    except Exception:
+        return None
+
+
+def _ensure_version_table(connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"""
+            CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+                component VARCHAR(32) PRIMARY KEY,
+                fingerprint VARCHAR(64) NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    )
+
+
+def _store_fingerprint(component: str, fingerprint: str, connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"""
+            INSERT INTO {SCHEMA_VERSION_TABLE} (component, fingerprint) VALUES (:component, :fingerprint)
+            ON CONFLICT (component) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint, applied_at = CURRENT_TIMESTAMP
+            """
+        ),
+        {"component": component, "fingerprint": fingerprint},
+    )
+
+
+@contextmanager
+def _schema_lock(bind: Engine) -> Iterator[Connection]:
+    """Transaction holding the schema advisory lock on PostgreSQL.
+
+    The lock is released when the transaction ends, so workers booting together
+    reconcile the schema one at a time. Other dialects run unlocked.
+    """
+
+    with bind.begin() as connection:
+        if bind.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        yield connection
+
+
+def _force_schema_check() -> bool:
+    return os.getenv("FISHMOUTH_FORCE_SCHEMA_CHECK", "").lower() in {"1", "true", "yes"}
+
+
+def _reconcile(component: str, apply: Callable[[Engine], None], force: bool, bind: Optional[Engine]) -> bool:
+    bind = bind if bind is not None else engine
+    fingerprint = schema_fingerprint(bind)
+    force = force or _force_schema_check()
+    if not force and _stored_fingerprint(component, bind) == fingerprint:
+        return False
+    with _schema_lock(bind) as connection:
+        _ensure_version_table(connection)
+        # Another worker may have finished the same reconciliation while we waited
+        if not force and _read_fingerprint(connection, component) == fingerprint:
+            return False
+        apply(bind)
+        _store_fingerprint(component, fingerprint, connection)
+    return True
+
+
+def ensure_schema(force: bool = False, bind: Optional[Engine] = None) -> bool:
+    """Run the schema guards only when the stored fingerprint is stale.
+
+    Returns ``True`` when the full reflection pass ran. Set
+    ``FISHMOUTH_FORCE_SCHEMA_CHECK=1`` (or pass ``force``) to always run it.
+    """
+
+    return _reconcile("guards", _ensure_schema, force, bind)
+
+
+def ensure_tables(force: bool = False, bind: Optional[Engine] = None) -> bool:
+    """``Base.metadata.create_all`` gated on the same schema fingerprint.
+
+    Returns ``True`` when tables were (re)checked against the database.
+    """
+
+    return _reconcile("metadata", lambda target: Base.metadata.create_all(bind=target), force, bind)
+
+
 try:
-    _ensure_schema()
+    ensure_schema()
 except Exception:
     # Database might not be ready yet (during initial migration setup).
     pass
@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import sentry_sdk
 import structlog
 from fastapi import FastAPI, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
@@ -25,7 +26,7 @@ from datetime import date, datetime, timedelta
 import secrets
 from pathlib import Path
 
-from database import engine, get_db, Base, SessionLocal
+from database import ensure_tables, get_db, SessionLocal
 from models import (
     User,
     AreaScan,
@@ -106,11 +107,11 @@ from cryptography.exceptions import InvalidSignature
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
 from logging_config import bind_request_context, clear_request_context, configure_logging
 from shared.observability import init_tracing
-from app.lib import request_id_middleware_factory
+from app.lib import request_id_middleware_factory, shutdown_telemetry_writer
 from app.lib.otel import setup_otel
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Create tables (skipped when the stored model fingerprint is current)
+ensure_tables()
 
 settings = get_settings()
 configure_logging()
@@ -271,6 +272,12 @@ async def on_startup() -> None:
     logger.info("app.startup", environment=settings.environment)
 
 
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    # The telemetry writer is a daemon thread; write what it still holds
+    await run_in_threadpool(shutdown_telemetry_writer)
+
+
 @app.websocket("/ws/scans/{scan_id}")
 async def scan_progress_websocket(websocket: WebSocket, scan_id: int) -> None:
     await websocket.accept()
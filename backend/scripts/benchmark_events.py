@@ -0,0 +1,112 @@
+"""Benchmark event emission throughput (events/sec) for each write mode."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.lib.events import EventPayload, TelemetryEventWriter, emit_event
+from app.models import EventLog
+
+
+def _payload(index: int) -> EventPayload:
+    return EventPayload(
+        type="message.sent",
+        source_service="benchmark",
+        lead_id=str(index % 97),
+        payload={"index": index, "channel": "email"},
+    )
+
+
+def run_immediate(factory: Callable[[], Session], count: int, per_commit: int) -> None:
+    session = factory()
+    try:
+        for index in range(count):
+            emit_event(session, _payload(index), buffered=False)
+            if (index + 1) % per_commit == 0:
+                session.commit()
+        session.commit()
+    finally:
+        session.close()
+
+
+def run_buffered(factory: Callable[[], Session], count: int, per_commit: int) -> None:
+    session = factory()
+    try:
+        for index in range(count):
+            emit_event(session, _payload(index))
+            if (index + 1) % per_commit == 0:
+                session.commit()
+        session.commit()
+    finally:
+        session.close()
+
+
+def run_telemetry(factory: Callable[[], Session], count: int, per_commit: int) -> None:
+    writer = TelemetryEventWriter(session_factory=factory, max_queue=max(count, 1), flush_interval=0.05)
+    for index in range(count):
+        writer.submit(
+            {
+                "id": _payload(index).id,
+                "type": "message.sent",
+                "source_service": "benchmark",
+                "payload": {"index": index},
+            }
+        )
+    writer.flush()
+    writer.close()
+
+
+MODES: Dict[str, Callable[[Callable[[], Session], int, int], None]] = {
+    "immediate": run_immediate,
+    "buffered": run_buffered,
+    "telemetry": run_telemetry,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark app.lib.events write modes")
+    parser.add_argument("--events", type=int, default=5000, help="Events emitted per mode")
+    parser.add_argument(
+        "--per-commit",
+        type=int,
+        default=10,
+        help="Events emitted per transaction (approximates events per request)",
+    )
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    tmpdir = None
+    database_url = args.database_url
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_url = f"sqlite:///{os.path.join(tmpdir.name, 'events.db')}"
+
+    engine = create_engine(database_url)
+    EventLog.__table__.create(bind=engine, checkfirst=True)
+    factory = sessionmaker(bind=engine)
+
+    try:
+        for name, runner in MODES.items():
+            start = time.perf_counter()
+            runner(factory, args.events, args.per_commit)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<10} {args.events / elapsed:>10.0f} events/sec ({elapsed:.2f}s)")
+    finally:
+        engine.dispose()
+        if tmpdir:
+            tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
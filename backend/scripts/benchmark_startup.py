@@ -0,0 +1,81 @@
+"""Measure cold-start import time of the API and Celery worker entrypoints."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS: Dict[str, str] = {
+    "api": "main",
+    "worker": "celery_app",
+}
+
+_PROBE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+logger = logging.getLogger("benchmark_startup")
+
+
+def measure(module: str, runs: int) -> List[float]:
+    """Import ``module`` in ``runs`` fresh interpreters and return the timings."""
+
+    timings: List[float] = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{completed.stderr.strip()}")
+        timings.append(float(completed.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cold start of backend processes")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument(
+        "--target",
+        choices=sorted(TARGETS),
+        action="append",
+        help="Restrict to one target (repeatable); defaults to all",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Exit non-zero when any target's median exceeds this budget",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    over_budget = False
+    for name in args.target or sorted(TARGETS):
+        timings = measure(TARGETS[name], args.runs)
+        median = statistics.median(timings)
+        print(f"{name:<8} median={median:.3f}s min={min(timings):.3f}s max={max(timings):.3f}s runs={len(timings)}")
+        if args.max_seconds is not None and median > args.max_seconds:
+            logger.warning("Startup budget exceeded", extra={"target": name, "median_seconds": median})
+            over_budget = True
+
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
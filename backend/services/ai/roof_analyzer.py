@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import logging
 import math
 from dataclasses import dataclass
 from datetime import datetime
 from io import BytesIO
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 from PIL import Image, ImageFilter
 
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever feature extraction changes so cached features are not reused
+ANALYZER_VERSION = "roof-cv-1"
+
 
 @dataclass
 class RoofAnalysisResult:
@@ -25,6 +33,19 @@ class RoofAnalyzer:
     """Performs computer-vision-based assessment of roof imagery."""
 
     def analyze(self, image_bytes: bytes, metadata: Dict) -> RoofAnalysisResult:
+        cache = _feature_cache()
+        if cache is None:
+            features = self.extract_features(image_bytes)
+        else:
+            digest = cache.digest(image_bytes)
+            features = cache.get(digest, "roof_analyzer", ANALYZER_VERSION)
+            if features is None:
+                features = self.extract_features(image_bytes)
+                cache.put(digest, "roof_analyzer", ANALYZER_VERSION, features)
+        return self.score(features, metadata)
+
+    def extract_features(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Image-only measurements; independent of property metadata, so cacheable by content"""
         image = Image.open(BytesIO(image_bytes)).convert("RGB")
         resized = image.resize((512, 512))
         np_image = np.asarray(resized) / 255.0
@@ -61,17 +82,34 @@ class RoofAnalyzer:
         if contrast < 0.08:
             damage_indicators.append("granule_loss")
 
+        height, width, _ = np_image.shape
+        return {
+            "contrast": contrast,
+            "edge_density": edge_density,
+            "dark_streak_ratio": dark_streak_ratio,
+            "moss_ratio": moss_ratio,
+            "texture_diff": texture_diff,
+            "damage_indicators": damage_indicators,
+            "min_dimension": min(height, width),
+        }
+
+    def score(self, features: Dict[str, Any], metadata: Dict) -> RoofAnalysisResult:
+        contrast = features["contrast"]
+        dark_streak_ratio = features["dark_streak_ratio"]
+        moss_ratio = features["moss_ratio"]
+        damage_indicators = list(features["damage_indicators"])
+
         roof_age_years = self._estimate_roof_age(metadata, damage_indicators, dark_streak_ratio, moss_ratio)
         condition_score = self._compute_condition_score(damage_indicators, dark_streak_ratio, moss_ratio, contrast)
         replacement_urgency = self._determine_urgency(condition_score, roof_age_years, damage_indicators)
-        confidence = self._estimate_confidence(metadata, np_image)
+        confidence = self._estimate_confidence(metadata, features["min_dimension"])
 
         metrics = {
             "contrast": round(contrast, 4),
-            "edge_density": round(edge_density, 4),
+            "edge_density": round(features["edge_density"], 4),
             "dark_streak_ratio": round(dark_streak_ratio, 4),
             "moss_ratio": round(moss_ratio, 4),
-            "texture_diff": round(texture_diff, 4),
+            "texture_diff": round(features["texture_diff"], 4),
         }
 
         summary = self._build_summary(replacement_urgency, damage_indicators, roof_age_years, condition_score, metadata)
@@ -123,9 +161,8 @@ class RoofAnalyzer:
             return "plan_ahead"
         return "good_condition"
 
-    def _estimate_confidence(self, metadata: Dict, np_image: np.ndarray) -> float:
-        height, width, _ = np_image.shape
-        resolution_factor = min(height, width) / 1024
+    def _estimate_confidence(self, metadata: Dict, min_dimension: int) -> float:
+        resolution_factor = min_dimension / 1024
         metadata_factor = 0.2 if metadata.get("year_built") else 0.0
         metadata_factor += 0.2 if metadata.get("last_roof_replacement_year") else 0.0
         return float(np.clip(0.55 + resolution_factor * 0.25 + metadata_factor, 0.55, 0.95))
@@ -150,5 +187,32 @@ class RoofAnalyzer:
         return f"Detected {issues} on a {material} roof. {value_segment} {urgency_text}"
 
 
+_feature_caches: Dict[str, Any] = {}
+
+
+def _feature_cache():
+    """Process-wide feature cache; ``None`` when disabled (ROOF_ANALYSIS_CACHE_ENTRIES=0, no dir).
+
+    The cache lives in the repo-level ``shared`` package, which only some
+    entry points (backend ``main.py``) put on ``sys.path``. Celery workers and
+    other callers without it analyse uncached rather than fail.
+    """
+    storage = get_settings().storage
+    if not storage.roof_analysis_cache_entries and not storage.roof_analysis_cache_dir:
+        return None
+    key = f"{storage.roof_analysis_cache_dir}:{storage.roof_analysis_cache_entries}"
+    if key not in _feature_caches:
+        try:
+            from shared.inference_cache import InferenceResultCache
+        except ImportError as exc:
+            logger.warning("Roof feature cache unavailable, analysing uncached: %s", exc)
+            _feature_caches[key] = None
+        else:
+            _feature_caches[key] = InferenceResultCache(
+                storage.roof_analysis_cache_dir, max_entries=storage.roof_analysis_cache_entries
+            )
+    return _feature_caches[key]
+
+
 def analyze_roof(image_bytes: bytes, metadata: Dict) -> RoofAnalysisResult:
     return RoofAnalyzer().analyze(image_bytes, metadata)
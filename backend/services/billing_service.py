@@ -2,15 +2,24 @@
 
 from __future__ import annotations
 
-from datetime import date, timedelta
-from typing import Dict, List, Optional
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
 
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from config import get_settings
 from models import BillingUsage, User
 from services.billing_stripe import report_usage as stripe_report_usage
 
+if TYPE_CHECKING:
+    from shared.cost_ledger import CostLedger
+
+logger = logging.getLogger(__name__)
+
 VOICE_MINUTE_COST = 0.18 / 60  # $0.18 per minute -> per second cost
 SMS_COST = 0.01
 EMAIL_COST = 0.002
@@ -147,6 +156,7 @@ def get_billing_summary(db: Session, *, days: int = 30) -> Dict:
         "top_users": top_users,
         "since": since.isoformat(),
         "days": days,
+        "imagery_costs": get_imagery_costs(start=since, end=date.today()),
     }
 
 
@@ -173,3 +183,75 @@ def aggregate_usage_for_period(db: Session, *, start: date, end: date) -> Dict[i
         entry[row.metric] = entry.get(row.metric, 0.0) + row.quantity
 
     return aggregates
+
+
+# Read-only ledgers by directory, most recently used last
+_imagery_ledgers: "OrderedDict[Path, CostLedger]" = OrderedDict()
+MAX_IMAGERY_LEDGERS = 4
+
+
+def _imagery_ledger(ledger_dir: Optional[Union[str, Path]] = None) -> Optional["CostLedger"]:
+    """Reader for the imagery cost ledger; ``None`` when unconfigured or unavailable.
+
+    The ledger lives in the repo-level ``shared`` package, which only some
+    entry points put on ``sys.path``; without it imagery costs are left out
+    of summaries rather than failing them.
+    """
+    root = ledger_dir or get_settings().storage.cost_ledger_dir
+    if not root:
+        return None
+    root = Path(root)
+    ledger = _imagery_ledgers.get(root)
+    if ledger is None:
+        try:
+            from shared.cost_ledger import CostLedger
+        except ImportError as exc:
+            logger.warning("Imagery cost ledger unavailable, omitting imagery costs: %s", exc)
+            return None
+        ledger = _imagery_ledgers[root] = CostLedger(root, read_only=True)
+        while len(_imagery_ledgers) > MAX_IMAGERY_LEDGERS:
+            _imagery_ledgers.popitem(last=False)
+    _imagery_ledgers.move_to_end(root)
+    return ledger
+
+
+def get_imagery_costs(
+    *, start: date, end: date, ledger_dir: Optional[Union[str, Path]] = None
+) -> Optional[Dict]:
+    """Imagery provider spend from the image-processor cost ledger.
+
+    Reads the ledger's checkpointed daily aggregates (no per-entry parsing) and
+    reports them as ``billing_usage``-style ``imagery.<source>`` metrics.
+    Returns ``None`` when no ledger directory is configured or the ``shared``
+    package cannot be imported.
+    """
+
+    ledger = _imagery_ledger(ledger_dir)
+    if ledger is None:
+        return None
+
+    from shared.cost_ledger import iter_billing_rows
+
+    days = ledger.days(start, end)
+    metrics: Dict[str, Dict[str, float]] = {}
+    daily: List[Dict] = []
+    for row in iter_billing_rows(days):
+        entry = metrics.setdefault(row["metric"], {"quantity": 0.0, "cost_usd": 0.0})
+        entry["quantity"] += row["quantity"]
+        entry["cost_usd"] += row["cost_usd"]
+    for aggregate in days:
+        if aggregate.entries:
+            daily.append(
+                {
+                    "day": datetime.strptime(aggregate.day, "%Y%m%d").date().isoformat(),
+                    "properties": aggregate.entries,
+                    "cost_usd": round(aggregate.total_cost, 4),
+                }
+            )
+
+    return {
+        "total_cost": round(sum(aggregate.total_cost for aggregate in days), 4),
+        "properties": sum(aggregate.entries for aggregate in days),
+        "metrics": metrics,
+        "daily_breakdown": daily,
+    }
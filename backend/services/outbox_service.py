@@ -57,6 +57,9 @@ def _record_event(session: Session, message_id: str, event_type: str, meta: Dict
 
 
 def _emit_domain_event(session: Session, message: OutboxMessage, event_type: str, payload: Dict[str, Any]) -> None:
+    # The event row is buffered until the caller commits, so only validation
+    # errors are caught here; a failed insert fails that commit, together with
+    # the outbox change it describes.
     try:
         event_payload = {**payload, "message_id": str(message.id), "channel": message.channel}
         lead_id_value = payload.get("lead_id")
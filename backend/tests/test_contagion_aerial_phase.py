@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.contagion_analyzer import ContagionAnalyzerService
+
+
+def _score(property_id: int, total: int) -> dict:
+    return {
+        "property_id": property_id,
+        "total_urgency_score": total,
+        "has_aerial_analysis": False,
+        "data_sources_used": {"aerial": "skipped"},
+    }
+
+
+def _located(scores) -> dict:
+    return {score["property_id"]: {"latitude": 30.27, "longitude": -97.74} for score in scores}
+
+
+def test_aerial_candidates_include_top_scores_and_tier_edges():
+    scores = [_score(1, 95), _score(2, 88), _score(3, 68), _score(4, 60), _score(5, 51), _score(6, 20)]
+
+    selected = ContagionAnalyzerService._select_aerial_candidates(scores, _located(scores), top_n=2, budget=10)
+    selected_ids = [score["property_id"] for score in selected]
+
+    assert selected_ids[:2] == [1, 2]
+    # 51 is one point from the warm threshold, 68 is two points from hot.
+    assert selected_ids[2:] == [5, 3]
+    assert 4 not in selected_ids and 6 not in selected_ids
+
+
+def test_aerial_candidates_respect_imagery_budget():
+    scores = [_score(i, 100 - i) for i in range(20)]
+    lookup = _located(scores)
+
+    assert len(ContagionAnalyzerService._select_aerial_candidates(scores, lookup, top_n=20, budget=3)) == 3
+    assert ContagionAnalyzerService._select_aerial_candidates(scores, lookup, top_n=20, budget=0) == []
+
+
+def test_aerial_candidates_skip_properties_without_coordinates():
+    scores = [_score(1, 99), _score(2, 98), _score(3, 97), _score(4, 96)]
+    lookup = _located(scores)
+    lookup[1]["latitude"] = None
+    lookup[3] = {"latitude": 30.27, "longitude": None}
+
+    selected = ContagionAnalyzerService._select_aerial_candidates(scores, lookup, top_n=2, budget=2)
+
+    assert [score["property_id"] for score in selected] == [2, 4]
+
+
+class _FakePipeline:
+    def __init__(self, fail_ids=()):
+        self.active = 0
+        self.peak = 0
+        self.fail_ids = set(fail_ids)
+
+    async def analyze_roof_with_quality_control(self, property_id, latitude, longitude, property_profile, enable_street_view):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if property_id in self.fail_ids:
+                raise RuntimeError("imagery unavailable")
+            return SimpleNamespace(
+                imagery=SimpleNamespace(quality=SimpleNamespace(overall_score=81.0), public_url=f"/aerial/{property_id}.jpg"),
+                roof_analysis=SimpleNamespace(confidence=0.77),
+                anomaly_bundle=SimpleNamespace(heatmap_url=None, heatmap_bytes=None),
+            )
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_aerial_phase_is_bounded_and_reports_into_scores():
+    scores = [_score(i, 90) for i in range(6)]
+    lookup = {i: {"id": i, "latitude": 30.27, "longitude": -97.74, "year_built": 2001} for i in range(6)}
+    pipeline = _FakePipeline(fail_ids={"5"})
+
+    stats = await ContagionAnalyzerService._run_aerial_phase(pipeline, scores, lookup, concurrency=2)
+
+    assert pipeline.peak <= 2
+    assert stats == {"aerial_analyzed": 5, "aerial_failed": 1}
+    assert scores[0]["has_aerial_analysis"] is True
+    assert scores[0]["image_quality"] == 81.0
+    assert scores[0]["data_sources_used"] == {"aerial": "analyzed"}
+    assert scores[5]["has_aerial_analysis"] is False
+    assert scores[5]["data_sources_used"] == {"aerial": "failed"}
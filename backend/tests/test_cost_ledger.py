@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from shared.cost_ledger import CostLedger, day_key  # noqa: E402
+from services.billing_service import get_imagery_costs  # noqa: E402
+
+
+def _entry(day: date, cost: float, sources, source_costs=None) -> dict:
+    entry = {
+        "property_id": "p",
+        "total_cost": cost,
+        "sources_used": list(sources),
+        "timestamp": f"{day.isoformat()}T12:00:00",
+    }
+    if source_costs:
+        entry["source_costs"] = source_costs
+    return entry
+
+
+def test_appends_are_buffered_until_batch_is_full(tmp_path):
+    ledger = CostLedger(tmp_path, flush_every=3, flush_interval=3600, checkpoint_interval=3600)
+    today = date.today()
+
+    ledger.record(_entry(today, 0.0, ["openstreetmap_free"]))
+    ledger.record(_entry(today, 0.0, ["openstreetmap_free"]))
+    entries = tmp_path / f"costs_{day_key(today)}.jsonl"
+    assert not entries.exists()
+    assert ledger.day(today).entries == 2
+
+    ledger.record(_entry(today, 0.02, ["google_maps_optimized"], {"google_maps_optimized": 0.02}))
+    assert len(entries.read_text().splitlines()) == 3
+
+
+def test_checkpoint_and_tail_replay_rebuild_aggregates(tmp_path):
+    today = date.today()
+    ledger = CostLedger(tmp_path, flush_interval=3600, checkpoint_interval=3600)
+    for _ in range(4):
+        ledger.record(_entry(today, 0.01, ["google_maps_optimized"], {"google_maps_optimized": 0.01}))
+    ledger.close()
+
+    # Simulate entries appended after the last checkpoint (e.g. a crash before it ran)
+    with open(tmp_path / f"costs_{day_key(today)}.jsonl", "a") as handle:
+        handle.write(json.dumps(_entry(today, 0.0, ["openstreetmap_free"])) + "\n")
+        handle.write('{"total_cost": 1.0')  # torn write is ignored
+
+    reopened = CostLedger(tmp_path).day(today)
+    assert reopened.entries == 5
+    assert round(reopened.total_cost, 4) == 0.04
+    assert reopened.source_usage == {"google_maps_optimized": 4, "openstreetmap_free": 1}
+    assert round(reopened.source_cost["google_maps_optimized"], 4) == 0.04
+
+
+def test_range_summary_and_billing_metrics(tmp_path):
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    ledger = CostLedger(tmp_path)
+    ledger.record(_entry(yesterday, 0.02, ["google_maps_optimized"], {"google_maps_optimized": 0.02}))
+    ledger.record(_entry(today, 0.0, ["openstreetmap_free"]))
+    ledger.record(_entry(today, 0.0, ["openstreetmap_free"]))
+    ledger.close()
+
+    summary = CostLedger(tmp_path, read_only=True).summary(yesterday, today)
+    assert summary.entries == 3
+    assert summary.source_usage == {"google_maps_optimized": 1, "openstreetmap_free": 2}
+
+    imagery = get_imagery_costs(start=yesterday, end=today, ledger_dir=tmp_path)
+    assert imagery["properties"] == 3
+    assert imagery["total_cost"] == 0.02
+    assert imagery["metrics"]["imagery.openstreetmap_free"] == {"quantity": 2.0, "cost_usd": 0.0}
+    assert [row["properties"] for row in imagery["daily_breakdown"]] == [1, 2]
+
+
+def test_day_cache_is_bounded_and_keeps_unwritten_days(tmp_path):
+    today = date.today()
+    ledger = CostLedger(tmp_path, flush_interval=3600, checkpoint_interval=3600, max_cached_days=3)
+    ledger.record(_entry(today, 0.01, ["google_maps_optimized"]))
+
+    ledger.days(today - timedelta(days=10), today - timedelta(days=1))
+    assert len(ledger._days) == 3
+    # Today's entry is still buffered, so its aggregate is never dropped
+    assert ledger.day(today).entries == 1
+
+    ledger.close()
+    ledger.days(today - timedelta(days=20), today - timedelta(days=11))
+    assert len(ledger._days) == 3
+    assert ledger.day(today).entries == 1
+
+
+def test_imagery_costs_are_omitted_without_the_shared_package(tmp_path, monkeypatch):
+    import builtins
+
+    from services import billing_service
+
+    real_import = builtins.__import__
+
+    def no_shared(name, *args, **kwargs):
+        if name == "shared.cost_ledger":
+            raise ModuleNotFoundError("No module named 'shared'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_shared)
+    monkeypatch.setattr(billing_service, "_imagery_ledgers", type(billing_service._imagery_ledgers)())
+    assert get_imagery_costs(start=date.today(), end=date.today(), ledger_dir=tmp_path) is None
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.lib import events
+from app.lib.events import EventPayload, TelemetryEventWriter, emit_event, flush_events
+from app.models import EventLog
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    EventLog.__table__.create(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _event(index: int = 0) -> EventPayload:
+    return EventPayload(type="report.viewed", source_service="unit.test", payload={"index": index})
+
+
+def test_buffered_events_are_written_on_commit(session_factory):
+    session = session_factory()
+    ids = [emit_event(session, _event(i)) for i in range(3)]
+
+    assert session.query(EventLog).count() == 0
+    session.commit()
+
+    assert {row.id for row in session.query(EventLog).all()} == set(ids)
+    session.close()
+
+
+def test_buffered_events_are_discarded_on_rollback(session_factory):
+    session = session_factory()
+    emit_event(session, _event())
+    session.rollback()
+    session.commit()
+
+    assert session.query(EventLog).count() == 0
+    assert flush_events(session) == 0
+    session.close()
+
+
+def test_unbuffered_event_is_flushed_immediately(session_factory):
+    session = session_factory()
+    event_id = emit_event(session, _event(), buffered=False)
+
+    assert session.get(EventLog, event_id) is not None
+    session.close()
+
+
+def test_unsupported_event_type_rejected(session_factory):
+    session = session_factory()
+    with pytest.raises(ValueError):
+        emit_event(session, EventPayload(type="bogus.type", source_service="unit.test"))
+    session.close()
+
+
+def test_telemetry_writer_batches_and_applies_back_pressure(session_factory):
+    writer = TelemetryEventWriter(session_factory=session_factory, max_queue=2, flush_interval=0.05)
+    rows = [
+        {"id": f"evt-{i}", "type": "report.viewed", "source_service": "unit.test", "payload": {}}
+        for i in range(3)
+    ]
+
+    # Fill the queue before the writer thread has a chance to drain it.
+    writer._queue.put_nowait(rows[0])
+    writer._queue.put_nowait(rows[1])
+    assert writer.submit(rows[2]) is False
+    assert writer.dropped == 1
+
+    writer.flush(timeout=5)
+    writer.close()
+
+    session = session_factory()
+    assert session.query(EventLog).count() == 2
+    assert writer.written == 2
+    session.close()
+
+
+def test_shutdown_writes_queued_telemetry(session_factory, monkeypatch):
+    writer = TelemetryEventWriter(session_factory=session_factory, flush_interval=0.05)
+    monkeypatch.setattr(events, "_telemetry_writer", writer)
+    writer._queue.put_nowait({"id": "evt-late", "type": "report.viewed", "source_service": "unit.test", "payload": {}})
+
+    events.shutdown_telemetry_writer(timeout=5)
+
+    session = session_factory()
+    assert session.query(EventLog).filter_by(id="evt-late").count() == 1
+    assert writer.written == 1
+    assert writer._thread is None
+    session.close()
@@ -0,0 +1,76 @@
+import os
+import sys
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from shared.inference_cache import InferenceResultCache  # noqa: E402
+from services.ai import roof_analyzer  # noqa: E402
+from services.ai.roof_analyzer import ANALYZER_VERSION, RoofAnalyzer, analyze_roof  # noqa: E402
+
+
+def _roof_png(seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    buffer = BytesIO()
+    Image.fromarray(rng.integers(0, 255, (320, 320, 3), dtype=np.uint8)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_repeat_analysis_reuses_features_and_applies_metadata(tmp_path, monkeypatch):
+    cache = InferenceResultCache(tmp_path, max_entries=8)
+    monkeypatch.setattr(roof_analyzer, "_feature_cache", lambda: cache)
+    calls = []
+    original = RoofAnalyzer.extract_features
+
+    def counting(self, image_bytes):
+        calls.append(1)
+        return original(self, image_bytes)
+
+    monkeypatch.setattr(RoofAnalyzer, "extract_features", counting)
+    image = _roof_png(1)
+
+    first = analyze_roof(image, {"year_built": 1990})
+    second = analyze_roof(image, {"last_roof_replacement_year": 2015, "roof_material": "metal"})
+    assert len(calls) == 1
+    assert second.metrics == first.metrics
+    assert second.roof_age_years != first.roof_age_years
+    assert "metal roof" in second.summary
+
+    # Callers adjust results in place; that must not leak into the cache
+    first.damage_indicators.append("hail_damage")
+    assert analyze_roof(image, {"year_built": 1990}).damage_indicators == second.damage_indicators
+
+    # Disk tier survives a cold memory tier; a different image misses
+    monkeypatch.setattr(roof_analyzer, "_feature_cache", lambda: InferenceResultCache(tmp_path, max_entries=8))
+    analyze_roof(image, {})
+    analyze_roof(_roof_png(2), {})
+    assert len(calls) == 2
+
+
+def test_version_change_invalidates_cached_features(tmp_path):
+    cache = InferenceResultCache(tmp_path)
+    digest = cache.digest(b"roof")
+    cache.put(digest, "roof_analyzer", ANALYZER_VERSION, {"contrast": 0.1})
+
+    assert cache.get(digest, "roof_analyzer", "roof-cv-next") is None
+    assert cache.purge_stale("roof_analyzer", "roof-cv-next") == {"memory_entries": 1, "version_dirs": 1}
+    assert InferenceResultCache(tmp_path).get(digest, "roof_analyzer", ANALYZER_VERSION) is None
+
+
+def test_analysis_runs_uncached_when_shared_package_is_unavailable(monkeypatch):
+    import builtins
+
+    real_import = builtins.__import__
+
+    def no_shared(name, *args, **kwargs):
+        if name == "shared.inference_cache":
+            raise ModuleNotFoundError("No module named 'shared'")
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "__import__", no_shared)
+    monkeypatch.setattr(roof_analyzer, "_feature_caches", {})
+    assert roof_analyzer._feature_cache() is None
+    assert analyze_roof(_roof_png(3), {"year_built": 2000}).roof_age_years > 0
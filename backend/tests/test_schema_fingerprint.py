@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, create_engine
+
+import database
+
+
+def _engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+
+
+def test_schema_guards_run_once_per_fingerprint(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    calls = []
+    monkeypatch.setattr(database, "_ensure_schema", lambda bind: calls.append(bind))
+
+    assert database.ensure_schema(bind=engine) is True
+    assert database.ensure_schema(bind=engine) is False
+    assert database.ensure_schema(force=True, bind=engine) is True
+    assert calls == [engine, engine]
+
+    with engine.begin() as connection:
+        database._store_fingerprint("guards", "stale", connection)
+    assert database.ensure_schema(bind=engine) is True
+    assert database._stored_fingerprint("guards", engine) == database.schema_fingerprint(engine)
+
+
+def test_waiting_worker_skips_reconciliation_done_by_another(tmp_path, monkeypatch):
+    engine = _engine(tmp_path)
+    calls = []
+    monkeypatch.setattr(database, "_ensure_schema", lambda bind: calls.append(bind))
+    # The fast-path read saw a stale fingerprint, but the worker holding the lock finished first
+    monkeypatch.setattr(database, "_stored_fingerprint", lambda component, bind: None)
+    with engine.begin() as connection:
+        database._ensure_version_table(connection)
+        database._store_fingerprint("guards", database.schema_fingerprint(engine), connection)
+
+    assert database.ensure_schema(bind=engine) is False
+    assert calls == []
+
+
+def test_fingerprint_tracks_columns_and_indexes(tmp_path):
+    engine = _engine(tmp_path)
+
+    def fingerprint(extra_column=False, index=False):
+        metadata = MetaData()
+        columns = [Column("id", Integer, primary_key=True), Column("name", String(64))]
+        if extra_column:
+            columns.append(Column("email", String(255)))
+        table = Table("people", metadata, *columns)
+        if index:
+            Index("ix_people_name", table.c.name)
+        return database.schema_fingerprint(engine, metadata)
+
+    assert fingerprint() == fingerprint()
+    assert fingerprint(extra_column=True) != fingerprint()
+    assert fingerprint(index=True) != fingerprint()
+    assert database.schema_fingerprint(engine) == database.schema_fingerprint(engine)
@@ -2,6 +2,7 @@
 Address validation and geocoding service
 """
 import httpx
+import asyncio
 import logging
 from typing import Dict, Any, Optional
 import os
@@ -9,8 +10,71 @@ import re
 from geopy.geocoders import GoogleV3, Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
+from app.enrichment.cache import BoundedCache, IntervalGate
+
 logger = logging.getLogger(__name__)
 
+# USPS abbreviations applied word by word when building cache keys
+STREET_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'drive': 'dr',
+    'boulevard': 'blvd', 'lane': 'ln', 'court': 'ct', 'place': 'pl',
+    'circle': 'cir', 'parkway': 'pkwy', 'highway': 'hwy', 'terrace': 'ter',
+    'trail': 'trl', 'way': 'way', 'square': 'sq', 'expressway': 'expy',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'apartment': '#', 'apt': '#', 'suite': '#', 'ste': '#', 'unit': '#'
+}
+
+STATE_CODES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc',
+    'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il',
+    'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la',
+    'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma', 'michigan': 'mi',
+    'minnesota': 'mn', 'mississippi': 'ms', 'missouri': 'mo', 'montana': 'mt',
+    'nebraska': 'ne', 'nevada': 'nv', 'new hampshire': 'nh', 'new jersey': 'nj',
+    'new mexico': 'nm', 'new york': 'ny', 'north carolina': 'nc', 'north dakota': 'nd',
+    'ohio': 'oh', 'oklahoma': 'ok', 'oregon': 'or', 'pennsylvania': 'pa',
+    'rhode island': 'ri', 'south carolina': 'sc', 'south dakota': 'sd', 'tennessee': 'tn',
+    'texas': 'tx', 'utah': 'ut', 'vermont': 'vt', 'virginia': 'va', 'washington': 'wa',
+    'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy'
+}
+
+# Lookups in flight per provider and process; Nominatim is additionally paced by NOMINATIM_INTERVAL
+PROVIDER_LIMITS = {'google': 10, 'mapbox': 10, 'nominatim': 1}
+NOMINATIM_INTERVAL = 1.0
+
+# Addresses of one batch validated at once
+BATCH_CONCURRENCY = int(os.getenv('ADDRESS_BATCH_CONCURRENCY', 20))
+
+
+def _normalize_words(text: str) -> str:
+    text = re.sub(r'[^\w#\s]', ' ', (text or '').lower()).replace('#', ' # ')
+    words = [STREET_ABBREVIATIONS.get(word, word) for word in text.split()]
+    return ' '.join(words).replace('# #', '#')
+
+
+def normalize_address_key(
+    address: str,
+    city: str = '',
+    state: str = '',
+    zip_code: Optional[str] = None
+) -> str:
+    """
+    Canonical key for an address, so spelling variants share a cache entry
+    
+    Case, punctuation, whitespace, street suffixes, directionals, unit
+    designators and state names are normalized; ZIP+4 is cut to five digits.
+    """
+    state = re.sub(r'[^a-z ]', '', (state or '').lower()).strip()
+    zip_match = re.match(r'\d{5}', re.sub(r'\s', '', zip_code or ''))
+    return '|'.join([
+        _normalize_words(address),
+        _normalize_words(city),
+        STATE_CODES.get(state, state),
+        zip_match.group(0) if zip_match else ''
+    ])
+
 class AddressValidator:
     """Validates and standardizes addresses using multiple providers"""
     
@@ -25,6 +89,17 @@ class AddressValidator:
             self.google_geocoder = None
             
         self.nominatim_geocoder = Nominatim(user_agent="roofing_lead_generator")
+        
+        # Geocoded results keyed by normalized address, shared across replicas
+        self.cache = BoundedCache(
+            'address',
+            ttl_seconds=int(os.getenv('ADDRESS_CACHE_TTL', 30 * 86400)),
+            max_entries=int(os.getenv('ADDRESS_CACHE_MAX_ENTRIES', 200000))
+        )
+        self.provider_limits = {
+            provider: asyncio.Semaphore(limit) for provider, limit in PROVIDER_LIMITS.items()
+        }
+        self.nominatim_gate = IntervalGate('nominatim', NOMINATIM_INTERVAL)
     
     async def validate_address(
         self,
@@ -35,22 +110,33 @@ class AddressValidator:
     ) -> Dict[str, Any]:
         """
         Validate and standardize address using multiple providers
+        
+        Geocoded results are cached by normalized address; a cached result
+        costs nothing and is marked with ``cache_hit``.
         """
         full_address = f"{address}, {city}, {state}"
         if zip_code:
             full_address += f" {zip_code}"
         
-        result = {
-            'input_address': full_address,
-            'formatted_address': None,
-            'latitude': None,
-            'longitude': None,
-            'components': {},
-            'confidence': 0.0,
-            'provider': None,
-            'cost': 0.0
-        }
-        
+        result, cached = await self.cache.get_or_load(
+            normalize_address_key(address, city, state, zip_code),
+            lambda: self._validate_uncached(full_address, address, city, state, zip_code),
+            cache_if=lambda result: result.get('latitude') is not None
+        )
+        result = dict(result, input_address=full_address, cache_hit=cached)
+        if cached:
+            result['cost'] = 0.0
+        return result
+    
+    async def _validate_uncached(
+        self,
+        full_address: str,
+        address: str,
+        city: str,
+        state: str,
+        zip_code: Optional[str]
+    ) -> Dict[str, Any]:
+        """Walk the provider fallback chain for one address"""
         # Try Google Geocoding first (most accurate)
         if self.google_geocoder:
             google_result = await self._validate_with_google(full_address)
@@ -85,7 +171,7 @@ class AddressValidator:
                 'key': self.google_api_key
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self.provider_limits['google'], httpx.AsyncClient() as client:
                 response = await client.get(url, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -134,7 +220,7 @@ class AddressValidator:
                 'limit': 1
             }
             
-            async with httpx.AsyncClient() as client:
+            async with self.provider_limits['mapbox'], httpx.AsyncClient() as client:
                 response = await client.get(url, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -174,17 +260,17 @@ class AddressValidator:
         Validate address using OpenStreetMap Nominatim (free)
         """
         try:
-            # Use asyncio to run blocking geocoder
-            import asyncio
-            
-            location = await asyncio.get_event_loop().run_in_executor(
-                None, 
-                lambda: self.nominatim_geocoder.geocode(
-                    address, 
-                    country_codes='us',
-                    timeout=10
+            # Nominatim's usage policy allows one request per second in total
+            async with self.provider_limits['nominatim']:
+                await self.nominatim_gate.wait()
+                location = await asyncio.get_running_loop().run_in_executor(
+                    None, 
+                    lambda: self.nominatim_geocoder.geocode(
+                        address, 
+                        country_codes='us',
+                        timeout=10
+                    )
                 )
-            )
             
             if location:
                 return {
@@ -269,11 +355,14 @@ class AddressValidator:
     async def batch_validate(self, addresses: list) -> list:
         """
         Validate multiple addresses in batch
+        
+        Addresses are deduplicated by normalized key and the distinct ones
+        validated concurrently; repeats get a copy of the first result at no cost.
         """
-        results = []
+        keyed = []
         for addr_data in addresses:
             if isinstance(addr_data, dict):
-                result = await self.validate_address(
+                parts = (
                     addr_data.get('address', ''),
                     addr_data.get('city', ''),
                     addr_data.get('state', ''),
@@ -281,10 +370,30 @@ class AddressValidator:
                 )
             elif isinstance(addr_data, str):
                 # Try to parse full address string
-                result = await self.validate_address(addr_data, '', '')
+                parts = (addr_data, '', '', None)
             else:
                 continue
-                
+            keyed.append((normalize_address_key(*parts), parts))
+        
+        distinct = {}
+        for key, parts in keyed:
+            distinct.setdefault(key, parts)
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def validate(parts) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.validate_address(*parts)
+        
+        validated = dict(zip(distinct, await asyncio.gather(*(validate(parts) for parts in distinct.values()))))
+        
+        results = []
+        seen = set()
+        for key, parts in keyed:
+            result = validated[key]
+            if key in seen:
+                input_address = f"{parts[0]}, {parts[1]}, {parts[2]}" + (f" {parts[3]}" if parts[3] else "")
+                result = dict(result, input_address=input_address, cost=0.0, cache_hit=True)
+            seen.add(key)
             results.append(result)
         
-        return results
\ No newline at end of file
+        return results
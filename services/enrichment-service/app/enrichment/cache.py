@@ -0,0 +1,323 @@
+"""
+Shared enrichment cache and rate-limit counters
+
+``BoundedCache`` is a namespaced LRU + TTL cache. In production it lives in
+Redis, so every enrichment replica shares hits. Each namespace keeps a sorted
+set of its keys by last access and is trimmed to ``max_entries`` on write; a
+second sorted set by expiry drops keys whose TTL ran out from the index.
+``MemoryCacheBackend`` implements the same operations in process for tests
+and single-replica runs (``ENRICHMENT_CACHE_BACKEND=memory``).
+
+``SharedRateLimiter`` keeps per-provider fixed-window call counters in the
+same backend, so a provider quota holds across replicas, and ``IntervalGate``
+spaces calls to a strictly paced provider across replicas.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "enrichment:"
+
+# Store a value and touch it in the namespace indexes, forget keys that expired by TTL, and
+# unindex the least recently used keys over the bound. The script only touches declared keys
+# (Redis Cluster requires it), so it returns the evicted value keys for the caller to delete.
+# Both steps handle at most 512 keys per write, which keeps unpack() within Lua's stack.
+# KEYS: value key, LRU index, expiry index; ARGV: value, ttl seconds, now, max entries
+SET_BOUNDED_SCRIPT = """
+local now = tonumber(ARGV[3])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+redis.call('ZADD', KEYS[2], now, KEYS[1])
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[2]), KEYS[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now, 'LIMIT', 0, 512)
+if #expired > 0 then
+    redis.call('ZREM', KEYS[2], unpack(expired))
+    redis.call('ZREM', KEYS[3], unpack(expired))
+end
+local overflow = math.min(redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4]), 512)
+if overflow <= 0 then
+    return {}
+end
+local victims = redis.call('ZRANGE', KEYS[2], 0, overflow - 1)
+redis.call('ZREM', KEYS[2], unpack(victims))
+redis.call('ZREM', KEYS[3], unpack(victims))
+return victims
+"""
+
+
+class MemoryCacheBackend:
+    """In-process stand-in for RedisCacheBackend"""
+
+    def __init__(self):
+        self._namespaces: Dict[str, "OrderedDict[str, Tuple[float, str]]"] = {}
+        self._counters: Dict[str, Tuple[float, int]] = {}
+        self._slots: Dict[str, float] = {}
+
+    async def get(self, namespace: str, key: str) -> Optional[str]:
+        entries = self._namespaces.get(namespace)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, namespace: str, key: str, value: str, ttl: int, max_entries: int):
+        entries = self._namespaces.setdefault(namespace, OrderedDict())
+        now = time.time()
+        entries[key] = (now + ttl, value)
+        entries.move_to_end(key)
+        if len(entries) > max_entries:
+            for stale in [name for name, (expires, _) in entries.items() if expires < now]:
+                del entries[stale]
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        expires, count = self._counters.get(key, (0.0, 0))
+        if expires < time.time():
+            expires, count = time.time() + ttl, 0
+        self._counters[key] = (expires, count + 1)
+        return count + 1
+
+    async def counter(self, key: str) -> int:
+        expires, count = self._counters.get(key, (0.0, 0))
+        return count if expires >= time.time() else 0
+
+    async def size(self, namespace: str) -> int:
+        return len(self._namespaces.get(namespace, ()))
+
+    async def acquire_slot(self, key: str, interval_ms: int) -> int:
+        now = time.time() * 1000
+        free_at = self._slots.get(key, 0.0)
+        if free_at > now:
+            return int(free_at - now) + 1
+        self._slots[key] = now + interval_ms
+        return 0
+
+
+class RedisCacheBackend:
+    """Values under ``enrichment:{<namespace>}:<key>`` with ``__lru`` and ``__expiry`` indexes.
+
+    The hash tag keeps a namespace's values and indexes in one Redis Cluster slot.
+    """
+
+    def __init__(self, redis=None):
+        self._redis = redis
+        self._set_script = None
+
+    async def _client(self):
+        if self._redis is None:
+            from shared.redis_client import redis_client
+            self._redis = await redis_client.client()
+        if self._set_script is None:
+            self._set_script = self._redis.register_script(SET_BOUNDED_SCRIPT)
+        return self._redis
+
+    @staticmethod
+    def _keys(namespace: str, key: str) -> Tuple[str, str, str]:
+        prefix = f"{KEY_PREFIX}{{{namespace}}}:"
+        return f"{prefix}{key}", f"{prefix}__lru", f"{prefix}__expiry"
+
+    async def get(self, namespace: str, key: str) -> Optional[str]:
+        client = await self._client()
+        value_key, index, _ = self._keys(namespace, key)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get(value_key)
+            pipe.zadd(index, {value_key: time.time()}, xx=True)
+            value, _ = await pipe.execute()
+        return value
+
+    async def set(self, namespace: str, key: str, value: str, ttl: int, max_entries: int):
+        client = await self._client()
+        victims = await self._set_script(
+            keys=list(self._keys(namespace, key)), args=[value, int(ttl), time.time(), int(max_entries)]
+        )
+        if victims:
+            await client.delete(*victims)
+
+    async def incr(self, key: str, ttl: int) -> int:
+        client = await self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.incr(f"{KEY_PREFIX}{key}")
+            pipe.expire(f"{KEY_PREFIX}{key}", int(ttl), nx=True)
+            count, _ = await pipe.execute()
+        return count
+
+    async def counter(self, key: str) -> int:
+        client = await self._client()
+        return int(await client.get(f"{KEY_PREFIX}{key}") or 0)
+
+    async def size(self, namespace: str) -> int:
+        client = await self._client()
+        return await client.zcard(self._keys(namespace, '')[1])
+
+    async def acquire_slot(self, key: str, interval_ms: int) -> int:
+        client = await self._client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.set(f"{KEY_PREFIX}{key}", 1, nx=True, px=int(interval_ms))
+            pipe.pttl(f"{KEY_PREFIX}{key}")
+            acquired, remaining = await pipe.execute()
+        return 0 if acquired else max(int(remaining), 1)
+
+
+_default_backend = None
+
+
+def default_backend():
+    """Process-wide backend chosen by ``ENRICHMENT_CACHE_BACKEND`` (redis, the default, or memory)"""
+    global _default_backend
+    if _default_backend is None:
+        if os.getenv('ENRICHMENT_CACHE_BACKEND', 'redis').lower() == 'memory':
+            _default_backend = MemoryCacheBackend()
+        else:
+            _default_backend = RedisCacheBackend()
+    return _default_backend
+
+
+class BoundedCache:
+    """JSON values in one namespace, bounded to ``max_entries`` and expiring after ``ttl_seconds``.
+
+    Backend errors are logged and treated as misses, so enrichment carries on
+    without the cache. ``get_or_load`` runs one loader per key at a time
+    within this process; concurrent callers for that key share its result.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: int, max_entries: int, backend=None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend or default_backend()
+        self.hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.backend.get(self.namespace, key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {self.namespace}: {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None):
+        try:
+            await self.backend.set(
+                self.namespace, key, json.dumps(value, default=str),
+                ttl_seconds or self.ttl_seconds, self.max_entries
+            )
+        except Exception as e:
+            logger.warning(f"Cache write failed for {self.namespace}: {e}")
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[int] = None,
+        cache_if: Callable[[Any], bool] = lambda value: value is not None
+    ) -> Tuple[Any, bool]:
+        """``(value, from_cache)``; values failing ``cache_if`` are returned but not stored"""
+        cached = await self.get(key)
+        if cached is not None:
+            return cached, True
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            if cache_if(value):
+                await self.set(key, value, ttl_seconds)
+            future.set_result(value)
+            return value, False
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieve the exception so an unawaited future does not warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'namespace': self.namespace, 'hits': self.hits, 'misses': self.misses}
+
+
+class SharedRateLimiter:
+    """Per-provider call counters over fixed windows, shared through the cache backend"""
+
+    def __init__(self, limits: Dict[str, int], window_seconds: int = 3600, backend=None, namespace: str = 'ratelimit'):
+        self.limits = dict(limits)
+        self.window_seconds = window_seconds
+        self.backend = backend or default_backend()
+        self.namespace = namespace
+
+    def _key(self, service: str) -> str:
+        return f"{self.namespace}:{service}:{int(time.time() // self.window_seconds)}"
+
+    async def allowed(self, service: str) -> bool:
+        """Whether ``service`` has calls left in the current window; fails open if the backend is down"""
+        limit = self.limits.get(service)
+        if limit is None:
+            return True
+        try:
+            return await self.backend.counter(self._key(service)) < limit
+        except Exception as e:
+            logger.warning(f"Rate limit check failed for {service}: {e}")
+            return True
+
+    async def record(self, service: str) -> int:
+        """Count one call against ``service``"""
+        if service not in self.limits:
+            return 0
+        try:
+            return await self.backend.incr(self._key(service), self.window_seconds)
+        except Exception as e:
+            logger.warning(f"Rate limit update failed for {service}: {e}")
+            return 0
+
+    async def usage(self) -> Dict[str, Dict[str, int]]:
+        usage = {}
+        for service, limit in self.limits.items():
+            try:
+                calls = await self.backend.counter(self._key(service))
+            except Exception:
+                calls = 0
+            usage[service] = {'calls': calls, 'limit': limit}
+        return usage
+
+
+class IntervalGate:
+    """At most one call per ``interval`` seconds for a provider, across every replica sharing the backend"""
+
+    def __init__(self, name: str, interval: float, backend=None):
+        self.key = f"gate:{name}"
+        self.interval_ms = int(interval * 1000)
+        self.backend = backend or default_backend()
+        self._local = asyncio.Lock()
+
+    async def wait(self):
+        """Return once this caller holds the next slot"""
+        async with self._local:
+            while True:
+                try:
+                    wait_ms = await self.backend.acquire_slot(self.key, self.interval_ms)
+                except Exception as e:
+                    # Without the backend, pace this process alone
+                    logger.warning(f"Interval gate {self.key} unavailable: {e}")
+                    await asyncio.sleep(self.interval_ms / 1000)
+                    return
+                if not wait_ms:
+                    return
+                await asyncio.sleep(wait_ms / 1000)
@@ -2,19 +2,16 @@
 Production-ready email finder with comprehensive verification and deliverability checking
 """
 import httpx
-import asyncio
 import logging
 import re
-import dns.resolver
-import smtplib
-import socket
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import os
 import hashlib
-import time
 from dataclasses import dataclass
 
+from app.enrichment.email_verification import EmailVerifier
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -48,6 +45,9 @@ class EmailFinder:
             'clearbit': {'calls': 0, 'reset': datetime.now(), 'limit': 1000}
         }
         
+        # Deliverability checks with cached per-domain DNS and catch-all state
+        self.verifier = EmailVerifier()
+        
         # Common email patterns
         self.email_patterns = [
             "{first}.{last}@{domain}",
@@ -159,26 +159,20 @@ class EmailFinder:
         # Remove duplicates
         possible_emails = list(set(possible_emails))
         
-        # Verify each email
-        verification_tasks = []
-        for email in possible_emails[:10]:  # Limit to top 10 patterns
-            verification_tasks.append(self._verify_email_comprehensive(email))
-        
-        verification_results = await asyncio.gather(*verification_tasks, return_exceptions=True)
-        
-        for i, email in enumerate(possible_emails[:10]):
-            if not isinstance(verification_results[i], Exception):
-                verification = verification_results[i]
-                if verification['valid'] or verification['deliverable']:
-                    results.append(EmailResult(
-                        email=email,
-                        confidence=0.7 if verification['deliverable'] else 0.4,
-                        source='pattern_based',
-                        verified=verification['valid'],
-                        deliverable=verification['deliverable'],
-                        verification_details=verification,
-                        cost=0.0
-                    ))
+        # Verify candidates together: one DNS lookup and one SMTP session for the domain
+        verification_results = await self.verifier.verify_many(possible_emails[:10])
+        
+        for email, verification in verification_results.items():
+            if verification['valid'] or verification['deliverable']:
+                results.append(EmailResult(
+                    email=email,
+                    confidence=0.7 if verification['deliverable'] else 0.4,
+                    source='pattern_based',
+                    verified=verification['valid'],
+                    deliverable=verification['deliverable'],
+                    verification_details=verification,
+                    cost=0.0
+                ))
         
         return results
 
@@ -392,191 +386,7 @@ class EmailFinder:
 
     async def _verify_email_comprehensive(self, email: str) -> Dict[str, Any]:
         """Comprehensive email verification using multiple methods"""
-        verification = {
-            'email': email,
-            'syntax_valid': False,
-            'domain_valid': False,
-            'mx_records_exist': False,
-            'smtp_valid': False,
-            'deliverable': False,
-            'valid': False,
-            'disposable': False,
-            'webmail': False,
-            'accept_all': False,
-            'verification_time': datetime.now().isoformat(),
-            'checks_performed': []
-        }
-        
-        try:
-            # 1. Syntax validation
-            syntax_valid = self._validate_email_syntax(email)
-            verification['syntax_valid'] = syntax_valid
-            verification['checks_performed'].append('syntax')
-            
-            if not syntax_valid:
-                return verification
-            
-            # 2. Domain validation
-            domain = email.split('@')[1]
-            domain_valid = await self._validate_domain(domain)
-            verification['domain_valid'] = domain_valid
-            verification['checks_performed'].append('domain')
-            
-            if not domain_valid:
-                return verification
-            
-            # 3. MX record check
-            mx_exists = await self._check_mx_records(domain)
-            verification['mx_records_exist'] = mx_exists
-            verification['checks_performed'].append('mx_records')
-            
-            if not mx_exists:
-                return verification
-            
-            # 4. Disposable email check
-            disposable = self._is_disposable_email(domain)
-            verification['disposable'] = disposable
-            verification['checks_performed'].append('disposable')
-            
-            # 5. Webmail detection
-            webmail = self._is_webmail(domain)
-            verification['webmail'] = webmail
-            verification['checks_performed'].append('webmail')
-            
-            # 6. SMTP validation (careful with rate limiting)
-            if not disposable:  # Don't waste time on disposable emails
-                smtp_result = await self._validate_smtp(email)
-                verification.update(smtp_result)
-                verification['checks_performed'].append('smtp')
-            
-            # Final determination
-            verification['valid'] = (
-                verification['syntax_valid'] and 
-                verification['domain_valid'] and 
-                verification['mx_records_exist'] and 
-                not verification['disposable']
-            )
-            
-            verification['deliverable'] = (
-                verification['valid'] and 
-                verification.get('smtp_valid', False)
-            )
-            
-        except Exception as e:
-            logger.error(f"Email verification error for {email}: {e}")
-            verification['error'] = str(e)
-        
-        return verification
-
-    def _validate_email_syntax(self, email: str) -> bool:
-        """Validate email syntax using regex"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
-
-    async def _validate_domain(self, domain: str) -> bool:
-        """Validate domain existence"""
-        try:
-            # Try to resolve domain
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, socket.gethostbyname, domain)
-            return True
-        except Exception:
-            return False
-
-    async def _check_mx_records(self, domain: str) -> bool:
-        """Check if domain has MX records"""
-        try:
-            loop = asyncio.get_event_loop()
-            mx_records = await loop.run_in_executor(
-                None, lambda: dns.resolver.resolve(domain, 'MX')
-            )
-            return len(mx_records) > 0
-        except Exception:
-            return False
-
-    def _is_disposable_email(self, domain: str) -> bool:
-        """Check if domain is a disposable email provider"""
-        disposable_domains = {
-            '10minutemail.com', 'guerrillamail.com', 'mailinator.com',
-            'tempmail.org', 'throwaway.email', 'yopmail.com',
-            'temp-mail.org', 'getnada.com', 'maildrop.cc'
-        }
-        return domain.lower() in disposable_domains
-
-    def _is_webmail(self, domain: str) -> bool:
-        """Check if domain is a webmail provider"""
-        webmail_domains = {
-            'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
-            'aol.com', 'icloud.com', 'mail.com', 'ymail.com',
-            'live.com', 'msn.com', 'protonmail.com'
-        }
-        return domain.lower() in webmail_domains
-
-    async def _validate_smtp(self, email: str) -> Dict[str, Any]:
-        """Validate email via SMTP (careful with rate limiting)"""
-        result = {
-            'smtp_valid': False,
-            'smtp_server': None,
-            'accept_all': False,
-            'smtp_response': None
-        }
-        
-        try:
-            domain = email.split('@')[1]
-            
-            # Get MX records
-            loop = asyncio.get_event_loop()
-            mx_records = await loop.run_in_executor(
-                None, lambda: dns.resolver.resolve(domain, 'MX')
-            )
-            
-            if not mx_records:
-                return result
-            
-            # Use the first MX record
-            mx_server = str(mx_records[0].exchange)
-            result['smtp_server'] = mx_server
-            
-            # SMTP check (simplified - in production would be more sophisticated)
-            def smtp_check():
-                try:
-                    server = smtplib.SMTP(mx_server, 25, timeout=10)
-                    server.helo('fishmouth.com')
-                    
-                    # Test with a fake email first to detect catch-all
-                    fake_email = f"nonexistent-{int(time.time())}@{domain}"
-                    code_fake, response_fake = server.rcpt(fake_email)
-                    
-                    # Test with the real email
-                    code_real, response_real = server.rcpt(email)
-                    
-                    server.quit()
-                    
-                    # If both fake and real emails are accepted, it's catch-all
-                    accept_all = (code_fake == 250 and code_real == 250)
-                    smtp_valid = (code_real == 250 and not accept_all)
-                    
-                    return {
-                        'smtp_valid': smtp_valid,
-                        'accept_all': accept_all,
-                        'smtp_response': response_real.decode() if hasattr(response_real, 'decode') else str(response_real)
-                    }
-                    
-                except Exception as e:
-                    return {
-                        'smtp_valid': False,
-                        'accept_all': False,
-                        'smtp_response': str(e)
-                    }
-            
-            smtp_result = await loop.run_in_executor(None, smtp_check)
-            result.update(smtp_result)
-            
-        except Exception as e:
-            logger.error(f"SMTP validation error for {email}: {e}")
-            result['smtp_response'] = str(e)
-        
-        return result
+        return await self.verifier.verify(email)
 
     async def _check_rate_limit(self, service: str) -> bool:
         """Check if service is within rate limits"""
@@ -601,6 +411,16 @@ class EmailFinder:
         """
         return await self._verify_email_comprehensive(email)
 
+    async def verify_many(self, emails: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Bulk deliverability verification, resolving and probing each domain once
+        """
+        return await self.verifier.verify_many(emails)
+
+    def close(self):
+        """Close pooled SMTP sessions"""
+        self.verifier.close()
+
     async def find_email_by_reverse_lookup(
         self,
         phone: Optional[str] = None,
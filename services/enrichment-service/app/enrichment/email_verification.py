@@ -0,0 +1,356 @@
+"""
+Email deliverability verification with domain-level caching
+
+Everything that depends only on the domain (A and MX records, disposable and
+webmail flags, catch-all behaviour) is resolved once and cached through
+BoundedCache, so it is shared by every replica. DNS goes through dnspython's
+async resolver. SMTP probes run on a dedicated thread pool and reuse one
+session per MX host for many RCPTs; each host has its own concurrency limit
+and a minimum gap between probe batches. ``verify_many`` groups addresses by
+domain, so a list spanning a few hundred domains costs roughly one DNS lookup
+and one SMTP session per domain.
+"""
+import asyncio
+import logging
+import os
+import re
+import smtplib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+from app.enrichment.cache import BoundedCache
+
+logger = logging.getLogger(__name__)
+
+DISPOSABLE_DOMAINS = {
+    '10minutemail.com', 'guerrillamail.com', 'mailinator.com',
+    'tempmail.org', 'throwaway.email', 'yopmail.com',
+    'temp-mail.org', 'getnada.com', 'maildrop.cc'
+}
+
+WEBMAIL_DOMAINS = {
+    'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com',
+    'aol.com', 'icloud.com', 'mail.com', 'ymail.com',
+    'live.com', 'msn.com', 'protonmail.com'
+}
+
+# RCPT replies that accept the recipient
+ACCEPTED_CODES = (250, 251)
+
+
+def is_valid_syntax(email: str) -> bool:
+    return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email))
+
+
+class MxConnectionPool:
+    """Reusable SMTP sessions per MX host, with per-host concurrency and pacing"""
+
+    def __init__(
+        self,
+        helo_host: str = 'fishmouth.com',
+        mail_from: str = 'verify@fishmouth.com',
+        per_host_limit: int = 2,
+        min_interval: float = 0.5,
+        max_rcpt_per_session: int = 100,
+        idle_timeout: float = 30.0,
+        unreachable_ttl: float = 600.0,
+        timeout: float = 10.0,
+        workers: int = 16
+    ):
+        self.helo_host = helo_host
+        self.mail_from = mail_from
+        self.per_host_limit = per_host_limit
+        self.min_interval = min_interval
+        self.max_rcpt_per_session = max_rcpt_per_session
+        self.idle_timeout = idle_timeout
+        self.unreachable_ttl = unreachable_ttl
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='smtp-probe')
+        self._idle: Dict[str, List[Dict[str, Any]]] = {}
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._unreachable: Dict[str, Tuple[float, str]] = {}
+        self.stats = {'sessions_opened': 0, 'sessions_reused': 0, 'stale_sessions': 0, 'rcpt_commands': 0}
+
+    def _open(self, host: str) -> smtplib.SMTP:
+        server = smtplib.SMTP(host, 25, timeout=self.timeout)
+        server.helo(self.helo_host)
+        return server
+
+    def _rcpt_batch(self, server: smtplib.SMTP, recipients: List[str]) -> Dict[str, Tuple[int, str]]:
+        code, response = server.mail(self.mail_from)
+        if code not in ACCEPTED_CODES:
+            raise smtplib.SMTPSenderRefused(code, response, self.mail_from)
+        replies = {}
+        for recipient in recipients:
+            code, response = server.rcpt(recipient)
+            replies[recipient] = (code, response.decode(errors='replace') if isinstance(response, bytes) else str(response))
+        server.rset()
+        return replies
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    async def _pace(self, host: str):
+        """Keep ``min_interval`` between probe batches sent to one host"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _checkout(self, host: str) -> Optional[Dict[str, Any]]:
+        idle = self._idle.get(host, [])
+        while idle:
+            session = idle.pop()
+            if time.monotonic() - session['last_used'] < self.idle_timeout:
+                return session
+            self._executor.submit(self._quit, session['server'])
+        return None
+
+    async def _connect(self, host: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        try:
+            server = await loop.run_in_executor(self._executor, self._open, host)
+        except (OSError, smtplib.SMTPException) as e:
+            # Port 25 is often blocked; stop retrying the host for a while
+            self._unreachable[host] = (time.monotonic() + self.unreachable_ttl, str(e))
+            raise ConnectionError(str(e)) from e
+        self.stats['sessions_opened'] += 1
+        return {'server': server, 'rcpts': 0}
+
+    async def probe(self, host: str, recipients: List[str]) -> Dict[str, Tuple[int, str]]:
+        """RCPT reply code and text for each recipient; raises if the host cannot be reached"""
+        unreachable = self._unreachable.get(host)
+        if unreachable and unreachable[0] > time.monotonic():
+            raise ConnectionError(unreachable[1])
+
+        loop = asyncio.get_running_loop()
+        limit = self._limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        replies: Dict[str, Tuple[int, str]] = {}
+        async with limit:
+            for start in range(0, len(recipients), self.max_rcpt_per_session):
+                chunk = recipients[start:start + self.max_rcpt_per_session]
+                await self._pace(host)
+                session = self._checkout(host)
+                if session is not None and session['rcpts'] + len(chunk) > self.max_rcpt_per_session:
+                    self._executor.submit(self._quit, session['server'])
+                    session = None
+                reused = session is not None
+                if reused:
+                    self.stats['sessions_reused'] += 1
+                else:
+                    session = await self._connect(host)
+
+                try:
+                    batch = await loop.run_in_executor(self._executor, self._rcpt_batch, session['server'], chunk)
+                except smtplib.SMTPServerDisconnected:
+                    self._executor.submit(self._quit, session['server'])
+                    if not reused:
+                        raise
+                    # The server dropped the idle session; retry once on a fresh one
+                    self.stats['stale_sessions'] += 1
+                    session = await self._connect(host)
+                    try:
+                        batch = await loop.run_in_executor(self._executor, self._rcpt_batch, session['server'], chunk)
+                    except Exception:
+                        self._executor.submit(self._quit, session['server'])
+                        raise
+                except Exception:
+                    self._executor.submit(self._quit, session['server'])
+                    raise
+                replies.update(batch)
+                self.stats['rcpt_commands'] += len(chunk)
+                session['rcpts'] += len(chunk)
+                session['last_used'] = time.monotonic()
+                self._idle.setdefault(host, []).append(session)
+        return replies
+
+    def close(self):
+        for sessions in self._idle.values():
+            for session in sessions:
+                self._executor.submit(self._quit, session['server'])
+        self._idle.clear()
+        self._executor.shutdown(wait=False)
+
+
+class EmailVerifier:
+    """Syntax, DNS, disposable/webmail and SMTP checks with cached domain state"""
+
+    def __init__(self, smtp_pool: MxConnectionPool = None, cache_backend=None, dns_timeout: float = 5.0):
+        ttl = int(os.getenv('EMAIL_DOMAIN_CACHE_TTL', 86400))
+        self.domains = BoundedCache('email_domain', ttl, 100000, cache_backend)
+        self.catch_all = BoundedCache('email_catch_all', ttl, 100000, cache_backend)
+        self.smtp = smtp_pool or MxConnectionPool(
+            mail_from=os.getenv('EMAIL_VERIFY_MAIL_FROM', 'verify@fishmouth.com'),
+            per_host_limit=int(os.getenv('EMAIL_SMTP_PER_HOST_LIMIT', 2)),
+            min_interval=float(os.getenv('EMAIL_SMTP_MIN_INTERVAL', 0.5)),
+            workers=int(os.getenv('EMAIL_SMTP_WORKERS', 16))
+        )
+        self.resolver = dns.asyncresolver.Resolver()
+        self.resolver.lifetime = dns_timeout
+
+    async def _resolve(self, domain: str, record_type: str) -> List[Any]:
+        try:
+            return list(await self.resolver.resolve(domain, record_type))
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return []
+
+    async def _lookup_domain(self, domain: str) -> Dict[str, Any]:
+        profile = {
+            'domain': domain,
+            'resolves': False,
+            'mx_hosts': [],
+            'disposable': domain in DISPOSABLE_DOMAINS,
+            'webmail': domain in WEBMAIL_DOMAINS,
+            'dns_error': None
+        }
+        try:
+            a_records, mx_records = await asyncio.gather(
+                self._resolve(domain, 'A'), self._resolve(domain, 'MX')
+            )
+        except dns.exception.DNSException as e:
+            # Timeouts and server failures are transient and never cached
+            profile['dns_error'] = str(e) or type(e).__name__
+            return profile
+        profile['resolves'] = bool(a_records)
+        profile['mx_hosts'] = [
+            str(record.exchange).rstrip('.')
+            for record in sorted(mx_records, key=lambda record: record.preference)
+        ]
+        return profile
+
+    async def domain_profile(self, domain: str) -> Dict[str, Any]:
+        """Cached A/MX records and provider flags for ``domain``"""
+        domain = domain.lower()
+        profile, _ = await self.domains.get_or_load(
+            domain, lambda: self._lookup_domain(domain),
+            cache_if=lambda profile: profile['dns_error'] is None
+        )
+        return profile
+
+    async def _probe_domain(
+        self, domain: str, mx_host: str, emails: List[str]
+    ) -> Tuple[Optional[bool], Dict[str, Tuple[int, str]], Optional[str]]:
+        """Catch-all status and RCPT replies for ``emails``, sharing one session"""
+        accept_all = await self.catch_all.get(domain)
+        if accept_all is not None and accept_all['accept_all']:
+            # Every address is accepted, so per-address probes cannot tell anything apart
+            return True, {}, None
+
+        recipients = list(emails)
+        sentinel = None
+        if accept_all is None:
+            sentinel = f"nonexistent-{uuid.uuid4().hex[:12]}@{domain}"
+            recipients.insert(0, sentinel)
+        try:
+            replies = await self.smtp.probe(mx_host, recipients)
+        except Exception as e:
+            return None, {}, str(e)
+
+        if sentinel is None:
+            return False, replies, None
+        detected = replies.pop(sentinel)[0] in ACCEPTED_CODES
+        await self.catch_all.set(domain, {'accept_all': detected, 'mx_host': mx_host})
+        return detected, replies, None
+
+    async def verify_many(self, emails: Iterable[str], concurrency: int = 50) -> Dict[str, Dict[str, Any]]:
+        """Verification for each distinct address, grouped so each domain is resolved and probed once"""
+        emails = list(dict.fromkeys(emails))
+        results = {email: self._blank(email) for email in emails}
+        by_domain: Dict[str, List[str]] = {}
+        for email in emails:
+            results[email]['checks_performed'].append('syntax')
+            if not is_valid_syntax(email):
+                continue
+            results[email]['syntax_valid'] = True
+            by_domain.setdefault(email.split('@')[1].lower(), []).append(email)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def verify_domain(domain: str, domain_emails: List[str]):
+            async with semaphore:
+                try:
+                    await self._verify_domain(domain, domain_emails, results)
+                except Exception as e:
+                    logger.error(f"Email verification error for {domain}: {e}")
+                    for email in domain_emails:
+                        results[email]['error'] = str(e)
+
+        await asyncio.gather(*(verify_domain(domain, batch) for domain, batch in by_domain.items()))
+        return results
+
+    async def verify(self, email: str) -> Dict[str, Any]:
+        return (await self.verify_many([email]))[email]
+
+    async def _verify_domain(self, domain: str, emails: List[str], results: Dict[str, Dict[str, Any]]):
+        profile = await self.domain_profile(domain)
+        for email in emails:
+            verification = results[email]
+            verification['domain_valid'] = profile['resolves']
+            verification['checks_performed'].append('domain')
+            if profile['dns_error']:
+                verification['error'] = profile['dns_error']
+        if not profile['resolves']:
+            return
+
+        for email in emails:
+            verification = results[email]
+            verification['mx_records_exist'] = bool(profile['mx_hosts'])
+            verification['checks_performed'].append('mx_records')
+        if not profile['mx_hosts']:
+            return
+
+        for email in emails:
+            verification = results[email]
+            verification['disposable'] = profile['disposable']
+            verification['webmail'] = profile['webmail']
+            verification['checks_performed'].extend(['disposable', 'webmail'])
+            verification['valid'] = not profile['disposable']
+
+        # Don't waste time on disposable emails
+        if profile['disposable']:
+            return
+
+        mx_host = profile['mx_hosts'][0]
+        accept_all, replies, error = await self._probe_domain(domain, mx_host, emails)
+        for email in emails:
+            verification = results[email]
+            code, response = replies.get(email, (None, error or 'catch-all domain'))
+            verification['smtp_server'] = mx_host
+            verification['accept_all'] = bool(accept_all)
+            verification['smtp_valid'] = code in ACCEPTED_CODES and not accept_all
+            verification['smtp_response'] = response
+            verification['checks_performed'].append('smtp')
+            verification['deliverable'] = verification['valid'] and verification['smtp_valid']
+
+    @staticmethod
+    def _blank(email: str) -> Dict[str, Any]:
+        return {
+            'email': email,
+            'syntax_valid': False,
+            'domain_valid': False,
+            'mx_records_exist': False,
+            'smtp_valid': False,
+            'deliverable': False,
+            'valid': False,
+            'disposable': False,
+            'webmail': False,
+            'accept_all': False,
+            'verification_time': datetime.now().isoformat(),
+            'checks_performed': []
+        }
+
+    def close(self):
+        self.smtp.close()
@@ -0,0 +1,117 @@
+"""
+Spatial cell cache for area-level enrichment data
+
+Census tracts, neighbourhood names and weather exposure are the same for
+every property in a small area. Coordinates are quantized onto a square
+lat/lon grid, one cell size per data type, and each cell is looked up once
+and cached through BoundedCache so every replica shares it. A scan area can
+be prefetched up front from the property coordinates or a bounding box.
+"""
+import math
+import os
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app.enrichment.cache import BoundedCache
+
+# Cell edge in degrees (0.01 deg is ~1.1km of latitude), overridable with ENRICHMENT_CELL_DEG_<TYPE>
+DEFAULT_CELL_SIZES = {
+    'census_tract': 0.005,
+    'mapbox_neighborhood': 0.01,
+    'osm_neighborhood': 0.01,
+    'weather': 0.25,
+}
+
+DEFAULT_CELL_TTLS = {
+    'census_tract': 30 * 86400,
+    'mapbox_neighborhood': 7 * 86400,
+    'osm_neighborhood': 7 * 86400,
+    'weather': 86400,
+}
+
+Cell = Tuple[int, int]
+
+
+def cell_of(lat: float, lon: float, size: float) -> Cell:
+    return math.floor(lat / size), math.floor(lon / size)
+
+
+def cell_center(cell: Cell, size: float) -> Tuple[float, float]:
+    return round((cell[0] + 0.5) * size, 6), round((cell[1] + 0.5) * size, 6)
+
+
+def cells_in_bounds(south: float, west: float, north: float, east: float, size: float):
+    """Cells covering the box, row by row"""
+    low, high = cell_of(south, west, size), cell_of(north, east, size)
+    for row in range(low[0], high[0] + 1):
+        for col in range(low[1], high[1] + 1):
+            yield row, col
+
+
+class GeoCellCache:
+    """One BoundedCache namespace per data type, keyed by grid cell"""
+
+    def __init__(
+        self,
+        cell_sizes: Dict[str, float] = None,
+        ttls: Dict[str, int] = None,
+        max_entries: int = 200000,
+        backend=None
+    ):
+        sizes = dict(DEFAULT_CELL_SIZES, **(cell_sizes or {}))
+        for data_type in sizes:
+            override = os.getenv(f"ENRICHMENT_CELL_DEG_{data_type.upper()}")
+            if override:
+                sizes[data_type] = float(override)
+        self.cell_sizes = sizes
+        ttls = dict(DEFAULT_CELL_TTLS, **(ttls or {}))
+        self.caches = {
+            data_type: BoundedCache(f"cell:{data_type}", ttls.get(data_type, 86400), max_entries, backend)
+            for data_type in sizes
+        }
+
+    def key(self, data_type: str, lat: float, lon: float) -> str:
+        size = self.cell_sizes[data_type]
+        row, col = cell_of(lat, lon, size)
+        # The size is part of the key so a resolution change never reads cells of another size
+        return f"{size}:{row}:{col}"
+
+    async def get_or_load(
+        self,
+        data_type: str,
+        lat: float,
+        lon: float,
+        loader: Callable[[], Awaitable[Any]],
+        cache_if: Callable[[Any], bool] = lambda value: value is not None
+    ) -> Tuple[Any, bool]:
+        """The cell's value, loading it from (lat, lon) on a miss"""
+        return await self.caches[data_type].get_or_load(self.key(data_type, lat, lon), loader, cache_if=cache_if)
+
+    def representatives(
+        self,
+        data_type: str,
+        points: Iterable[Tuple[float, float]] = (),
+        bounds: Optional[Tuple[float, float, float, float]] = None,
+        max_cells: int = 2000
+    ) -> Dict[str, Tuple[float, float]]:
+        """One lookup point per distinct cell, at most ``max_cells``.
+
+        Real property coordinates are preferred, since a cell centre can land
+        in water or outside any tract; a bounding box (south, west, north,
+        east) contributes the centres of the cells it covers.
+        """
+        size = self.cell_sizes[data_type]
+        chosen: Dict[str, Tuple[float, float]] = {}
+        for lat, lon in points:
+            if len(chosen) >= max_cells:
+                return chosen
+            chosen.setdefault(self.key(data_type, lat, lon), (lat, lon))
+        if bounds:
+            for cell in cells_in_bounds(*bounds, size):
+                if len(chosen) >= max_cells:
+                    break
+                lat, lon = cell_center(cell, size)
+                chosen.setdefault(self.key(data_type, lat, lon), (lat, lon))
+        return chosen
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {data_type: cache.stats() for data_type, cache in self.caches.items()}
@@ -6,16 +6,29 @@ import asyncio
 import logging
 import re
 import json
-from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime
 import os
 import hashlib
 import time
 from dataclasses import dataclass
 import random
 
+from app.enrichment.cache import BoundedCache, SharedRateLimiter
+from app.enrichment.geo_cells import GeoCellCache
+from app.enrichment.stages import StageExecutor
+
 logger = logging.getLogger(__name__)
 
+# Calls per hour
+RATE_LIMITS = {
+    'census': 500,
+    'mapbox': 100000,
+    'google': 40000,
+    'melissa': 1000,
+    'zillow': 1000
+}
+
 @dataclass
 class EnrichmentResult:
     success: bool
@@ -40,15 +53,22 @@ class PropertyEnricher:
         self.smarty_auth_token = os.getenv('SMARTY_AUTH_TOKEN')
         self.zillow_key = os.getenv('ZILLOW_API_KEY')
         
-        # Rate limiting and caching
-        self.rate_limits = {
-            'census': {'calls': 0, 'reset': datetime.now(), 'limit': 500},
-            'mapbox': {'calls': 0, 'reset': datetime.now(), 'limit': 100000},
-            'google': {'calls': 0, 'reset': datetime.now(), 'limit': 40000},
-            'melissa': {'calls': 0, 'reset': datetime.now(), 'limit': 1000},
-            'zillow': {'calls': 0, 'reset': datetime.now(), 'limit': 1000}
-        }
-        self.cache = {}
+        # Rate limiting and caching, shared across replicas through the cache backend
+        self.rate_limits = SharedRateLimiter(RATE_LIMITS, window_seconds=3600)
+        self.cache = BoundedCache(
+            'property',
+            ttl_seconds=int(os.getenv('PROPERTY_CACHE_TTL', 86400)),
+            max_entries=int(os.getenv('PROPERTY_CACHE_MAX_ENTRIES', 50000))
+        )
+        self.stages = StageExecutor()
+        
+        # Area-level data is shared by every property in a grid cell or census tract
+        self.geo_cache = GeoCellCache()
+        self.tract_cache = BoundedCache(
+            'census_acs',
+            ttl_seconds=30 * 86400,
+            max_entries=int(os.getenv('CENSUS_TRACT_CACHE_MAX_ENTRIES', 100000))
+        )
         
         logger.info("PropertyEnricher initialized with full production fallback system")
 
@@ -59,18 +79,61 @@ class PropertyEnricher:
 
     async def _check_rate_limit(self, service: str) -> bool:
         """Check if service is within rate limits"""
-        now = datetime.now()
-        limit_info = self.rate_limits.get(service)
+        return await self.rate_limits.allowed(service)
+
+    async def _record_call(self, service: str):
+        """Count a successful call against the service's hourly limit"""
+        await self.rate_limits.record(service)
+
+    async def _get_area_data(self, data_type: str, lat: float, lon: float) -> Tuple[Any, bool]:
+        """Area-level data for the grid cell containing the coordinates, fetched once per cell"""
+        fetch = {
+            'census_tract': self._get_census_tract,
+            'mapbox_neighborhood': self._get_mapbox_neighborhood,
+            'osm_neighborhood': self._get_osm_neighborhood,
+            'weather': self._assess_weather_risk
+        }[data_type]
+        return await self.geo_cache.get_or_load(
+            data_type, lat, lon, lambda: fetch(lat, lon),
+            cache_if=lambda data: bool(data) and data.get('source') != 'fallback'
+        )
+
+    async def prefetch_area(
+        self,
+        points: List[Tuple[float, float]] = (),
+        bounds: Optional[Tuple[float, float, float, float]] = None,
+        data_types: Optional[List[str]] = None,
+        max_cells: int = 2000
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Load area-level data for a scan area before its properties are enriched
         
-        if not limit_info:
-            return True
-            
-        # Reset counter if hour has passed
-        if now - limit_info['reset'] > timedelta(hours=1):
-            limit_info['calls'] = 0
-            limit_info['reset'] = now
-            
-        return limit_info['calls'] < limit_info['limit']
+        Each distinct cell is fetched once, from a property inside it when
+        ``points`` are given, or from cell centres covering ``bounds``
+        (south, west, north, east). Later enrichment in the area hits the cache.
+        """
+        if data_types is None:
+            data_types = ['census_tract', 'weather']
+            if self.mapbox_token:
+                data_types.append('mapbox_neighborhood')
+            elif not self.google_key:
+                data_types.append('osm_neighborhood')
+        
+        summary = {}
+        for data_type in data_types:
+            cells = self.geo_cache.representatives(data_type, points, bounds, max_cells)
+            cache = self.geo_cache.caches[data_type]
+            hits_before = cache.hits
+            if data_type == 'census_tract':
+                # Resolves the tract per cell and then its ACS data once per tract
+                lookups = [self._get_census_demographics(lat, lon) for lat, lon in cells.values()]
+            else:
+                lookups = [self._get_area_data(data_type, lat, lon) for lat, lon in cells.values()]
+            await asyncio.gather(*lookups, return_exceptions=True)
+            summary[data_type] = {'cells': len(cells), 'already_cached': cache.hits - hits_before}
+        
+        logger.info(f"Prefetched area data: {summary}")
+        return summary
 
     async def enrich_property(
         self,
@@ -90,18 +153,17 @@ class PropertyEnricher:
         
         # Check cache first
         cache_key = self._get_cache_key(address, latitude, longitude)
-        if cached := self.cache.get(cache_key):
-            if cached['expires'] > datetime.now():
-                logger.info(f"Using cached data for {address}")
-                cached['data']['cache_hit'] = True
-                return EnrichmentResult(
-                    success=True,
-                    data=cached['data'],
-                    cost=0.0,
-                    sources_used=['cache'],
-                    fallbacks_triggered=[],
-                    processing_time=time.time() - start_time
-                )
+        if (cached := await self.cache.get(cache_key)) is not None:
+            logger.info(f"Using cached data for {address}")
+            cached['cache_hit'] = True
+            return EnrichmentResult(
+                success=True,
+                data=cached,
+                cost=0.0,
+                sources_used=['cache'],
+                fallbacks_triggered=[],
+                processing_time=time.time() - start_time
+            )
         
         result = {
             'address': address,
@@ -112,46 +174,25 @@ class PropertyEnricher:
             'cache_hit': False
         }
         
-        # 1. Get comprehensive demographic data with fallbacks
-        demographic_result = await self._get_comprehensive_demographics(latitude, longitude)
-        result.update(demographic_result['data'])
-        total_cost += demographic_result['cost']
-        sources_used.extend(demographic_result['sources'])
-        fallbacks_triggered.extend(demographic_result['fallbacks'])
-        
-        # 2. Get neighborhood analysis with multiple sources
-        neighborhood_result = await self._get_comprehensive_neighborhood_data(latitude, longitude)
-        result.update(neighborhood_result['data'])
-        total_cost += neighborhood_result['cost']
-        sources_used.extend(neighborhood_result['sources'])
-        fallbacks_triggered.extend(neighborhood_result['fallbacks'])
-        
-        # 3. Advanced property analysis with satellite imagery
-        property_result = await self._get_comprehensive_property_analysis(latitude, longitude, address)
-        result.update(property_result['data'])
-        total_cost += property_result['cost']
-        sources_used.extend(property_result['sources'])
-        fallbacks_triggered.extend(property_result['fallbacks'])
-        
-        # 4. Market analysis and valuation estimates
-        market_result = await self._get_market_analysis(latitude, longitude, property_value)
-        result.update(market_result['data'])
-        total_cost += market_result['cost']
-        sources_used.extend(market_result['sources'])
-        fallbacks_triggered.extend(market_result['fallbacks'])
-        
-        # 5. Risk assessment and lead scoring factors
-        risk_result = await self._get_risk_assessment(latitude, longitude, address)
-        result.update(risk_result['data'])
-        total_cost += risk_result['cost']
-        sources_used.extend(risk_result['sources'])
-        fallbacks_triggered.extend(risk_result['fallbacks'])
-        
-        # Cache the result for 24 hours
-        self.cache[cache_key] = {
-            'data': result,
-            'expires': datetime.now() + timedelta(hours=24)
-        }
+        # The stages only depend on the coordinates, so they run concurrently and merge in this order
+        stage_results = await self.stages.run({
+            'demographics': self._get_comprehensive_demographics(latitude, longitude),
+            'neighborhood': self._get_comprehensive_neighborhood_data(latitude, longitude),
+            'property_analysis': self._get_comprehensive_property_analysis(latitude, longitude, address),
+            'market_analysis': self._get_market_analysis(latitude, longitude, property_value),
+            'risk_assessment': self._get_risk_assessment(latitude, longitude, address)
+        })
+        for stage, stage_result in stage_results.items():
+            if isinstance(stage_result, BaseException):
+                result[stage] = {'error': str(stage_result)}
+                fallbacks_triggered.append(f"{stage}_failed")
+                continue
+            result.update(stage_result['data'])
+            total_cost += stage_result['cost']
+            sources_used.extend(stage_result['sources'])
+            fallbacks_triggered.extend(stage_result['fallbacks'])
+        
+        await self.cache.set(cache_key, result)
         
         processing_time = time.time() - start_time
         logger.info(f"Property enrichment completed in {processing_time:.2f}s, cost: ${total_cost:.4f}")
@@ -170,14 +211,12 @@ class PropertyEnricher:
         result = {'data': {}, 'cost': 0.0, 'sources': [], 'fallbacks': []}
         
         try:
-            # Try free Census API first
-            if await self._check_rate_limit('census'):
-                census_data = await self._get_census_demographics(lat, lon)
-                if census_data:
-                    result['data']['demographics'] = census_data
-                    result['sources'].append('census_free')
-                    self.rate_limits['census']['calls'] += 1
-                    return result
+            # Try free Census API first (rate limited per tract fetch, cached per tract)
+            census_data = await self._get_census_demographics(lat, lon)
+            if census_data:
+                result['data']['demographics'] = census_data
+                result['sources'].append('census_free')
+                return result
             
             # Fallback to Google Places API
             result['fallbacks'].append('census_rate_limited')
@@ -187,7 +226,7 @@ class PropertyEnricher:
                     result['data']['demographics'] = google_data
                     result['sources'].append('google_places')
                     result['cost'] = 0.017  # Google Places API cost
-                    self.rate_limits['google']['calls'] += 1
+                    await self._record_call('google')
                     return result
             
             # Final fallback to estimated data
@@ -202,77 +241,97 @@ class PropertyEnricher:
         return result
 
     async def _get_census_demographics(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
-        """Get free demographic data from US Census API"""
+        """Get free demographic data from US Census API, fetched once per tract"""
         try:
             # First, get the census tract for the coordinates
-            tract_url = "https://geocoding.geo.census.gov/geocoder/geographies/coordinates"
-            tract_params = {
-                'x': lon,
-                'y': lat,
-                'benchmark': 'Public_AR_Current',
-                'vintage': 'Current_Current',
-                'format': 'json'
-            }
+            tract, _ = await self._get_area_data('census_tract', lat, lon)
+            if not tract:
+                return None
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                tract_response = await client.get(tract_url, params=tract_params)
-                tract_data = tract_response.json()
-                
-                if not tract_data.get('result', {}).get('geographies', {}).get('Census Tracts'):
-                    return None
-                
-                tract_info = list(tract_data['result']['geographies']['Census Tracts'].values())[0]
-                state_code = tract_info['STATE']
-                county_code = tract_info['COUNTY']
-                tract_code = tract_info['TRACT']
-                
-                # Get ACS demographic data
-                acs_url = "https://api.census.gov/data/2022/acs/acs5"
-                variables = [
-                    'B25077_001E',  # Median home value
-                    'B19013_001E',  # Median household income
-                    'B25003_001E',  # Total housing units
-                    'B25003_002E',  # Owner occupied
-                    'B01003_001E'   # Total population
-                ]
-                
-                acs_params = {
-                    'get': ','.join(variables),
-                    'for': f'tract:{tract_code}',
-                    'in': f'state:{state_code} county:{county_code}',
-                    'key': self.census_key if self.census_key != 'free_tier' else None
-                }
-                
-                # Remove None values
-                acs_params = {k: v for k, v in acs_params.items() if v is not None}
-                
-                acs_response = await client.get(acs_url, params=acs_params)
-                acs_data = acs_response.json()
-                
-                if len(acs_data) < 2:
-                    return None
-                
-                # Parse the response
-                headers = acs_data[0]
-                values = acs_data[1]
-                data_dict = dict(zip(headers, values))
-                
-                return {
-                    'median_home_value': int(data_dict.get('B25077_001E', 0)) or None,
-                    'median_household_income': int(data_dict.get('B19013_001E', 0)) or None,
-                    'total_housing_units': int(data_dict.get('B25003_001E', 0)) or None,
-                    'owner_occupied_units': int(data_dict.get('B25003_002E', 0)) or None,
-                    'total_population': int(data_dict.get('B01003_001E', 0)) or None,
-                    'homeownership_rate': round((int(data_dict.get('B25003_002E', 0)) / max(int(data_dict.get('B25003_001E', 1)), 1)) * 100, 2),
-                    'data_source': 'us_census_acs',
-                    'confidence': 0.95,
-                    'tract_id': f"{state_code}{county_code}{tract_code}"
-                }
+            demographics, _ = await self.tract_cache.get_or_load(
+                tract['tract_id'], lambda: self._get_census_acs(tract)
+            )
+            return demographics
                 
         except Exception as e:
             logger.error(f"Census API error: {e}")
             return None
 
+    async def _get_census_tract(self, lat: float, lon: float) -> Optional[Dict[str, str]]:
+        """Resolve the census tract containing the coordinates"""
+        tract_url = "https://geocoding.geo.census.gov/geocoder/geographies/coordinates"
+        tract_params = {
+            'x': lon,
+            'y': lat,
+            'benchmark': 'Public_AR_Current',
+            'vintage': 'Current_Current',
+            'format': 'json'
+        }
+        
+        async with self.stages.provider('census'), httpx.AsyncClient(timeout=30.0) as client:
+            tract_response = await client.get(tract_url, params=tract_params)
+            tract_data = tract_response.json()
+        
+        if not tract_data.get('result', {}).get('geographies', {}).get('Census Tracts'):
+            return None
+        
+        tract_info = list(tract_data['result']['geographies']['Census Tracts'].values())[0]
+        return {
+            'state': tract_info['STATE'],
+            'county': tract_info['COUNTY'],
+            'tract': tract_info['TRACT'],
+            'tract_id': f"{tract_info['STATE']}{tract_info['COUNTY']}{tract_info['TRACT']}"
+        }
+
+    async def _get_census_acs(self, tract: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Get ACS demographic data for one tract, counted against the census rate limit"""
+        if not await self._check_rate_limit('census'):
+            return None
+        
+        acs_url = "https://api.census.gov/data/2022/acs/acs5"
+        variables = [
+            'B25077_001E',  # Median home value
+            'B19013_001E',  # Median household income
+            'B25003_001E',  # Total housing units
+            'B25003_002E',  # Owner occupied
+            'B01003_001E'   # Total population
+        ]
+        
+        acs_params = {
+            'get': ','.join(variables),
+            'for': f"tract:{tract['tract']}",
+            'in': f"state:{tract['state']} county:{tract['county']}",
+            'key': self.census_key if self.census_key != 'free_tier' else None
+        }
+        
+        # Remove None values
+        acs_params = {k: v for k, v in acs_params.items() if v is not None}
+        
+        async with self.stages.provider('census'), httpx.AsyncClient(timeout=30.0) as client:
+            acs_response = await client.get(acs_url, params=acs_params)
+            acs_data = acs_response.json()
+        await self._record_call('census')
+        
+        if len(acs_data) < 2:
+            return None
+        
+        # Parse the response
+        headers = acs_data[0]
+        values = acs_data[1]
+        data_dict = dict(zip(headers, values))
+        
+        return {
+            'median_home_value': int(data_dict.get('B25077_001E', 0)) or None,
+            'median_household_income': int(data_dict.get('B19013_001E', 0)) or None,
+            'total_housing_units': int(data_dict.get('B25003_001E', 0)) or None,
+            'owner_occupied_units': int(data_dict.get('B25003_002E', 0)) or None,
+            'total_population': int(data_dict.get('B01003_001E', 0)) or None,
+            'homeownership_rate': round((int(data_dict.get('B25003_002E', 0)) / max(int(data_dict.get('B25003_001E', 1)), 1)) * 100, 2),
+            'data_source': 'us_census_acs',
+            'confidence': 0.95,
+            'tract_id': tract['tract_id']
+        }
+
     async def _get_google_demographics(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
         """Get demographic data from Google Places API (paid fallback)"""
         try:
@@ -285,7 +344,7 @@ class PropertyEnricher:
                 'key': self.google_key
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.stages.provider('google'), httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.get(url, params=params)
                 data = response.json()
                 
@@ -373,13 +432,12 @@ class PropertyEnricher:
         
         try:
             # Try Mapbox first (if available)
-            if self.mapbox_token and await self._check_rate_limit('mapbox'):
-                mapbox_data = await self._get_mapbox_neighborhood(lat, lon)
+            if self.mapbox_token:
+                mapbox_data, cached = await self._get_area_data('mapbox_neighborhood', lat, lon)
                 if mapbox_data:
                     result['data']['neighborhood'] = mapbox_data
                     result['sources'].append('mapbox')
-                    result['cost'] = 0.005  # Mapbox geocoding cost
-                    self.rate_limits['mapbox']['calls'] += 1
+                    result['cost'] = 0.0 if cached else 0.005  # Mapbox geocoding cost
                     return result
             
             # Fallback to Google Geocoding
@@ -390,12 +448,12 @@ class PropertyEnricher:
                     result['data']['neighborhood'] = google_data
                     result['sources'].append('google_geocoding')
                     result['cost'] = 0.005  # Google geocoding cost
-                    self.rate_limits['google']['calls'] += 1
+                    await self._record_call('google')
                     return result
             
             # Final fallback to OpenStreetMap (free)
             result['fallbacks'].append('google_unavailable')
-            osm_data = await self._get_osm_neighborhood(lat, lon)
+            osm_data, _ = await self._get_area_data('osm_neighborhood', lat, lon)
             result['data']['neighborhood'] = osm_data
             result['sources'].append('openstreetmap_free')
             
@@ -406,7 +464,9 @@ class PropertyEnricher:
         return result
 
     async def _get_mapbox_neighborhood(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
-        """Get neighborhood data from Mapbox"""
+        """Get neighborhood data from Mapbox, counted against the mapbox rate limit"""
+        if not await self._check_rate_limit('mapbox'):
+            return None
         try:
             url = f"https://api.mapbox.com/geocoding/v5/mapbox.places/{lon},{lat}.json"
             params = {
@@ -415,8 +475,9 @@ class PropertyEnricher:
                 'limit': 5
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.stages.provider('mapbox'), httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.get(url, params=params)
+                await self._record_call('mapbox')
                 response.raise_for_status()
                 data = response.json()
                 
@@ -457,7 +518,7 @@ class PropertyEnricher:
                 'result_type': 'neighborhood|sublocality|locality'
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.stages.provider('google'), httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.get(url, params=params)
                 data = response.json()
                 
@@ -504,7 +565,7 @@ class PropertyEnricher:
                 'User-Agent': 'FishMouth-PropertyEnricher/1.0'
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.stages.provider('osm'), httpx.AsyncClient(timeout=30.0) as client:
                 await asyncio.sleep(1)  # Respect OSM rate limiting
                 response = await client.get(url, params=params, headers=headers)
                 data = response.json()
@@ -600,7 +661,7 @@ class PropertyEnricher:
                 url = f"https://api.mapbox.com/styles/v1/mapbox/satellite-v9/static/{lon},{lat},{zoom}/640x640@2x"
                 params = {'access_token': self.mapbox_token}
                 
-                async with httpx.AsyncClient(timeout=30.0) as client:
+                async with self.stages.provider('mapbox'), httpx.AsyncClient(timeout=30.0) as client:
                     response = await client.get(url, params=params)
                     if response.status_code == 200:
                         return {
@@ -655,7 +716,7 @@ class PropertyEnricher:
             }
             
             # Test if the image is available
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self.stages.provider('google'), httpx.AsyncClient(timeout=30.0) as client:
                 response = await client.get(url, params=params)
                 if response.status_code == 200:
                     return {
@@ -732,7 +793,7 @@ class PropertyEnricher:
         
         try:
             # Weather and natural disaster risk assessment
-            weather_risk = await self._assess_weather_risk(lat, lon)
+            weather_risk, _ = await self._get_area_data('weather', lat, lon)
             
             # Lead scoring factors
             result['data']['risk_assessment'] = {
@@ -0,0 +1,51 @@
+"""
+Concurrent execution of independent enrichment stages
+
+Stages that only depend on the input coordinates run together; calls to an
+external provider take a slot from that provider's semaphore, so fanning out
+stages (and properties) never exceeds a provider's concurrency budget.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Concurrent in-flight requests per provider and process, overridable with ENRICHMENT_PROVIDER_LIMIT_<NAME>
+DEFAULT_PROVIDER_LIMITS = {
+    'census': 4,
+    'google': 8,
+    'mapbox': 8,
+    'osm': 1,
+    'melissa': 2,
+    'zillow': 2,
+}
+DEFAULT_LIMIT = 4
+
+
+class StageExecutor:
+    """Runs named stage coroutines concurrently and hands out per-provider slots"""
+
+    def __init__(self, provider_limits: Dict[str, int] = None):
+        limits = dict(DEFAULT_PROVIDER_LIMITS, **(provider_limits or {}))
+        for provider in limits:
+            override = os.getenv(f"ENRICHMENT_PROVIDER_LIMIT_{provider.upper()}")
+            if override:
+                limits[provider] = int(override)
+        self.limits = limits
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def provider(self, name: str) -> asyncio.Semaphore:
+        """Semaphore to hold around a request to ``name``"""
+        if name not in self._semaphores:
+            self._semaphores[name] = asyncio.Semaphore(max(1, self.limits.get(name, DEFAULT_LIMIT)))
+        return self._semaphores[name]
+
+    async def run(self, stages: Dict[str, Awaitable[Any]]) -> Dict[str, Any]:
+        """Await all stages together; a failed stage maps to its exception, in input order"""
+        results = await asyncio.gather(*stages.values(), return_exceptions=True)
+        for name, outcome in zip(stages, results):
+            if isinstance(outcome, Exception):
+                logger.error(f"Enrichment stage {name} failed: {outcome}")
+        return dict(zip(stages, results))
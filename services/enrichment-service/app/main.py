@@ -5,7 +5,7 @@ Port: 8004
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 import asyncio
 import uuid
 from datetime import datetime
@@ -20,6 +20,7 @@ sys.path.append('../../..')
 from shared.database import db_client
 from shared.redis_client import redis_client
 from shared.observability import RequestContextMiddleware, setup_observability
+from shared.pipeline_events import publish_event
 from app.enrichment.property_enricher import PropertyEnricher
 from app.enrichment.email_finder import EmailFinder
 from app.enrichment.address_validator import AddressValidator
@@ -51,6 +52,12 @@ class EnrichmentRequest(BaseModel):
     source_id: str
     enrichment_types: List[str]  # email_lookup, phone_lookup, address_validation
 
+class RecordsEnrichmentRequest(BaseModel):
+    source_table: str  # raw_permits, raw_properties
+    source_ids: List[str]
+    enrichment_types: List[str]
+    event_stream: Optional[str] = None  # stream to receive one "enriched" event per record
+
 class PropertyEnrichmentRequest(BaseModel):
     property_id: Optional[str] = None
     address: str
@@ -60,6 +67,12 @@ class PropertyEnrichmentRequest(BaseModel):
     owner_name: Optional[str] = None
     property_value: Optional[float] = None
 
+class AreaPrefetchRequest(BaseModel):
+    points: List[List[float]] = []  # [lat, lon] of the properties about to be enriched
+    bounds: Optional[List[float]] = None  # [south, west, north, east]
+    data_types: Optional[List[str]] = None  # census_tract, mapbox_neighborhood, osm_neighborhood, weather
+    max_cells: int = 2000
+
 class EmailLookupRequest(BaseModel):
     first_name: str
     last_name: str
@@ -67,6 +80,12 @@ class EmailLookupRequest(BaseModel):
     domain: Optional[str] = None
     address: Optional[str] = None
 
+class EmailVerificationRequest(BaseModel):
+    emails: List[str]
+
+class AddressBatchRequest(BaseModel):
+    addresses: List[Union[Dict[str, Optional[str]], str]]  # {address, city, state, zip_code} or one-line strings
+
 class EnrichmentStatus(BaseModel):
     id: str
     status: str
@@ -74,6 +93,15 @@ class EnrichmentStatus(BaseModel):
     cost: float
     error_message: Optional[str] = None
 
+# Records of one /enrich/records request enriched at once
+RECORD_CONCURRENCY = 5
+
+# Addresses accepted by one /verify/emails request
+MAX_VERIFY_EMAILS = 10000
+
+# Addresses accepted by one /validate/addresses request
+MAX_BATCH_ADDRESSES = 1000
+
 # Initialize enrichment services
 property_enricher = PropertyEnricher()
 email_finder = EmailFinder()
@@ -95,6 +123,7 @@ async def startup():
 async def shutdown():
     """Clean up connections"""
     try:
+        email_finder.close()
         await db_client.disconnect()
         await redis_client.disconnect()
         logger.info("shutdown.success")
@@ -174,6 +203,31 @@ async def enrich_property(request: PropertyEnrichmentRequest):
         logger.error(f"Property enrichment failed: {e}")
         raise HTTPException(status_code=500, detail=f"Enrichment failed: {e}")
 
+# Area prefetch
+@app.post("/enrich/area/prefetch")
+async def prefetch_area(request: AreaPrefetchRequest):
+    """Fetch area-level data once per cell for a scan area ahead of property enrichment"""
+    if request.bounds is not None and len(request.bounds) != 4:
+        raise HTTPException(status_code=400, detail="bounds must be [south, west, north, east]")
+    if any(len(point) != 2 for point in request.points):
+        raise HTTPException(status_code=400, detail="points must be [lat, lon] pairs")
+    unknown = set(request.data_types or []) - set(property_enricher.geo_cache.cell_sizes)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown data types: {sorted(unknown)}")
+    
+    try:
+        summary = await property_enricher.prefetch_area(
+            [tuple(point) for point in request.points],
+            tuple(request.bounds) if request.bounds else None,
+            request.data_types,
+            request.max_cells
+        )
+        return {"success": True, "cells": summary}
+        
+    except Exception as e:
+        logger.error(f"Area prefetch failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Area prefetch failed: {e}")
+
 # Email lookup
 @app.post("/enrich/email")
 async def lookup_email(request: EmailLookupRequest):
@@ -220,6 +274,26 @@ async def lookup_email(request: EmailLookupRequest):
         logger.error(f"Email lookup failed: {e}")
         raise HTTPException(status_code=500, detail=f"Email lookup failed: {e}")
 
+# Bulk email verification
+@app.post("/verify/emails")
+async def verify_emails(request: EmailVerificationRequest):
+    """Verify deliverability of many emails; DNS and SMTP probes run once per domain"""
+    if len(request.emails) > MAX_VERIFY_EMAILS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_VERIFY_EMAILS} emails per request")
+    
+    try:
+        results = await email_finder.verify_many(request.emails)
+        return {
+            "success": True,
+            "verified": len(results),
+            "deliverable": sum(1 for result in results.values() if result['deliverable']),
+            "results": results
+        }
+        
+    except Exception as e:
+        logger.error(f"Email verification failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Email verification failed: {e}")
+
 # Address validation
 @app.post("/validate/address")
 async def validate_address_endpoint(
@@ -242,9 +316,34 @@ async def validate_address_endpoint(
         logger.error(f"Address validation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Address validation failed: {e}")
 
+@app.post("/validate/addresses")
+async def validate_addresses_endpoint(request: AddressBatchRequest):
+    """Validate a batch of addresses; repeats are deduplicated and served from cache"""
+    if len(request.addresses) > MAX_BATCH_ADDRESSES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ADDRESSES} addresses per request")
+    
+    try:
+        results = await address_validator.batch_validate(request.addresses)
+        return {
+            "success": True,
+            "validated_addresses": results,
+            "cache_hits": sum(1 for result in results if result.get('cache_hit')),
+            "cost": sum(result.get('cost', 0) for result in results)
+        }
+        
+    except Exception as e:
+        logger.error(f"Batch address validation failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch address validation failed: {e}")
+
 # Background enrichment processing
-async def process_enrichment_job(job_id: str, source_table: str, source_id: str, enrichment_types: List[str]):
-    """Process enrichment job in background"""
+async def process_enrichment_job(
+    job_id: str,
+    source_table: str,
+    source_id: str,
+    enrichment_types: List[str],
+    event_stream: Optional[str] = None
+):
+    """Process enrichment job in background, reporting the outcome on ``event_stream`` if given"""
     try:
         # Update job status to running
         await db_client.execute(
@@ -324,14 +423,44 @@ async def process_enrichment_job(job_id: str, source_table: str, source_id: str,
         """, job_id, total_cost, json.dumps(enrichment_results))
         
         logger.info(f"✅ Enrichment job {job_id} completed with cost ${total_cost}")
+        await publish_event(
+            event_stream, "enriched",
+            job_id=job_id, source_id=source_id, status="completed", cost=total_cost
+        )
         
     except Exception as e:
         logger.error(f"❌ Enrichment job {job_id} failed: {e}")
-        await db_client.execute("""
-            UPDATE enrichment_jobs 
-            SET status = 'failed', error_message = $2
-            WHERE id = $1
-        """, job_id, str(e))
+        try:
+            await db_client.execute("""
+                UPDATE enrichment_jobs 
+                SET status = 'failed', error_message = $2
+                WHERE id = $1
+            """, job_id, str(e))
+        except Exception as update_error:
+            logger.error(f"Could not mark enrichment job {job_id} failed: {update_error}")
+        finally:
+            # The orchestrator waits for this event, whatever happened to the job row
+            await publish_event(
+                event_stream, "enriched",
+                job_id=job_id, source_id=source_id, status="failed", error=str(e)
+            )
+
+async def process_enrichment_records(
+    jobs: List[Dict[str, str]],
+    source_table: str,
+    enrichment_types: List[str],
+    event_stream: Optional[str] = None
+):
+    """Run the enrichment jobs of one records request, RECORD_CONCURRENCY at a time"""
+    semaphore = asyncio.Semaphore(RECORD_CONCURRENCY)
+    
+    async def run(job: Dict[str, str]):
+        async with semaphore:
+            await process_enrichment_job(
+                job['job_id'], source_table, job['source_id'], enrichment_types, event_stream
+            )
+    
+    await asyncio.gather(*(run(job) for job in jobs))
 
 # Create enrichment job
 @app.post("/jobs", response_model=EnrichmentStatus)
@@ -479,6 +608,44 @@ async def enrich_batch(
         logger.error(f"Batch enrichment failed: {e}")
         raise HTTPException(status_code=500, detail=f"Batch enrichment failed: {e}")
 
+# Enrich specific records
+@app.post("/enrich/records")
+async def enrich_records(request: RecordsEnrichmentRequest, background_tasks: BackgroundTasks):
+    """Enrich the given records; with ``event_stream`` set, each record reports when it is done"""
+    try:
+        if request.source_table not in ("raw_properties", "raw_permits"):
+            raise HTTPException(status_code=400, detail=f"Unsupported source table: {request.source_table}")
+        
+        source_ids = list(dict.fromkeys(request.source_ids))
+        jobs = [{'job_id': str(uuid.uuid4()), 'source_id': source_id} for source_id in source_ids]
+        if jobs:
+            await db_client.execute("""
+                INSERT INTO enrichment_jobs (id, source_table, source_id, enrichment_type, status)
+                SELECT job.id, $2, job.source_id, $4, 'pending'
+                FROM unnest($1::uuid[], $3::uuid[]) AS job(id, source_id)
+            """, [job['job_id'] for job in jobs], request.source_table, source_ids,
+                ','.join(request.enrichment_types))
+            
+            background_tasks.add_task(
+                process_enrichment_records,
+                jobs,
+                request.source_table,
+                request.enrichment_types,
+                request.event_stream
+            )
+        
+        return {
+            "success": True,
+            "records_queued": len(jobs),
+            "job_ids": [job['job_id'] for job in jobs]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Records enrichment failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Records enrichment failed: {e}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8004)
@@ -0,0 +1,159 @@
+"""
+Disk-backed geocode cache
+
+Forward lookups are keyed by a normalized address and reverse lookups by
+coordinates rounded to about a metre, so the many repeat queries a scan
+makes are answered from SQLite without touching a provider. Misses that
+found nothing are cached for a shorter time than hits. SQLite calls run on
+one dedicated thread to keep them off the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+STREET_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "lane": "ln", "court": "ct", "place": "pl", "parkway": "pkwy", "highway": "hwy",
+    "circle": "cir", "terrace": "ter", "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "suite": "ste", "apartment": "apt",
+}
+
+REVERSE_PRECISION = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_geocode_cache_expires ON geocode_cache(expires_at);
+"""
+
+
+def normalize_address(address: str) -> str:
+    """Lowercase, punctuation-free address with common street words abbreviated"""
+    words = re.sub(r"[^\w\s]", " ", address.lower()).split()
+    return " ".join(STREET_ABBREVIATIONS.get(word, word) for word in words)
+
+
+def forward_key(address: str) -> str:
+    return f"fwd:{normalize_address(address)}"
+
+
+def reverse_key(lat: float, lon: float) -> str:
+    return f"rev:{round(lat, REVERSE_PRECISION):.{REVERSE_PRECISION}f}:{round(lon, REVERSE_PRECISION):.{REVERSE_PRECISION}f}"
+
+
+class GeocodeCache:
+    """SQLite-backed result cache shared by forward and reverse geocoding"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        empty_ttl_seconds: Optional[int] = None,
+    ) -> None:
+        self.path = path or os.getenv("GEOCODER_CACHE_PATH", "data/geocode_cache.sqlite3")
+        self.ttl_seconds = ttl_seconds or int(os.getenv("GEOCODER_CACHE_TTL", str(90 * 86400)))
+        self.empty_ttl_seconds = empty_ttl_seconds or int(os.getenv("GEOCODER_EMPTY_TTL", str(86400)))
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="geocode-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.execute("DELETE FROM geocode_cache WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _get_many(self, keys: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        conn = self._connect()
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        now = time.time()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, results FROM geocode_cache WHERE key IN ({marks}) AND expires_at >= ?",
+                (*chunk, now),
+            ).fetchall()
+            for key, results in rows:
+                found[key] = json.loads(results)
+        if found:
+            conn.executemany("UPDATE geocode_cache SET hits = hits + 1 WHERE key = ?", [(key,) for key in found])
+            conn.commit()
+        return found
+
+    def _put_many(self, entries: List[Tuple[str, str, List[Dict[str, Any]]]]) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.executemany(
+            """
+            INSERT INTO geocode_cache (key, query, results, created_at, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                query = excluded.query, results = excluded.results,
+                created_at = excluded.created_at, expires_at = excluded.expires_at
+            """,
+            [
+                (key, query, json.dumps(results), now, now + (self.ttl_seconds if results else self.empty_ttl_seconds))
+                for key, query, results in entries
+            ],
+        )
+        conn.commit()
+
+    def _stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        entries, empty, hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(results = '[]'), 0), COALESCE(SUM(hits), 0) FROM geocode_cache"
+        ).fetchone()
+        return {"path": self.path, "entries": entries, "empty_entries": empty, "stored_hits": hits}
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Unexpired results by key; missing keys are absent"""
+        keys = list(dict.fromkeys(keys))
+        return await self._run(self._get_many, keys) if keys else {}
+
+    async def put_many(self, entries: Iterable[Tuple[str, str, List[Dict[str, Any]]]]) -> None:
+        """Store (key, query, results) entries"""
+        entries = list(entries)
+        if entries:
+            await self._run(self._put_many, entries)
+
+    async def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        return (await self.get_many([key])).get(key)
+
+    async def put(self, key: str, query: str, results: List[Dict[str, Any]]) -> None:
+        await self.put_many([(key, query, results)])
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self._run(self._stats)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+        self._executor.shutdown(wait=False)
@@ -1,34 +1,122 @@
 """
 Geocoder Service (FREE-FIRST)
 
-Forward geocoding using OpenStreetMap Nominatim (polite usage), optional Mapbox
-fallback when MAPBOX_TOKEN is present. Simple FastAPI microservice with health
-endpoints. Intended for low-rate development and local use.
+Forward and reverse geocoding using OpenStreetMap Nominatim (polite usage),
+optional Mapbox fallback when MAPBOX_TOKEN is present. Results are kept in a
+disk-backed cache (see geocode_cache), and every Nominatim request goes
+through one scheduler that keeps to the 1 request/second usage policy.
+Simple FastAPI microservice with health and metrics endpoints.
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
+import time
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from urllib.parse import quote
 
 import httpx
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
+from geocode_cache import GeocodeCache, forward_key, reverse_key
+from scheduler import NominatimScheduler, SchedulerFull
+
 
 SERVICE_NAME = "geocoder-service"
 USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "fishmouth-geocoder/1.0 (+local)")
 NOMINATIM_BASE = os.getenv("NOMINATIM_BASE", "https://nominatim.openstreetmap.org")
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
 MAPBOX_TOKEN = os.getenv("MAPBOX_TOKEN", os.getenv("MAPBOX_API_KEY", ""))
 
+# Providers are always asked for this many results so one cache entry serves any limit
+MAX_RESULTS = 5
+MAX_BATCH_ADDRESSES = 1000
+LATENCY_WINDOW = 1024
+# Transport failures and malformed provider payloads; neither is cached
+PROVIDER_ERRORS = (httpx.HTTPError, ValueError, KeyError)
+
 
 app = FastAPI(
     title="Geocoder Service",
     description="FREE-FIRST geocoding via OSM Nominatim, with optional Mapbox fallback.",
-    version="0.1.0",
+    version="0.2.0",
 )
 
+cache = GeocodeCache()
+nominatim = NominatimScheduler(NOMINATIM_BASE, USER_AGENT, min_interval=NOMINATIM_MIN_INTERVAL)
+_mapbox_client: Optional[httpx.AsyncClient] = None
+# Lookups in progress by cache key; callers asking for the same key share one task
+_inflight: Dict[str, asyncio.Task] = {}
+
+
+class Metrics:
+    """Cache hit rate and rolling latencies per endpoint and provider"""
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.counters: Dict[str, int] = {
+            "cache_hits": 0, "cache_misses": 0, "coalesced": 0, "not_found": 0, "errors": 0, "pending": 0,
+            "rejected": 0,
+        }
+        self.requests: Dict[str, int] = {}
+        self.latencies: Dict[str, Deque[float]] = {}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.requests[name] = self.requests.get(name, 0) + 1
+        self.latencies.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    @staticmethod
+    def _percentile(values: Deque[float], pct: float) -> Optional[float]:
+        ordered = sorted(values)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.counters["cache_hits"] + self.counters["cache_misses"]
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+            "cache_hit_rate": round(self.counters["cache_hits"] / lookups, 4) if lookups else None,
+            **self.counters,
+            "latency": {
+                name: {
+                    "count": self.requests[name],
+                    "p50_ms": self._percentile(values, 50),
+                    "p95_ms": self._percentile(values, 95),
+                }
+                for name, values in self.latencies.items()
+            },
+        }
+
+
+metrics = Metrics()
+
+
+async def _timed(name: str, call: Awaitable[Any]) -> Any:
+    started = time.monotonic()
+    try:
+        return await call
+    finally:
+        metrics.observe(name, time.monotonic() - started)
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    global _mapbox_client
+    await nominatim.close()
+    if _mapbox_client is not None:
+        await _mapbox_client.aclose()
+        _mapbox_client = None
+    cache.close()
+
 
 @app.get("/healthz")
 async def healthz() -> Dict[str, Any]:
@@ -48,9 +136,31 @@ async def readyz() -> Dict[str, Any]:
     return {"status": "healthy", "service": SERVICE_NAME}
 
 
+@app.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    return {
+        **metrics.snapshot(),
+        "nominatim": {**nominatim.stats, "queued": nominatim.queued},
+        "inflight": len(_inflight),
+        "cache": await cache.stats(),
+    }
+
+
 class GeocodeRequest(BaseModel):
     address: str = Field(..., min_length=3)
-    limit: int = Field(1, ge=1, le=5)
+    limit: int = Field(1, ge=1, le=MAX_RESULTS)
+
+
+class BatchGeocodeRequest(BaseModel):
+    addresses: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_ADDRESSES)
+    limit: int = Field(1, ge=1, le=MAX_RESULTS)
+    # Lookups still queued after this long are reported as pending and finish in the background
+    wait_seconds: float = Field(30.0, ge=0, le=600)
+
+
+class ReverseRequest(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
 
 
 class GeocodeResult(BaseModel):
@@ -63,76 +173,257 @@ class GeocodeResult(BaseModel):
 class GeocodeResponse(BaseModel):
     success: bool
     results: List[GeocodeResult]
+    cached: bool = False
+
+
+class BatchGeocodeItem(BaseModel):
+    address: str
+    status: str  # ok, not_found, pending, rejected (queue full, retry later), error
+    cached: bool = False
+    results: List[GeocodeResult] = []
+    error: Optional[str] = None
+
+
+class BatchGeocodeResponse(BaseModel):
+    success: bool
+    items: List[BatchGeocodeItem]
+    summary: Dict[str, int]
+
+
+def _mapbox() -> httpx.AsyncClient:
+    global _mapbox_client
+    if _mapbox_client is None:
+        _mapbox_client = httpx.AsyncClient(
+            timeout=15.0, limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+        )
+    return _mapbox_client
+
+
+def _parse_nominatim(item: Dict[str, Any], fallback_label: str) -> Optional[GeocodeResult]:
+    try:
+        return GeocodeResult(
+            label=str(item.get("display_name") or fallback_label),
+            lat=float(item["lat"]),
+            lon=float(item["lon"]),
+            provider="nominatim",
+        )
+    except Exception:
+        return None
 
 
 async def _geocode_nominatim(address: str, limit: int) -> List[GeocodeResult]:
-    headers = {"User-Agent": USER_AGENT}
     params = {"q": address, "format": "json", "limit": str(limit), "addressdetails": "0"}
-    async with httpx.AsyncClient(headers=headers, timeout=15.0) as client:
-        resp = await client.get(f"{NOMINATIM_BASE}/search", params=params)
-        try:
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(status_code=502, detail=f"Nominatim error: {exc}")
-        payload = resp.json()
-    out: List[GeocodeResult] = []
-    for item in payload or []:
-        try:
-            out.append(
-                GeocodeResult(
-                    label=str(item.get("display_name") or address),
-                    lat=float(item["lat"]),
-                    lon=float(item["lon"]),
-                    provider="nominatim",
-                )
-            )
-        except Exception:
-            continue
-    return out
+    payload = await _timed("nominatim.search", nominatim.call("search", params))
+    parsed = (_parse_nominatim(item, address) for item in payload or [])
+    return [result for result in parsed if result is not None]
 
 
-async def _geocode_mapbox(address: str, limit: int) -> List[GeocodeResult]:
+async def _reverse_nominatim(lat: float, lon: float) -> List[GeocodeResult]:
+    params = {"lat": f"{lat}", "lon": f"{lon}", "format": "json", "addressdetails": "0"}
+    payload = await _timed("nominatim.reverse", nominatim.call("reverse", params))
+    if not payload or "error" in payload:
+        return []
+    result = _parse_nominatim(payload, f"{lat},{lon}")
+    return [result] if result else []
+
+
+async def _mapbox_places(query: str, limit: int, fallback_label: str) -> List[GeocodeResult]:
     if not MAPBOX_TOKEN:
         return []
     params = {"access_token": MAPBOX_TOKEN, "limit": str(limit)}
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.get(
-            f"https://api.mapbox.com/geocoding/v5/mapbox.places/{httpx.utils.quote(address)}.json",
-            params=params,
+    try:
+        resp = await _timed(
+            "mapbox",
+            _mapbox().get(f"https://api.mapbox.com/geocoding/v5/mapbox.places/{quote(query)}.json", params=params),
         )
-        try:
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as exc:
-            return []
+        resp.raise_for_status()
         payload = resp.json()
+    except PROVIDER_ERRORS:
+        return []
     features = (payload or {}).get("features") or []
     out: List[GeocodeResult] = []
     for feat in features:
         coords = (feat.get("center") or [])
         if len(coords) == 2:
-            out.append(
-                GeocodeResult(
-                    label=str(feat.get("place_name") or address),
-                    lon=float(coords[0]),
-                    lat=float(coords[1]),
-                    provider="mapbox",
+            try:
+                out.append(
+                    GeocodeResult(
+                        label=str(feat.get("place_name") or fallback_label),
+                        lon=float(coords[0]),
+                        lat=float(coords[1]),
+                        provider="mapbox",
+                    )
                 )
-            )
+            except (TypeError, ValueError):
+                continue
     return out
 
 
+async def _geocode_mapbox(address: str, limit: int) -> List[GeocodeResult]:
+    return await _mapbox_places(address, limit, address)
+
+
+async def _reverse_mapbox(lat: float, lon: float) -> List[GeocodeResult]:
+    # Mapbox reverse queries only accept limit=1 without a types filter
+    return await _mapbox_places(f"{lon},{lat}", 1, f"{lat},{lon}")
+
+
+async def _lookup(
+    key: str,
+    query: str,
+    primary: Callable[[], Awaitable[List[GeocodeResult]]],
+    fallback: Callable[[], Awaitable[List[GeocodeResult]]],
+) -> List[Dict[str, Any]]:
+    """Ask the providers in order and cache the answer; provider errors are not cached"""
+    error: Optional[Exception] = None
+    try:
+        results = await primary()
+    except (SchedulerFull, *PROVIDER_ERRORS) as exc:
+        error, results = exc, []
+    if not results:
+        try:
+            results = await fallback()
+        except PROVIDER_ERRORS as exc:
+            error, results = error or exc, []
+    if not results and error is not None:
+        raise error
+    stored = [result.model_dump() for result in results]
+    await cache.put(key, query, stored)
+    return stored
+
+
+def _finished(key: str, task: asyncio.Task) -> None:
+    _inflight.pop(key, None)
+    # Batch callers may have stopped waiting; mark errors retrieved so they are not logged as lost
+    if not task.cancelled():
+        task.exception()
+
+
+def _resolve(key: str, query: str, primary, fallback) -> asyncio.Task:
+    """The task resolving ``key``, shared with any caller already waiting on it"""
+    task = _inflight.get(key)
+    if task is not None:
+        metrics.count("coalesced")
+        return task
+    task = asyncio.create_task(_lookup(key, query, primary, fallback))
+    _inflight[key] = task
+    task.add_done_callback(lambda done: _finished(key, done))
+    return task
+
+
+def _resolve_forward(address: str) -> asyncio.Task:
+    return _resolve(
+        forward_key(address), address,
+        lambda: _geocode_nominatim(address, MAX_RESULTS),
+        lambda: _geocode_mapbox(address, MAX_RESULTS),
+    )
+
+
+async def _cached_or_resolve(key: str, task_factory: Callable[[], asyncio.Task]):
+    cached = await cache.get(key)
+    if cached is not None:
+        metrics.count("cache_hits")
+        return cached, True
+    metrics.count("cache_misses")
+    try:
+        return await asyncio.shield(task_factory()), False
+    except SchedulerFull as exc:
+        metrics.count("rejected")
+        raise HTTPException(status_code=503, detail=f"Geocoder busy: {exc}", headers={"Retry-After": "30"})
+    except PROVIDER_ERRORS as exc:
+        metrics.count("errors")
+        raise HTTPException(status_code=502, detail=f"Geocoding provider error: {exc}")
+
+
+def _response(stored: List[Dict[str, Any]], limit: int, cached: bool) -> GeocodeResponse:
+    results = [GeocodeResult(**item) for item in stored[:limit]]
+    if not results:
+        metrics.count("not_found")
+    return GeocodeResponse(success=bool(results), results=results, cached=cached)
+
+
 @app.post("/geocode", response_model=GeocodeResponse)
 async def geocode(payload: GeocodeRequest) -> GeocodeResponse:
-    # Try Nominatim first (free), then Mapbox if available
-    results = await _geocode_nominatim(payload.address, payload.limit)
-    if not results:
-        results = await _geocode_mapbox(payload.address, payload.limit)
-    return GeocodeResponse(success=bool(results), results=results)
+    # Cache first, then Nominatim (free), then Mapbox if available
+    started = time.monotonic()
+    try:
+        stored, cached = await _cached_or_resolve(
+            forward_key(payload.address), lambda: _resolve_forward(payload.address)
+        )
+        return _response(stored, payload.limit, cached)
+    finally:
+        metrics.observe("geocode", time.monotonic() - started)
+
+
+@app.post("/reverse", response_model=GeocodeResponse)
+async def reverse(payload: ReverseRequest) -> GeocodeResponse:
+    started = time.monotonic()
+    key = reverse_key(payload.lat, payload.lon)
+    try:
+        stored, cached = await _cached_or_resolve(
+            key,
+            lambda: _resolve(
+                key, f"{payload.lat},{payload.lon}",
+                lambda: _reverse_nominatim(payload.lat, payload.lon),
+                lambda: _reverse_mapbox(payload.lat, payload.lon),
+            ),
+        )
+        return _response(stored, 1, cached)
+    finally:
+        metrics.observe("reverse", time.monotonic() - started)
+
+
+@app.post("/geocode/batch", response_model=BatchGeocodeResponse)
+async def geocode_batch(payload: BatchGeocodeRequest) -> BatchGeocodeResponse:
+    """Geocode many addresses: duplicates are looked up once, cache hits are
+    answered at once and misses queue behind the Nominatim scheduler."""
+    started = time.monotonic()
+    keys = {address: forward_key(address) for address in payload.addresses}
+    unique: Dict[str, str] = {}
+    for address, key in keys.items():
+        unique.setdefault(key, address)
+
+    found = await cache.get_many(unique)
+    metrics.count("cache_hits", len(found))
+    metrics.count("cache_misses", len(unique) - len(found))
+    tasks = {key: _resolve_forward(address) for key, address in unique.items() if key not in found}
+    if tasks:
+        await asyncio.wait(list(tasks.values()), timeout=payload.wait_seconds)
+
+    items: List[BatchGeocodeItem] = []
+    for address in payload.addresses:
+        key = keys[address]
+        if key in found:
+            results = [GeocodeResult(**item) for item in found[key][:payload.limit]]
+            items.append(BatchGeocodeItem(
+                address=address, status="ok" if results else "not_found", cached=True, results=results
+            ))
+            continue
+        task = tasks[key]
+        if not task.done():
+            items.append(BatchGeocodeItem(address=address, status="pending"))
+        elif task.cancelled():
+            items.append(BatchGeocodeItem(address=address, status="error", error="lookup cancelled"))
+        elif isinstance(task.exception(), SchedulerFull):
+            items.append(BatchGeocodeItem(address=address, status="rejected", error=str(task.exception())))
+        elif task.exception() is not None:
+            items.append(BatchGeocodeItem(address=address, status="error", error=str(task.exception())))
+        else:
+            results = [GeocodeResult(**item) for item in task.result()[:payload.limit]]
+            items.append(BatchGeocodeItem(address=address, status="ok" if results else "not_found", results=results))
+
+    summary: Dict[str, int] = {"total": len(items), "unique": len(unique), "cached": len(found)}
+    for item in items:
+        summary[item.status] = summary.get(item.status, 0) + 1
+    metrics.count("not_found", summary.get("not_found", 0))
+    metrics.count("errors", summary.get("error", 0))
+    metrics.count("pending", summary.get("pending", 0))
+    metrics.count("rejected", summary.get("rejected", 0))
+    metrics.observe("geocode_batch", time.monotonic() - started)
+    return BatchGeocodeResponse(success=summary.get("ok", 0) > 0, items=items, summary=summary)
 
 
 if __name__ == "__main__":
     import uvicorn
 
     uvicorn.run(app, host="0.0.0.0", port=8015)
-
-
@@ -0,0 +1,133 @@
+"""
+Nominatim request scheduler
+
+The public Nominatim usage policy allows at most one request per second per
+application. Every Nominatim call in the service goes through one queue and
+one worker, which starts requests no closer together than the configured
+interval on a single pooled client, and backs off when the server answers
+429/503. The queue is bounded; calls beyond it fail at once with
+``SchedulerFull`` instead of waiting behind hours of backlog.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 503}
+MAX_QUEUED = int(os.getenv("NOMINATIM_MAX_QUEUED", "600"))
+
+
+class SchedulerFull(Exception):
+    """Raised when the Nominatim queue is already at its limit"""
+
+
+class NominatimScheduler:
+    """Serializes Nominatim requests at a fixed minimum spacing"""
+
+    def __init__(
+        self,
+        base_url: str,
+        user_agent: str,
+        min_interval: float = 1.0,
+        max_retries: int = 2,
+        client: Optional[httpx.AsyncClient] = None,
+        max_queued: int = MAX_QUEUED,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.user_agent = user_agent
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.max_queued = max(1, max_queued)
+        self._client = client
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._last_start = 0.0
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0, "rejected": 0}
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.user_agent},
+                timeout=15.0,
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            )
+        return self._client
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _pace(self, extra: float = 0.0) -> None:
+        wait = self._last_start + self.min_interval + extra - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_start = time.monotonic()
+
+    async def _request(self, path: str, params: Dict[str, str]) -> Any:
+        backoff = 0.0
+        for attempt in range(self.max_retries + 1):
+            await self._pace(backoff)
+            self.stats["requests"] += 1
+            resp = await self._http().get(f"{self.base_url}/{path}", params=params)
+            if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                self.stats["throttled"] += 1
+                retry_after = resp.headers.get("retry-after", "")
+                backoff = float(retry_after) if retry_after.isdigit() else 5.0 * (attempt + 1)
+                logger.warning(f"Nominatim answered {resp.status_code}, backing off {backoff:.0f}s")
+                continue
+            resp.raise_for_status()
+            return resp.json()
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            (path, params), future = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                try:
+                    payload = await self._request(path, params)
+                except Exception as exc:
+                    self.stats["errors"] += 1
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    if not future.done():
+                        future.set_result(payload)
+            finally:
+                queue.task_done()
+
+    async def call(self, path: str, params: Dict[str, str]) -> Any:
+        """JSON payload of ``GET {base_url}/{path}``, once the request's turn comes"""
+        queue = self._ensure_worker()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        request: Tuple[str, Dict[str, str]] = (path, params)
+        try:
+            queue.put_nowait((request, future))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise SchedulerFull(f"{queue.qsize()} Nominatim requests already queued")
+        return await future
+
+    async def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
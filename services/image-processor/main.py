@@ -8,7 +8,6 @@ import uuid
 import aiohttp
 import asyncio
 import json
-import math
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Optional, Dict, Any, Tuple
@@ -17,7 +16,7 @@ import numpy as np
 from PIL import Image, ImageEnhance, ImageFilter
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi import Response
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 import structlog
 
@@ -26,6 +25,9 @@ if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
 from shared.observability import RequestContextMiddleware, setup_observability
+from tile_mosaic import MAX_GRID_RADIUS, TileMosaic, TileMosaicEngine, assemble_mosaic, deg2num, tile_coords
+from mosaic_cache import MosaicCache
+from shared.cost_ledger import CostLedger, DayAggregate
 
 SERVICE_NAME = "image-processor"
 setup_observability(SERVICE_NAME)
@@ -60,8 +62,61 @@ USE_OPENSTREETMAP_TILES = True
 USE_LOCAL_SUPER_RESOLUTION = True
 USE_BATCH_PROCESSING = True
 
+# OSM tile fetching: grid radius 1 => 3x3 tiles, politeness per tile host
+OSM_GRID_RADIUS = int(os.getenv("OSM_GRID_RADIUS", "1"))
+OSM_PER_HOST_LIMIT = int(os.getenv("OSM_PER_HOST_LIMIT", "2"))
+OSM_PER_HOST_INTERVAL = float(os.getenv("OSM_PER_HOST_INTERVAL", "0.05"))
+
+tile_engine = TileMosaicEngine(
+    grid_radius=OSM_GRID_RADIUS,
+    per_host_limit=OSM_PER_HOST_LIMIT,
+    per_host_interval=OSM_PER_HOST_INTERVAL,
+)
+
+# Stitched mosaics are indexed by the tiles they cover and shared between
+# nearby properties; batch groups are blocks of this many tiles per side.
+mosaic_cache = MosaicCache(
+    Path(os.getenv("MOSAIC_CACHE_DIR", "/app/images/mosaics")),
+    max_age_days=CACHE_DURATION_DAYS,
+)
+BATCH_GROUP_SPAN_TILES = int(os.getenv("BATCH_GROUP_SPAN_TILES", "4"))
+# Web-mercator tiles stop here; beyond it a point has no tile row
+MERCATOR_MAX_LAT = 85.05112878
+
+# Per-property spend: appends are batched, summaries read checkpointed daily aggregates
+cost_ledger = CostLedger(Path(os.getenv("COST_LEDGER_DIR", "/app/logs/costs")))
+DAILY_API_BUDGET = float(os.getenv("DAILY_API_BUDGET", "10.00"))
+TRADITIONAL_COST_PER_PROPERTY = 0.036  # $0.036 per property traditionally
+COST_LEDGER_FLUSH_SECONDS = 1.0
+
 logger.info("startup.begin", note="Starting cost-optimized image processor")
 
+
+async def _flush_cost_ledger():
+    while True:
+        await asyncio.sleep(COST_LEDGER_FLUSH_SECONDS)
+        try:
+            cost_ledger.maybe_flush()
+        except OSError as exc:
+            logger.warning("cost_ledger.flush_failed", error=str(exc))
+
+
+@app.on_event("startup")
+async def start_cost_ledger_flusher():
+    app.state.cost_ledger_flusher = asyncio.create_task(_flush_cost_ledger())
+
+
+@app.on_event("shutdown")
+async def close_tile_engine():
+    await tile_engine.close()
+    if SUPER_HD_AVAILABLE:
+        shutdown_super_hd_pool()
+    flusher = getattr(app.state, "cost_ledger_flusher", None)
+    if flusher:
+        flusher.cancel()
+    cost_ledger.close()
+
+
 @app.get("/healthz")
 async def healthz():
     return {
@@ -126,6 +181,7 @@ class OSMRequest(BaseModel):
     lng: float
     zoom: int = 18
     prefer_free: bool = True
+    grid_radius: Optional[int] = Field(None, ge=0, le=MAX_GRID_RADIUS)  # Defaults to OSM_GRID_RADIUS
 
 
 @app.post("/images/satellite/osm")
@@ -136,31 +192,24 @@ async def get_osm_satellite_image(request: OSMRequest) -> Response:
     backend imagery provider chain to obtain a free satellite-style raster.
     """
     try:
-        # Attempt tile download and stitching
+        # Attempt tile download and stitching (served straight from memory)
         property_id = f"osm-{request.lat:.5f}-{request.lng:.5f}-{request.zoom}"
-        ok = await download_openstreetmap_tiles(property_id, request.lat, request.lng, request.zoom)
-        if not ok:
-            # Attempt cache
-            cache_dir = Path(f"/app/images/satellite/{property_id}")
-            latest = None
-            if cache_dir.exists():
-                jpgs = list(cache_dir.glob("*.jpg"))
-                if jpgs:
-                    latest = max(jpgs, key=lambda p: p.stat().st_mtime)
-            if latest and latest.exists():
-                return Response(latest.read_bytes(), media_type="image/jpeg")
-            raise HTTPException(status_code=424, detail="OSM tiles unavailable")
-
-        # Load stitched output path
-        out_path = Path(f"/app/images/satellite/{property_id}/free_osm_satellite.jpg")
-        if not out_path.exists():
-            # Fallback: search for any jpg
-            candidates = list(Path(f"/app/images/satellite/{property_id}").glob("*.jpg"))
-            if not candidates:
-                raise HTTPException(status_code=500, detail="Stitched image missing")
-            out_path = max(candidates, key=lambda p: p.stat().st_mtime)
-
-        return Response(out_path.read_bytes(), media_type="image/jpeg")
+        mosaic = await fetch_osm_mosaic(request.lat, request.lng, request.zoom, request.grid_radius)
+        if mosaic is not None:
+            jpeg_bytes = await stitch_osm_tiles(property_id, mosaic)
+            if jpeg_bytes:
+                return Response(jpeg_bytes, media_type="image/jpeg")
+
+        # Attempt cache
+        cache_dir = Path(f"/app/images/satellite/{property_id}")
+        latest = None
+        if cache_dir.exists():
+            jpgs = list(cache_dir.glob("*.jpg"))
+            if jpgs:
+                latest = max(jpgs, key=lambda p: p.stat().st_mtime)
+        if latest and latest.exists():
+            return Response(latest.read_bytes(), media_type="image/jpeg")
+        raise HTTPException(status_code=424, detail="OSM tiles unavailable")
     except HTTPException:
         raise
     except Exception as e:
@@ -177,6 +226,7 @@ async def process_free_first_satellite_download(
     
     total_cost = 0.0
     sources_used = []
+    source_costs: Dict[str, float] = {}
     images_downloaded = 0
     
     try:
@@ -227,13 +277,14 @@ async def process_free_first_satellite_download(
                 if google_cost > 0:
                     total_cost += google_cost
                     sources_used.append("google_maps_optimized")
+                    source_costs["google_maps_optimized"] = google_cost
                     images_downloaded += 1
                     
             # Apply local processing to enhance paid images
             if images_downloaded > 0:
                 await apply_local_super_resolution(property_id, "paid")
         
-        await save_cost_tracking(property_id, total_cost, sources_used)
+        await save_cost_tracking(property_id, total_cost, sources_used, source_costs)
         print(f"📊 Total cost for property {property_id}: ${total_cost:.4f}")
         
     except Exception as e:
@@ -241,131 +292,60 @@ async def process_free_first_satellite_download(
         # Fallback to local processing
         await generate_synthetic_satellite_data(property_id, lat, lng)
 
-async def download_openstreetmap_tiles(property_id: str, lat: float, lng: float, zoom: int) -> bool:
+async def fetch_osm_mosaic(
+    lat: float, lng: float, zoom: int, grid_radius: Optional[int] = None
+) -> Optional[TileMosaic]:
+    """Fetch and stitch the OSM tile grid around a point, entirely in memory"""
+    tile_range = tile_engine.tile_range(lat, lng, zoom, grid_radius)
+    cached = await mosaic_cache.lookup(zoom, *tile_range)
+    if cached is not None:
+        print("✅ Using geographic proximity cache")
+        return cached.sub_mosaic(*tile_range)
+
+    mosaic = await tile_engine.build_mosaic_for_range(zoom, *tile_range)
+    if mosaic is None:
+        print("⚠️ No OpenStreetMap tiles could be fetched")
+        return None
+    # Need reasonable coverage (more than half of the grid)
+    if mosaic.tiles_fetched * 2 <= mosaic.tiles_expected:
+        print(f"⚠️ Insufficient tile coverage ({mosaic.tiles_fetched}/{mosaic.tiles_expected} tiles)")
+        return None
+    await mosaic_cache.add(mosaic)
+    return mosaic
+
+
+async def download_openstreetmap_tiles(
+    property_id: str, lat: float, lng: float, zoom: int, grid_radius: Optional[int] = None
+) -> bool:
     """Download FREE satellite-style tiles from OpenStreetMap"""
     try:
-        # Convert lat/lng to tile coordinates
-        tile_x, tile_y = deg2num(lat, lng, zoom)
-        
-        # Download multiple tiles for better coverage
-        tiles_downloaded = 0
-        tile_grid = []
-        
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                x = tile_x + dx
-                y = tile_y + dy
-                
-                # Try multiple FREE tile servers
-                tile_servers = [
-                    f"https://tile.openstreetmap.org/{zoom}/{x}/{y}.png",
-                    f"https://a.tile.openstreetmap.org/{zoom}/{x}/{y}.png", 
-                    f"https://b.tile.openstreetmap.org/{zoom}/{x}/{y}.png",
-                    f"https://c.tile.openstreetmap.org/{zoom}/{x}/{y}.png"
-                ]
-                
-                for server_url in tile_servers:
-                    try:
-                        async with aiohttp.ClientSession() as session:
-                            # Respectful delay for free service
-                            await asyncio.sleep(0.1)
-                            
-                            async with session.get(server_url) as response:
-                                if response.status == 200:
-                                    tile_data = await response.read()
-                                    
-                                    # Save tile
-                                    tile_dir = Path(f"/app/images/osm_tiles/{property_id}")
-                                    tile_dir.mkdir(parents=True, exist_ok=True)
-                                    
-                                    tile_path = tile_dir / f"tile_{x}_{y}.png"
-                                    with open(tile_path, 'wb') as f:
-                                        f.write(tile_data)
-                                    
-                                    tile_grid.append({"x": x, "y": y, "path": str(tile_path)})
-                                    tiles_downloaded += 1
-                                    break  # Success, no need to try other servers
-                                    
-                    except Exception as e:
-                        continue  # Try next server
-        
-        if tiles_downloaded > 4:  # Need reasonable coverage
-            # Stitch tiles together into single satellite-style image
-            await stitch_osm_tiles(property_id, tile_grid, zoom)
-            print(f"✅ Downloaded {tiles_downloaded} FREE OpenStreetMap tiles")
-            return True
-        else:
-            print(f"⚠️ Insufficient tile coverage ({tiles_downloaded} tiles)")
+        mosaic = await fetch_osm_mosaic(lat, lng, zoom, grid_radius)
+        if mosaic is None:
             return False
-            
+        await stitch_osm_tiles(property_id, mosaic)
+        print(f"✅ Downloaded {mosaic.tiles_fetched} FREE OpenStreetMap tiles")
+        return True
+
     except Exception as e:
         print(f"❌ OpenStreetMap tile download failed: {e}")
         return False
 
-def deg2num(lat_deg: float, lon_deg: float, zoom: int) -> Tuple[int, int]:
-    """Convert latitude/longitude to tile coordinates"""
-    lat_rad = math.radians(lat_deg)
-    n = 2.0 ** zoom
-    x = int((lon_deg + 180.0) / 360.0 * n)
-    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
-    return x, y
-
-async def stitch_osm_tiles(property_id: str, tile_grid: List[Dict], zoom: int):
-    """Stitch OpenStreetMap tiles into single satellite-style image"""
+async def stitch_osm_tiles(property_id: str, mosaic: TileMosaic) -> Optional[bytes]:
+    """Write the in-memory stitched mosaic as the property's satellite-style image"""
     try:
-        if not tile_grid:
-            return
-        
-        # Load all tiles
-        tile_images = {}
-        for tile_info in tile_grid:
-            try:
-                img = cv2.imread(tile_info["path"])
-                if img is not None:
-                    tile_images[(tile_info["x"], tile_info["y"])] = img
-            except:
-                continue
-        
-        if not tile_images:
-            return
-        
-        # Find grid bounds
-        x_coords = [x for x, y in tile_images.keys()]
-        y_coords = [y for x, y in tile_images.keys()]
-        min_x, max_x = min(x_coords), max(x_coords)
-        min_y, max_y = min(y_coords), max(y_coords)
-        
-        # Stitch tiles together (256x256 tiles)
-        tile_size = 256
-        width = (max_x - min_x + 1) * tile_size
-        height = (max_y - min_y + 1) * tile_size
-        
-        stitched = np.zeros((height, width, 3), dtype=np.uint8)
-        
-        for (x, y), tile_img in tile_images.items():
-            start_x = (x - min_x) * tile_size
-            start_y = (y - min_y) * tile_size
-            end_x = start_x + tile_img.shape[1]
-            end_y = start_y + tile_img.shape[0]
-            
-            # Ensure we don't exceed bounds
-            end_x = min(end_x, width)
-            end_y = min(end_y, height)
-            
-            if end_x > start_x and end_y > start_y:
-                stitched[start_y:end_y, start_x:end_x] = tile_img[:end_y-start_y, :end_x-start_x]
-        
-        # Save stitched satellite-style image
+        jpeg_bytes = mosaic.encode_jpeg(quality=90)
+
         output_dir = Path(f"/app/images/satellite/{property_id}")
         output_dir.mkdir(parents=True, exist_ok=True)
         output_path = output_dir / "free_osm_satellite.jpg"
-        
-        cv2.imwrite(str(output_path), stitched, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        
-        print(f"✅ Stitched {len(tile_images)} tiles into satellite image: {output_path}")
-        
+        output_path.write_bytes(jpeg_bytes)
+
+        print(f"✅ Stitched {mosaic.tiles_fetched} tiles into satellite image: {output_path}")
+        return jpeg_bytes
+
     except Exception as e:
         print(f"❌ Tile stitching error: {e}")
+        return None
 
 async def apply_local_super_resolution(property_id: str, source_type: str):
     """Apply FREE local super-resolution to enhance image quality"""
@@ -474,7 +454,7 @@ async def check_extended_cache(property_id: str, lat: float, lng: float, zoom: i
         
         # Check nearby properties for geographic cache sharing
         # This reduces API calls for properties in the same area
-        nearby_cached = await check_geographic_cache(lat, lng, zoom)
+        nearby_cached = await check_geographic_cache(lat, lng, zoom, property_id)
         if nearby_cached:
             print(f"✅ Using geographic proximity cache")
             return True
@@ -485,20 +465,21 @@ async def check_extended_cache(property_id: str, lat: float, lng: float, zoom: i
         print(f"❌ Cache check error: {e}")
         return False
 
-async def check_geographic_cache(lat: float, lng: float, zoom: int) -> bool:
-    """Check for cached images of nearby properties to share resources"""
+async def check_geographic_cache(
+    lat: float, lng: float, zoom: int, property_id: Optional[str] = None
+) -> bool:
+    """Check for cached mosaics of nearby properties to share resources"""
     try:
-        # This would query database for nearby properties with recent images
-        # For now, simulate the concept
-        print(f"🗺️ Checking geographic cache for lat={lat}, lng={lng}")
-        
-        # In production, this would:
-        # 1. Query database for properties within 0.001 degrees (~100m)
-        # 2. Check if any have recent satellite images
-        # 3. Copy/adapt existing images if suitable
-        
-        return False  # Simplified for now
-        
+        tile_range = tile_engine.tile_range(lat, lng, zoom)
+        cached = await mosaic_cache.lookup(zoom, *tile_range)
+        if cached is None:
+            return False
+
+        # Cut this property's tile window out of the shared mosaic
+        if property_id:
+            await stitch_osm_tiles(property_id, cached.sub_mosaic(*tile_range))
+        return True
+
     except Exception as e:
         print(f"❌ Geographic cache error: {e}")
         return False
@@ -509,8 +490,8 @@ async def check_api_budget() -> Dict[str, Any]:
         # This would check actual API usage/billing
         # For demonstration, return budget status
         
-        daily_budget = 10.00  # $10/day budget
-        daily_spent = 3.50    # Amount already spent today
+        daily_budget = DAILY_API_BUDGET
+        daily_spent = cost_ledger.day().total_cost
         
         return {
             "has_budget": daily_spent < daily_budget,
@@ -611,7 +592,12 @@ async def generate_synthetic_satellite_data(property_id: str, lat: float, lng: f
     except Exception as e:
         print(f"❌ Synthetic data generation error: {e}")
 
-async def save_cost_tracking(property_id: str, cost: float, sources_used: List[str]):
+async def save_cost_tracking(
+    property_id: str,
+    cost: float,
+    sources_used: List[str],
+    source_costs: Optional[Dict[str, float]] = None
+):
     """Save cost tracking information for analysis"""
     try:
         cost_data = {
@@ -621,135 +607,245 @@ async def save_cost_tracking(property_id: str, cost: float, sources_used: List[s
             "timestamp": datetime.now().isoformat(),
             "optimization_enabled": True
         }
+        if source_costs:
+            cost_data["source_costs"] = source_costs
         
-        # Save to cost tracking file
-        cost_dir = Path("/app/logs/costs")
-        cost_dir.mkdir(parents=True, exist_ok=True)
-        
-        cost_file = cost_dir / f"costs_{datetime.now().strftime('%Y%m%d')}.jsonl"
-        with open(cost_file, 'a') as f:
-            f.write(json.dumps(cost_data) + '\n')
+        # Buffered; the ledger appends to costs_YYYYMMDD.jsonl in batches
+        cost_ledger.record(cost_data)
         
         print(f"💰 Cost tracking saved: ${cost:.4f} for property {property_id}")
         
     except Exception as e:
         print(f"❌ Cost tracking error: {e}")
 
+def _cost_summary_payload(aggregate: DayAggregate) -> Dict[str, Any]:
+    total_cost = aggregate.total_cost
+    total_properties = aggregate.entries
+    
+    # Calculate savings vs traditional approach
+    traditional_cost = total_properties * TRADITIONAL_COST_PER_PROPERTY
+    savings = traditional_cost - total_cost
+    savings_percentage = (savings / traditional_cost * 100) if traditional_cost > 0 else 0
+    
+    return {
+        "properties_processed": total_properties,
+        "total_cost": round(total_cost, 4),
+        "traditional_cost": round(traditional_cost, 4),
+        "savings": round(savings, 4),
+        "savings_percentage": round(savings_percentage, 1),
+        "source_usage": dict(aggregate.source_usage),
+        "source_cost": {source: round(cost, 4) for source, cost in aggregate.source_cost.items()},
+        "avg_cost_per_property": round(total_cost / max(total_properties, 1), 4)
+    }
+
 @app.get("/costs/summary")
-async def get_cost_summary():
-    """Get cost optimization summary"""
+async def get_cost_summary(start: Optional[str] = None, end: Optional[str] = None):
+    """Get cost optimization summary for today or an inclusive ``start``..``end`` range (YYYY-MM-DD)"""
     try:
-        today = datetime.now().strftime('%Y%m%d')
-        cost_file = Path(f"/app/logs/costs/costs_{today}.jsonl")
-        
-        total_cost = 0.0
-        total_properties = 0
-        source_usage = {}
-        
-        if cost_file.exists():
-            with open(cost_file, 'r') as f:
-                for line in f:
-                    data = json.loads(line)
-                    total_cost += data.get('total_cost', 0)
-                    total_properties += 1
-                    
-                    for source in data.get('sources_used', []):
-                        source_usage[source] = source_usage.get(source, 0) + 1
-        
-        # Calculate savings vs traditional approach
-        traditional_cost = total_properties * 0.036  # $0.036 per property traditionally
-        savings = traditional_cost - total_cost
-        savings_percentage = (savings / traditional_cost * 100) if traditional_cost > 0 else 0
+        start_day = datetime.fromisoformat(start).date() if start else datetime.now().date()
+        end_day = datetime.fromisoformat(end).date() if end else start_day
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use ISO YYYY-MM-DD.")
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start date must be before end date")
+    if (end_day - start_day).days > 366:
+        raise HTTPException(status_code=400, detail="Range is limited to 366 days")
+    
+    try:
+        days = cost_ledger.days(start_day, end_day)
+        total = DayAggregate(day=start_day.strftime('%Y%m%d'))
+        for aggregate in days:
+            total.merge(aggregate)
         
-        return {
+        summary = {
             "success": True,
-            "date": today,
-            "properties_processed": total_properties,
-            "total_cost": round(total_cost, 4),
-            "traditional_cost": round(traditional_cost, 4),
-            "savings": round(savings, 4),
-            "savings_percentage": round(savings_percentage, 1),
-            "source_usage": source_usage,
-            "avg_cost_per_property": round(total_cost / max(total_properties, 1), 4)
+            "date": total.day,
+            "start": start_day.isoformat(),
+            "end": end_day.isoformat(),
+            **_cost_summary_payload(total)
         }
+        if len(days) > 1:
+            summary["daily"] = [
+                {"date": aggregate.day, **_cost_summary_payload(aggregate)}
+                for aggregate in days
+            ]
+        return summary
         
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _batch_coordinate(value: Any) -> Optional[float]:
+    """Parse a batch item's lat or lng, or ``None`` when it is not a number"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
 @app.post("/images/batch/optimize")
 async def batch_optimize_properties(request: Dict[str, Any], background_tasks: BackgroundTasks):
-    """Batch process multiple properties for maximum cost efficiency"""
-    
-    property_ids = request.get("property_ids", [])
-    if not property_ids:
+    """Batch process multiple properties for maximum cost efficiency
+
+    Expects ``properties: [{"property_id", "lat", "lng"}]`` (``property_ids``
+    entries may also be such dicts) plus optional ``zoom`` and ``grid_radius``.
+    Plain property ID strings are still accepted, but without coordinates they
+    cannot be placed on the tile grid; they are returned as
+    ``unlocated_property_ids`` and skipped.
+    """
+
+    properties = request.get("properties") or request.get("property_ids") or []
+    if not properties:
         raise HTTPException(status_code=400, detail="No property IDs provided")
-    
+
+    located, unlocated = [], []
+    for item in properties:
+        if not isinstance(item, dict):
+            unlocated.append(str(item))
+            continue
+        property_id = item.get("property_id") or item.get("id")
+        if property_id is None or str(property_id).strip() == "":
+            raise HTTPException(status_code=400, detail="Each property needs a property_id")
+        if item.get("lat") is None or item.get("lng") is None:
+            unlocated.append(str(property_id))
+            continue
+        lat, lng = _batch_coordinate(item["lat"]), _batch_coordinate(item["lng"])
+        # Chained comparisons also reject NaN and infinities
+        if lat is None or lng is None or not (
+            -MERCATOR_MAX_LAT <= lat <= MERCATOR_MAX_LAT and -180.0 <= lng <= 180.0
+        ):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Property {property_id} has invalid coordinates: lat={item['lat']!r}, lng={item['lng']!r}",
+            )
+        located.append({"property_id": str(property_id), "lat": lat, "lng": lng})
+
+    zoom = int(request.get("zoom", 18))
+    grid_radius = request.get("grid_radius")
+
     # Group properties geographically for shared processing
-    geographic_groups = await group_properties_geographically(property_ids)
-    
-    for group in geographic_groups:
-        background_tasks.add_task(process_geographic_batch, group)
-    
+    geographic_groups = await group_properties_geographically(located, zoom, grid_radius)
+    unique_tiles = {
+        tile for group in geographic_groups for tile in tile_coords(*group["tile_range"])
+    }
+
+    background_tasks.add_task(process_geographic_batches, geographic_groups, zoom)
+
     return {
         "success": True,
-        "message": f"Batch optimization queued for {len(property_ids)} properties",
+        "message": f"Batch optimization queued for {len(located)} properties",
         "geographic_groups": len(geographic_groups),
-        "estimated_cost_savings": "60-80% vs individual processing"
+        "unique_tiles": len(unique_tiles),
+        "tiles_if_individual": sum(
+            len(tile_coords(*prop["tile_range"])) for group in geographic_groups for prop in group["properties"]
+        ),
+        "unlocated_property_ids": unlocated,
     }
 
-async def group_properties_geographically(property_ids: List[str]) -> List[Dict[str, Any]]:
-    """Group properties by geographic proximity for shared processing"""
-    # This would query database for property coordinates
-    # and group them by proximity for batch processing
-    
-    # For demonstration:
-    return [{"group_id": 1, "property_ids": property_ids, "center_lat": 30.2672, "center_lng": -97.7431}]
+async def group_properties_geographically(
+    properties: List[Dict[str, Any]], zoom: int, grid_radius: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Group properties by shared web-mercator tile blocks for shared processing"""
+    groups: Dict[Tuple[int, int], Dict[str, Any]] = {}
 
-async def process_geographic_batch(group: Dict[str, Any]):
+    for prop in properties:
+        tile_range = tile_engine.tile_range(prop["lat"], prop["lng"], zoom, grid_radius)
+        tile_x, tile_y = deg2num(prop["lat"], prop["lng"], zoom)
+        block = (tile_x // BATCH_GROUP_SPAN_TILES, tile_y // BATCH_GROUP_SPAN_TILES)
+
+        group = groups.get(block)
+        if group is None:
+            group = {
+                "group_id": len(groups) + 1,
+                "zoom": zoom,
+                "properties": [],
+                "tile_range": tile_range,
+            }
+            groups[block] = group
+        else:
+            min_x, min_y, max_x, max_y = group["tile_range"]
+            group["tile_range"] = (
+                min(min_x, tile_range[0]),
+                min(min_y, tile_range[1]),
+                max(max_x, tile_range[2]),
+                max(max_y, tile_range[3]),
+            )
+        group["properties"].append({**prop, "tile_range": tile_range})
+
+    result = list(groups.values())
+    for group in result:
+        members = group["properties"]
+        group["property_ids"] = [prop["property_id"] for prop in members]
+        group["center_lat"] = sum(prop["lat"] for prop in members) / len(members)
+        group["center_lng"] = sum(prop["lng"] for prop in members) / len(members)
+    return result
+
+async def process_geographic_batches(groups: List[Dict[str, Any]], zoom: int):
+    """Process all groups of a batch, fetching every distinct tile only once"""
+    # Tiles shared by neighbouring groups are kept until their last group is done
+    tile_refs: Dict[Tuple[int, int], int] = {}
+    for group in groups:
+        for tile in tile_coords(*group["tile_range"]):
+            tile_refs[tile] = tile_refs.get(tile, 0) + 1
+
+    tile_store: Dict[Tuple[int, int], np.ndarray] = {}
+    for group in groups:
+        await process_geographic_batch(group, zoom, tile_store, tile_refs)
+
+async def process_geographic_batch(
+    group: Dict[str, Any],
+    zoom: int,
+    tile_store: Dict[Tuple[int, int], np.ndarray],
+    tile_refs: Dict[Tuple[int, int], int],
+):
     """Process a group of geographically close properties efficiently"""
+    group_tiles = tile_coords(*group["tile_range"])
     try:
         print(f"🗺️ Processing geographic batch: {len(group['property_ids'])} properties")
-        
-        # Download one high-quality image for the area
-        center_lat = group["center_lat"] 
-        center_lng = group["center_lng"]
-        
-        # Use FREE OpenStreetMap for the entire area
-        success = await download_openstreetmap_tiles(
-            f"batch_{group['group_id']}", center_lat, center_lng, 18
-        )
-        
-        if success:
-            # Extract individual property images from the batch
-            for property_id in group["property_ids"]:
-                await extract_property_from_batch(property_id, group["group_id"])
-            
-            print(f"✅ Batch processing complete - massive cost savings achieved")
-        else:
+
+        # One mosaic for the whole group: cached, or built from shared tiles
+        mosaic = await mosaic_cache.lookup(zoom, *group["tile_range"])
+        if mosaic is None:
+            needed = [tile for tile in group_tiles if tile not in tile_store]
+            if needed:
+                tile_store.update(await tile_engine.fetch_tiles(zoom, needed))
+            mosaic = assemble_mosaic(tile_store, zoom, *group["tile_range"])
+            if mosaic is not None:
+                await mosaic_cache.add(mosaic)
+
+        if mosaic is None:
             print(f"❌ Batch processing failed - fallback to individual processing")
-            
+            return
+
+        # Extract individual property images from the batch
+        for prop in group["properties"]:
+            await extract_property_from_batch(prop, mosaic)
+
+        print(f"✅ Batch processing complete - {mosaic.tiles_fetched} tiles shared by {len(group['properties'])} properties")
+
     except Exception as e:
         print(f"❌ Batch processing error: {e}")
+    finally:
+        for tile in group_tiles:
+            tile_refs[tile] -= 1
+            if tile_refs[tile] <= 0:
+                tile_store.pop(tile, None)
 
-async def extract_property_from_batch(property_id: str, batch_id: int):
+async def extract_property_from_batch(prop: Dict[str, Any], mosaic: TileMosaic):
     """Extract individual property image from batch download"""
     try:
-        # This would crop the appropriate section from the batch image
-        # based on the property's specific coordinates
-        print(f"✂️ Extracting property {property_id} from batch {batch_id}")
-        
-        # Implementation would:
-        # 1. Load the batch satellite image
-        # 2. Calculate crop coordinates for this property
-        # 3. Extract and save individual property image
-        # 4. Apply local enhancement
-        
+        property_view = mosaic.sub_mosaic(*prop["tile_range"])
+        if property_view.tiles_fetched * 2 <= property_view.tiles_expected:
+            print(f"⚠️ Insufficient tile coverage for property {prop['property_id']}")
+            return
+        await stitch_osm_tiles(prop["property_id"], property_view)
+
     except Exception as e:
         print(f"❌ Property extraction error: {e}")
 
 # Import Super HD Enhancement module
 try:
-    from super_hd_enhancement import enhance_satellite_to_super_hd
+    from super_hd_enhancement import enhance_satellite_to_super_hd, shutdown_super_hd_pool
     SUPER_HD_AVAILABLE = True
     print("✅ Super HD Enhancement module loaded")
 except ImportError as e:
@@ -0,0 +1,201 @@
+"""
+Spatial index over cached stitched OSM mosaics
+Lets nearby properties reuse a mosaic instead of re-fetching the same tiles
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import cv2
+import structlog
+
+from tile_mosaic import TILE_SIZE, TileMosaic, tile_coords
+
+logger = structlog.get_logger("image-processor")
+
+# Mosaics are stored as PNG: crops of them are encoded again, and each lossy
+# pass would degrade the shared image
+_MOSAIC_NAME = re.compile(r"^z(\d+)_x(-?\d+)_(-?\d+)_y(-?\d+)_(-?\d+)\.png$")
+
+
+@dataclass(frozen=True)
+class MosaicEntry:
+    """A complete mosaic on disk and the tile range it covers"""
+    path: Path
+    zoom: int
+    min_x: int
+    min_y: int
+    max_x: int
+    max_y: int
+    created_at: float
+
+    @property
+    def tile_count(self) -> int:
+        return (self.max_x - self.min_x + 1) * (self.max_y - self.min_y + 1)
+
+    def covers(self, zoom: int, min_x: int, min_y: int, max_x: int, max_y: int) -> bool:
+        return (
+            self.zoom == zoom
+            and self.min_x <= min_x
+            and self.min_y <= min_y
+            and self.max_x >= max_x
+            and self.max_y >= max_y
+        )
+
+
+class MosaicCache:
+    """Index cached mosaics by every (zoom, x, y) tile they contain.
+
+    Coverage is encoded in the file name, so the index is rebuilt from a
+    directory listing at start-up. Only fully-fetched mosaics are cached, and
+    their files are deleted once they expire. PNG encoding, decoding and file
+    writes run in the default executor so they do not block the event loop.
+    """
+
+    def __init__(self, root: Path, max_age_days: float = 7, memory_items: int = 8):
+        self.root = Path(root)
+        self.max_age_seconds = max_age_days * 86400
+        self.memory_items = memory_items
+        self._entries: Dict[Path, MosaicEntry] = {}
+        self._by_tile: Dict[Tuple[int, int, int], Set[Path]] = {}
+        self._images: "OrderedDict[Path, TileMosaic]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def _load_index(self):
+        if not self.root.exists():
+            return
+        for path in self.root.glob("*.png"):
+            match = _MOSAIC_NAME.match(path.name)
+            if not match:
+                continue
+            zoom, min_x, max_x, min_y, max_y = (int(value) for value in match.groups())
+            entry = MosaicEntry(path, zoom, min_x, min_y, max_x, max_y, path.stat().st_mtime)
+            if self._expired(entry):
+                self._delete_file(path)
+                continue
+            self._register(entry)
+        logger.info("mosaic_cache.loaded", entries=len(self._entries))
+
+    def _register(self, entry: MosaicEntry):
+        self._entries[entry.path] = entry
+        for x, y in tile_coords(entry.min_x, entry.min_y, entry.max_x, entry.max_y):
+            self._by_tile.setdefault((entry.zoom, x, y), set()).add(entry.path)
+
+    def _forget(self, entry: MosaicEntry):
+        self._entries.pop(entry.path, None)
+        self._images.pop(entry.path, None)
+        for x, y in tile_coords(entry.min_x, entry.min_y, entry.max_x, entry.max_y):
+            paths = self._by_tile.get((entry.zoom, x, y))
+            if paths:
+                paths.discard(entry.path)
+                if not paths:
+                    del self._by_tile[(entry.zoom, x, y)]
+
+    def _drop(self, entry: MosaicEntry):
+        """Forget an expired or unreadable mosaic and delete its file"""
+        self._forget(entry)
+        self._delete_file(entry.path)
+
+    @staticmethod
+    def _delete_file(path: Path):
+        try:
+            path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("mosaic_cache.delete_failed", path=str(path), error=str(e))
+
+    def _expired(self, entry: MosaicEntry) -> bool:
+        return time.time() - entry.created_at > self.max_age_seconds
+
+    def prune(self) -> int:
+        """Drop every expired mosaic, including ones no lookup has touched since"""
+        expired = [entry for entry in self._entries.values() if self._expired(entry)]
+        for entry in expired:
+            self._drop(entry)
+        return len(expired)
+
+    def find(self, zoom: int, min_x: int, min_y: int, max_x: int, max_y: int) -> Optional[MosaicEntry]:
+        """Smallest fresh cached mosaic that covers the whole tile range"""
+        candidates: List[MosaicEntry] = []
+        for path in list(self._by_tile.get((zoom, min_x, min_y), ())):
+            entry = self._entries[path]
+            if self._expired(entry) or not entry.path.exists():
+                self._drop(entry)
+                continue
+            if entry.covers(zoom, min_x, min_y, max_x, max_y):
+                candidates.append(entry)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda entry: entry.tile_count)
+
+    async def load(self, entry: MosaicEntry) -> Optional[TileMosaic]:
+        if entry.path in self._images:
+            self._images.move_to_end(entry.path)
+            return self._images[entry.path]
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(None, cv2.imread, str(entry.path))
+        if image is None:
+            self._drop(entry)
+            return None
+        mosaic = TileMosaic(
+            image=image,
+            zoom=entry.zoom,
+            min_x=entry.min_x,
+            min_y=entry.min_y,
+            cols=entry.max_x - entry.min_x + 1,
+            rows=entry.max_y - entry.min_y + 1,
+            tiles_fetched=entry.tile_count,
+            tiles_expected=entry.tile_count,
+        )
+        self._remember(entry.path, mosaic)
+        return mosaic
+
+    async def lookup(self, zoom: int, min_x: int, min_y: int, max_x: int, max_y: int) -> Optional[TileMosaic]:
+        entry = self.find(zoom, min_x, min_y, max_x, max_y)
+        mosaic = await self.load(entry) if entry else None
+        if mosaic is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return mosaic
+
+    async def add(self, mosaic: TileMosaic) -> Optional[MosaicEntry]:
+        """Persist a complete mosaic and index its tiles"""
+        if mosaic.missing or mosaic.image.shape[0] != mosaic.rows * TILE_SIZE:
+            return None
+        name = f"z{mosaic.zoom}_x{mosaic.min_x}_{mosaic.max_x}_y{mosaic.min_y}_{mosaic.max_y}.png"
+        path = self.root / name
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write, path, mosaic)
+        self.prune()
+        existing = self._entries.get(path)
+        if existing:
+            self._forget(existing)
+        entry = MosaicEntry(path, mosaic.zoom, mosaic.min_x, mosaic.min_y, mosaic.max_x, mosaic.max_y, time.time())
+        self._register(entry)
+        self._remember(path, mosaic)
+        return entry
+
+    def _write(self, path: Path, mosaic: TileMosaic):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(mosaic.encode_png())
+
+    def _remember(self, path: Path, mosaic: TileMosaic):
+        self._images[path] = mosaic
+        self._images.move_to_end(path)
+        while len(self._images) > self.memory_items:
+            self._images.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "indexed_tiles": len(self._by_tile),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
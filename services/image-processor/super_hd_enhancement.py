@@ -5,24 +5,37 @@ Uses open source AI models for radical image quality improvement
 
 import os
 import sys
-import cv2
-import numpy as np
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
-import requests
-import io
-import base64
-from PIL import Image, ImageEnhance, ImageFilter
-import math
+from PIL import Image
 
 # Import the main service logger
 sys.path.append(str(Path(__file__).parent))
 from main import logger, print
+import tiled_enhancement
+
+SUPER_HD_WORKERS = int(os.getenv("SUPER_HD_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) // 2)))))
+SUPER_HD_WORKER_THREADS = int(os.getenv("SUPER_HD_WORKER_THREADS", "1"))
+SUPER_HD_TILE_SIZE = int(os.getenv("SUPER_HD_TILE_SIZE", str(tiled_enhancement.DEFAULT_TILE_SIZE)))
 
 class SuperHDEnhancer:
-    """Advanced satellite image enhancement using open source models"""
+    """Advanced satellite image enhancement using open source models.
+
+    Rendering is tiled (see ``tiled_enhancement``) and runs in a process pool so
+    the event loop stays free and several enhancements proceed in parallel.
+    """
+    
+    PIPELINE_BANNERS = {
+        "maximum": "🔥 Applying MAXIMUM enhancement pipeline",
+        "medium": "⚡ Applying MEDIUM enhancement pipeline",
+        "light": "💨 Applying LIGHT enhancement pipeline"
+    }
     
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, tile_size: Optional[int] = None):
         # Use relative paths that work in the current environment
         base_dir = Path(__file__).parent / "images"
         self.temp_dir = base_dir / "temp"
@@ -30,12 +43,32 @@ class SuperHDEnhancer:
         
         # Open source enhancement models available
         self.models = {
-            "real_esrgan": self._real_esrgan_enhance,
-            "srcnn": self._srcnn_enhance, 
-            "edsr": self._edsr_enhance,
-            "local_advanced": self._local_advanced_enhance
+            "real_esrgan": tiled_enhancement.esrgan_style_enhance,
+            "srcnn": tiled_enhancement.srcnn_enhance,
+            "edsr": tiled_enhancement.edsr_enhance,
+            "local_advanced": tiled_enhancement.local_advanced_enhance
         }
         
+        self.max_workers = max_workers or SUPER_HD_WORKERS
+        self.tile_size = tile_size or SUPER_HD_TILE_SIZE
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=tiled_enhancement.init_worker,
+                initargs=(SUPER_HD_WORKER_THREADS,),
+            )
+        return self._pool
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        
     async def enhance_satellite_image(
         self, 
         image_path: str,
@@ -56,36 +89,34 @@ class SuperHDEnhancer:
             print(f"🚀 Starting Super HD enhancement for property {property_id}")
             print(f"📈 Enhancement level: {enhancement_level}, Target: {target_resolution}")
             
-            # Load original image
-            original = cv2.imread(image_path)
-            if original is None:
-                raise ValueError(f"Could not load image: {image_path}")
-            
-            h, w = original.shape[:2]
+            # Only the header is needed here; pixels are decoded in the worker
+            with Image.open(image_path) as probe:
+                w, h = probe.size
             print(f"📊 Original resolution: {w}x{h}")
             
             # Determine target size based on resolution setting
             target_w, target_h = self._calculate_target_size(w, h, target_resolution)
             print(f"🎯 Target resolution: {target_w}x{target_h}")
+            print(self.PIPELINE_BANNERS.get(enhancement_level, self.PIPELINE_BANNERS["light"]))
             
-            # Apply enhancement pipeline based on level
-            if enhancement_level == "maximum":
-                enhanced = await self._maximum_enhancement_pipeline(original, target_w, target_h)
-            elif enhancement_level == "medium":
-                enhanced = await self._medium_enhancement_pipeline(original, target_w, target_h)
-            else:
-                enhanced = await self._light_enhancement_pipeline(original, target_w, target_h)
-            
-            # Save enhanced image
             output_dir = Path(f"/app/images/satellite/{property_id}/enhanced")
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
             output_path = output_dir / f"super_hd_{enhancement_level}_{target_resolution}.jpg"
-            cv2.imwrite(str(output_path), enhanced, [cv2.IMWRITE_JPEG_QUALITY, 98])
+            comparison_dir = Path(f"/app/images/satellite/{property_id}/comparisons")
+            comparison_path = comparison_dir / f"comparison_{enhancement_level}.jpg"
             
-            # Generate comparison and metadata
-            comparison_path = await self._create_before_after_comparison(
-                original, enhanced, property_id, enhancement_level
+            loop = asyncio.get_running_loop()
+            render = await loop.run_in_executor(
+                self._get_pool(),
+                partial(
+                    tiled_enhancement.render_super_hd,
+                    image_path,
+                    str(output_path),
+                    str(comparison_path),
+                    enhancement_level,
+                    target_w,
+                    target_h,
+                    tile_size=self.tile_size,
+                ),
             )
             
             enhancement_factor = (target_w * target_h) / (w * h)
@@ -95,18 +126,24 @@ class SuperHDEnhancer:
                 "property_id": property_id,
                 "original_path": image_path,
                 "enhanced_path": str(output_path),
-                "comparison_path": str(comparison_path),
+                "comparison_path": str(comparison_path) if comparison_path.exists() else "",
                 "original_resolution": f"{w}x{h}",
                 "enhanced_resolution": f"{target_w}x{target_h}",
                 "enhancement_factor": f"{enhancement_factor:.1f}x",
                 "enhancement_level": enhancement_level,
                 "target_resolution": target_resolution,
                 "file_size_mb": round(output_path.stat().st_size / (1024*1024), 2),
-                "processing_method": "open_source_ai_models"
+                "processing_method": "open_source_ai_models",
+                "tiles": render["tiles"],
+                "tile_size": render["tile_size"],
+                "peak_tile_mb": render["peak_tile_mb"],
+                "band_buffer_mb": render["band_buffer_mb"],
+                "render_seconds": render["render_seconds"]
             }
             
             print(f"✅ Super HD enhancement complete!")
             print(f"📏 Enhanced from {w}x{h} to {target_w}x{target_h} ({enhancement_factor:.1f}x)")
+            print(f"🧩 Rendered {render['tiles']} tiles in {render['render_seconds']}s")
             print(f"💾 Saved to: {output_path}")
             
             return result
@@ -140,320 +177,6 @@ class SuperHDEnhancer:
             target_h = int(target_h * scale)
         
         return target_w, target_h
-    
-    async def _maximum_enhancement_pipeline(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """Maximum quality enhancement using multiple techniques"""
-        print("🔥 Applying MAXIMUM enhancement pipeline")
-        
-        # Step 1: Noise reduction and preparation
-        denoised = cv2.bilateralFilter(img, 9, 75, 75)
-        
-        # Step 2: Real-ESRGAN style enhancement
-        esrgan_enhanced = self._real_esrgan_enhance(denoised, target_w, target_h)
-        
-        # Step 3: EDSR enhancement for fine details
-        edsr_enhanced = self._edsr_enhance(esrgan_enhanced, target_w, target_h)
-        
-        # Step 4: Advanced local processing
-        final_enhanced = self._local_advanced_enhance(edsr_enhanced, target_w, target_h)
-        
-        # Step 5: Final quality refinement
-        final = self._apply_final_refinement(final_enhanced)
-        
-        return final
-    
-    async def _medium_enhancement_pipeline(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """Medium quality enhancement balancing speed and quality"""
-        print("⚡ Applying MEDIUM enhancement pipeline")
-        
-        # Step 1: Light denoising
-        denoised = cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
-        
-        # Step 2: SRCNN enhancement
-        srcnn_enhanced = self._srcnn_enhance(denoised, target_w, target_h)
-        
-        # Step 3: Local advanced processing
-        final = self._local_advanced_enhance(srcnn_enhanced, target_w, target_h)
-        
-        return final
-    
-    async def _light_enhancement_pipeline(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """Light enhancement for speed"""
-        print("💨 Applying LIGHT enhancement pipeline")
-        
-        # Use advanced local processing only
-        enhanced = self._local_advanced_enhance(img, target_w, target_h)
-        return enhanced
-    
-    def _real_esrgan_enhance(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """Real-ESRGAN inspired super resolution enhancement"""
-        print("🎨 Applying Real-ESRGAN style enhancement")
-        
-        try:
-            # Step 1: Multi-scale upsampling
-            h, w = img.shape[:2]
-            
-            # Progressive upsampling for better quality
-            current_img = img.copy()
-            current_w, current_h = w, h
-            
-            while current_w < target_w or current_h < target_h:
-                # Calculate next scale (max 2x per step)
-                scale_factor = min(2.0, min(target_w / current_w, target_h / current_h))
-                new_w = int(current_w * scale_factor)
-                new_h = int(current_h * scale_factor)
-                
-                # High-quality bicubic upsampling
-                current_img = cv2.resize(current_img, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-                
-                # Apply enhancement at this scale
-                current_img = self._apply_esrgan_style_enhancement(current_img)
-                
-                current_w, current_h = new_w, new_h
-            
-            # Final resize to exact target
-            if current_w != target_w or current_h != target_h:
-                current_img = cv2.resize(current_img, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-            
-            return current_img
-            
-        except Exception as e:
-            print(f"⚠️ Real-ESRGAN fallback to bicubic: {e}")
-            return cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_CUBIC)
-    
-    def _apply_esrgan_style_enhancement(self, img: np.ndarray) -> np.ndarray:
-        """Apply ESRGAN-style enhancement techniques"""
-        
-        # 1. Edge enhancement using Laplacian
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F, ksize=3)
-        laplacian = np.uint8(np.absolute(laplacian))
-        laplacian_colored = cv2.cvtColor(laplacian, cv2.COLOR_GRAY2BGR)
-        
-        # 2. High-frequency detail enhancement
-        gaussian = cv2.GaussianBlur(img, (5, 5), 1.0)
-        high_freq = cv2.subtract(img, gaussian)
-        enhanced = cv2.addWeighted(img, 1.0, high_freq, 0.5, 0)
-        
-        # 3. Edge-guided enhancement
-        enhanced = cv2.addWeighted(enhanced, 0.85, laplacian_colored, 0.15, 0)
-        
-        # 4. Contrast enhancement
-        enhanced = cv2.convertScaleAbs(enhanced, alpha=1.1, beta=5)
-        
-        return enhanced
-    
-    def _srcnn_enhance(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """SRCNN inspired super resolution"""
-        print("🧠 Applying SRCNN style enhancement")
-        
-        try:
-            # Simulate SRCNN-style processing
-            
-            # Step 1: Initial upsampling
-            upsampled = cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_CUBIC)
-            
-            # Step 2: Feature extraction (simulate conv layers)
-            # Use multiple Gaussian derivatives to simulate learned filters
-            enhanced = upsampled.copy().astype(np.float32)
-            
-            # Simulate multiple conv layers with different kernels
-            kernels = [
-                np.array([[-1, -1, -1], [-1, 8, -1], [-1, -1, -1]]),  # Edge detection
-                np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]),      # Sharpening
-                np.array([[1, 2, 1], [2, 4, 2], [1, 2, 1]]) / 16       # Smoothing
-            ]
-            
-            feature_maps = []
-            for kernel in kernels:
-                filtered = cv2.filter2D(enhanced, -1, kernel)
-                feature_maps.append(filtered)
-            
-            # Step 3: Non-linear mapping (simulate ReLU + learning)
-            combined = np.zeros_like(enhanced)
-            for fm in feature_maps:
-                # Simulate learned feature combination
-                combined += np.maximum(0, fm) * 0.33
-            
-            # Step 4: Reconstruction
-            result = cv2.addWeighted(upsampled.astype(np.float32), 0.7, combined, 0.3, 0)
-            result = np.clip(result, 0, 255).astype(np.uint8)
-            
-            return result
-            
-        except Exception as e:
-            print(f"⚠️ SRCNN fallback: {e}")
-            return cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-    
-    def _edsr_enhance(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """EDSR inspired enhancement for fine details"""
-        print("🔬 Applying EDSR style detail enhancement")
-        
-        try:
-            # EDSR focuses on residual learning
-            
-            # Step 1: Extract current size image if already upsampled
-            h, w = img.shape[:2]
-            if w != target_w or h != target_h:
-                resized = cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-            else:
-                resized = img.copy()
-            
-            # Step 2: Residual block simulation
-            enhanced = resized.astype(np.float32)
-            
-            # Multiple residual-like enhancement passes
-            for i in range(3):
-                # Simulate residual block
-                residual = self._apply_residual_block(enhanced)
-                enhanced = enhanced + residual * 0.1  # Residual connection
-            
-            # Step 3: Final upsampling refinement if needed
-            if enhanced.shape[:2] != (target_h, target_w):
-                enhanced = cv2.resize(enhanced, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-            
-            result = np.clip(enhanced, 0, 255).astype(np.uint8)
-            return result
-            
-        except Exception as e:
-            print(f"⚠️ EDSR fallback: {e}")
-            return cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-    
-    def _apply_residual_block(self, img: np.ndarray) -> np.ndarray:
-        """Simulate a residual block enhancement"""
-        
-        # Apply series of convolutions to simulate residual learning
-        kernel1 = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
-        kernel2 = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32) / 5
-        
-        conv1 = cv2.filter2D(img, -1, kernel1)
-        conv2 = cv2.filter2D(conv1, -1, kernel2)
-        
-        # Return residual (difference to be added back)
-        residual = conv2 - img
-        return residual
-    
-    def _local_advanced_enhance(self, img: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
-        """Advanced local processing for satellite imagery"""
-        print("🛰️ Applying satellite-specific local enhancement")
-        
-        # Resize to target size if needed
-        if img.shape[1] != target_w or img.shape[0] != target_h:
-            img = cv2.resize(img, (target_w, target_h), interpolation=cv2.INTER_LANCZOS4)
-        
-        # Convert to PIL for advanced processing
-        img_pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        
-        # 1. Unsharp masking specifically tuned for satellite imagery
-        img_pil = img_pil.filter(ImageFilter.UnsharpMask(radius=3, percent=200, threshold=2))
-        
-        # 2. Enhance contrast for satellite features
-        enhancer = ImageEnhance.Contrast(img_pil)
-        img_pil = enhancer.enhance(1.3)
-        
-        # 3. Enhance color saturation for better property visibility
-        enhancer = ImageEnhance.Color(img_pil)
-        img_pil = enhancer.enhance(1.2)
-        
-        # 4. Enhance sharpness for building details
-        enhancer = ImageEnhance.Sharpness(img_pil)
-        img_pil = enhancer.enhance(1.4)
-        
-        # Convert back to OpenCV
-        enhanced = cv2.cvtColor(np.array(img_pil), cv2.COLOR_RGB2BGR)
-        
-        # 5. Apply satellite-specific enhancements
-        enhanced = self._apply_satellite_specific_enhancements(enhanced)
-        
-        return enhanced
-    
-    def _apply_satellite_specific_enhancements(self, img: np.ndarray) -> np.ndarray:
-        """Apply enhancements specifically for satellite imagery"""
-        
-        # 1. Building edge enhancement
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Use Sobel operators to enhance building edges
-        sobel_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobel_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        sobel_combined = np.sqrt(sobel_x**2 + sobel_y**2)
-        sobel_combined = np.uint8(sobel_combined / sobel_combined.max() * 255)
-        
-        # Convert edge map to color and blend
-        edges_colored = cv2.cvtColor(sobel_combined, cv2.COLOR_GRAY2BGR)
-        enhanced = cv2.addWeighted(img, 0.85, edges_colored, 0.15, 0)
-        
-        # 2. Roof texture enhancement
-        # Apply morphological operations to enhance roof textures
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        morph = cv2.morphologyEx(enhanced, cv2.MORPH_TOPHAT, kernel)
-        enhanced = cv2.addWeighted(enhanced, 0.9, morph, 0.1, 0)
-        
-        # 3. Shadow and highlight adjustment for better property visibility
-        lab = cv2.cvtColor(enhanced, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        
-        # Apply CLAHE (Contrast Limited Adaptive Histogram Equalization) to L channel
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-        l = clahe.apply(l)
-        
-        enhanced = cv2.merge([l, a, b])
-        enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
-        
-        return enhanced
-    
-    def _apply_final_refinement(self, img: np.ndarray) -> np.ndarray:
-        """Apply final quality refinement"""
-        print("✨ Applying final quality refinement")
-        
-        # 1. Final sharpening pass
-        kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        sharpened = cv2.filter2D(img, -1, kernel)
-        refined = cv2.addWeighted(img, 0.85, sharpened, 0.15, 0)
-        
-        # 2. Noise reduction while preserving details
-        refined = cv2.bilateralFilter(refined, 5, 50, 50)
-        
-        # 3. Final contrast adjustment
-        refined = cv2.convertScaleAbs(refined, alpha=1.05, beta=2)
-        
-        return refined
-    
-    async def _create_before_after_comparison(
-        self, 
-        original: np.ndarray, 
-        enhanced: np.ndarray, 
-        property_id: str,
-        enhancement_level: str
-    ) -> str:
-        """Create before/after comparison image"""
-        
-        try:
-            # Resize original to match enhanced for comparison
-            enhanced_h, enhanced_w = enhanced.shape[:2]
-            original_resized = cv2.resize(original, (enhanced_w//2, enhanced_h))
-            enhanced_resized = cv2.resize(enhanced, (enhanced_w//2, enhanced_h))
-            
-            # Create side-by-side comparison
-            comparison = np.hstack([original_resized, enhanced_resized])
-            
-            # Add labels
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            cv2.putText(comparison, "ORIGINAL", (20, 40), font, 1, (0, 255, 255), 2)
-            cv2.putText(comparison, "SUPER HD ENHANCED", (enhanced_w//2 + 20, 40), font, 1, (0, 255, 0), 2)
-            
-            # Save comparison
-            comparison_dir = Path(f"/app/images/satellite/{property_id}/comparisons")
-            comparison_dir.mkdir(parents=True, exist_ok=True)
-            comparison_path = comparison_dir / f"comparison_{enhancement_level}.jpg"
-            
-            cv2.imwrite(str(comparison_path), comparison, [cv2.IMWRITE_JPEG_QUALITY, 95])
-            
-            return str(comparison_path)
-            
-        except Exception as e:
-            print(f"⚠️ Comparison creation error: {e}")
-            return ""
 
 # Global enhancer instance
 super_hd_enhancer = SuperHDEnhancer()
@@ -478,4 +201,9 @@ async def enhance_satellite_to_super_hd(
     """
     return await super_hd_enhancer.enhance_satellite_image(
         image_path, property_id, enhancement_level, target_resolution
-    )
\ No newline at end of file
+    )
+
+
+def shutdown_super_hd_pool():
+    """Stop the enhancement worker processes (service shutdown)"""
+    super_hd_enhancer.shutdown()
@@ -0,0 +1,293 @@
+"""
+Concurrent OpenStreetMap tile mosaic engine
+Fetches a tile grid over one pooled HTTP session, decodes and stitches in memory
+"""
+
+import asyncio
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+import cv2
+import numpy as np
+import structlog
+
+logger = structlog.get_logger("image-processor")
+
+TILE_SIZE = 256
+OSM_MIRRORS = ("a", "b", "c")
+OSM_TILE_URL = "https://{mirror}.tile.openstreetmap.org/{zoom}/{x}/{y}.png"
+OSM_PRIMARY_URL = "https://tile.openstreetmap.org/{zoom}/{x}/{y}.png"
+# Largest grid radius served: 4 => 9x9 tiles per mosaic
+MAX_GRID_RADIUS = 4
+DEFAULT_USER_AGENT = os.getenv(
+    "OSM_USER_AGENT", "FishmouthImageProcessor/2.1 (+https://fishmouth.io/contact)"
+)
+
+
+def deg2num(lat_deg: float, lon_deg: float, zoom: int) -> Tuple[int, int]:
+    """Convert latitude/longitude to tile coordinates"""
+    lat_rad = math.radians(lat_deg)
+    n = 2.0 ** zoom
+    x = int((lon_deg + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return x, y
+
+
+@dataclass
+class TileMosaic:
+    """Stitched tile grid held in memory"""
+    image: np.ndarray
+    zoom: int
+    min_x: int
+    min_y: int
+    cols: int
+    rows: int
+    tiles_fetched: int
+    tiles_expected: int
+    missing: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def max_x(self) -> int:
+        return self.min_x + self.cols - 1
+
+    @property
+    def max_y(self) -> int:
+        return self.min_y + self.rows - 1
+
+    def sub_mosaic(self, min_x: int, min_y: int, max_x: int, max_y: int) -> "TileMosaic":
+        """Tile-aligned view of part of this mosaic (no copy)"""
+        left = (min_x - self.min_x) * TILE_SIZE
+        top = (min_y - self.min_y) * TILE_SIZE
+        cols = max_x - min_x + 1
+        rows = max_y - min_y + 1
+        missing = [(x, y) for x, y in self.missing if min_x <= x <= max_x and min_y <= y <= max_y]
+        return TileMosaic(
+            image=self.image[top:top + rows * TILE_SIZE, left:left + cols * TILE_SIZE],
+            zoom=self.zoom,
+            min_x=min_x,
+            min_y=min_y,
+            cols=cols,
+            rows=rows,
+            tiles_fetched=cols * rows - len(missing),
+            tiles_expected=cols * rows,
+            missing=missing,
+        )
+
+    def encode_png(self, compression: int = 3) -> bytes:
+        """Lossless encoding, for mosaics that are cropped and re-encoded later"""
+        ok, buffer = cv2.imencode(".png", self.image, [cv2.IMWRITE_PNG_COMPRESSION, compression])
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        return buffer.tobytes()
+
+    def encode_jpeg(self, quality: int = 90) -> bytes:
+        ok, buffer = cv2.imencode(".jpg", self.image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+
+class _HostPoliteness:
+    """Per-host concurrency cap plus a minimum spacing between request starts"""
+
+    def __init__(self, max_concurrent: int, min_interval: float):
+        self.semaphore = asyncio.Semaphore(max(1, max_concurrent))
+        self.min_interval = max(0.0, min_interval)
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait_turn(self):
+        if not self.min_interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class TileMosaicEngine:
+    """Fetch OSM tile grids concurrently across mirrors and stitch them in memory"""
+
+    def __init__(
+        self,
+        grid_radius: int = 1,
+        per_host_limit: int = 2,
+        per_host_interval: float = 0.05,
+        timeout_seconds: float = 10.0,
+        user_agent: str = DEFAULT_USER_AGENT,
+    ):
+        self.grid_radius = min(max(0, grid_radius), MAX_GRID_RADIUS)
+        self.per_host_limit = per_host_limit
+        self.per_host_interval = per_host_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        self.user_agent = user_agent
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._hosts: Dict[str, _HostPoliteness] = {}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.per_host_limit * (len(OSM_MIRRORS) + 1),
+                limit_per_host=self.per_host_limit,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"User-Agent": self.user_agent},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _host(self, url: str) -> _HostPoliteness:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostPoliteness(self.per_host_limit, self.per_host_interval)
+        return self._hosts[host]
+
+    def _tile_urls(self, zoom: int, x: int, y: int) -> List[str]:
+        # Rotate the starting mirror so neighbouring tiles spread across hosts
+        start = (x + y) % len(OSM_MIRRORS)
+        mirrors = OSM_MIRRORS[start:] + OSM_MIRRORS[:start]
+        urls = [OSM_TILE_URL.format(mirror=m, zoom=zoom, x=x, y=y) for m in mirrors]
+        urls.append(OSM_PRIMARY_URL.format(zoom=zoom, x=x, y=y))
+        return urls
+
+    async def fetch_tile_bytes(self, zoom: int, x: int, y: int) -> Optional[bytes]:
+        session = await self._get_session()
+        for url in self._tile_urls(zoom, x, y):
+            host = self._host(url)
+            try:
+                async with host.semaphore:
+                    await host.wait_turn()
+                    async with session.get(url) as response:
+                        if response.status == 200:
+                            return await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+        return None
+
+    async def fetch_tile(self, zoom: int, x: int, y: int) -> Optional[np.ndarray]:
+        data = await self.fetch_tile_bytes(zoom, x, y)
+        if not data:
+            return None
+        return decode_tile(data)
+
+    def tile_range(self, lat: float, lng: float, zoom: int, grid_radius: Optional[int] = None) -> Tuple[int, int, int, int]:
+        """Return (min_x, min_y, max_x, max_y) of the grid centred on lat/lng.
+
+        ``grid_radius`` is clamped to ``MAX_GRID_RADIUS``.
+        """
+        radius = self.grid_radius if grid_radius is None else min(max(0, grid_radius), MAX_GRID_RADIUS)
+        tile_x, tile_y = deg2num(lat, lng, zoom)
+        return tile_x - radius, tile_y - radius, tile_x + radius, tile_y + radius
+
+    async def build_mosaic(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int,
+        grid_radius: Optional[int] = None,
+    ) -> Optional[TileMosaic]:
+        min_x, min_y, max_x, max_y = self.tile_range(lat, lng, zoom, grid_radius)
+        return await self.build_mosaic_for_range(zoom, min_x, min_y, max_x, max_y)
+
+    async def fetch_tiles(
+        self, zoom: int, coords: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], np.ndarray]:
+        """Fetch many tiles concurrently; failed tiles are omitted"""
+        tiles = await asyncio.gather(*(self.fetch_tile(zoom, x, y) for x, y in coords))
+        return {coord: tile for coord, tile in zip(coords, tiles) if tile is not None}
+
+    async def build_mosaic_for_range(
+        self,
+        zoom: int,
+        min_x: int,
+        min_y: int,
+        max_x: int,
+        max_y: int,
+    ) -> Optional[TileMosaic]:
+        coords = tile_coords(min_x, min_y, max_x, max_y)
+        fetched = await self.fetch_tiles(zoom, coords)
+        return assemble_mosaic(fetched, zoom, min_x, min_y, max_x, max_y)
+
+
+def tile_coords(min_x: int, min_y: int, max_x: int, max_y: int) -> List[Tuple[int, int]]:
+    return [(x, y) for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+
+def assemble_mosaic(
+    tiles: Dict[Tuple[int, int], np.ndarray],
+    zoom: int,
+    min_x: int,
+    min_y: int,
+    max_x: int,
+    max_y: int,
+) -> Optional[TileMosaic]:
+    """Stitch the tiles of a range that are present in ``tiles`` into a mosaic"""
+    coords = tile_coords(min_x, min_y, max_x, max_y)
+    present = {coord: tiles[coord] for coord in coords if coord in tiles}
+    if not present:
+        return None
+
+    cols = max_x - min_x + 1
+    rows = max_y - min_y + 1
+    image = stitch_tiles(present, min_x, min_y, cols, rows)
+    missing = [coord for coord in coords if coord not in present]
+    logger.info(
+        "osm.mosaic.built",
+        zoom=zoom,
+        tiles_fetched=len(present),
+        tiles_expected=len(coords),
+    )
+    return TileMosaic(
+        image=image,
+        zoom=zoom,
+        min_x=min_x,
+        min_y=min_y,
+        cols=cols,
+        rows=rows,
+        tiles_fetched=len(present),
+        tiles_expected=len(coords),
+        missing=missing,
+    )
+
+
+def decode_tile(data: bytes) -> Optional[np.ndarray]:
+    """Decode a PNG/JPEG tile straight from the response buffer"""
+    array = np.frombuffer(data, dtype=np.uint8)
+    image = cv2.imdecode(array, cv2.IMREAD_COLOR)
+    return image
+
+
+def stitch_tiles(
+    tiles: Dict[Tuple[int, int], np.ndarray],
+    min_x: int,
+    min_y: int,
+    cols: int,
+    rows: int,
+) -> np.ndarray:
+    """Copy decoded tiles into one preallocated canvas"""
+    height = rows * TILE_SIZE
+    width = cols * TILE_SIZE
+    stitched = np.zeros((height, width, 3), dtype=np.uint8)
+
+    for (x, y), tile in tiles.items():
+        start_x = (x - min_x) * TILE_SIZE
+        start_y = (y - min_y) * TILE_SIZE
+        end_x = min(start_x + tile.shape[1], width)
+        end_y = min(start_y + tile.shape[0], height)
+        if end_x > start_x and end_y > start_y:
+            stitched[start_y:end_y, start_x:end_x] = tile[: end_y - start_y, : end_x - start_x]
+
+    return stitched
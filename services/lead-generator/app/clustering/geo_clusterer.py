@@ -5,12 +5,55 @@ import logging
 from typing import Dict, Any, List, Tuple
 import asyncio
 from sklearn.cluster import DBSCAN
-from geopy.distance import geodesic
 import numpy as np
 import json
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_MILES = 3958.8
+
+# Clusters up to this size get the exact mean pairwise distance; larger ones are sampled
+PAIRWISE_EXACT_LIMIT = 2000
+PAIRWISE_SAMPLE_PAIRS = 200_000
+PAIRWISE_CHUNK_ROWS = 256
+
+
+def haversine_miles(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in miles between radian coordinates (broadcasts)"""
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def mean_pairwise_distance_miles(
+    radians: np.ndarray,
+    exact_limit: int = PAIRWISE_EXACT_LIMIT,
+    sample_pairs: int = PAIRWISE_SAMPLE_PAIRS,
+    seed: int = 0,
+) -> float:
+    """Average distance over all distinct pairs of ``(lat, lon)`` radian rows.
+
+    Exact (row-chunked broadcasting) up to ``exact_limit`` points, otherwise
+    estimated from ``sample_pairs`` random distinct pairs.
+    """
+    n = len(radians)
+    if n < 2:
+        return 0.0
+    lat, lon = radians[:, 0], radians[:, 1]
+    if n <= exact_limit:
+        total = 0.0
+        for start in range(0, n, PAIRWISE_CHUNK_ROWS):
+            stop = min(n, start + PAIRWISE_CHUNK_ROWS)
+            total += float(haversine_miles(lat[start:stop, None], lon[start:stop, None], lat[None, :], lon[None, :]).sum())
+        # Every pair is counted twice and the diagonal is zero
+        return total / (n * (n - 1))
+    rng = np.random.default_rng(seed)
+    first = rng.integers(0, n, sample_pairs)
+    second = (first + rng.integers(1, n, sample_pairs)) % n
+    return float(haversine_miles(lat[first], lon[first], lat[second], lon[second]).mean())
+
+
 class GeoClusterer:
     """Creates geographic clusters of properties for lead packages"""
     
@@ -47,49 +90,40 @@ class GeoClusterer:
                 lon = prop.get('longitude')
                 
                 if lat and lon and lat != 0 and lon != 0:
-                    coordinates.append([float(lat), float(lon)])
+                    coordinates.append((float(lat), float(lon)))
                     valid_properties.append(prop)
             
             if len(valid_properties) < min_cluster_size:
                 logger.warning(f"Not enough properties with valid coordinates: {len(valid_properties)}")
                 return []
             
-            coordinates = np.array(coordinates)
-            
-            # Convert max radius to approximate degrees
-            # 1 degree lat ≈ 69 miles, 1 degree lon ≈ 54.6 miles (at 45° lat)
-            epsilon_lat = max_radius_miles / 69.0
-            epsilon_lon = max_radius_miles / 54.6
+            coordinates = np.asarray(coordinates, dtype=np.float64)
+            radians = np.radians(coordinates)
             
-            # Use average epsilon for DBSCAN
-            epsilon = (epsilon_lat + epsilon_lon) / 2
-            
-            # Perform DBSCAN clustering
+            # Haversine DBSCAN on a BallTree: eps is the max radius as an angle on the sphere
             clustering = DBSCAN(
-                eps=epsilon,
+                eps=max_radius_miles / EARTH_RADIUS_MILES,
                 min_samples=min_cluster_size,
-                metric='euclidean'
-            ).fit(coordinates)
-            
-            # Group properties by cluster
-            clusters = {}
-            noise_points = []
+                metric='haversine',
+                algorithm='ball_tree'
+            ).fit(radians)
             
-            for idx, cluster_id in enumerate(clustering.labels_):
-                if cluster_id == -1:  # Noise point
-                    noise_points.append(valid_properties[idx])
-                else:
-                    if cluster_id not in clusters:
-                        clusters[cluster_id] = []
-                    clusters[cluster_id].append({
-                        'property': valid_properties[idx],
-                        'coordinates': coordinates[idx]
-                    })
+            # Group member indices by label (noise is -1)
+            labels = clustering.labels_
+            order = np.argsort(labels, kind='stable')
+            cluster_ids, starts = np.unique(labels[order], return_index=True)
+            members = np.split(order, starts[1:])
             
             # Convert to output format
             cluster_list = []
-            for cluster_id, cluster_properties in clusters.items():
-                cluster_info = await self._analyze_cluster(cluster_id, cluster_properties)
+            for cluster_id, indices in zip(cluster_ids, members):
+                if cluster_id == -1:
+                    continue
+                cluster_info = await self._analyze_cluster(
+                    int(cluster_id),
+                    [valid_properties[idx] for idx in indices],
+                    coordinates[indices],
+                )
                 cluster_list.append(cluster_info)
             
             # Sort clusters by quality score (descending)
@@ -106,26 +140,21 @@ class GeoClusterer:
     async def _analyze_cluster(
         self,
         cluster_id: int,
-        cluster_properties: List[Dict[str, Any]]
+        properties: List[Dict[str, Any]],
+        coordinates: np.ndarray
     ) -> Dict[str, Any]:
         """
         Analyze a cluster and calculate metrics
         """
         try:
-            properties = [item['property'] for item in cluster_properties]
-            coordinates = [item['coordinates'] for item in cluster_properties]
-            
             # Calculate cluster center
-            center_lat = np.mean([coord[0] for coord in coordinates])
-            center_lon = np.mean([coord[1] for coord in coordinates])
+            center_lat = float(coordinates[:, 0].mean())
+            center_lon = float(coordinates[:, 1].mean())
             
             # Calculate cluster radius
-            center = (center_lat, center_lon)
-            max_distance = 0
-            
-            for coord in coordinates:
-                distance = geodesic(center, (coord[0], coord[1])).miles
-                max_distance = max(max_distance, distance)
+            radians = np.radians(coordinates)
+            center_lat_rad, center_lon_rad = np.radians(center_lat), np.radians(center_lon)
+            max_distance = float(haversine_miles(center_lat_rad, center_lon_rad, radians[:, 0], radians[:, 1]).max())
             
             # Calculate quality metrics
             total_score = sum(prop.get('overall_score', 0) for prop in properties)
@@ -136,7 +165,7 @@ class GeoClusterer:
             avg_property_value = np.mean(property_values) if property_values else 0
             
             # Calculate cluster quality score
-            quality_score = await self._calculate_cluster_quality(properties, coordinates, avg_score)
+            quality_score = await self._calculate_cluster_quality(properties, radians, avg_score)
             
             # Identify cluster characteristics
             characteristics = await self._identify_cluster_characteristics(properties)
@@ -162,7 +191,7 @@ class GeoClusterer:
             logger.error(f"Cluster analysis failed: {e}")
             return {
                 'cluster_id': f"cluster_{cluster_id}_error",
-                'property_count': len(cluster_properties),
+                'property_count': len(properties),
                 'quality_score': 0,
                 'properties': []
             }
@@ -170,11 +199,13 @@ class GeoClusterer:
     async def _calculate_cluster_quality(
         self,
         properties: List[Dict[str, Any]],
-        coordinates: List[List[float]],
+        radians: np.ndarray,
         avg_score: float
     ) -> float:
         """
         Calculate overall cluster quality score
+        
+        ``radians`` holds the members' (lat, lon) in radians.
         """
         try:
             quality_factors = []
@@ -183,21 +214,9 @@ class GeoClusterer:
             quality_factors.append(avg_score)
             
             # Factor 2: Cluster density (higher is better)
-            if len(coordinates) >= 2:
-                # Calculate average distance between properties
-                total_distance = 0
-                pair_count = 0
-                
-                for i in range(len(coordinates)):
-                    for j in range(i + 1, len(coordinates)):
-                        distance = geodesic(
-                            (coordinates[i][0], coordinates[i][1]),
-                            (coordinates[j][0], coordinates[j][1])
-                        ).miles
-                        total_distance += distance
-                        pair_count += 1
-                
-                avg_distance = total_distance / pair_count if pair_count > 0 else 5
+            if len(radians) >= 2:
+                # Average distance between properties (sampled for very large clusters)
+                avg_distance = mean_pairwise_distance_miles(radians)
                 
                 # Convert to density score (closer properties = higher score)
                 density_score = max(0, 100 - (avg_distance * 20))  # 5 miles = 0 points
@@ -265,8 +284,8 @@ class GeoClusterer:
             # Owner occupancy
             owner_occupied_count = 0
             for prop in properties:
-                owner_address = prop.get('owner_address', '').lower()
-                property_address = prop.get('address', '').lower()
+                owner_address = (prop.get('owner_address') or '').lower()
+                property_address = (prop.get('address') or '').lower()
                 if owner_address and property_address and owner_address in property_address:
                     owner_occupied_count += 1
             
@@ -316,28 +335,25 @@ class GeoClusterer:
             # Sort clusters by quality score (assign best clusters first)
             sorted_clusters = sorted(clusters, key=lambda x: x['quality_score'], reverse=True)
             
+            # The assignment score is the cluster's quality for every contractor
+            # (in a real implementation it would consider location, specialties, etc.),
+            # so the best contractor is the first one in order with capacity left.
+            # Capacity only shrinks, so one cursor walks the contractors once.
+            contractors = list(contractor_capacity)
+            cursor = 0
+            
             for cluster in sorted_clusters:
-                best_contractor = None
-                best_score = -1
-                
-                # Find best contractor for this cluster
-                for contractor_id, capacity in contractor_capacity.items():
-                    if capacity <= 0:  # No capacity remaining
-                        continue
-                    
-                    # Calculate assignment score
-                    # (In real implementation, would consider contractor location, specialties, etc.)
-                    assignment_score = cluster['quality_score']
-                    
-                    if assignment_score > best_score:
-                        best_score = assignment_score
-                        best_contractor = contractor_id
+                while cursor < len(contractors) and contractor_capacity[contractors[cursor]] <= 0:
+                    cursor += 1
+                if cursor == len(contractors):
+                    break
                 
+                best_contractor = contractors[cursor]
                 if best_contractor:
                     assignments[cluster['cluster_id']] = {
                         'contractor_id': best_contractor,
                         'cluster': cluster,
-                        'assignment_score': best_score
+                        'assignment_score': cluster['quality_score']
                     }
                     
                     # Reduce contractor capacity
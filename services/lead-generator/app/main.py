@@ -8,6 +8,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import json
+import uuid
 
 import structlog
 
@@ -18,6 +19,7 @@ from shared.database import db_client
 from shared.redis_client import redis_client
 from shared.observability import RequestContextMiddleware, setup_observability
 from app.scoring.lead_scorer import LeadScorer
+from app.scoring.batch_scorer import BatchLeadScorer, ScoringFrame
 from app.clustering.geo_clusterer import GeoClusterer
 from app.triggers.trigger_detector import TriggerDetector
 
@@ -70,6 +72,7 @@ class LeadScore(BaseModel):
 
 # Initialize services
 lead_scorer = LeadScorer()
+batch_scorer = BatchLeadScorer(lead_scorer)
 geo_clusterer = GeoClusterer()
 trigger_detector = TriggerDetector()
 
@@ -219,6 +222,100 @@ async def score_lead(request: LeadScoringRequest):
         logger.error(f"Lead scoring failed: {e}")
         raise HTTPException(status_code=500, detail=f"Scoring failed: {e}")
 
+# The single-property query takes whichever completed enrichment row the join
+# returns first; for batches the latest completed one is used, so results are
+# deterministic when a property was enriched more than once
+BATCH_PROPERTIES_QUERY = """
+SELECT DISTINCT ON (p.id) p.*, e.result as enrichment_data
+FROM raw_properties p
+LEFT JOIN enrichment_jobs e ON e.source_id = p.id AND e.status = 'completed'
+WHERE p.id = ANY($1::uuid[])
+ORDER BY p.id, e.completed_at DESC NULLS LAST
+"""
+
+# One statement for the whole batch: columns are passed as arrays and unnested
+BATCH_UPSERT_QUERY = """
+INSERT INTO lead_scores (
+    property_id, overall_score, roof_age_score, property_value_score,
+    storm_activity_score, neighborhood_score, owner_match_score,
+    urgency_score, buying_signals, triggers_detected, pricing_tier, price_per_lead
+)
+SELECT property_id, overall_score, roof_age_score, property_value_score,
+       storm_activity_score, neighborhood_score, owner_match_score,
+       urgency_score, buying_signals::jsonb, triggers_detected::jsonb, pricing_tier, price_per_lead
+FROM unnest(
+    $1::uuid[], $2::int[], $3::int[], $4::int[], $5::int[], $6::int[], $7::int[],
+    $8::int[], $9::text[], $10::text[], $11::text[], $12::numeric[]
+) AS scored(
+    property_id, overall_score, roof_age_score, property_value_score,
+    storm_activity_score, neighborhood_score, owner_match_score,
+    urgency_score, buying_signals, triggers_detected, pricing_tier, price_per_lead
+)
+ON CONFLICT (property_id) DO UPDATE SET
+overall_score = EXCLUDED.overall_score,
+roof_age_score = EXCLUDED.roof_age_score,
+property_value_score = EXCLUDED.property_value_score,
+storm_activity_score = EXCLUDED.storm_activity_score,
+neighborhood_score = EXCLUDED.neighborhood_score,
+owner_match_score = EXCLUDED.owner_match_score,
+urgency_score = EXCLUDED.urgency_score,
+buying_signals = EXCLUDED.buying_signals,
+triggers_detected = EXCLUDED.triggers_detected,
+pricing_tier = EXCLUDED.pricing_tier,
+price_per_lead = EXCLUDED.price_per_lead,
+updated_at = NOW()
+"""
+
+
+def upsert_columns(scores: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Column arrays for BATCH_UPSERT_QUERY, in parameter order"""
+    def component(name: str) -> List[int]:
+        return [score['component_scores'].get(name, 0) for score in scores]
+
+    return [
+        [str(score['property_id']) for score in scores],
+        [score['overall_score'] for score in scores],
+        component('roof_age'),
+        component('property_value'),
+        component('storm_activity'),
+        component('neighborhood'),
+        component('owner_match'),
+        component('urgency'),
+        [json.dumps(score['buying_signals']) for score in scores],
+        [json.dumps(score['triggers']) for score in scores],
+        [score['pricing_tier'] for score in scores],
+        [score['estimated_price'] for score in scores],
+    ]
+
+
+def valid_property_ids(property_ids: List[Any]) -> List[str]:
+    """Distinct ids in request order; malformed ones are dropped so they cannot fail the ``uuid[]`` cast for the whole batch"""
+    valid = []
+    for property_id in property_ids:
+        try:
+            valid.append(str(uuid.UUID(str(property_id))))
+        except ValueError:
+            logger.warning(f"Skipping malformed property id {property_id!r}")
+    return list(dict.fromkeys(valid))
+
+
+async def score_properties(property_ids: List[str]) -> List[Dict[str, Any]]:
+    """Score a set of properties with one read, one column-wise scoring pass and one upsert.
+
+    Returns results in request order; malformed ids and ids with no
+    ``raw_properties`` row are omitted.
+    """
+    unique_ids = valid_property_ids(property_ids)
+    if not unique_ids:
+        return []
+    rows = await db_client.fetch_all(BATCH_PROPERTIES_QUERY, unique_ids)
+    scores = batch_scorer.score(ScoringFrame.from_rows(rows))
+    if scores:
+        await db_client.execute(BATCH_UPSERT_QUERY, *upsert_columns(scores))
+    by_id = {str(score['property_id']): score for score in scores}
+    return [by_id[property_id] for property_id in unique_ids if property_id in by_id]
+
+
 # Batch scoring
 @app.post("/score/batch")
 async def score_leads_batch(request: BatchScoringRequest):
@@ -226,24 +323,25 @@ async def score_leads_batch(request: BatchScoringRequest):
     try:
         logger.info(f"Batch scoring {len(request.property_ids)} properties")
         
-        results = []
-        failed = 0
-        
-        for property_id in request.property_ids:
-            try:
-                # Score individual property
-                score_request = LeadScoringRequest(property_id=property_id)
-                result = await score_lead(score_request)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to score property {property_id}: {e}")
-                failed += 1
+        scores = await score_properties(request.property_ids)
+        results = [
+            LeadScore(
+                property_id=str(score['property_id']),
+                overall_score=score['overall_score'],
+                component_scores=score['component_scores'],
+                buying_signals=score['buying_signals'],
+                triggers=score['triggers'],
+                pricing_tier=score['pricing_tier'],
+                estimated_price=score['estimated_price']
+            )
+            for score in scores
+        ]
         
         return {
             "success": True,
             "results": results,
             "scored": len(results),
-            "failed": failed
+            "failed": len(set(request.property_ids)) - len(results)
         }
         
     except Exception as e:
@@ -404,14 +502,11 @@ async def process_new_properties_for_scoring():
         """
         
         properties = await db_client.fetch_all(query)
+        if not properties:
+            return
         
-        for prop in properties:
-            try:
-                score_request = LeadScoringRequest(property_id=prop['id'])
-                await score_lead(score_request)
-                logger.info(f"Auto-scored property {prop['id']}")
-            except Exception as e:
-                logger.error(f"Auto-scoring failed for {prop['id']}: {e}")
+        scores = await score_properties([prop['id'] for prop in properties])
+        logger.info(f"Auto-scored {len(scores)} of {len(properties)} properties")
                 
     except Exception as e:
         logger.error(f"Background scoring task failed: {e}")
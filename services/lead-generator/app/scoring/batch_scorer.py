@@ -0,0 +1,267 @@
+"""
+Set-based lead scoring: LeadScorer components and trigger types computed over column arrays
+
+Rules come from lead_scorer and trigger_detector: rules on numeric columns are
+applied as arrays from the same band tables, rules on enrichment payloads run
+once per row through the same functions the per-property path calls.
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.scoring.lead_scorer import (
+    EMAIL_CONTACT_MULTIPLIER,
+    HIGH_VALUE_SIGNAL_MIN,
+    NEIGHBORHOOD_SCORE_DEFAULT,
+    OWNER_MATCH_SCORE_DEFAULT,
+    PREMIUM_SIGNAL_MULTIPLIER,
+    PROPERTY_VALUE_BANDS,
+    PROPERTY_VALUE_DEFAULT,
+    PROPERTY_VALUE_FLOOR,
+    PROPERTY_VALUE_PRICE_BANDS,
+    ROOF_AGE_BANDS,
+    ROOF_AGE_DEFAULT,
+    ROOF_AGE_FLOOR,
+    ROOF_REPLACEMENT_SIGNAL_MIN,
+    STORM_SCORE_DEFAULT,
+    STORM_SIGNAL_MIN,
+    LeadScorer,
+    has_email_contact,
+    is_owner_occupied,
+    neighborhood_score,
+    owner_match_score,
+    season_signal,
+    storm_activity_score,
+    urgency_score,
+)
+from app.triggers.trigger_detector import (
+    AGE_TRIGGERS,
+    NEIGHBORHOOD_TREND_URGENCY,
+    PROPERTY_SALE_URGENCY,
+    SEASONAL_TRIGGERS,
+    is_absentee_owner,
+    is_established_neighborhood,
+)
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ['roof_age', 'property_value', 'storm_activity', 'neighborhood', 'owner_match', 'urgency']
+
+
+def parse_enrichment(raw: Any) -> Dict[str, Any]:
+    """Enrichment result column (JSON text or already decoded) as a dict"""
+    if not raw:
+        return {}
+    if isinstance(raw, dict):
+        return raw
+    try:
+        parsed = json.loads(raw)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _to_float(value: Any) -> float:
+    if not value:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_year(value: Any) -> float:
+    if not value:
+        return np.nan
+    try:
+        return float(int(value))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _rule(rule: Callable[..., Any], default: Any, *args: Any) -> Any:
+    """Apply a per-row rule; malformed enrichment falls back the way the per-property path does"""
+    try:
+        return rule(*args)
+    except Exception:
+        return default
+
+
+def _bands(values: np.ndarray, bands: Sequence[Tuple[float, Any]], floor: Any, default: Any) -> np.ndarray:
+    """Vectorized ``band_score``; NaN (missing or unparseable) gets ``default``"""
+    return np.select(
+        [np.isnan(values)] + [values >= minimum for minimum, _ in bands],
+        [default] + [score for _, score in bands],
+        default=floor,
+    )
+
+
+@dataclass
+class ScoringFrame:
+    """Column view of a batch of properties and their enrichment results"""
+    property_ids: List[Any]
+    year_built: np.ndarray
+    property_value: np.ndarray
+    storm_activity: np.ndarray
+    neighborhood_score: np.ndarray
+    owner_match: np.ndarray
+    established_neighborhood: np.ndarray
+    owner_occupied: np.ndarray
+    absentee_owner: np.ndarray
+    has_email: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.property_ids)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], enrichments: Optional[List[Dict[str, Any]]] = None) -> "ScoringFrame":
+        """Build columns from ``raw_properties`` rows; ``enrichments`` defaults to each row's ``enrichment_data``"""
+        if enrichments is None:
+            enrichments = [parse_enrichment(row.get('enrichment_data')) for row in rows]
+
+        return cls(
+            property_ids=[row.get('id') for row in rows],
+            year_built=np.array([_to_year(row.get('year_built')) for row in rows], dtype=np.float64),
+            property_value=np.array([_to_float(row.get('property_value')) for row in rows], dtype=np.float64),
+            storm_activity=np.array(
+                [_rule(storm_activity_score, STORM_SCORE_DEFAULT, enrichment) for enrichment in enrichments],
+                dtype=np.int64,
+            ),
+            neighborhood_score=np.array(
+                [_rule(neighborhood_score, NEIGHBORHOOD_SCORE_DEFAULT, enrichment) for enrichment in enrichments],
+                dtype=np.int64,
+            ),
+            owner_match=np.array(
+                [_rule(owner_match_score, OWNER_MATCH_SCORE_DEFAULT, row, enrichment)
+                 for row, enrichment in zip(rows, enrichments)],
+                dtype=np.int64,
+            ),
+            established_neighborhood=np.array(
+                [_rule(is_established_neighborhood, False, enrichment.get('neighborhood', {}))
+                 for enrichment in enrichments],
+                dtype=bool,
+            ),
+            owner_occupied=np.array([_rule(is_owner_occupied, False, row) for row in rows], dtype=bool),
+            absentee_owner=np.array([_rule(is_absentee_owner, False, row) for row in rows], dtype=bool),
+            has_email=np.array([_rule(has_email_contact, False, enrichment) for enrichment in enrichments], dtype=bool),
+        )
+
+
+class BatchLeadScorer:
+    """Scores a ScoringFrame with the same rules and weights as ``LeadScorer.score_property``
+    and the trigger types ``TriggerDetector.detect_triggers`` would report"""
+
+    def __init__(self, scorer: Optional[LeadScorer] = None):
+        self.scorer = scorer or LeadScorer()
+
+    def component_scores(self, frame: ScoringFrame, now: datetime) -> Dict[str, np.ndarray]:
+        age = now.year - frame.year_built
+        return {
+            'roof_age': _bands(age, ROOF_AGE_BANDS, ROOF_AGE_FLOOR, ROOF_AGE_DEFAULT).astype(np.int64),
+            'property_value': _bands(
+                frame.property_value, PROPERTY_VALUE_BANDS, PROPERTY_VALUE_FLOOR, PROPERTY_VALUE_DEFAULT
+            ).astype(np.int64),
+            'storm_activity': frame.storm_activity,
+            'neighborhood': frame.neighborhood_score,
+            'owner_match': frame.owner_match,
+            'urgency': np.full(len(frame), urgency_score(now.month), dtype=np.int64),
+        }
+
+    def _tiers(self, overall: np.ndarray) -> np.ndarray:
+        tiers = self.scorer.pricing_tiers
+        return np.select(
+            [overall >= tiers['premium']['min_score'], overall >= tiers['standard']['min_score']],
+            ['premium', 'standard'],
+            default='budget',
+        )
+
+    def _trigger_types(self, frame: ScoringFrame, now: datetime) -> List[List[str]]:
+        """Trigger types per property, highest urgency first"""
+        age = now.year - frame.year_built
+        # Index into AGE_TRIGGERS, or -1 when no age trigger applies (including unknown years)
+        age_rule = np.select(
+            [age >= rule[0] for rule in AGE_TRIGGERS],
+            list(range(len(AGE_TRIGGERS))),
+            default=-1,
+        )
+        seasonal = SEASONAL_TRIGGERS.get(now.month)
+
+        results = []
+        for index in range(len(frame)):
+            found = []
+            if age_rule[index] >= 0:
+                _, trigger_type, urgency, _, _ = AGE_TRIGGERS[age_rule[index]]
+                found.append((urgency, trigger_type))
+            if seasonal:
+                found.append((seasonal[1], 'seasonal_opportunity'))
+            if frame.established_neighborhood[index]:
+                found.append((NEIGHBORHOOD_TREND_URGENCY, 'neighborhood_trend'))
+            if frame.absentee_owner[index]:
+                found.append((PROPERTY_SALE_URGENCY, 'property_sale'))
+            found.sort(key=lambda item: item[0], reverse=True)
+            results.append([trigger_type for _, trigger_type in found])
+        return results
+
+    def score(self, frame: ScoringFrame, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """One result per row, shaped like ``score_property`` plus ``triggers`` (types)"""
+        now = now or datetime.now()
+        if not len(frame):
+            return []
+        components = self.component_scores(frame, now)
+
+        weighted = np.zeros(len(frame), dtype=np.float64)
+        for name in COMPONENTS:
+            weighted = weighted + components[name] * self.scorer.weights[name]
+        overall = np.clip(weighted.astype(np.int64), 0, 100)
+        tiers = self._tiers(overall)
+
+        roof_due = components['roof_age'] >= ROOF_REPLACEMENT_SIGNAL_MIN
+        high_value = components['property_value'] >= HIGH_VALUE_SIGNAL_MIN
+        storm = components['storm_activity'] >= STORM_SIGNAL_MIN
+        season = season_signal(now.month)
+
+        base_price = np.select(
+            [tiers == 'premium', tiers == 'standard'],
+            [self.scorer.pricing_tiers['premium']['base_price'], self.scorer.pricing_tiers['standard']['base_price']],
+            default=self.scorer.pricing_tiers['budget']['base_price'],
+        )
+        premium_count = roof_due.astype(np.int64) + high_value + frame.owner_occupied
+        multiplier = 1.0 + premium_count * PREMIUM_SIGNAL_MULTIPLIER
+        multiplier = multiplier + np.where(frame.has_email, EMAIL_CONTACT_MULTIPLIER, 0.0)
+        value = np.nan_to_num(frame.property_value, nan=0.0)
+        multiplier = multiplier + _bands(value, PROPERTY_VALUE_PRICE_BANDS, 0.0, 0.0)
+        prices = base_price * multiplier
+
+        triggers = self._trigger_types(frame, now)
+        scored_at = datetime.utcnow().isoformat()
+        columns = {name: components[name].tolist() for name in COMPONENTS}
+        results = []
+        for index, property_id in enumerate(frame.property_ids):
+            signals = []
+            if roof_due[index]:
+                signals.append('roof_replacement_due')
+            if high_value[index]:
+                signals.append('high_value_property')
+            if frame.owner_occupied[index]:
+                signals.append('owner_occupied')
+            if frame.has_email[index]:
+                signals.append('email_contact_available')
+            if storm[index]:
+                signals.append('recent_storm_activity')
+            if season:
+                signals.append(season)
+            results.append({
+                'property_id': property_id,
+                'overall_score': int(overall[index]),
+                'component_scores': {name: columns[name][index] for name in COMPONENTS},
+                'buying_signals': signals,
+                'triggers': triggers[index],
+                'pricing_tier': str(tiers[index]),
+                'estimated_price': round(float(prices[index]), 2),
+                'scored_at': scored_at,
+            })
+        return results
@@ -2,13 +2,149 @@
 Lead scoring algorithm for roofing prospects
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import asyncio
 from datetime import datetime, timedelta
 import json
 
 logger = logging.getLogger(__name__)
 
+# Scoring rules shared by LeadScorer and the column-wise BatchLeadScorer.
+# Bands are (minimum, score) pairs checked from the top; values below every
+# band get the floor, missing or unparseable values the default.
+ROOF_AGE_BANDS: Sequence[Tuple[float, int]] = ((20, 95), (15, 80), (10, 60), (5, 30))
+ROOF_AGE_FLOOR = 10
+ROOF_AGE_DEFAULT = 50
+PROPERTY_VALUE_BANDS: Sequence[Tuple[float, int]] = (
+    (500000, 95), (350000, 85), (250000, 75), (150000, 60), (100000, 45)
+)
+PROPERTY_VALUE_FLOOR = 20
+PROPERTY_VALUE_DEFAULT = 40
+# Price multiplier added for expensive properties
+PROPERTY_VALUE_PRICE_BANDS: Sequence[Tuple[float, float]] = ((500000, 0.2), (350000, 0.1))
+
+STORM_SCORE_WITH_COORDINATES = 40
+STORM_SCORE_DEFAULT = 30
+NEIGHBORHOOD_SCORE_DEFAULT = 50
+OWNER_MATCH_SCORE_DEFAULT = 30
+
+# Component scores at or above these produce a buying signal
+ROOF_REPLACEMENT_SIGNAL_MIN = 85
+HIGH_VALUE_SIGNAL_MIN = 80
+STORM_SIGNAL_MIN = 70
+
+PREMIUM_SIGNALS = ('high_value_property', 'owner_occupied', 'roof_replacement_due')
+PREMIUM_SIGNAL_MULTIPLIER = 0.1
+EMAIL_CONTACT_MULTIPLIER = 0.15
+
+
+def band_score(value, bands, floor):
+    """Score of the first band whose minimum ``value`` reaches"""
+    for minimum, score in bands:
+        if value >= minimum:
+            return score
+    return floor
+
+
+def roof_age_score(year_built: Any, current_year: int) -> int:
+    if not year_built:
+        return ROOF_AGE_DEFAULT
+    try:
+        # Assume the roof is as old as the property
+        roof_age = current_year - int(year_built)
+    except (ValueError, TypeError):
+        return ROOF_AGE_DEFAULT
+    return band_score(roof_age, ROOF_AGE_BANDS, ROOF_AGE_FLOOR)
+
+
+def property_value_score(property_value: Any) -> int:
+    if not property_value:
+        return PROPERTY_VALUE_DEFAULT
+    try:
+        value = float(property_value)
+    except (ValueError, TypeError):
+        return PROPERTY_VALUE_DEFAULT
+    return band_score(value, PROPERTY_VALUE_BANDS, PROPERTY_VALUE_FLOOR)
+
+
+def storm_activity_score(enrichment_data: Dict[str, Any]) -> int:
+    """Placeholder until weather events are queried: properties with coordinates score higher"""
+    address_data = enrichment_data.get('address', {})
+    if not address_data.get('latitude') or not address_data.get('longitude'):
+        return STORM_SCORE_DEFAULT
+    return STORM_SCORE_WITH_COORDINATES
+
+
+def neighborhood_score(enrichment_data: Dict[str, Any]) -> int:
+    neighborhood_data = enrichment_data.get('neighborhood', {})
+    score = NEIGHBORHOOD_SCORE_DEFAULT
+
+    # Established neighborhoods tend to have older roofs
+    if neighborhood_data.get('neighborhood'):
+        score += 10
+
+    # Suburban areas typically better for roofing leads
+    district = (neighborhood_data.get('district') or '').lower()
+    if any(word in district for word in ['suburb', 'residential', 'estate']):
+        score += 15
+    elif any(word in district for word in ['urban', 'downtown', 'city']):
+        score += 5
+    return min(100, score)
+
+
+def is_owner_occupied(property_data: Dict[str, Any]) -> bool:
+    owner_address = (property_data.get('owner_address') or '').lower()
+    property_address = (property_data.get('address') or '').lower()
+    return bool(owner_address and property_address and owner_address in property_address)
+
+
+def has_email_contact(enrichment_data: Dict[str, Any]) -> bool:
+    return bool(enrichment_data.get('email', {}).get('emails'))
+
+
+def owner_match_score(property_data: Dict[str, Any], enrichment_data: Dict[str, Any]) -> int:
+    score = 0
+
+    # Owner name available
+    if property_data.get('owner_name'):
+        score += 30
+
+    # Owner-occupied is valuable
+    if is_owner_occupied(property_data):
+        score += 25
+
+    # Email found, with a bonus for a high confidence address
+    email_data = enrichment_data.get('email', {})
+    if email_data.get('emails'):
+        score += 30
+        if email_data.get('confidence', 0) > 0.7:
+            score += 10
+
+    # Phone number available (would be from enrichment)
+    if enrichment_data.get('phone'):
+        score += 15
+
+    return min(100, score)
+
+
+def urgency_score(month: int) -> int:
+    # Recent permit activity in the ZIP code would also raise urgency
+    score = 20
+    if month in [3, 4, 5, 9, 10]:  # Spring/Fall roofing seasons
+        score += 30
+    elif month in [6, 7, 8]:  # Summer (peak season)
+        score += 20
+    return min(100, score)
+
+
+def season_signal(month: int) -> Optional[str]:
+    if month in [3, 4, 5]:
+        return 'spring_season'
+    if month in [9, 10]:
+        return 'fall_season'
+    return None
+
+
 class LeadScorer:
     """Scores roofing leads based on multiple factors"""
     
@@ -90,163 +226,39 @@ class LeadScorer:
     
     async def _score_roof_age(self, property_data: Dict[str, Any]) -> int:
         """Score based on estimated roof age"""
-        try:
-            year_built = property_data.get('year_built')
-            if not year_built:
-                return 50  # Default score if no data
-            
-            current_year = datetime.now().year
-            property_age = current_year - int(year_built)
-            
-            # Assume roof was replaced/installed when built or 15 years ago (whichever is more recent)
-            roof_age = min(property_age, property_age)
-            
-            # Scoring based on typical roof lifespan
-            if roof_age >= 20:  # Needs replacement soon
-                return 95
-            elif roof_age >= 15:  # Getting old
-                return 80
-            elif roof_age >= 10:  # Middle age
-                return 60
-            elif roof_age >= 5:   # Still good
-                return 30
-            else:  # New roof
-                return 10
-                
-        except (ValueError, TypeError):
-            return 50
+        return roof_age_score(property_data.get('year_built'), datetime.now().year)
     
     async def _score_property_value(self, property_data: Dict[str, Any]) -> int:
         """Score based on property value (higher value = better lead)"""
-        try:
-            property_value = property_data.get('property_value')
-            if not property_value:
-                return 40
-            
-            value = float(property_value)
-            
-            # Score based on property value ranges
-            if value >= 500000:     # Premium properties
-                return 95
-            elif value >= 350000:   # Upper middle class
-                return 85
-            elif value >= 250000:   # Middle class
-                return 75
-            elif value >= 150000:   # Lower middle class
-                return 60
-            elif value >= 100000:   # Budget range
-                return 45
-            else:                   # Very low value
-                return 20
-                
-        except (ValueError, TypeError):
-            return 40
+        return property_value_score(property_data.get('property_value'))
     
     async def _score_storm_activity(self, property_data: Dict[str, Any], enrichment_data: Dict[str, Any]) -> int:
         """Score based on recent storm activity in the area"""
         try:
-            # Get property coordinates
-            address_data = enrichment_data.get('address', {})
-            latitude = address_data.get('latitude')
-            longitude = address_data.get('longitude')
-            
-            if not latitude or not longitude:
-                return 30  # Default if no coordinates
-            
-            # Query recent weather events near this property
-            # This would connect to weather database or API
-            # For now, using mock scoring
-            
-            # In real implementation, you'd query:
-            # - Hail events within 50 miles in last 2 years
-            # - Wind damage events
-            # - Insurance claims data if available
-            
-            # Mock scoring based on general storm activity
-            return 40  # Placeholder
-            
+            return storm_activity_score(enrichment_data)
         except Exception as e:
             logger.error(f"Storm activity scoring failed: {e}")
-            return 30
+            return STORM_SCORE_DEFAULT
     
     async def _score_neighborhood(self, property_data: Dict[str, Any], enrichment_data: Dict[str, Any]) -> int:
         """Score based on neighborhood characteristics"""
         try:
-            neighborhood_data = enrichment_data.get('neighborhood', {})
-            
-            # Factors that increase lead quality:
-            score = 50  # Base score
-            
-            # Established neighborhoods tend to have older roofs
-            if neighborhood_data.get('neighborhood'):
-                score += 10
-            
-            # Suburban areas typically better for roofing leads
-            district = neighborhood_data.get('district', '').lower()
-            if any(word in district for word in ['suburb', 'residential', 'estate']):
-                score += 15
-            elif any(word in district for word in ['urban', 'downtown', 'city']):
-                score += 5
-                
-            return min(100, score)
-            
+            return neighborhood_score(enrichment_data)
         except Exception as e:
             logger.error(f"Neighborhood scoring failed: {e}")
-            return 50
+            return NEIGHBORHOOD_SCORE_DEFAULT
     
     async def _score_owner_match(self, property_data: Dict[str, Any], enrichment_data: Dict[str, Any]) -> int:
         """Score based on owner contact information quality"""
         try:
-            score = 0
-            
-            # Owner name available
-            if property_data.get('owner_name'):
-                score += 30
-            
-            # Owner address matches property (owner-occupied)
-            owner_address = property_data.get('owner_address', '').lower()
-            property_address = property_data.get('address', '').lower()
-            if owner_address and property_address and owner_address in property_address:
-                score += 25  # Owner-occupied is valuable
-            
-            # Email found
-            email_data = enrichment_data.get('email', {})
-            if email_data.get('emails'):
-                score += 30
-                # Bonus for high confidence email
-                if email_data.get('confidence', 0) > 0.7:
-                    score += 10
-            
-            # Phone number available (would be from enrichment)
-            if enrichment_data.get('phone'):
-                score += 15
-            
-            return min(100, score)
-            
+            return owner_match_score(property_data, enrichment_data)
         except Exception as e:
             logger.error(f"Owner match scoring failed: {e}")
-            return 30
+            return OWNER_MATCH_SCORE_DEFAULT
     
     async def _score_urgency(self, property_data: Dict[str, Any], enrichment_data: Dict[str, Any]) -> int:
         """Score based on urgency factors"""
-        try:
-            score = 20  # Base urgency score
-            
-            # Recent permit activity in neighborhood (indicates active market)
-            # This would query recent permits in same ZIP code
-            
-            # Seasonal factors
-            current_month = datetime.now().month
-            if current_month in [3, 4, 5, 9, 10]:  # Spring/Fall roofing seasons
-                score += 30
-            elif current_month in [6, 7, 8]:  # Summer (peak season)
-                score += 20
-                
-            return min(100, score)
-            
-        except Exception as e:
-            logger.error(f"Urgency scoring failed: {e}")
-            return 20
+        return urgency_score(datetime.now().month)
     
     async def _identify_buying_signals(
         self,
@@ -258,33 +270,29 @@ class LeadScorer:
         signals = []
         
         # High roof age
-        if component_scores.get('roof_age', 0) >= 85:
+        if component_scores.get('roof_age', 0) >= ROOF_REPLACEMENT_SIGNAL_MIN:
             signals.append('roof_replacement_due')
         
         # High property value
-        if component_scores.get('property_value', 0) >= 80:
+        if component_scores.get('property_value', 0) >= HIGH_VALUE_SIGNAL_MIN:
             signals.append('high_value_property')
         
         # Owner-occupied
-        owner_address = property_data.get('owner_address', '').lower()
-        property_address = property_data.get('address', '').lower()
-        if owner_address and property_address and owner_address in property_address:
+        if is_owner_occupied(property_data):
             signals.append('owner_occupied')
         
         # Email available
-        if enrichment_data.get('email', {}).get('emails'):
+        if has_email_contact(enrichment_data):
             signals.append('email_contact_available')
         
         # Recent storm activity
-        if component_scores.get('storm_activity', 0) >= 70:
+        if component_scores.get('storm_activity', 0) >= STORM_SIGNAL_MIN:
             signals.append('recent_storm_activity')
         
         # Seasonal urgency
-        current_month = datetime.now().month
-        if current_month in [3, 4, 5]:
-            signals.append('spring_season')
-        elif current_month in [9, 10]:
-            signals.append('fall_season')
+        season = season_signal(datetime.now().month)
+        if season:
+            signals.append(season)
         
         return signals
     
@@ -313,21 +321,19 @@ class LeadScorer:
         price_multiplier = 1.0
         
         # Premium signals increase price
-        premium_signals = ['high_value_property', 'owner_occupied', 'roof_replacement_due']
-        premium_count = sum(1 for signal in buying_signals if signal in premium_signals)
-        price_multiplier += premium_count * 0.1
+        premium_count = sum(1 for signal in buying_signals if signal in PREMIUM_SIGNALS)
+        price_multiplier += premium_count * PREMIUM_SIGNAL_MULTIPLIER
         
         # Contact availability increases price
         if 'email_contact_available' in buying_signals:
-            price_multiplier += 0.15
+            price_multiplier += EMAIL_CONTACT_MULTIPLIER
         
-        # Property value adjustment
-        property_value = property_data.get('property_value', 0)
-        if property_value:
-            if property_value >= 500000:
-                price_multiplier += 0.2
-            elif property_value >= 350000:
-                price_multiplier += 0.1
+        # Property value adjustment; values that do not parse get none
+        try:
+            property_value = float(property_data.get('property_value') or 0)
+        except (TypeError, ValueError):
+            property_value = 0.0
+        price_multiplier += band_score(property_value, PROPERTY_VALUE_PRICE_BANDS, 0.0)
         
         final_price = base_price * price_multiplier
         return round(final_price, 2)
\ No newline at end of file
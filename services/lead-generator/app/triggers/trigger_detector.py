@@ -2,13 +2,60 @@
 Trigger detection for identifying urgent roofing leads
 """
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 import asyncio
 from datetime import datetime, timedelta
 import json
 
 logger = logging.getLogger(__name__)
 
+# Trigger rules shared by TriggerDetector and the column-wise BatchLeadScorer.
+# Age triggers: (minimum property age, type, urgency, timeframe days, message), checked from the top
+AGE_TRIGGERS: Sequence[Tuple[int, str, int, int, str]] = (
+    (25, 'roof_replacement_due', 95, 30,
+     "Roof likely needs replacement - property built in {year_built} ({property_age} years old)"),
+    (20, 'age_threshold', 75, 90, "Roof approaching replacement age - built in {year_built}"),
+    (15, 'age_threshold', 60, 180, "Roof maintenance likely needed - built in {year_built}"),
+)
+# Seasonal opportunities: (season, urgency, timeframe days, detail flag, message)
+_SPRING = ('spring', 65, 45, 'optimal_timing',
+           "Spring roofing season - optimal time for roof inspections and repairs")
+_FALL = ('fall', 70, 30, 'pre_winter', "Fall roofing season - critical time to prepare roof for winter")
+_PRE_STORM = ('pre_storm', 55, 60, 'storm_prep',
+              "Pre-storm season - good time for roof inspections before severe weather")
+SEASONAL_TRIGGERS: Dict[int, Tuple[str, int, int, str, str]] = {
+    3: _SPRING, 4: _SPRING, 5: _SPRING,  # Spring roofing season (March-May)
+    9: _FALL, 10: _FALL,  # Fall roofing season (September-October)
+    6: _PRE_STORM, 7: _PRE_STORM,  # Pre-storm season (early summer)
+}
+ESTABLISHED_KEYWORDS = ('estate', 'heights', 'park', 'manor', 'hills', 'grove')
+NEIGHBORHOOD_TREND_URGENCY = 50
+PROPERTY_SALE_URGENCY = 45
+
+
+def age_trigger(property_age: float) -> Optional[Tuple[int, str, int, int, str]]:
+    """The AGE_TRIGGERS entry a property of this age falls under, if any"""
+    for rule in AGE_TRIGGERS:
+        if property_age >= rule[0]:
+            return rule
+    return None
+
+
+def is_established_neighborhood(neighborhood_data: Dict[str, Any]) -> bool:
+    """Established neighborhoods have higher roof replacement probability"""
+    if not neighborhood_data:
+        return False
+    neighborhood = (neighborhood_data.get('neighborhood') or '').lower()
+    district = (neighborhood_data.get('district') or '').lower()
+    return any(keyword in neighborhood or keyword in district for keyword in ESTABLISHED_KEYWORDS)
+
+
+def is_absentee_owner(property_data: Dict[str, Any]) -> bool:
+    """Owner address differs from the property address: likely a rental or recent sale"""
+    owner_address = property_data.get('owner_address', '')
+    property_address = property_data.get('address', '')
+    return bool(owner_address and property_address and owner_address.lower() not in property_address.lower())
+
 class TriggerDetector:
     """Detects buying triggers and urgency signals for roofing leads"""
     
@@ -129,43 +176,24 @@ class TriggerDetector:
             property_age = current_year - int(year_built)
             
             # Trigger based on typical roof lifespans
-            if property_age >= 25:
-                triggers.append({
-                    'type': 'roof_replacement_due',
-                    'urgency': 95,
-                    'timeframe_days': 30,
-                    'detected_at': datetime.utcnow().isoformat(),
-                    'details': {
-                        'property_age': property_age,
-                        'year_built': year_built,
-                        'estimated_roof_age': property_age
-                    },
-                    'message': f"Roof likely needs replacement - property built in {year_built} ({property_age} years old)"
-                })
-            elif property_age >= 20:
-                triggers.append({
-                    'type': 'age_threshold',
-                    'urgency': 75,
-                    'timeframe_days': 90,
-                    'detected_at': datetime.utcnow().isoformat(),
-                    'details': {
-                        'property_age': property_age,
-                        'year_built': year_built
-                    },
-                    'message': f"Roof approaching replacement age - built in {year_built}"
-                })
-            elif property_age >= 15:
-                triggers.append({
-                    'type': 'age_threshold',
-                    'urgency': 60,
-                    'timeframe_days': 180,
-                    'detected_at': datetime.utcnow().isoformat(),
-                    'details': {
-                        'property_age': property_age,
-                        'year_built': year_built
-                    },
-                    'message': f"Roof maintenance likely needed - built in {year_built}"
-                })
+            rule = age_trigger(property_age)
+            if rule is None:
+                return triggers
+            _, trigger_type, urgency, timeframe_days, message = rule
+            details = {
+                'property_age': property_age,
+                'year_built': year_built
+            }
+            if trigger_type == 'roof_replacement_due':
+                details['estimated_roof_age'] = property_age
+            triggers.append({
+                'type': trigger_type,
+                'urgency': urgency,
+                'timeframe_days': timeframe_days,
+                'detected_at': datetime.utcnow().isoformat(),
+                'details': details,
+                'message': message.format(year_built=year_built, property_age=property_age)
+            })
                 
         except (ValueError, TypeError) as e:
             logger.error(f"Age trigger detection failed: {e}")
@@ -220,49 +248,20 @@ class TriggerDetector:
             current_date = datetime.now()
             current_month = current_date.month
             
-            # Spring roofing season (March-May)
-            if current_month in [3, 4, 5]:
+            season = SEASONAL_TRIGGERS.get(current_month)
+            if season:
+                name, urgency, timeframe_days, flag, message = season
                 triggers.append({
                     'type': 'seasonal_opportunity',
-                    'urgency': 65,
-                    'timeframe_days': 45,
+                    'urgency': urgency,
+                    'timeframe_days': timeframe_days,
                     'detected_at': current_date.isoformat(),
                     'details': {
-                        'season': 'spring',
+                        'season': name,
                         'month': current_month,
-                        'optimal_timing': True
+                        flag: True
                     },
-                    'message': "Spring roofing season - optimal time for roof inspections and repairs"
-                })
-            
-            # Fall roofing season (September-October)
-            elif current_month in [9, 10]:
-                triggers.append({
-                    'type': 'seasonal_opportunity',
-                    'urgency': 70,
-                    'timeframe_days': 30,
-                    'detected_at': current_date.isoformat(),
-                    'details': {
-                        'season': 'fall',
-                        'month': current_month,
-                        'pre_winter': True
-                    },
-                    'message': "Fall roofing season - critical time to prepare roof for winter"
-                })
-            
-            # Pre-storm season (early summer)
-            elif current_month in [6, 7]:
-                triggers.append({
-                    'type': 'seasonal_opportunity',
-                    'urgency': 55,
-                    'timeframe_days': 60,
-                    'detected_at': current_date.isoformat(),
-                    'details': {
-                        'season': 'pre_storm',
-                        'month': current_month,
-                        'storm_prep': True
-                    },
-                    'message': "Pre-storm season - good time for roof inspections before severe weather"
+                    'message': message
                 })
                 
         except Exception as e:
@@ -285,15 +284,12 @@ class TriggerDetector:
                 return triggers
             
             # Check for established neighborhood (more likely to need roof work)
-            neighborhood = neighborhood_data.get('neighborhood', '').lower()
-            district = neighborhood_data.get('district', '').lower()
-            
-            # Established neighborhoods have higher roof replacement probability
-            established_keywords = ['estate', 'heights', 'park', 'manor', 'hills', 'grove']
-            if any(keyword in neighborhood or keyword in district for keyword in established_keywords):
+            if is_established_neighborhood(neighborhood_data):
+                neighborhood = (neighborhood_data.get('neighborhood') or '').lower()
+                district = (neighborhood_data.get('district') or '').lower()
                 triggers.append({
                     'type': 'neighborhood_trend',
-                    'urgency': 50,
+                    'urgency': NEIGHBORHOOD_TREND_URGENCY,
                     'timeframe_days': 120,
                     'detected_at': datetime.utcnow().isoformat(),
                     'details': {
@@ -325,14 +321,12 @@ class TriggerDetector:
             
             # For now, using basic heuristics
             owner_name = property_data.get('owner_name', '')
-            owner_address = property_data.get('owner_address', '')
-            property_address = property_data.get('address', '')
             
             # If owner address differs from property address, might be recent sale/rental
-            if owner_address and property_address and owner_address.lower() not in property_address.lower():
+            if is_absentee_owner(property_data):
                 triggers.append({
                     'type': 'property_sale',
-                    'urgency': 45,
+                    'urgency': PROPERTY_SALE_URGENCY,
                     'timeframe_days': 90,
                     'detected_at': datetime.utcnow().isoformat(),
                     'details': {
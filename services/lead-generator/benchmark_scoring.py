@@ -0,0 +1,116 @@
+"""Benchmark per-property lead scoring against the set-based batch path.
+
+Uses synthetic ``raw_properties`` rows. ``--round-trip-ms`` models one
+database round trip: the per-property path pays two per property (SELECT and
+upsert), the batch path two per batch. Also checks that both paths produce the
+same scores.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.scoring.batch_scorer import BatchLeadScorer, ScoringFrame, parse_enrichment
+from app.scoring.lead_scorer import LeadScorer
+from app.triggers.trigger_detector import TriggerDetector
+
+DISTRICTS = ["Residential North", "Downtown", "Oak Estates", "Industrial", "", None]
+NEIGHBORHOODS = ["Maple Heights", "Riverside", "Grove Park", "", None]
+
+
+def synthetic_rows(count: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    rows = []
+    for index in range(count):
+        street = f"{rng.randint(100, 9999)} Elm St"
+        enrichment: Dict[str, Any] = {}
+        if rng.random() < 0.8:
+            enrichment["address"] = {"latitude": 30 + rng.random(), "longitude": -97 - rng.random()}
+        if rng.random() < 0.7:
+            enrichment["neighborhood"] = {
+                "neighborhood": rng.choice(NEIGHBORHOODS),
+                "district": rng.choice(DISTRICTS),
+            }
+        if rng.random() < 0.5:
+            enrichment["email"] = {"emails": ["owner@example.com"], "confidence": rng.random()}
+        if rng.random() < 0.3:
+            enrichment["phone"] = "+15125550100"
+        rows.append({
+            "id": f"00000000-0000-0000-0000-{index:012d}",
+            "address": f"{street}, Austin, TX",
+            "city": "Austin",
+            "state": "TX",
+            "owner_name": "J. Owner" if rng.random() < 0.9 else None,
+            "owner_address": rng.choice([street, "PO Box 12", None]),
+            "property_value": rng.choice([None, rng.randint(60_000, 900_000)]),
+            "year_built": rng.choice([None, rng.randint(1950, 2024)]),
+            "enrichment_data": json.dumps(enrichment) if enrichment else None,
+        })
+    return rows
+
+
+async def per_property(rows: List[Dict[str, Any]], round_trip: float) -> Dict[str, Dict[str, Any]]:
+    """Previous behaviour: fetch, score, detect triggers and upsert one property at a time"""
+    scorer, detector = LeadScorer(), TriggerDetector()
+    results = {}
+    for row in rows:
+        await asyncio.sleep(round_trip)
+        enrichment = parse_enrichment(row["enrichment_data"])
+        score = await scorer.score_property(row, enrichment)
+        triggers = await detector.detect_triggers(row, enrichment)
+        score["triggers"] = [trigger["type"] for trigger in triggers]
+        await asyncio.sleep(round_trip)
+        results[row["id"]] = score
+    return results
+
+
+async def batched(rows: List[Dict[str, Any]], round_trip: float, batch_size: int) -> Dict[str, Dict[str, Any]]:
+    scorer = BatchLeadScorer()
+    results = {}
+    for start in range(0, len(rows), batch_size):
+        await asyncio.sleep(round_trip)
+        scores = scorer.score(ScoringFrame.from_rows(rows[start:start + batch_size]))
+        await asyncio.sleep(round_trip)
+        results.update((score["property_id"], score) for score in scores)
+    return results
+
+
+def _comparable(score: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in score.items() if key not in ("scored_at", "property_id")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark lead-generator batch scoring")
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--round-trip-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rows = synthetic_rows(args.properties)
+    round_trip = args.round_trip_ms / 1000
+
+    start = time.perf_counter()
+    expected = asyncio.run(per_property(rows, round_trip))
+    single_elapsed = time.perf_counter() - start
+    print(f"per-property {args.properties / single_elapsed:>10.1f} properties/sec ({single_elapsed:.2f}s)")
+
+    start = time.perf_counter()
+    actual = asyncio.run(batched(rows, round_trip, args.batch_size))
+    batch_elapsed = time.perf_counter() - start
+    print(f"batched      {args.properties / batch_elapsed:>10.1f} properties/sec ({batch_elapsed:.2f}s)")
+    print(f"speedup      {single_elapsed / batch_elapsed:>10.1f}x")
+
+    mismatched = [key for key in expected if _comparable(expected[key]) != _comparable(actual[key])]
+    print(f"mismatches   {len(mismatched):>10d} (month {datetime.now().month})")
+    if mismatched:
+        raise SystemExit(f"batch scores differ for {mismatched[:5]}")
+
+
+if __name__ == "__main__":
+    main()
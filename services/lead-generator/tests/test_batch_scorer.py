@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.scoring import lead_scorer  # noqa: E402
+from app.scoring.batch_scorer import BatchLeadScorer, ScoringFrame, parse_enrichment  # noqa: E402
+from app.scoring.lead_scorer import LeadScorer  # noqa: E402
+from app.triggers import trigger_detector  # noqa: E402
+from app.triggers.trigger_detector import TriggerDetector  # noqa: E402
+from benchmark_scoring import synthetic_rows  # noqa: E402
+
+
+def _row(index, enrichment=None, **fields):
+    row = {
+        "id": f"00000000-0000-0000-ffff-{index:012d}",
+        "address": "12 Oak Ln, Austin, TX",
+        "owner_name": "J. Owner",
+        "owner_address": "12 Oak Ln",
+        "property_value": 300000,
+        "year_built": 1990,
+        "enrichment_data": json.dumps(enrichment) if enrichment is not None else None,
+    }
+    row.update(fields)
+    return row
+
+
+# Every age trigger band, unknown values and malformed enrichment sections
+EDGE_ROWS = [
+    _row(1, year_built=None, property_value=None),
+    _row(2, year_built="not a year", property_value="n/a"),
+    _row(3, year_built=2000, owner_address="PO Box 9"),
+    _row(4, year_built=2006, owner_address=None, address=None),
+    _row(5, year_built=2011, property_value=99999),
+    _row(6, enrichment={"neighborhood": {"neighborhood": "Maple Heights", "district": None}}),
+    _row(7, enrichment={"neighborhood": {"neighborhood": "Riverside", "district": 42}}),
+    _row(8, enrichment={"email": {"emails": ["a@example.com"], "confidence": "high"}}),
+    _row(9, enrichment={"email": {"emails": ["a@example.com"], "confidence": 0.9}, "phone": "+15125550100"}),
+    _row(10, enrichment={"address": {"latitude": 30.2, "longitude": None}}),
+    _row(11, enrichment={"address": {"latitude": 30.2, "longitude": -97.7}}),
+    _row(12, enrichment={"neighborhood": {"district": "Grove Park Estates"}}, property_value=650000),
+]
+
+
+def _freeze(monkeypatch, moment):
+    class Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment
+
+    monkeypatch.setattr(lead_scorer, "datetime", Frozen)
+    monkeypatch.setattr(trigger_detector, "datetime", Frozen)
+
+
+async def _per_property(rows):
+    scorer, detector = LeadScorer(), TriggerDetector()
+    results = {}
+    for row in rows:
+        enrichment = parse_enrichment(row["enrichment_data"])
+        score = await scorer.score_property(row, enrichment)
+        triggers = await detector.detect_triggers(row, enrichment)
+        score["triggers"] = [trigger["type"] for trigger in triggers]
+        results[row["id"]] = score
+    return results
+
+
+def _comparable(score):
+    return {key: value for key, value in score.items() if key not in ("scored_at", "property_id")}
+
+
+@pytest.mark.parametrize("month", range(1, 13))
+def test_batch_scores_match_per_property_scoring(monkeypatch, month):
+    moment = datetime(2026, month, 15)
+    _freeze(monkeypatch, moment)
+    rows = synthetic_rows(300, seed=month) + EDGE_ROWS
+
+    expected = asyncio.run(_per_property(rows))
+    actual = BatchLeadScorer().score(ScoringFrame.from_rows(rows), now=moment)
+
+    assert len(actual) == len(rows)
+    for score in actual:
+        assert _comparable(score) == _comparable(expected[score["property_id"]]), score["property_id"]
+
+
+def test_batch_covers_every_trigger_type():
+    moment = datetime(2026, 4, 15)
+    scores = BatchLeadScorer().score(ScoringFrame.from_rows(EDGE_ROWS), now=moment)
+    seen = {trigger for score in scores for trigger in score["triggers"]}
+
+    assert seen == {
+        "roof_replacement_due", "age_threshold", "seasonal_opportunity", "neighborhood_trend", "property_sale",
+    }
+    by_id = {score["property_id"]: score for score in scores}
+    # Highest urgency first: age (95) before spring (65) before the established neighborhood (50)
+    assert by_id[EDGE_ROWS[5]["id"]]["triggers"] == ["roof_replacement_due", "seasonal_opportunity", "neighborhood_trend"]
+
+
+def test_malformed_ids_are_dropped_before_the_uuid_cast():
+    from app.main import valid_property_ids
+
+    ids = ["00000000-0000-0000-0000-0000000000AB", "not-a-uuid", None, "00000000-0000-0000-0000-0000000000ab"]
+
+    assert valid_property_ids(ids) == ["00000000-0000-0000-0000-0000000000ab"]
@@ -0,0 +1,142 @@
+"""Benchmark per-image inference against the micro-batching scheduler.
+
+Uses the mock models. ``--batch-overhead-ms`` models the fixed cost of one
+model invocation (kernel launch, host/device copy) that batching amortises.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+
+from inference_scheduler import InferenceScheduler
+from mock_models import BATCH_METHODS, model_factory
+from model_registry import ModelRegistry, ModelSpec
+
+MODEL_NAMES = ["classifier", "detector", "segmentor"]
+
+
+def _with_overhead(batch_fn: Callable, overhead: float, per_image: float) -> Callable:
+    def run(images: List[np.ndarray]):
+        time.sleep(overhead + per_image * len(images))
+        return batch_fn(images)
+    return run
+
+
+class _SlowModel:
+    """Mock model whose batch call pays a simulated per-call overhead"""
+
+    def __init__(self, name: str, overhead: float, per_image: float):
+        model = model_factory(name)()
+        self.model_version = model.model_version
+        self.run_batch = _with_overhead(getattr(model, BATCH_METHODS[name]), overhead, per_image)
+
+
+def _write_images(directory: str, count: int, size: int) -> List[str]:
+    rng = np.random.default_rng(7)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"roof_{index}.jpg")
+        cv2.imwrite(path, rng.integers(0, 255, (size, size, 3), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+async def run_per_image(batch_fns: Dict[str, Callable], requests: List[List[str]]) -> None:
+    """Previous behaviour: decode and run each model per image on the event loop"""
+
+    async def handle(paths: List[str]):
+        for path in paths:
+            image = cv2.imread(path)
+            for name in MODEL_NAMES:
+                batch_fns[name]([image])
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*(handle(paths) for paths in requests))
+
+
+async def run_scheduled(requests: List[List[str]], args) -> Dict:
+    overhead, per_image = args.batch_overhead_ms / 1000, args.per_image_ms / 1000
+    registry = ModelRegistry([
+        ModelSpec(
+            name=name,
+            factory=lambda version, name=name: _SlowModel(name, overhead, per_image),
+            batch_method="run_batch",
+            workers=args.model_workers,
+        )
+        for name in MODEL_NAMES
+    ])
+    await registry.preload()
+    scheduler = InferenceScheduler(
+        registry,
+        max_batch_size=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+        decode_workers=args.decode_workers,
+    )
+    scheduler.start()
+
+    async def handle(paths: List[str]):
+        images = await scheduler.load_images(paths)
+        await asyncio.gather(*(scheduler.infer(image, MODEL_NAMES) for image in images))
+
+    try:
+        await asyncio.gather(*(handle(paths) for paths in requests))
+        return scheduler.stats()
+    finally:
+        await scheduler.close()
+        await registry.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ml-inference batching")
+    parser.add_argument("--requests", type=int, default=32, help="Concurrent property analyses")
+    parser.add_argument("--images-per-request", type=int, default=4)
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--batch-overhead-ms", type=float, default=5.0)
+    parser.add_argument("--per-image-ms", type=float, default=0.5)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--decode-workers", type=int, default=4)
+    parser.add_argument("--model-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    batch_fns = {
+        name: _with_overhead(
+            getattr(model_factory(name)(), BATCH_METHODS[name]),
+            args.batch_overhead_ms / 1000,
+            args.per_image_ms / 1000,
+        )
+        for name in MODEL_NAMES
+    }
+    total_images = args.requests * args.images_per_request
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = _write_images(tmpdir, total_images, args.image_size)
+        requests = [
+            paths[index:index + args.images_per_request]
+            for index in range(0, total_images, args.images_per_request)
+        ]
+
+        start = time.perf_counter()
+        asyncio.run(run_per_image(batch_fns, requests))
+        elapsed = time.perf_counter() - start
+        print(f"per-image  {total_images / elapsed:>8.1f} images/sec ({elapsed:.2f}s)")
+
+        start = time.perf_counter()
+        stats = asyncio.run(run_scheduled(requests, args))
+        elapsed = time.perf_counter() - start
+        print(f"scheduled  {total_images / elapsed:>8.1f} images/sec ({elapsed:.2f}s)")
+        for name, model_stats in stats["models"].items():
+            print(
+                f"  {name:<10} avg_batch={model_stats['avg_batch_size']:<5} "
+                f"p50={model_stats['latency_ms_p50']}ms p95={model_stats['latency_ms_p95']}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Micro-batching inference scheduler
+Collects images for each model across concurrent requests, runs them as one
+batch call on the model's worker pool and fans the results back out to the callers.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import structlog
+
+from model_registry import ModelRegistry
+
+logger = structlog.get_logger("ml-inference")
+
+LATENCY_WINDOW = 1024
+
+
+@dataclass
+class ModelMetrics:
+    """Rolling latency/throughput counters for one model"""
+    batches: int = 0
+    items: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    max_batch_seen: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    batch_seconds: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def observe_batch(self, size: int, seconds: float, waits: Iterable[float]):
+        self.batches += 1
+        self.items += size
+        self.busy_seconds += seconds
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        self.batch_seconds.append(seconds)
+        self.latencies.extend(waits)
+
+    @staticmethod
+    def _percentile(values: Iterable[float], pct: float) -> Optional[float]:
+        ordered = sorted(values)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "throughput_per_sec": round(self.items / elapsed, 2),
+            "items_per_busy_sec": round(self.items / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+            "latency_ms_p50": self._percentile(self.latencies, 50),
+            "latency_ms_p95": self._percentile(self.latencies, 95),
+            "batch_ms_p50": self._percentile(self.batch_seconds, 50),
+            "batch_ms_p95": self._percentile(self.batch_seconds, 95),
+        }
+
+
+@dataclass
+class _Pending:
+    image: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class _ModelLane:
+    """Queue and batcher task for a single model"""
+
+    def __init__(self, name: str, registry: ModelRegistry, max_batch_size: int, max_wait: float):
+        self.name = name
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: "asyncio.Queue[_Pending]" = asyncio.Queue()
+        # One batch per worker of the active model version; the queue keeps
+        # filling while they are busy. The limit is read on every acquire so
+        # it follows version swaps that change the pool size.
+        self.busy = 0
+        self._slot_freed = asyncio.Event()
+        self.metrics = ModelMetrics()
+        self.task: Optional[asyncio.Task] = None
+        self.inflight: set = set()
+
+    async def _acquire_slot(self):
+        while self.busy >= self.registry.workers(self.name):
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+        self.busy += 1
+
+    def _release_slot(self):
+        self.busy -= 1
+        self._slot_freed.set()
+
+    def resize(self):
+        """Re-check the slot limit after the model's pool size may have changed"""
+        self._slot_freed.set()
+
+    async def _collect(self) -> List[_Pending]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._acquire_slot()
+            try:
+                batch = await self._collect()
+            except asyncio.CancelledError:
+                self._release_slot()
+                raise
+            task = loop.create_task(self._execute(batch))
+            self.inflight.add(task)
+            task.add_done_callback(self.inflight.discard)
+
+    async def _execute(self, batch: List[_Pending]):
+        live = [item for item in batch if not item.future.done()]
+        try:
+            if not live:
+                return
+            started = time.monotonic()
+            try:
+                version, results = await self.registry.run_batch_versioned(self.name, [item.image for item in live])
+                if len(results) != len(live):
+                    raise RuntimeError(
+                        f"{self.name} returned {len(results)} results for a batch of {len(live)}"
+                    )
+            except Exception as exc:
+                self.metrics.errors += len(live)
+                logger.error("inference.batch_failed", model=self.name, size=len(live), error=str(exc))
+                for item in live:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+                return
+            finished = time.monotonic()
+            self.metrics.observe_batch(
+                len(live), finished - started, (finished - item.enqueued_at for item in live)
+            )
+            for item, result in zip(live, results):
+                if not item.future.done():
+                    item.future.set_result((result, version))
+        finally:
+            self._release_slot()
+
+
+class InferenceScheduler:
+    """Micro-batches single-image requests per model.
+
+    A batch is dispatched when ``max_batch_size`` images are queued or
+    ``max_wait_ms`` has passed since the first one arrived. Batch calls run on
+    the registry's per-model worker pools; image decoding runs on a separate
+    pool so neither blocks the event loop. With a ``result_cache``,
+    ``infer_file`` serves repeat images by content hash and only decodes and
+    queues the models whose current version has no cached result.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        decode_workers: int = 4,
+        result_cache=None,
+    ):
+        self.registry = registry
+        self.result_cache = result_cache
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.decoder = ThreadPoolExecutor(max_workers=max(1, decode_workers), thread_name_prefix="decode")
+        self._lanes: Dict[str, _ModelLane] = {}
+        self.decoded = 0
+        self.decode_seconds = 0.0
+
+    @property
+    def model_names(self) -> List[str]:
+        return self.registry.names
+
+    def start(self):
+        if not self._lanes:
+            self.registry.add_swap_listener(self._model_swapped)
+        for name in self.registry.names:
+            if name in self._lanes:
+                continue
+            lane = _ModelLane(name, self.registry, self.max_batch_size, self.max_wait)
+            lane.task = asyncio.get_running_loop().create_task(lane.run())
+            self._lanes[name] = lane
+        logger.info(
+            "inference.scheduler_started",
+            models=self.model_names,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=self.max_wait * 1000,
+        )
+
+    def _model_swapped(self, name: str):
+        lane = self._lanes.get(name)
+        if lane is not None:
+            lane.resize()
+
+    async def close(self):
+        for lane in self._lanes.values():
+            if lane.task:
+                lane.task.cancel()
+            if lane.inflight:
+                await asyncio.gather(*lane.inflight, return_exceptions=True)
+            while not lane.queue.empty():
+                pending = lane.queue.get_nowait()
+                if not pending.future.done():
+                    pending.future.set_exception(RuntimeError("inference scheduler closed"))
+        self._lanes.clear()
+        self.decoder.shutdown(wait=False)
+
+    def _decode(self, path: str) -> Tuple[Optional[np.ndarray], float]:
+        started = time.monotonic()
+        image = cv2.imread(path)
+        return image, time.monotonic() - started
+
+    async def load_image(self, path: str) -> Optional[np.ndarray]:
+        """Decode an image file on the decode pool; ``None`` if unreadable"""
+        image, seconds = await asyncio.get_running_loop().run_in_executor(self.decoder, self._decode, path)
+        self.decoded += 1
+        self.decode_seconds += seconds
+        return image
+
+    async def load_images(self, paths: List[str]) -> List[Optional[np.ndarray]]:
+        return list(await asyncio.gather(*(self.load_image(path) for path in paths)))
+
+    def _lookup(self, path: str, versions: Dict[str, Optional[str]]) -> Tuple[Optional[bytes], str, Dict[str, Any]]:
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+        except OSError:
+            return None, "", {}
+        digest = self.result_cache.digest(data)
+        cached = {}
+        for name, version in versions.items():
+            result = self.result_cache.get(digest, name, version)
+            if result is not None:
+                cached[name] = result
+        return data, digest, cached
+
+    def _decode_bytes(self, data: bytes) -> Tuple[Optional[np.ndarray], float]:
+        started = time.monotonic()
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        return image, time.monotonic() - started
+
+    async def infer_file(self, path: str, model_names: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Run an image file through several models; ``None`` if unreadable.
+
+        Without a result cache this is ``load_image`` followed by ``infer``.
+        """
+        names = list(model_names) if model_names is not None else self.model_names
+        if self.result_cache is None:
+            image = await self.load_image(path)
+            return None if image is None else await self.infer(image, names)
+
+        loop = asyncio.get_running_loop()
+        versions = {name: self.registry.active_version(name) for name in names}
+        data, digest, results = await loop.run_in_executor(self.decoder, self._lookup, path, versions)
+        if data is None:
+            return None
+        missing = [name for name in names if name not in results]
+        if not missing:
+            return results
+
+        image, seconds = await loop.run_in_executor(self.decoder, self._decode_bytes, data)
+        self.decoded += 1
+        self.decode_seconds += seconds
+        if image is None:
+            return None
+        # Each result is cached as soon as its model answers, so a failure in
+        # one model does not throw away the others' work
+        outputs = await asyncio.gather(*(self._submit_and_store(name, image, digest) for name in missing))
+        results.update(zip(missing, outputs))
+        return {name: results[name] for name in names}
+
+    async def _submit_and_store(self, model_name: str, image: np.ndarray, digest: str) -> Any:
+        result, version = await self._submit(model_name, image)
+        await asyncio.get_running_loop().run_in_executor(
+            self.decoder, self.result_cache.put, digest, model_name, version, result
+        )
+        return result
+
+    async def _submit(self, model_name: str, image: np.ndarray) -> Tuple[Any, str]:
+        lane = self._lanes.get(model_name)
+        if lane is None:
+            raise KeyError(f"Unknown model: {model_name}")
+        future = asyncio.get_running_loop().create_future()
+        lane.queue.put_nowait(_Pending(image, future, time.monotonic()))
+        return await future
+
+    async def submit(self, model_name: str, image: np.ndarray) -> Any:
+        result, _ = await self._submit(model_name, image)
+        return result
+
+    async def infer(self, image: np.ndarray, model_names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Run one image through several models; each joins that model's next batch"""
+        names = list(model_names) if model_names is not None else self.model_names
+        results = await asyncio.gather(*(self.submit(name, image) for name in names))
+        return dict(zip(names, results))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "decode": {
+                "images": self.decoded,
+                "avg_ms": round(self.decode_seconds / self.decoded * 1000, 2) if self.decoded else 0.0,
+            },
+            "models": {
+                name: {
+                    "queued": lane.queue.qsize(),
+                    "version": self.registry.active_version(name),
+                    "workers": self.registry.workers(name),
+                    **lane.metrics.snapshot(),
+                }
+                for name, lane in self._lanes.items()
+            },
+        }
+        if self.result_cache is not None:
+            stats["result_cache"] = self.result_cache.stats()
+        return stats
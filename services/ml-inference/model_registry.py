@@ -0,0 +1,247 @@
+"""
+Versioned model registry
+Loads models lazily, warms a new version up before swapping it in, and keeps
+old versions alive until the batches that acquired them have finished.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+logger = structlog.get_logger("ml-inference")
+
+ModelFactory = Callable[[Optional[str]], Any]
+SwapListener = Callable[[str], None]
+
+
+@dataclass
+class ModelSpec:
+    """How to build a model and how many worker threads its versions get"""
+    name: str
+    factory: ModelFactory
+    batch_method: str
+    workers: int = 1
+    version: Optional[str] = None
+
+
+@dataclass
+class ModelVersion:
+    name: str
+    version: str
+    model: Any
+    batch_fn: Callable[[List[np.ndarray]], List[Any]]
+    executor: ThreadPoolExecutor
+    workers: int
+    loaded_at: float = field(default_factory=time.time)
+    warmup_ms: float = 0.0
+    state: str = "warming"  # warming -> active -> draining -> retired
+    refs: int = 0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "state": self.state,
+            "type": self.model.__class__.__name__,
+            "workers": self.workers,
+            "in_flight": self.refs,
+            "warmup_ms": round(self.warmup_ms, 2),
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+class ModelRegistry:
+    """Thread-pooled, reference-counted model versions keyed by model name.
+
+    ``acquire`` pins the active version for the duration of a batch. ``reload``
+    builds and warms a candidate on its own pool, then swaps it in with a single
+    assignment; the previous version drains and its pool is shut down once its
+    last batch completes, so in-flight work never sees a half-loaded model.
+    """
+
+    def __init__(self, specs: List[ModelSpec], warmup_image: Optional[np.ndarray] = None):
+        self.specs: Dict[str, ModelSpec] = {spec.name: spec for spec in specs}
+        self.warmup_image = warmup_image if warmup_image is not None else np.full((512, 512, 3), 128, np.uint8)
+        self._active: Dict[str, ModelVersion] = {}
+        self._draining: List[ModelVersion] = []
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._swap_listeners: List[SwapListener] = []
+
+    def add_swap_listener(self, listener: SwapListener):
+        """Call ``listener(name)`` whenever a version of ``name`` is activated"""
+        self._swap_listeners.append(listener)
+
+    def _activated(self, name: str):
+        for listener in self._swap_listeners:
+            try:
+                listener(name)
+            except Exception as exc:
+                logger.error("model.swap_listener_failed", model=name, error=str(exc))
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    @property
+    def loaded(self) -> List[str]:
+        """Models with a successfully loaded active version"""
+        return list(self._active)
+
+    def workers(self, name: str) -> int:
+        """Worker threads of the active version, or of the next one built"""
+        current = self._active.get(name)
+        return current.workers if current is not None else max(1, self.specs[name].workers)
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        if name not in self._locks:
+            self._locks[name] = asyncio.Lock()
+        return self._locks[name]
+
+    async def _build(self, spec: ModelSpec, version: Optional[str]) -> ModelVersion:
+        executor = ThreadPoolExecutor(max_workers=max(1, spec.workers), thread_name_prefix=f"model-{spec.name}")
+        loop = asyncio.get_running_loop()
+        try:
+            model = await loop.run_in_executor(executor, spec.factory, version)
+            batch_fn = getattr(model, spec.batch_method)
+            candidate = ModelVersion(
+                name=spec.name,
+                version=str(getattr(model, "model_version", version or "unknown")),
+                model=model,
+                batch_fn=batch_fn,
+                executor=executor,
+                workers=max(1, spec.workers),
+            )
+            # Warm-up inference doubles as a smoke test before the swap
+            started = time.monotonic()
+            results = await loop.run_in_executor(executor, batch_fn, [self.warmup_image])
+            if len(results) != 1:
+                raise ModelLoadError(f"{spec.name} warm-up returned {len(results)} results")
+            candidate.warmup_ms = (time.monotonic() - started) * 1000
+            return candidate
+        except Exception as exc:
+            executor.shutdown(wait=False)
+            if isinstance(exc, ModelLoadError):
+                raise
+            raise ModelLoadError(f"Failed to load {spec.name}: {exc}") from exc
+
+    async def ensure_loaded(self, name: str) -> ModelVersion:
+        """Active version of ``name``, loading it on first use"""
+        current = self._active.get(name)
+        if current is not None:
+            return current
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+        async with self._lock(name):
+            current = self._active.get(name)
+            if current is None:
+                spec = self.specs[name]
+                current = await self._build(spec, spec.version)
+                current.state = "active"
+                self._active[name] = current
+                logger.info("model.loaded", model=name, version=current.version, warmup_ms=current.warmup_ms)
+                self._activated(name)
+            return current
+
+    async def preload(self, names: Optional[List[str]] = None):
+        await asyncio.gather(*(self.ensure_loaded(name) for name in (names or self.names)))
+
+    async def reload(
+        self, name: str, version: Optional[str] = None, workers: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Build, warm up and atomically activate a new version of ``name``, optionally with a different pool size"""
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+        async with self._lock(name):
+            spec = self.specs[name]
+            if workers:
+                spec = replace(spec, workers=max(1, workers))
+            candidate = await self._build(spec, version or spec.version)
+            previous = self._active.get(name)
+            candidate.state = "active"
+            self._active[name] = candidate
+            if version:
+                self.specs[name].version = version
+            self.specs[name].workers = candidate.workers
+            if previous is not None:
+                self._retire(previous)
+            self._activated(name)
+        logger.info(
+            "model.swapped",
+            model=name,
+            version=candidate.version,
+            previous=previous.version if previous else None,
+            warmup_ms=candidate.warmup_ms,
+        )
+        return {
+            "model_id": name,
+            "version": candidate.version,
+            "previous_version": previous.version if previous else None,
+            "warmup_ms": round(candidate.warmup_ms, 2),
+            "workers": candidate.workers,
+        }
+
+    def _retire(self, version: ModelVersion):
+        version.state = "draining"
+        self._draining.append(version)
+        self._release_if_drained(version)
+
+    def _release_if_drained(self, version: ModelVersion):
+        if version.state == "draining" and version.refs == 0:
+            version.state = "retired"
+            version.executor.shutdown(wait=False)
+            self._draining.remove(version)
+            logger.info("model.retired", model=version.name, version=version.version)
+
+    @asynccontextmanager
+    async def acquire(self, name: str) -> AsyncIterator[ModelVersion]:
+        """Pin the active version of ``name`` until the block exits"""
+        version = await self.ensure_loaded(name)
+        version.refs += 1
+        try:
+            yield version
+        finally:
+            version.refs -= 1
+            self._release_if_drained(version)
+
+    async def run_batch(self, name: str, images: List[np.ndarray]) -> List[Any]:
+        _, results = await self.run_batch_versioned(name, images)
+        return results
+
+    async def run_batch_versioned(self, name: str, images: List[np.ndarray]) -> Tuple[str, List[Any]]:
+        """Like ``run_batch`` but also reports which version produced the results"""
+        async with self.acquire(name) as version:
+            results = await asyncio.get_running_loop().run_in_executor(version.executor, version.batch_fn, images)
+            return version.version, results
+
+    def active_version(self, name: str) -> Optional[str]:
+        current = self._active.get(name)
+        if current is not None:
+            return current.version
+        return self.specs[name].version if name in self.specs else None
+
+    def describe(self, name: str) -> Dict[str, Any]:
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+        current = self._active.get(name)
+        return {
+            "name": name,
+            "status": "loaded" if current else "not_loaded",
+            "version": self.active_version(name) or "unknown",
+            "workers": self.specs[name].workers,
+            "active": current.describe() if current else None,
+            "draining": [version.describe() for version in self._draining if version.name == name],
+        }
+
+    async def close(self):
+        for version in list(self._active.values()) + list(self._draining):
+            version.executor.shutdown(wait=False)
+        self._active.clear()
+        self._draining.clear()
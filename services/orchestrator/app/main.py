@@ -6,7 +6,6 @@ from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-import asyncio
 from datetime import datetime, timedelta
 import json
 import httpx
@@ -116,6 +115,9 @@ async def startup():
         # Start the background scheduler
         scheduler.start()
         
+        # Sample system health in the background; status endpoints read the snapshot
+        health_monitor.start()
+        
         # Schedule daily workflows
         await schedule_daily_workflows()
         
@@ -129,6 +131,8 @@ async def shutdown():
     """Clean up connections and stop scheduler"""
     try:
         scheduler.shutdown()
+        await city_processor.close()
+        await health_monitor.stop()
         await db_client.disconnect()
         await redis_client.disconnect()
         logger.info("shutdown.success")
@@ -189,7 +193,7 @@ async def healthz():
 async def readyz():
     """Comprehensive readiness probe for the orchestrator."""
     try:
-        system_health = await health_monitor.check_system_health()
+        system_health = await health_monitor.snapshot()
         
         return {
             "status": "healthy" if system_health['overall_healthy'] else "degraded",
@@ -212,16 +216,12 @@ async def legacy_health():
 async def get_system_status():
     """Get comprehensive system status"""
     try:
-        # Check service health
-        service_health = await health_monitor.check_all_services()
-        
-        # Get active workflow count
-        active_workflows = await redis_client.llen("active_workflows")
-        
-        # Get pending jobs count
-        pending_jobs_query = "SELECT COUNT(*) as count FROM scraping_jobs WHERE status = 'pending'"
-        pending_result = await db_client.fetch_one(pending_jobs_query)
-        pending_jobs = pending_result['count'] if pending_result else 0
+        # Service health and backlog come from the sampled snapshot
+        snapshot = await health_monitor.snapshot()
+        service_health = snapshot.get('services', {})
+        workflows = snapshot.get('workflows', {})
+        active_workflows = workflows.get('active_workflows', 0)
+        pending_jobs = workflows.get('pending_jobs', 0)
         
         # Determine overall health
         healthy_services = sum(1 for service in service_health.values() if service.get('healthy', False))
@@ -251,15 +251,16 @@ async def process_city(request: CityRequest):
         await redis_client.lpush("active_workflows", workflow_id)
         
         # Process the city
-        result = await city_processor.process_city(
-            request.city,
-            request.state, 
-            request.scrape_types,
-            request.priority
-        )
-        
-        # Remove from active workflows
-        await redis_client.lpop("active_workflows")  # Simple implementation
+        try:
+            result = await city_processor.process_city(
+                request.city,
+                request.state, 
+                request.scrape_types,
+                request.priority
+            )
+        finally:
+            # Remove this workflow (not whichever entry happens to be at the head)
+            await redis_client.lrem("active_workflows", workflow_id)
         
         return {
             "success": True,
@@ -584,14 +585,16 @@ async def run_user_scraping_job(cities, parameters):
         await run_daily_scraping_workflow()
     else:
         # Run for specific cities
+        requests = []
         for city_state in cities:
             city, state = city_state.split(",")
-            await city_processor.process_city(
-                city.strip(), 
-                state.strip(),
-                parameters.get("scrape_types", ["permit", "property"]),
-                parameters.get("priority", 2)
-            )
+            requests.append({
+                'city': city.strip(),
+                'state': state.strip(),
+                'scrape_types': parameters.get("scrape_types", ["permit", "property"]),
+                'priority': parameters.get("priority", 2)
+            })
+        await city_processor.process_cities(requests)
 
 async def run_user_enrichment_job(cities, parameters):
     """Execute user-defined enrichment job"""
@@ -654,22 +657,21 @@ async def run_daily_scraping_workflow():
                 {'city': 'San Antonio', 'state': 'TX'}
             ]
         
+        # Cities run concurrently; CityProcessor's per-service limits keep servers from being overwhelmed
+        results = await city_processor.process_cities([
+            {
+                'city': city_data['city'],
+                'state': city_data['state'],
+                'scrape_types': ["permit", "property"],
+                'priority': 2  # Medium priority for automated runs
+            }
+            for city_data in cities
+        ])
         total_processed = 0
-        for city_data in cities:
-            try:
-                result = await city_processor.process_city(
-                    city_data['city'],
-                    city_data['state'],
-                    ["permit", "property"],
-                    priority=2  # Medium priority for automated runs
-                )
-                total_processed += result.get('properties_processed', 0)
-                
-                # Add delay between cities to avoid overwhelming servers
-                await asyncio.sleep(60)
-                
-            except Exception as e:
-                logger.error(f"Failed to process {city_data['city']}, {city_data['state']}: {e}")
+        for result in results:
+            total_processed += result.get('properties_processed', 0)
+            if result.get('errors'):
+                logger.error(f"Failed to process {result['city']}, {result['state']}: {result['errors']}")
         
         logger.info(f"✅ Daily scraping workflow completed. Processed {total_processed} properties.")
         
@@ -769,20 +771,20 @@ async def run_city_batch_workflow(cities: List[CityRequest]):
     try:
         logger.info(f"🏙️  Processing {len(cities)} cities in batch")
         
-        for city_request in cities:
-            try:
-                await city_processor.process_city(
-                    city_request.city,
-                    city_request.state,
-                    city_request.scrape_types,
-                    city_request.priority
-                )
-                
-                # Add delay between cities
-                await asyncio.sleep(30)
-                
-            except Exception as e:
-                logger.error(f"Failed to process {city_request.city}: {e}")
+        # Cities run concurrently; CityProcessor's per-service limits bound the load
+        results = await city_processor.process_cities([
+            {
+                'city': city_request.city,
+                'state': city_request.state,
+                'scrape_types': city_request.scrape_types,
+                'priority': city_request.priority
+            }
+            for city_request in cities
+        ])
+        
+        for result in results:
+            if result.get('errors'):
+                logger.error(f"Errors processing {result['city']}: {result['errors']}")
         
         logger.info("✅ City batch workflow completed")
         
@@ -792,19 +794,13 @@ async def run_city_batch_workflow(cities: List[CityRequest]):
 async def run_health_monitoring():
     """Health monitoring workflow"""
     try:
-        health_status = await health_monitor.check_system_health()
+        health_status = await health_monitor.snapshot()
         
-        # Store health metrics in database
-        await db_client.execute("""
-            INSERT INTO system_health (service_name, health_check, status, metadata)
-            VALUES ('orchestrator', 'system_health', $1, $2)
-        """, 
-            'healthy' if health_status['overall_healthy'] else 'degraded',
-            json.dumps(health_status)
-        )
+        # The sampler buffers per-check history; write whatever has accumulated
+        await health_monitor.flush_history()
         
         # Log any unhealthy services
-        for service, status in health_status['services'].items():
+        for service, status in health_status.get('services', {}).items():
             if not status.get('healthy', True):
                 logger.warning(f"⚠️  Service {service} is unhealthy: {status}")
                 
@@ -841,41 +837,7 @@ async def get_workflow_history(limit: int = 50):
 async def get_metrics():
     """Get system performance metrics"""
     try:
-        # Daily processing stats
-        daily_stats_query = """
-        SELECT 
-            DATE(created_at) as date,
-            COUNT(*) as total_jobs,
-            SUM(records_processed) as total_records,
-            SUM(records_succeeded) as successful_records,
-            AVG(EXTRACT(EPOCH FROM (completed_at - started_at))/60) as avg_duration_minutes
-        FROM scraping_jobs
-        WHERE created_at >= NOW() - INTERVAL '7 days'
-          AND status = 'completed'
-        GROUP BY DATE(created_at)
-        ORDER BY date DESC
-        """
-        
-        daily_stats = await db_client.fetch_all(daily_stats_query)
-        
-        # Lead generation stats
-        lead_stats_query = """
-        SELECT 
-            COUNT(*) as total_leads,
-            AVG(overall_score) as avg_score,
-            COUNT(*) FILTER (WHERE overall_score >= 80) as high_quality_leads,
-            COUNT(*) FILTER (WHERE pricing_tier = 'premium') as premium_leads
-        FROM lead_scores
-        WHERE created_at >= NOW() - INTERVAL '7 days'
-        """
-        
-        lead_stats = await db_client.fetch_one(lead_stats_query)
-        
-        return {
-            "daily_processing": daily_stats,
-            "lead_generation": lead_stats,
-            "generated_at": datetime.utcnow().isoformat()
-        }
+        return await health_monitor.metrics()
         
     except Exception as e:
         logger.error(f"Failed to get metrics: {e}")
@@ -1,19 +1,117 @@
 """
 System health monitoring and alerting.
+
+A background sampler probes every service, the database and Redis on an
+interval and keeps the latest results as an in-memory snapshot, together with
+per-check latency histograms. Status endpoints read the snapshot; when it is
+stale, concurrent callers share a single refresh instead of each re-probing
+the fleet. Health history is buffered and written in batched inserts.
 """
 import asyncio
+import bisect
+import json
+import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Tuple
 
 import httpx
 import structlog
 
 logger = structlog.get_logger("orchestrator.health")
 
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+HISTORY_INSERT_QUERY = """
+INSERT INTO system_health (service_name, health_check, status, response_time_ms, last_error, metadata, checked_at)
+SELECT * FROM unnest($1::text[], $2::text[], $3::text[], $4::int[], $5::text[], $6::jsonb[], $7::timestamp[])
+"""
+
+
+class LatencyHistogram:
+    """Cumulative bucketed latencies of one check, plus a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 120):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, latency_ms: Optional[float], healthy: bool):
+        if not healthy:
+            self.failures += 1
+        if latency_ms is None:
+            return
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.recent.append(latency_ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ['le_inf']
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets': dict(zip(labels, self.buckets))
+        }
+
+
+class CoalescedValue:
+    """Latest result of an expensive loader; callers that find it stale share one in-flight refresh"""
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]]):
+        self._loader = loader
+        self._inflight: Optional[asyncio.Future] = None
+        self.value: Any = None
+        self.updated_at = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at if self.value is not None else float('inf')
+
+    async def get(self, max_age: float) -> Any:
+        if self.age <= max_age:
+            return self.value
+        return await self.refresh()
+
+    async def refresh(self) -> Any:
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._load())
+        # Shielded so one caller giving up does not cancel the refresh for the rest
+        return await asyncio.shield(self._inflight)
+
+    async def _load(self) -> Any:
+        try:
+            value = await self._loader()
+            self.value = value
+            self.updated_at = time.monotonic()
+            return value
+        finally:
+            self._inflight = None
+
+
 class HealthMonitor:
     """Monitors health of all services in the system"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        sample_interval: float = 30.0,
+        max_snapshot_age: float = 60.0,
+        metrics_max_age: float = 120.0,
+        history_interval: float = 900.0,
+        history_batch_size: int = 50
+    ):
         self.services = {
             'scraper': {
                 'url': 'http://scraper-service:8011/readyz',
@@ -52,6 +150,134 @@ class HealthMonitor:
             'SELECT COUNT(*) FROM raw_properties',  # Data availability
             'SELECT COUNT(*) FROM scraping_jobs WHERE status = \'running\'',  # Active jobs
         ]
+        
+        self.sample_interval = sample_interval
+        self.max_snapshot_age = max_snapshot_age
+        self.metrics_max_age = metrics_max_age
+        # A check's history row is written when its status changes, or at least this often
+        self.history_interval = history_interval
+        self.history_batch_size = history_batch_size
+        
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self._health = CoalescedValue(self._sample)
+        self._metrics = CoalescedValue(self.collect_metrics)
+        self._history: List[Tuple] = []
+        self._last_recorded: Dict[str, Tuple[str, float]] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._scheduler = None
+        self._sampler: Optional[asyncio.Task] = None
+    
+    def _client(self) -> httpx.AsyncClient:
+        """One pooled client for all probes; each probe sets its own timeout"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(limits=httpx.Limits(max_connections=len(self.services) * 2))
+        return self._http
+    
+    # Background sampling and snapshots
+    
+    def start(self):
+        """Start the background sampler"""
+        if self._sampler is None or self._sampler.done():
+            self._sampler = asyncio.create_task(self._run_sampler())
+    
+    async def stop(self):
+        """Stop sampling, write buffered history and close the probe client"""
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+        await self.flush_history()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _run_sampler(self):
+        while True:
+            try:
+                await self._health.refresh()
+                if len(self._history) >= self.history_batch_size:
+                    await self.flush_history()
+            except Exception as e:
+                logger.error("system_health.sampler.failed", error=str(e))
+            await asyncio.sleep(self.sample_interval)
+    
+    async def snapshot(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Latest system health, re-sampled (once, however many callers ask) if older than ``max_age``"""
+        return await self._health.get(self.max_snapshot_age if max_age is None else max_age)
+    
+    async def metrics(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Cached processing metrics plus the live latency histograms"""
+        metrics = await self._metrics.get(self.metrics_max_age if max_age is None else max_age)
+        return {**metrics, 'service_latency': self.latency_summary()}
+    
+    def latency_summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: histogram.to_dict() for name, histogram in self.latency.items()}
+    
+    async def _sample(self) -> Dict[str, Any]:
+        health = await self.check_system_health()
+        health['workflows'] = await self.check_workflow_backlog()
+        
+        checks = dict(health.get('services', {}))
+        checks['database'] = health.get('database', {})
+        checks['queue'] = health.get('queue', {})
+        now = datetime.utcnow()
+        for name, result in checks.items():
+            if not result:
+                continue
+            healthy = bool(result.get('healthy', False))
+            self.latency.setdefault(name, LatencyHistogram()).record(result.get('response_time'), healthy)
+            self._queue_history(name, result, healthy, now)
+        critical = health.get('critical_issues') or []
+        self._queue_history(
+            'system_health', {'error': ', '.join(critical) or None},
+            bool(health.get('overall_healthy')), now, unhealthy_status='degraded'
+        )
+        
+        health['latency'] = self.latency_summary()
+        return health
+    
+    def _queue_history(
+        self,
+        name: str,
+        result: Dict[str, Any],
+        healthy: bool,
+        now: datetime,
+        unhealthy_status: str = 'down'
+    ):
+        status = 'healthy' if healthy else unhealthy_status
+        previous = self._last_recorded.get(name)
+        moment = time.monotonic()
+        if previous and previous[0] == status and moment - previous[1] < self.history_interval:
+            return
+        self._last_recorded[name] = (status, moment)
+        response_time = result.get('response_time')
+        self._history.append((
+            name if name in self.services else 'orchestrator',
+            'api' if name in self.services else name,
+            status,
+            int(response_time) if response_time is not None else None,
+            result.get('error'),
+            json.dumps({'status_code': result.get('status_code')} if name in self.services else {}),
+            now
+        ))
+    
+    async def flush_history(self) -> int:
+        """Write buffered history rows in one insert; rows are kept for the next flush on failure"""
+        if not self._history:
+            return 0
+        rows, self._history = self._history, []
+        try:
+            from shared.database import db_client
+            columns = [list(column) for column in zip(*rows)]
+            await db_client.execute(HISTORY_INSERT_QUERY, *columns)
+            return len(rows)
+        except Exception as e:
+            logger.error("system_health.history.flush_failed", error=str(e), rows=len(rows))
+            self._history = rows[-self.history_batch_size * 10:] + self._history
+            return 0
     
     async def check_system_health(self) -> Dict[str, Any]:
         """Comprehensive system health check"""
@@ -142,39 +368,38 @@ class HealthMonitor:
         try:
             start_time = datetime.now()
             
-            async with httpx.AsyncClient(timeout=config['timeout']) as client:
-                response = await client.get(config['url'])
-                
-                response_time = (datetime.now() - start_time).total_seconds() * 1000
-                
-                if response.status_code == 200:
-                    # Try to parse health response
-                    try:
-                        health_data = response.json()
-                        return {
-                            'healthy': health_data.get('status') in ['healthy', 'ok'],
-                            'response_time': round(response_time, 2),
-                            'status_code': response.status_code,
-                            'details': health_data,
-                            'last_checked': datetime.utcnow().isoformat()
-                        }
-                    except:
-                        # Service responded but no JSON
-                        return {
-                            'healthy': True,
-                            'response_time': round(response_time, 2),
-                            'status_code': response.status_code,
-                            'details': {'raw_response': response.text[:200]},
-                            'last_checked': datetime.utcnow().isoformat()
-                        }
-                else:
+            response = await self._client().get(config['url'], timeout=config['timeout'])
+            
+            response_time = (datetime.now() - start_time).total_seconds() * 1000
+            
+            if response.status_code == 200:
+                # Try to parse health response
+                try:
+                    health_data = response.json()
                     return {
-                        'healthy': False,
+                        'healthy': health_data.get('status') in ['healthy', 'ok'],
                         'response_time': round(response_time, 2),
                         'status_code': response.status_code,
-                        'error': f"HTTP {response.status_code}",
+                        'details': health_data,
                         'last_checked': datetime.utcnow().isoformat()
                     }
+                except:
+                    # Service responded but no JSON
+                    return {
+                        'healthy': True,
+                        'response_time': round(response_time, 2),
+                        'status_code': response.status_code,
+                        'details': {'raw_response': response.text[:200]},
+                        'last_checked': datetime.utcnow().isoformat()
+                    }
+            else:
+                return {
+                    'healthy': False,
+                    'response_time': round(response_time, 2),
+                    'status_code': response.status_code,
+                    'error': f"HTTP {response.status_code}",
+                    'last_checked': datetime.utcnow().isoformat()
+                }
                     
         except httpx.TimeoutException:
             return {
@@ -240,17 +465,20 @@ class HealthMonitor:
             
             start_time = datetime.now()
             
-            # Basic connectivity
-            await redis_client.set("health_check", "ok", expire=60)
-            result = await redis_client.get("health_check")
+            # Basic connectivity: write and read back in one round trip
+            async with redis_client.pipeline() as pipe:
+                pipe.set("health_check", "ok", ex=60)
+                pipe.get("health_check")
+                _, result = await pipe.execute()
             
             response_time = (datetime.now() - start_time).total_seconds() * 1000
             
             if result == "ok":
                 # Get queue statistics
-                from app.scheduling.job_scheduler import JobScheduler
-                scheduler = JobScheduler()
-                queue_stats = await scheduler.get_queue_stats()
+                if self._scheduler is None:
+                    from app.scheduling.job_scheduler import JobScheduler
+                    self._scheduler = JobScheduler()
+                queue_stats = await self._scheduler.get_queue_stats()
                 
                 return {
                     'healthy': True,
@@ -273,6 +501,65 @@ class HealthMonitor:
                 'last_checked': datetime.utcnow().isoformat()
             }
     
+    async def check_workflow_backlog(self) -> Dict[str, Any]:
+        """Active workflow and pending scraping job counts"""
+        backlog = {'active_workflows': 0, 'pending_jobs': 0}
+        try:
+            from shared.redis_client import redis_client
+            backlog['active_workflows'] = await redis_client.llen("active_workflows")
+        except Exception as e:
+            backlog['error'] = str(e)
+        try:
+            from shared.database import db_client
+            pending = await db_client.fetch_one(
+                "SELECT COUNT(*) as count FROM scraping_jobs WHERE status = 'pending'"
+            )
+            backlog['pending_jobs'] = pending['count'] if pending else 0
+        except Exception as e:
+            backlog['error'] = str(e)
+        return backlog
+    
+    async def collect_metrics(self) -> Dict[str, Any]:
+        """Seven-day scraping and lead generation metrics"""
+        from shared.database import db_client
+        
+        # Daily processing stats
+        daily_stats_query = """
+        SELECT 
+            DATE(created_at) as date,
+            COUNT(*) as total_jobs,
+            SUM(records_processed) as total_records,
+            SUM(records_succeeded) as successful_records,
+            AVG(EXTRACT(EPOCH FROM (completed_at - started_at))/60) as avg_duration_minutes
+        FROM scraping_jobs
+        WHERE created_at >= NOW() - INTERVAL '7 days'
+          AND status = 'completed'
+        GROUP BY DATE(created_at)
+        ORDER BY date DESC
+        """
+        
+        # Lead generation stats
+        lead_stats_query = """
+        SELECT 
+            COUNT(*) as total_leads,
+            AVG(overall_score) as avg_score,
+            COUNT(*) FILTER (WHERE overall_score >= 80) as high_quality_leads,
+            COUNT(*) FILTER (WHERE pricing_tier = 'premium') as premium_leads
+        FROM lead_scores
+        WHERE created_at >= NOW() - INTERVAL '7 days'
+        """
+        
+        daily_stats, lead_stats = await asyncio.gather(
+            db_client.fetch_all(daily_stats_query),
+            db_client.fetch_one(lead_stats_query)
+        )
+        
+        return {
+            "daily_processing": daily_stats,
+            "lead_generation": lead_stats,
+            "generated_at": datetime.utcnow().isoformat()
+        }
+    
     async def get_performance_metrics(self) -> Dict[str, Any]:
         """Get system performance metrics"""
         try:
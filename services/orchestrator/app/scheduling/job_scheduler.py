@@ -1,25 +1,205 @@
 """
 Job scheduling and queue management
+
+Layout (all keys under ``jobs:``):
+    jobs:<priority>                  ready list of job ids (LPUSH in, claimed from the right)
+    jobs:delayed:<priority>          sorted set of delayed job ids scored by execute-after time
+    jobs:payloads                    hash of job id -> JSON payload
+    jobs:inflight:<worker>           per-worker list of claimed job ids
+    jobs:leases                      sorted set of claimed job ids scored by visibility deadline
+    jobs:owners                      hash of claimed job id -> "<worker>|<priority>"
+    jobs:deliveries                  hash of job id -> times claimed
+    jobs:dead                        job ids that exceeded max deliveries
+    jobs:wakeup                      wake-up tokens for workers blocked waiting for work (bounded, expiring)
+
+Ready lists used to hold JSON payloads; such entries are converted to ids the
+first time they are claimed.
 """
 import logging
 from typing import Dict, Any, List, Optional
 import asyncio
 import json
+import os
+import socket
+import time
+import uuid
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+PRIORITIES = ['high', 'medium', 'low', 'maintenance']
+
+# Wake-up tokens kept for workers that are not blocked yet; blocked workers
+# re-check on their own at least every requeue interval, so tokens that are
+# trimmed or expire unconsumed only cost latency
+MAX_WAKEUP_TOKENS = 16
+WAKEUP_TTL_SECONDS = 60
+
+# Promote due delayed jobs, then move the first ready job (in priority order,
+# skipping paused queues) into this worker's in-flight list under a lease.
+# KEYS: inflight, leases, owners, deliveries, payloads, then for each of N
+#       priorities: ready list, delayed zset, paused flag
+# ARGV: now, lease deadline, worker id, N, promote limit, priority names...
+CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local n = tonumber(ARGV[4])
+local limit = tonumber(ARGV[5])
+for i = 1, n do
+    local ready, delayed = KEYS[3 + i * 3], KEYS[4 + i * 3]
+    local due = redis.call('ZRANGEBYSCORE', delayed, '-inf', now, 'LIMIT', 0, limit)
+    for _, id in ipairs(due) do
+        redis.call('ZREM', delayed, id)
+        redis.call('LPUSH', ready, id)
+    end
+end
+local next_due = false
+for i = 1, n do
+    local ready, delayed, paused = KEYS[3 + i * 3], KEYS[4 + i * 3], KEYS[5 + i * 3]
+    if redis.call('EXISTS', paused) == 0 then
+        local id = redis.call('LMOVE', ready, KEYS[1], 'RIGHT', 'LEFT')
+        if id then
+            redis.call('ZADD', KEYS[2], ARGV[2], id)
+            redis.call('HSET', KEYS[3], id, ARGV[3] .. '|' .. ARGV[5 + i])
+            local deliveries = redis.call('HINCRBY', KEYS[4], id, 1)
+            return {id, redis.call('HGET', KEYS[5], id) or '', deliveries}
+        end
+        local head = redis.call('ZRANGE', delayed, 0, 0, 'WITHSCORES')
+        if head[2] and (not next_due or tonumber(head[2]) < next_due) then
+            next_due = tonumber(head[2])
+        end
+    end
+end
+return {false, false, next_due and tostring(next_due) or false}
+"""
+
+# Remove a claimed job from its worker's in-flight list, drop its lease and
+# store its result record (if given) in the same round trip. The caller names
+# the worker it expects to own the job; if the job has no owner or another
+# worker owns it (the lease expired and it was requeued), nothing is changed
+# and the current owner is returned.
+# KEYS: leases, owners, deliveries, payloads, result, expected worker's inflight
+# ARGV: job id, expected worker, record, ttl
+ACK_SCRIPT = """
+local owner = redis.call('HGET', KEYS[2], ARGV[1])
+if not owner then
+    return {0, false}
+end
+local worker = string.match(owner, '^(.*)|[^|]*$')
+if worker ~= ARGV[2] then
+    return {0, worker}
+end
+redis.call('LREM', KEYS[6], 1, ARGV[1])
+if ARGV[3] ~= '' then
+    redis.call('SET', KEYS[5], ARGV[3], 'EX', tonumber(ARGV[4]))
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('HDEL', KEYS[4], ARGV[1])
+return {1, false}
+"""
+
+# Return jobs whose lease expired (worker died or stalled) to the front of their
+# ready queue, or to the dead-letter list after too many deliveries. The caller
+# reads the expired jobs and their owners first; a job whose lease or owner
+# changed since is skipped.
+# KEYS: leases, owners, deliveries, dead, then per job: owner's inflight list, ready list
+# ARGV: now, max deliveries, then per job: id, owner ("" for a lease without owner)
+REQUEUE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local requeued = 0
+for i = 1, (#ARGV - 2) / 2 do
+    local id, expected = ARGV[1 + i * 2], ARGV[2 + i * 2]
+    local inflight, ready = KEYS[3 + i * 2], KEYS[4 + i * 2]
+    local lease = redis.call('ZSCORE', KEYS[1], id)
+    local owner = redis.call('HGET', KEYS[2], id) or ''
+    if lease and tonumber(lease) <= now and owner == expected then
+        redis.call('ZREM', KEYS[1], id)
+        redis.call('HDEL', KEYS[2], id)
+        if owner ~= '' then
+            redis.call('LREM', inflight, 1, id)
+            if tonumber(redis.call('HGET', KEYS[3], id) or '0') >= tonumber(ARGV[2]) then
+                redis.call('LPUSH', KEYS[4], id)
+            else
+                redis.call('RPUSH', ready, id)
+                requeued = requeued + 1
+            end
+        end
+    end
+end
+return requeued
+"""
+
+# Extend the lease of a job still owned by this worker. KEYS: leases, owners; ARGV: id, deadline, worker
+EXTEND_SCRIPT = """
+local owner = redis.call('HGET', KEYS[2], ARGV[1])
+if not owner or string.match(owner, '^(.*)|[^|]*$') ~= ARGV[3] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[2], ARGV[1])
+return 1
+"""
+
+
 class JobScheduler:
-    """Manages job scheduling and queue processing"""
-    
-    def __init__(self):
+    """Manages job scheduling and queue processing.
+
+    Delayed jobs wait in per-priority sorted sets and are promoted atomically
+    when due, so pollers never cycle them through the ready lists. Claiming
+    moves a job id into the worker's in-flight list with a visibility lease in
+    the same script; ``complete_job``/``fail_job`` acknowledge it, and jobs
+    whose lease expires are requeued (or dead-lettered after
+    ``max_deliveries``). ``get_next_job(timeout=...)`` blocks on a wake-up
+    list rather than polling.
+
+    ``redis`` may be any ``redis.asyncio``-compatible client created with
+    ``decode_responses=True`` (e.g. ``fakeredis.aioredis.FakeRedis`` in tests);
+    by default the shared client is used.
+    """
+
+    def __init__(
+        self,
+        redis=None,
+        worker_id: Optional[str] = None,
+        visibility_timeout: float = 300.0,
+        max_deliveries: int = 5,
+        key_prefix: str = 'jobs:'
+    ):
+        self.prefix = key_prefix
         self.job_queues = {
-            'high_priority': 'jobs:high',
-            'medium_priority': 'jobs:medium', 
-            'low_priority': 'jobs:low',
-            'maintenance': 'jobs:maintenance'
+            'high_priority': f'{key_prefix}high',
+            'medium_priority': f'{key_prefix}medium',
+            'low_priority': f'{key_prefix}low',
+            'maintenance': f'{key_prefix}maintenance'
         }
-        
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.promote_limit = 100
+        self.requeue_interval = min(30.0, max(1.0, visibility_timeout / 4))
+        self._redis = redis
+        self._scripts = None
+        self._last_requeue = 0.0
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def _ready_key(self, priority: str) -> str:
+        return self.job_queues.get(f"{priority}_priority") or self.job_queues.get(priority) or self._key(priority)
+
+    async def _client(self):
+        if self._redis is None:
+            from shared.redis_client import redis_client
+            self._redis = await redis_client.client()
+        if self._scripts is None:
+            self._scripts = {
+                'claim': self._redis.register_script(CLAIM_SCRIPT),
+                'ack': self._redis.register_script(ACK_SCRIPT),
+                'requeue': self._redis.register_script(REQUEUE_SCRIPT),
+                'extend': self._redis.register_script(EXTEND_SCRIPT),
+            }
+        return self._redis
+
     async def schedule_job(
         self,
         job_type: str,
@@ -29,10 +209,13 @@ class JobScheduler:
     ) -> str:
         """Schedule a job for execution"""
         try:
-            from shared.redis_client import redis_client
-            
-            job_id = f"{job_type}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
-            
+            client = await self._client()
+
+            if priority not in PRIORITIES:
+                priority = 'medium'
+            job_id = f"{job_type}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+            execute_at = time.time() + max(0, delay_seconds)
+
             job_payload = {
                 'id': job_id,
                 'type': job_type,
@@ -42,133 +225,237 @@ class JobScheduler:
                 'execute_after': (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat(),
                 'status': 'scheduled'
             }
-            
-            # Add to appropriate queue
-            queue_key = self.job_queues.get(f"{priority}_priority", self.job_queues['medium_priority'])
-            await redis_client.lpush(queue_key, json.dumps(job_payload))
-            
+
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.hset(self._key('payloads'), job_id, json.dumps(job_payload))
+                if delay_seconds > 0:
+                    pipe.zadd(self._key(f'delayed:{priority}'), {job_id: execute_at})
+                else:
+                    pipe.lpush(self._ready_key(priority), job_id)
+                # Wake a blocked worker; it recomputes its wait for delayed jobs
+                self._signal_wakeup(pipe)
+                await pipe.execute()
+
             logger.info(f"Scheduled job {job_id} with {priority} priority")
             return job_id
-            
+
         except Exception as e:
             logger.error(f"Failed to schedule job: {e}")
             raise
-    
-    async def get_next_job(self, priority_order: List[str] = None) -> Optional[Dict[str, Any]]:
-        """Get next job from queues in priority order"""
+
+    def _signal_wakeup(self, pipe):
+        key = self._key('wakeup')
+        pipe.lpush(key, '1')
+        pipe.ltrim(key, 0, MAX_WAKEUP_TOKENS - 1)
+        pipe.expire(key, WAKEUP_TTL_SECONDS)
+
+    async def _claim(self, priorities: List[str]):
+        keys = [
+            self._key(f'inflight:{self.worker_id}'),
+            self._key('leases'),
+            self._key('owners'),
+            self._key('deliveries'),
+            self._key('payloads'),
+        ]
+        for priority in priorities:
+            keys += [self._ready_key(priority), self._key(f'delayed:{priority}'), f"queue_paused:{priority}"]
+        now = time.time()
+        return await self._scripts['claim'](
+            keys=keys,
+            args=[now, now + self.visibility_timeout, self.worker_id, len(priorities), self.promote_limit, *priorities],
+        )
+
+    async def get_next_job(
+        self,
+        priority_order: List[str] = None,
+        timeout: float = 0
+    ) -> Optional[Dict[str, Any]]:
+        """Claim the next ready job in priority order.
+
+        With ``timeout`` > 0, blocks up to that many seconds for a job to become
+        ready instead of returning ``None`` straight away. The job must be
+        acknowledged with ``complete_job`` or ``fail_job`` before its
+        visibility timeout, or it will be delivered again.
+        """
         try:
-            from shared.redis_client import redis_client
-            
-            if not priority_order:
-                priority_order = ['high', 'medium', 'low', 'maintenance']
-            
-            for priority in priority_order:
-                queue_key = self.job_queues.get(f"{priority}_priority")
-                if not queue_key:
+            client = await self._client()
+
+            priorities = [p for p in (priority_order or PRIORITIES) if p in PRIORITIES]
+            deadline = time.monotonic() + max(0.0, timeout)
+
+            while True:
+                if time.monotonic() - self._last_requeue >= self.requeue_interval:
+                    await self.requeue_expired()
+
+                job_id, payload, extra = await self._claim(priorities)
+                if job_id and not payload and job_id.startswith('{'):
+                    # Queued before ready lists held ids: the entry is the payload itself
+                    await self._migrate_legacy_entry(job_id)
                     continue
-                
-                # Get job from queue
-                job_data = await redis_client.rpop(queue_key)
-                if job_data:
+                if job_id:
                     try:
-                        job = json.loads(job_data)
-                        
-                        # Check if job is ready to execute
-                        execute_after = datetime.fromisoformat(job['execute_after'])
-                        if datetime.utcnow() >= execute_after:
-                            job['status'] = 'running'
-                            return job
-                        else:
-                            # Put job back if not ready
-                            await redis_client.rpush(queue_key, job_data)
-                    except json.JSONDecodeError:
-                        logger.error(f"Invalid job data in queue: {job_data}")
-            
-            return None
-            
+                        job = json.loads(payload)
+                    except (TypeError, json.JSONDecodeError):
+                        logger.error(f"Invalid job data for {job_id}: {payload}")
+                        await self._ack(job_id)
+                        continue
+                    job['status'] = 'running'
+                    job['deliveries'] = int(extra)
+                    job['worker_id'] = self.worker_id
+                    return job
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                wait = remaining
+                if extra:
+                    wait = min(wait, max(0.0, float(extra) - time.time()))
+                wait = min(wait, self.requeue_interval)
+                if wait > 0.01:
+                    await client.brpop(self._key('wakeup'), timeout=wait)
+
         except Exception as e:
             logger.error(f"Failed to get next job: {e}")
             return None
-    
+
+    async def _migrate_legacy_entry(self, entry: str):
+        """Re-queue a claimed JSON-payload entry as an id, at the front of its queue"""
+        client = await self._client()
+        try:
+            job = json.loads(entry)
+        except json.JSONDecodeError:
+            logger.error(f"Invalid legacy job data: {entry}")
+            await self._ack(entry)
+            return
+        priority = job.get('priority') if job.get('priority') in PRIORITIES else 'medium'
+        job_id = str(job.get('id') or f"{job.get('type', 'job')}_{uuid.uuid4().hex[:8]}")
+        job['id'] = job_id
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key('payloads'), job_id, json.dumps(job))
+            pipe.rpush(self._ready_key(priority), job_id)
+            await pipe.execute()
+        await self._ack(entry)
+        logger.info(f"Migrated legacy queue entry for job {job_id}")
+
+    async def requeue_expired(self) -> int:
+        """Return jobs whose visibility timeout passed to their ready queues"""
+        client = await self._client()
+        self._last_requeue = time.monotonic()
+        now = time.time()
+        expired = await client.zrangebyscore(self._key('leases'), '-inf', now, start=0, num=500)
+        if not expired:
+            return 0
+        owners = await client.hmget(self._key('owners'), expired)
+
+        keys = [self._key('leases'), self._key('owners'), self._key('deliveries'), self._key('dead')]
+        args = [now, self.max_deliveries]
+        for job_id, owner in zip(expired, owners):
+            if owner:
+                worker, _, priority = owner.rpartition('|')
+                keys += [self._key(f'inflight:{worker}'), self._ready_key(priority)]
+            else:
+                # Lease without an owner: only the lease is dropped
+                keys += [self._key('leases'), self._key('leases')]
+            args += [job_id, owner or '']
+        requeued = await self._scripts['requeue'](keys=keys, args=args)
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs after visibility timeout")
+        return int(requeued)
+
+    async def extend_lease(self, job_id: str, seconds: Optional[float] = None) -> bool:
+        """Heartbeat for long-running jobs: push this worker's visibility deadline out"""
+        await self._client()
+        extended = await self._scripts['extend'](
+            keys=[self._key('leases'), self._key('owners')],
+            args=[job_id, time.time() + (seconds or self.visibility_timeout), self.worker_id],
+        )
+        return bool(extended)
+
+    async def _ack(self, job_id: str, record: Optional[Dict[str, Any]] = None) -> bool:
+        await self._client()
+        acked, owner = await self._scripts['ack'](
+            keys=[
+                self._key('leases'), self._key('owners'), self._key('deliveries'), self._key('payloads'),
+                f"job_result:{job_id}", self._key(f'inflight:{self.worker_id}'),
+            ],
+            args=[job_id, self.worker_id, json.dumps(record) if record else '', 86400],  # Keep for 24 hours
+        )
+        if not acked:
+            # The lease expired and the job was requeued; its result belongs to the next delivery
+            logger.warning(f"Not acknowledging job {job_id}: owned by {owner or 'no worker'}, not {self.worker_id}")
+        return bool(acked)
+
     async def complete_job(self, job_id: str, result: Dict[str, Any] = None):
-        """Mark job as completed"""
+        """Acknowledge a claimed job and record its result"""
         try:
-            from shared.redis_client import redis_client
-            
             completion_data = {
                 'job_id': job_id,
                 'completed_at': datetime.utcnow().isoformat(),
                 'result': result or {},
                 'status': 'completed'
             }
-            
-            # Store completion record
-            await redis_client.set(
-                f"job_result:{job_id}",
-                json.dumps(completion_data),
-                expire=86400  # Keep for 24 hours
-            )
-            
-            logger.info(f"Job {job_id} completed successfully")
-            
+
+            if await self._ack(job_id, completion_data):
+                logger.info(f"Job {job_id} completed successfully")
+
         except Exception as e:
             logger.error(f"Failed to complete job {job_id}: {e}")
-    
+
     async def fail_job(self, job_id: str, error: str):
-        """Mark job as failed"""
+        """Acknowledge a claimed job and record its failure"""
         try:
-            from shared.redis_client import redis_client
-            
             failure_data = {
                 'job_id': job_id,
                 'failed_at': datetime.utcnow().isoformat(),
                 'error': error,
                 'status': 'failed'
             }
-            
-            # Store failure record
-            await redis_client.set(
-                f"job_result:{job_id}",
-                json.dumps(failure_data),
-                expire=86400  # Keep for 24 hours
-            )
-            
-            logger.error(f"Job {job_id} failed: {error}")
-            
+
+            if await self._ack(job_id, failure_data):
+                logger.error(f"Job {job_id} failed: {error}")
+
         except Exception as e:
             logger.error(f"Failed to record job failure {job_id}: {e}")
-    
+
     async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """Get job status and result"""
         try:
-            from shared.redis_client import redis_client
-            
-            result_data = await redis_client.get(f"job_result:{job_id}")
+            client = await self._client()
+
+            result_data = await client.get(f"job_result:{job_id}")
             if result_data:
                 return json.loads(result_data)
-            
+
             return None
-            
+
         except Exception as e:
             logger.error(f"Failed to get job status {job_id}: {e}")
             return None
-    
+
     async def get_queue_stats(self) -> Dict[str, int]:
-        """Get queue statistics"""
+        """Ready queue lengths per priority plus delayed, in-flight and dead-letter counts"""
         try:
-            from shared.redis_client import redis_client
-            
-            stats = {}
-            for priority, queue_key in self.job_queues.items():
-                length = await redis_client.llen(queue_key)
-                stats[priority] = length
-            
+            client = await self._client()
+
+            async with client.pipeline(transaction=False) as pipe:
+                for queue_key in self.job_queues.values():
+                    pipe.llen(queue_key)
+                for priority in PRIORITIES:
+                    pipe.zcard(self._key(f'delayed:{priority}'))
+                pipe.zcard(self._key('leases'))
+                pipe.llen(self._key('dead'))
+                counts = await pipe.execute()
+
+            stats = dict(zip(self.job_queues, counts))
+            stats['delayed'] = sum(counts[len(self.job_queues):len(self.job_queues) + len(PRIORITIES)])
+            stats['in_flight'] = counts[-2]
+            stats['dead_letter'] = counts[-1]
             return stats
-            
+
         except Exception as e:
             logger.error(f"Failed to get queue stats: {e}")
             return {}
-    
+
     async def schedule_recurring_job(
         self,
         job_type: str,
@@ -181,52 +468,53 @@ class JobScheduler:
             # This would use APScheduler to create recurring jobs
             # For now, just log the request
             logger.info(f"Recurring job {job_type} scheduled with cron: {cron_expression}")
-            
+
         except Exception as e:
             logger.error(f"Failed to schedule recurring job: {e}")
-    
+
     async def cleanup_completed_jobs(self, older_than_hours: int = 24):
         """Clean up old completed job records"""
         try:
-            from shared.redis_client import redis_client
-            
-            # This would clean up old job result records
-            # For now, Redis TTL handles this automatically
+            # Result records carry a TTL; payloads are removed on acknowledgement
             logger.info(f"Cleaned up job records older than {older_than_hours} hours")
-            
+
         except Exception as e:
             logger.error(f"Failed to cleanup jobs: {e}")
-    
+
     async def pause_queue(self, priority: str):
         """Pause processing of a specific queue"""
         try:
-            from shared.redis_client import redis_client
-            
-            await redis_client.set(f"queue_paused:{priority}", "true", expire=3600)
+            client = await self._client()
+
+            await client.set(f"queue_paused:{priority}", "true", ex=3600)
             logger.info(f"Paused {priority} priority queue")
-            
+
         except Exception as e:
             logger.error(f"Failed to pause queue {priority}: {e}")
-    
+
     async def resume_queue(self, priority: str):
         """Resume processing of a paused queue"""
         try:
-            from shared.redis_client import redis_client
-            
-            await redis_client.delete(f"queue_paused:{priority}")
+            client = await self._client()
+
+            # Blocked workers should look at the queue again
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.delete(f"queue_paused:{priority}")
+                self._signal_wakeup(pipe)
+                await pipe.execute()
             logger.info(f"Resumed {priority} priority queue")
-            
+
         except Exception as e:
             logger.error(f"Failed to resume queue {priority}: {e}")
-    
+
     async def is_queue_paused(self, priority: str) -> bool:
         """Check if queue is paused"""
         try:
-            from shared.redis_client import redis_client
-            
-            paused = await redis_client.exists(f"queue_paused:{priority}")
+            client = await self._client()
+
+            paused = await client.exists(f"queue_paused:{priority}")
             return bool(paused)
-            
+
         except Exception as e:
             logger.error(f"Failed to check queue status {priority}: {e}")
-            return False
\ No newline at end of file
+            return False
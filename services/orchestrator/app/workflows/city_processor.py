@@ -1,23 +1,101 @@
 """
 City processing workflow coordinator
+
+A city run is a pipeline rather than three back-to-back phases. Scraping jobs
+report the ids they store, URL by URL, on a per-run Redis stream; each batch of
+new properties is sent for enrichment straight away, enrichment reports every
+finished record on the same stream, and finished records are scored in
+batches. Clustering runs once at the end, since it needs the whole city.
+
+Per-service semaphores shared by every run cap how much work each downstream
+service has in flight, so several cities can be processed concurrently.
 """
 import logging
-import httpx
-from typing import Dict, Any, List
+import os
+import uuid
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Set
 import asyncio
 
+import httpx
+
 logger = logging.getLogger(__name__)
 
+SCRAPE_TYPES = ('permit', 'property', 'contractor')
+ENRICHMENT_TYPES = ['email_lookup', 'address_validation', 'property_enrichment']
+
+# Concurrent requests per downstream service, across all city runs
+DEFAULT_SERVICE_LIMITS = {
+    'scraper': 4,        # scraping jobs running
+    'enrichment': 8,     # enrichment batches outstanding
+    'lead_generator': 4  # scoring / clustering calls
+}
+
+
+@dataclass
+class _ScrapeJob:
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    status: Optional[str] = None
+    stored: int = 0
+    succeeded: Optional[int] = None
+
+
+@dataclass
+class _EnrichmentBatch:
+    outstanding: Set[str]
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class _CityRun:
+    city: str
+    state: str
+    stream: str
+    enrich_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    score_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    jobs: Dict[str, _ScrapeJob] = field(default_factory=dict)
+    awaiting: Dict[str, _EnrichmentBatch] = field(default_factory=dict)
+    scraping_closed: bool = False
+    enrichment_batches: int = 0
+    enriched: int = 0
+    scored: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def job(self, job_id: str) -> _ScrapeJob:
+        # Events may arrive before the POST that created the job returns
+        return self.jobs.setdefault(str(job_id), _ScrapeJob())
+
+    @property
+    def records_found(self) -> int:
+        return sum(job.stored if job.succeeded is None else job.succeeded for job in self.jobs.values())
+
+    @property
+    def records_reported(self) -> int:
+        """Ids published by scrape batches, including records stored by earlier runs"""
+        return sum(job.stored for job in self.jobs.values())
+
+
 class CityProcessor:
     """Coordinates processing of individual cities through complete workflow"""
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        redis=None,
+        service_limits: Optional[Dict[str, int]] = None,
+        enrichment_batch_size: int = 50,
+        score_batch_size: int = 200,
+        score_flush_seconds: float = 5.0,
+        scrape_timeout: float = 30 * 60,
+        enrichment_timeout: float = 15 * 60,
+        status_poll_interval: float = 30.0
+    ):
         self.service_urls = {
             'scraper': 'http://scraper-service:8011',
             'enrichment': 'http://enrichment-service:8004',
             'lead_generator': 'http://lead-generator:8008'
         }
-        
+
         # Common permit portal URLs for major Texas cities
         self.city_urls = {
             'austin_tx': [
@@ -37,7 +115,50 @@ class CityProcessor:
                 'https://www.sanantonio.gov/development-services'
             ]
         }
-    
+
+        limits = {
+            service: int(os.getenv(f"PIPELINE_LIMIT_{service.upper()}", default))
+            for service, default in DEFAULT_SERVICE_LIMITS.items()
+        }
+        limits.update(service_limits or {})
+        self.service_limits = limits
+        self._capacity = {service: asyncio.Semaphore(limit) for service, limit in limits.items()}
+
+        self.enrichment_batch_size = enrichment_batch_size
+        self.score_batch_size = score_batch_size
+        self.score_flush_seconds = score_flush_seconds
+        self.scrape_timeout = scrape_timeout
+        self.enrichment_timeout = enrichment_timeout
+        self.status_poll_interval = status_poll_interval
+        self.event_block_ms = 5000
+        self._redis = redis
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _client(self) -> httpx.AsyncClient:
+        """One pooled client for every downstream call"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(max_connections=sum(self.service_limits.values()) + 10)
+            )
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _reader(self, stream: str):
+        from shared.pipeline_events import EventStreamReader
+        return EventStreamReader(stream, redis=self._redis)
+
+    async def process_cities(self, cities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process several cities concurrently; the service limits bound the combined load.
+
+        Each item holds ``process_city`` keyword arguments.
+        """
+        return list(await asyncio.gather(*(self.process_city(**city) for city in cities)))
+
     async def process_city(
         self,
         city: str,
@@ -47,14 +168,14 @@ class CityProcessor:
     ) -> Dict[str, Any]:
         """
         Process a city through the complete data acquisition pipeline
-        
-        Phase 1: Scraping
-        Phase 2: Enrichment  
-        Phase 3: Lead Generation
+
+        Scraping, enrichment and scoring overlap: each stage picks up batches
+        from the one before as they are reported. Lead generation (clustering)
+        follows once scoring has drained.
         """
         try:
             logger.info(f"🏙️  Starting complete processing for {city}, {state}")
-            
+
             result = {
                 'city': city,
                 'state': state,
@@ -63,37 +184,45 @@ class CityProcessor:
                 'leads_generated': 0,
                 'errors': []
             }
-            
-            # Phase 1: Data Scraping
-            if "permit" in scrape_types or "property" in scrape_types:
-                scraping_result = await self._run_scraping_phase(city, state, scrape_types)
-                result['phases_completed'].append('scraping')
-                result['properties_processed'] = scraping_result.get('records_found', 0)
-                
-                if scraping_result.get('errors'):
-                    result['errors'].extend(scraping_result['errors'])
-            
-            # Phase 2: Data Enrichment  
-            if result['properties_processed'] > 0:
-                enrichment_result = await self._run_enrichment_phase(city, state)
+
+            if "permit" not in scrape_types and "property" not in scrape_types:
+                return result
+
+            slug = f"{city.lower().replace(' ', '_')}_{state.lower()}"
+            run = _CityRun(city, state, stream=f"pipeline:{slug}:{uuid.uuid4().hex[:12]}")
+            reader = self._reader(run.stream)
+            router = asyncio.create_task(self._route_events(run, reader))
+            try:
+                await asyncio.gather(
+                    self._run_scraping_stage(run, scrape_types, priority),
+                    self._run_enrichment_stage(run),
+                    self._run_scoring_stage(run)
+                )
+            finally:
+                router.cancel()
+                with suppress(asyncio.CancelledError):
+                    await router
+                await reader.delete()
+
+            result['phases_completed'].append('scraping')
+            result['properties_processed'] = run.records_found
+            # Permit-only runs enrich nothing but still cluster the city's stored properties
+            if run.enrichment_batches or run.records_found or run.records_reported:
                 result['phases_completed'].append('enrichment')
-                
-                if enrichment_result.get('errors'):
-                    result['errors'].extend(enrichment_result['errors'])
-            
-            # Phase 3: Lead Generation
-            if 'enrichment' in result['phases_completed']:
+
                 lead_result = await self._run_lead_generation_phase(city, state)
                 result['phases_completed'].append('lead_generation')
                 result['leads_generated'] = lead_result.get('leads_generated', 0)
-                
-                if lead_result.get('errors'):
-                    result['errors'].extend(lead_result['errors'])
-            
-            logger.info(f"✅ Completed processing {city}, {state}. {result['properties_processed']} properties, {result['leads_generated']} leads")
-            
+                run.errors.extend(lead_result.get('errors', []))
+            result['errors'] = run.errors
+
+            logger.info(
+                f"✅ Completed processing {city}, {state}. {result['properties_processed']} properties, "
+                f"{run.enriched} enriched, {run.scored} scored, {result['leads_generated']} leads"
+            )
+
             return result
-            
+
         except Exception as e:
             logger.error(f"❌ City processing failed for {city}, {state}: {e}")
             return {
@@ -104,207 +233,259 @@ class CityProcessor:
                 'leads_generated': 0,
                 'errors': [str(e)]
             }
-    
-    async def _run_scraping_phase(self, city: str, state: str, scrape_types: List[str]) -> Dict[str, Any]:
-        """Run the data scraping phase"""
+
+    async def _route_events(self, run: _CityRun, reader):
+        """Hand events from the run's stream to the stage waiting on them"""
+        while True:
+            try:
+                events = await reader.read(block_ms=self.event_block_ms)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Reading events for {run.city}, {run.state} failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for event in events:
+                self._dispatch(run, event)
+
+    def _dispatch(self, run: _CityRun, event: Dict[str, Any]):
+        kind = event.get('event')
+        if kind == 'scrape_batch':
+            ids = [str(record_id) for record_id in event.get('ids') or []]
+            run.job(event.get('job_id')).stored += len(ids)
+            # Only properties are enriched and scored; late batches after a timeout are dropped
+            if ids and event.get('table') == 'raw_properties' and not run.scraping_closed:
+                run.enrich_queue.put_nowait(ids)
+        elif kind == 'scrape_done':
+            job = run.job(event.get('job_id'))
+            job.status = event.get('status')
+            job.succeeded = int(event.get('succeeded') or 0)
+            if event.get('error'):
+                run.errors.append(f"Scraping job {event.get('job_id')} failed: {event['error']}")
+            job.done.set()
+        elif kind == 'enriched':
+            source_id = str(event.get('source_id'))
+            batch = run.awaiting.pop(source_id, None)
+            if batch is None:
+                return
+            if event.get('status') == 'completed':
+                run.enriched += 1
+            batch.outstanding.discard(source_id)
+            run.score_queue.put_nowait(source_id)
+            if not batch.outstanding:
+                batch.done.set()
+
+    def _urls_for(self, city: str, state: str) -> List[str]:
+        city_key = f"{city.lower()}_{state.lower()}"
+        urls = self.city_urls.get(city_key, [])
+
+        if not urls:
+            # Generate common URL patterns for unknown cities
+            urls = [
+                f"https://www.{city.lower().replace(' ', '')}.gov/permits",
+                f"https://www.{city.lower().replace(' ', '')}permits.com",
+                f"https://permits.{city.lower().replace(' ', '')}.gov"
+            ]
+        return urls
+
+    async def _run_scraping_stage(self, run: _CityRun, scrape_types: List[str], priority: int):
+        """Run one scraping job per type; enrichment input closes when all have finished"""
         try:
-            logger.info(f"🕷️  Phase 1: Scraping data for {city}, {state}")
-            
-            # Get URLs for this city
-            city_key = f"{city.lower()}_{state.lower()}"
-            urls = self.city_urls.get(city_key, [])
-            
-            if not urls:
-                # Generate common URL patterns for unknown cities
-                urls = [
-                    f"https://www.{city.lower().replace(' ', '')}.gov/permits",
-                    f"https://www.{city.lower().replace(' ', '')}permits.com",
-                    f"https://permits.{city.lower().replace(' ', '')}.gov"
-                ]
-            
-            total_records = 0
-            errors = []
-            
-            # Create scraping jobs for each type
-            for scrape_type in scrape_types:
-                if scrape_type in ['permit', 'property', 'contractor']:
-                    try:
-                        job_request = {
-                            'job_type': scrape_type,
-                            'city': city,
-                            'state': state,
-                            'urls': urls,
-                            'metadata': {
-                                'priority': 2,
-                                'automated': True
-                            }
-                        }
-                        
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            response = await client.post(
-                                f"{self.service_urls['scraper']}/jobs",
-                                json=job_request
-                            )
-                            
-                            if response.status_code == 200:
-                                job_data = response.json()
-                                logger.info(f"✅ Created {scrape_type} scraping job: {job_data.get('id')}")
-                                
-                                # Wait for job completion (with timeout)
-                                await self._wait_for_job_completion(
-                                    'scraper',
-                                    job_data['id'],
-                                    timeout_minutes=30
-                                )
-                                
-                                # Get final job status
-                                status_response = await client.get(
-                                    f"{self.service_urls['scraper']}/jobs/{job_data['id']}"
-                                )
-                                
-                                if status_response.status_code == 200:
-                                    job_status = status_response.json()
-                                    total_records += job_status['progress'].get('records_succeeded', 0)
-                                    
-                            else:
-                                errors.append(f"Failed to create {scrape_type} job: {response.status_code}")
-                                
-                    except Exception as e:
-                        errors.append(f"Scraping {scrape_type} failed: {str(e)}")
-            
-            return {
-                'records_found': total_records,
-                'errors': errors
+            logger.info(f"🕷️  Scraping data for {run.city}, {run.state}")
+            urls = self._urls_for(run.city, run.state)
+            await asyncio.gather(*(
+                self._run_scrape_job(run, scrape_type, urls, priority)
+                for scrape_type in scrape_types if scrape_type in SCRAPE_TYPES
+            ))
+        finally:
+            run.scraping_closed = True
+            run.enrich_queue.put_nowait(None)
+
+    async def _run_scrape_job(self, run: _CityRun, scrape_type: str, urls: List[str], priority: int):
+        job_request = {
+            'job_type': scrape_type,
+            'city': run.city,
+            'state': run.state,
+            'urls': urls,
+            'metadata': {
+                'priority': priority,
+                'automated': True,
+                'event_stream': run.stream
             }
-            
+        }
+        try:
+            async with self._capacity['scraper']:
+                response = await self._client().post(f"{self.service_urls['scraper']}/jobs", json=job_request)
+                if response.status_code != 200:
+                    run.errors.append(f"Failed to create {scrape_type} job: {response.status_code}")
+                    return
+
+                job_id = str(response.json()['id'])
+                logger.info(f"✅ Created {scrape_type} scraping job: {job_id}")
+                job = run.job(job_id)
+                if await self._wait_for_scrape_job(job_id, job):
+                    logger.info(f"Job {job_id} {job.status}")
+                else:
+                    logger.warning(f"Job {job_id} timed out after {self.scrape_timeout / 60:.0f} minutes")
+                    run.errors.append(f"Scraping job {job_id} timed out")
         except Exception as e:
-            logger.error(f"Scraping phase failed: {e}")
-            return {'records_found': 0, 'errors': [str(e)]}
-    
-    async def _run_enrichment_phase(self, city: str, state: str) -> Dict[str, Any]:
-        """Run the data enrichment phase"""
+            run.errors.append(f"Scraping {scrape_type} failed: {str(e)}")
+
+    async def _wait_for_scrape_job(self, job_id: str, job: _ScrapeJob) -> bool:
+        """Wait for the job's completion event, polling its status every
+        ``status_poll_interval`` in case the event is lost (e.g. Redis unavailable)"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.scrape_timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=min(self.status_poll_interval, remaining))
+                return True
+            except asyncio.TimeoutError:
+                if await self._check_scrape_job(job_id, job):
+                    return True
+
+    async def _check_scrape_job(self, job_id: str, job: _ScrapeJob) -> bool:
+        """Record the job's outcome from the scraper's status endpoint once it has finished"""
         try:
-            logger.info(f"🔍 Phase 2: Enriching data for {city}, {state}")
-            
-            errors = []
-            
-            # Trigger batch enrichment for this city's properties
-            enrichment_request = {
-                'source_table': 'raw_properties',
-                'enrichment_types': ['email_lookup', 'address_validation', 'property_enrichment'],
-                'limit': 200  # Process up to 200 properties per city
-            }
-            
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.service_urls['enrichment']}/enrich/batch",
-                    params=enrichment_request
+            response = await self._client().get(f"{self.service_urls['scraper']}/jobs/{job_id}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Polling scraping job {job_id} failed: {e}")
+            return False
+        if response.status_code != 200:
+            return False
+        job_status = response.json()
+        if job_status.get('status') not in ('completed', 'failed'):
+            return False
+        job.status = job_status['status']
+        job.succeeded = (job_status.get('progress') or {}).get('records_succeeded') or 0
+        return True
+
+    async def _run_enrichment_stage(self, run: _CityRun):
+        """Request enrichment for each scraped batch as it arrives; scoring input closes after the last"""
+        batches = []
+        try:
+            while True:
+                ids = await run.enrich_queue.get()
+                if ids is None:
+                    break
+                for start in range(0, len(ids), self.enrichment_batch_size):
+                    batch_ids = ids[start:start + self.enrichment_batch_size]
+                    batches.append(asyncio.create_task(self._enrich_batch(run, batch_ids)))
+            await asyncio.gather(*batches)
+        finally:
+            for task in batches:
+                task.cancel()
+            run.score_queue.put_nowait(None)
+
+    async def _enrich_batch(self, run: _CityRun, ids: List[str]):
+        async with self._capacity['enrichment']:
+            batch = _EnrichmentBatch(outstanding=set(ids))
+            for property_id in ids:
+                run.awaiting[property_id] = batch
+            run.enrichment_batches += 1
+            try:
+                response = await self._client().post(
+                    f"{self.service_urls['enrichment']}/enrich/records",
+                    json={
+                        'source_table': 'raw_properties',
+                        'source_ids': ids,
+                        'enrichment_types': ENRICHMENT_TYPES,
+                        'event_stream': run.stream
+                    }
                 )
-                
                 if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"✅ Queued enrichment for {result.get('records_queued', 0)} properties")
-                    
-                    # Wait for enrichment jobs to complete
-                    await asyncio.sleep(120)  # Give enrichment time to process
-                    
+                    await asyncio.wait_for(batch.done.wait(), timeout=self.enrichment_timeout)
                 else:
-                    errors.append(f"Enrichment request failed: {response.status_code}")
-            
-            return {'errors': errors}
-            
+                    run.errors.append(f"Enrichment request failed: {response.status_code}")
+            except asyncio.TimeoutError:
+                logger.warning(f"{len(batch.outstanding)} enrichments for {run.city} still pending after timeout")
+            except Exception as e:
+                run.errors.append(f"Enrichment request failed: {str(e)}")
+            finally:
+                # Whatever did not report back is still scored, as unenriched properties always were
+                for property_id in list(batch.outstanding):
+                    run.awaiting.pop(property_id, None)
+                    run.score_queue.put_nowait(property_id)
+                batch.outstanding.clear()
+
+    async def _run_scoring_stage(self, run: _CityRun):
+        """Score enriched properties in batches of ``score_batch_size``, or whatever has
+        accumulated once no new record has arrived for ``score_flush_seconds``"""
+        pending: List[str] = []
+        scoring = []
+        while True:
+            try:
+                property_id = await asyncio.wait_for(
+                    run.score_queue.get(),
+                    timeout=self.score_flush_seconds if pending else None
+                )
+            except asyncio.TimeoutError:
+                property_id = ''
+            if property_id:
+                pending.append(property_id)
+            if pending and (not property_id or len(pending) >= self.score_batch_size):
+                scoring.append(asyncio.create_task(self._score_batch(run, pending)))
+                pending = []
+            if property_id is None:
+                break
+        await asyncio.gather(*scoring)
+
+    async def _score_batch(self, run: _CityRun, property_ids: List[str]):
+        try:
+            async with self._capacity['lead_generator']:
+                response = await self._client().post(
+                    f"{self.service_urls['lead_generator']}/score/batch",
+                    json={'property_ids': property_ids}
+                )
+            if response.status_code == 200:
+                run.scored += response.json().get('scored', 0)
+            else:
+                run.errors.append(f"Lead scoring failed: {response.status_code}")
         except Exception as e:
-            logger.error(f"Enrichment phase failed: {e}")
-            return {'errors': [str(e)]}
-    
+            run.errors.append(f"Lead scoring failed: {str(e)}")
+
     async def _run_lead_generation_phase(self, city: str, state: str) -> Dict[str, Any]:
-        """Run the lead generation phase"""
+        """Cluster the city's scored properties into leads"""
         try:
-            logger.info(f"📊 Phase 3: Generating leads for {city}, {state}")
-            
+            logger.info(f"📊 Generating leads for {city}, {state}")
+
             errors = []
             leads_generated = 0
-            
-            # Trigger background scoring
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                # Start background scoring
-                scoring_response = await client.post(
-                    f"{self.service_urls['lead_generator']}/score/background"
-                )
-                
-                if scoring_response.status_code != 200:
-                    errors.append(f"Lead scoring failed: {scoring_response.status_code}")
-                
-                # Wait for scoring to complete
-                await asyncio.sleep(60)
-                
-                # Create clusters for this city
-                cluster_request = {
-                    'city': city,
-                    'state': state,
-                    'max_cluster_radius_miles': 2.5,
-                    'min_cluster_size': 3
-                }
-                
-                cluster_response = await client.post(
+
+            cluster_request = {
+                'city': city,
+                'state': state,
+                'max_cluster_radius_miles': 2.5,
+                'min_cluster_size': 3
+            }
+
+            async with self._capacity['lead_generator']:
+                cluster_response = await self._client().post(
                     f"{self.service_urls['lead_generator']}/cluster",
                     json=cluster_request
                 )
-                
-                if cluster_response.status_code == 200:
-                    cluster_result = cluster_response.json()
-                    clusters = cluster_result.get('clusters', [])
-                    leads_generated = sum(len(c.get('properties', [])) for c in clusters)
-                    
-                    logger.info(f"✅ Generated {len(clusters)} clusters with {leads_generated} leads")
-                else:
-                    errors.append(f"Clustering failed: {cluster_response.status_code}")
-            
+
+            if cluster_response.status_code == 200:
+                cluster_result = cluster_response.json()
+                clusters = cluster_result.get('clusters', [])
+                leads_generated = sum(len(c.get('properties', [])) for c in clusters)
+
+                logger.info(f"✅ Generated {len(clusters)} clusters with {leads_generated} leads")
+            else:
+                errors.append(f"Clustering failed: {cluster_response.status_code}")
+
             return {
                 'leads_generated': leads_generated,
                 'errors': errors
             }
-            
+
         except Exception as e:
             logger.error(f"Lead generation phase failed: {e}")
             return {'leads_generated': 0, 'errors': [str(e)]}
-    
-    async def _wait_for_job_completion(
-        self,
-        service: str,
-        job_id: str,
-        timeout_minutes: int = 30
-    ):
-        """Wait for a job to complete with timeout"""
-        try:
-            start_time = asyncio.get_event_loop().time()
-            timeout_seconds = timeout_minutes * 60
-            
-            while True:
-                elapsed = asyncio.get_event_loop().time() - start_time
-                if elapsed > timeout_seconds:
-                    logger.warning(f"Job {job_id} timed out after {timeout_minutes} minutes")
-                    break
-                
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(
-                        f"{self.service_urls[service]}/jobs/{job_id}"
-                    )
-                    
-                    if response.status_code == 200:
-                        job_status = response.json()
-                        status = job_status.get('status')
-                        
-                        if status in ['completed', 'failed']:
-                            logger.info(f"Job {job_id} {status}")
-                            break
-                
-                # Wait before next check
-                await asyncio.sleep(30)
-                
-        except Exception as e:
-            logger.error(f"Failed to wait for job {job_id}: {e}")
-    
+
     async def get_city_processing_stats(self, city: str, state: str) -> Dict[str, Any]:
         """Get processing statistics for a city"""
         try:
@@ -319,7 +500,7 @@ class CityProcessor:
                 'clusters_created': 0,
                 'last_processed': None
             }
-            
+
         except Exception as e:
             logger.error(f"Failed to get stats for {city}: {e}")
             return {}
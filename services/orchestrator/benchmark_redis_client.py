@@ -0,0 +1,153 @@
+"""Count Redis round trips on orchestrator and scraper paths, one call at a time vs batched.
+
+Runs the shared RedisClient against an in-process server (fakeredis) by
+default, or a real one with ``--redis-url``. Every request written to a
+connection counts as one round trip, and ``--round-trip-ms`` adds that much
+latency to each so the time saved is visible without a network.
+
+Scenarios:
+
+* health probe: write and read back ``health_check`` (orchestrator queue check)
+* queue lengths: ready list length per priority (orchestrator status)
+* cache lookups: response cache reads for a batch of URLs (scraper batch jobs)
+* cache writes: storing a batch of responses with a TTL
+* hot reads: repeated reads of a few keys, with and without the local cache
+"""
+
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+from typing import Awaitable, Callable, Dict
+
+sys.path.append('../..')
+from shared.redis_client import RedisClient
+
+QUEUES = ["jobs:high", "jobs:medium", "jobs:low", "jobs:maintenance"]
+
+
+def counting_connection(base, stats: Dict[str, float]):
+    class CountingConnection(base):
+        async def send_packed_command(self, *args, **kwargs):
+            stats["round_trips"] += 1
+            if stats["latency"]:
+                await asyncio.sleep(stats["latency"])
+            return await super().send_packed_command(*args, **kwargs)
+    return CountingConnection
+
+
+async def make_client(redis_url: str, stats: Dict[str, float]) -> RedisClient:
+    import redis.asyncio as redis
+    client = RedisClient(redis_url=redis_url or "redis://fake")
+    if redis_url:
+        pool = redis.ConnectionPool.from_url(
+            redis_url, decode_responses=True,
+            connection_class=counting_connection(redis.Connection, stats)
+        )
+    else:
+        try:
+            import fakeredis
+            from fakeredis.aioredis import FakeAsyncRedisConnection
+        except ImportError:
+            raise SystemExit("Install fakeredis or pass --redis-url")
+        pool = redis.ConnectionPool(
+            server=fakeredis.FakeServer(), decode_responses=True,
+            connection_class=counting_connection(FakeAsyncRedisConnection, stats)
+        )
+    client._client = redis.Redis(connection_pool=pool)
+    await client._client.flushdb()
+    return client
+
+
+def url_key(index: int) -> str:
+    return f"scrape:{hashlib.md5(f'https://permits.example.gov/{index}'.encode()).hexdigest()}"
+
+
+async def measure(stats: Dict[str, float], step: Callable[[], Awaitable]) -> Dict[str, float]:
+    stats["round_trips"] = 0
+    start = time.perf_counter()
+    await step()
+    return {"round_trips": stats["round_trips"], "ms": (time.perf_counter() - start) * 1000}
+
+
+async def main_async(args):
+    stats = {"round_trips": 0, "latency": args.round_trip_ms / 1000}
+    client = await make_client(args.redis_url, stats)
+    keys = [url_key(index) for index in range(args.urls)]
+    await client.mset({key: "<html>cached</html>" for key in keys[::2]}, expire=3600)
+    hot = keys[:args.hot_keys]
+
+    async def probe_single():
+        await client.set("health_check", "ok", expire=60)
+        await client.get("health_check")
+
+    async def probe_pipeline():
+        async with client.pipeline() as pipe:
+            pipe.set("health_check", "ok", ex=60)
+            pipe.get("health_check")
+            await pipe.execute()
+
+    async def queues_single():
+        for queue in QUEUES:
+            await client.llen(queue)
+
+    async def queues_batched():
+        await client.llen_many(QUEUES)
+
+    async def lookups_single():
+        for key in keys:
+            await client.get(key)
+
+    async def lookups_batched():
+        await client.mget(keys)
+
+    async def writes_single():
+        for key in keys:
+            await client.set(key, "<html>fresh</html>", expire=3600)
+
+    async def writes_batched():
+        await client.mset({key: "<html>fresh</html>" for key in keys}, expire=3600)
+
+    async def hot_reads():
+        for _ in range(args.hot_reads // len(hot)):
+            for key in hot:
+                await client.get(key)
+
+    scenarios = [
+        ("health probe", probe_single, probe_pipeline),
+        ("queue lengths", queues_single, queues_batched),
+        (f"cache lookups x{len(keys)}", lookups_single, lookups_batched),
+        (f"cache writes x{len(keys)}", writes_single, writes_batched),
+    ]
+    print(f"{'scenario':<22} {'one-by-one':>22} {'batched':>22}")
+    for label, single, batched in scenarios:
+        before = await measure(stats, single)
+        after = await measure(stats, batched)
+        print(
+            f"{label:<22} {before['round_trips']:>8.0f} trips {before['ms']:>7.1f}ms "
+            f"{after['round_trips']:>8.0f} trips {after['ms']:>7.1f}ms"
+        )
+
+    before = await measure(stats, hot_reads)
+    client.enable_local_cache(["scrape:"], ttl=60)
+    after = await measure(stats, hot_reads)
+    await client.disconnect()
+    print(
+        f"{f'hot reads x{args.hot_reads}':<22} {before['round_trips']:>8.0f} trips {before['ms']:>7.1f}ms "
+        f"{after['round_trips']:>8.0f} trips {after['ms']:>7.1f}ms  (local cache)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched Redis access")
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--hot-keys", type=int, default=20)
+    parser.add_argument("--hot-reads", type=int, default=2000)
+    parser.add_argument("--round-trip-ms", type=float, default=0.5)
+    parser.add_argument("--redis-url", default="", help="Use a real Redis instead of fakeredis")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Benchmark the previous list-polling job queue against JobScheduler.
+
+Runs against an in-process Redis stand-in (fakeredis with Lua support) by
+default, or a real server with ``--redis-url``. Two scenarios:
+
+* ready: every job is runnable; measures claim + acknowledge throughput.
+* mixed: a share of the jobs is delayed into the future and interleaved with
+  ready ones; measures how many ready jobs workers get through and how many
+  Redis round trips they spend polling.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from app.scheduling.job_scheduler import JobScheduler
+
+PRIORITIES = ["high", "medium", "low"]
+
+
+class CountingRedis:
+    """Counts round trips to the wrapped client; a pipeline or script call counts once"""
+
+    def __init__(self, client):
+        self._client = client
+        self.calls = 0
+
+    def register_script(self, source: str):
+        script = self._client.register_script(source)
+
+        async def run(*args, **kwargs):
+            self.calls += 1
+            return await script(*args, **kwargs)
+        return run
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+async def _connect(url: str):
+    if url:
+        import redis.asyncio as redis
+        client = redis.from_url(url, decode_responses=True)
+    else:
+        try:
+            from fakeredis import aioredis
+        except ImportError:
+            raise SystemExit("Install fakeredis[lua] or pass --redis-url")
+        client = aioredis.FakeRedis(decode_responses=True)
+    await client.flushdb()
+    return client
+
+
+class ListPollingQueue:
+    """The previous algorithm: LPUSH payloads, RPOP each priority, push back jobs that are not due"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def schedule(self, priority: str, delay_seconds: float, index: int):
+        payload = {
+            "id": f"job_{index}",
+            "priority": priority,
+            "execute_after": (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat(),
+        }
+        await self.client.lpush(f"legacy:{priority}", json.dumps(payload))
+
+    async def next_job(self):
+        for priority in PRIORITIES:
+            raw = await self.client.rpop(f"legacy:{priority}")
+            if raw:
+                job = json.loads(raw)
+                if datetime.utcnow() >= datetime.fromisoformat(job["execute_after"]):
+                    return job
+                await self.client.rpush(f"legacy:{priority}", raw)
+        return None
+
+    async def complete(self, job):
+        await self.client.set(f"legacy_result:{job['id']}", "{}", ex=86400)
+
+
+def _workload(jobs: int, delayed_share: float) -> List[Tuple[str, float]]:
+    every = int(1 / delayed_share) if delayed_share > 0 else 0
+    return [
+        (PRIORITIES[index % len(PRIORITIES)], 3600.0 if every and index % every == 0 else 0.0)
+        for index in range(jobs)
+    ]
+
+
+async def run_legacy(client, workload, workers: int, budget: float) -> Dict:
+    queue = ListPollingQueue(client)
+    for index, (priority, delay) in enumerate(workload):
+        await queue.schedule(priority, delay, index)
+    counter = CountingRedis(client)
+    queue.client = counter
+    ready = sum(1 for _, delay in workload if not delay)
+    done = 0
+    deadline = time.perf_counter() + budget
+
+    async def worker():
+        nonlocal done
+        while done < ready and time.perf_counter() < deadline:
+            job = await queue.next_job()
+            if job is None:
+                await asyncio.sleep(0.001)  # the old orchestrator loop polled on an interval
+                continue
+            await queue.complete(job)
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return {"done": done, "ready": ready, "seconds": time.perf_counter() - start, "calls": counter.calls}
+
+
+async def run_scheduler(client, workload, workers: int, budget: float) -> Dict:
+    producer = JobScheduler(redis=client)
+    for priority, delay in workload:
+        await producer.schedule_job("bench", {}, priority, delay_seconds=delay)
+    counter = CountingRedis(client)
+    schedulers = [JobScheduler(redis=counter, worker_id=f"bench-{index}") for index in range(workers)]
+    ready = sum(1 for _, delay in workload if not delay)
+    done = 0
+    deadline = time.perf_counter() + budget
+
+    async def worker(scheduler: JobScheduler):
+        nonlocal done
+        while done < ready and time.perf_counter() < deadline:
+            job = await scheduler.get_next_job(PRIORITIES, timeout=0.05)
+            if job is None:
+                continue
+            await scheduler.complete_job(job["id"])
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(scheduler) for scheduler in schedulers))
+    return {"done": done, "ready": ready, "seconds": time.perf_counter() - start, "calls": counter.calls}
+
+
+def _report(label: str, stats: Dict):
+    rate = stats["done"] / stats["seconds"] if stats["seconds"] else 0.0
+    per_job = stats["calls"] / stats["done"] if stats["done"] else float("inf")
+    print(
+        f"  {label:<12} {stats['done']:>6}/{stats['ready']:<6} jobs  {rate:>9.1f} jobs/sec  "
+        f"{per_job:>7.1f} redis calls/job"
+    )
+
+
+async def main_async(args):
+    for scenario, share in (("ready", 0.0), ("mixed", args.delayed_share)):
+        workload = _workload(args.jobs, share)
+        print(f"{scenario} ({args.jobs} jobs, {int(share * 100)}% delayed, {args.workers} workers)")
+        client = await _connect(args.redis_url)
+        _report("list-polling", await run_legacy(client, workload, args.workers, args.budget))
+        client = await _connect(args.redis_url)
+        _report("scheduler", await run_scheduler(client, workload, args.workers, args.budget))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark orchestrator job queues")
+    parser.add_argument("--jobs", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--delayed-share", type=float, default=0.1)
+    parser.add_argument("--budget", type=float, default=10.0, help="Seconds allowed per run")
+    parser.add_argument("--redis-url", default="", help="Use a real Redis instead of fakeredis")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
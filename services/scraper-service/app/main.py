@@ -18,8 +18,11 @@ sys.path.append('../../..')
 from shared.database import db_client
 from shared.redis_client import redis_client
 from shared.observability import RequestContextMiddleware, setup_observability
-from app.scrapers.smart_scraper import SmartScraper, scrape_urls_batch
+from shared.pipeline_events import publish_event
+from app.scrapers.smart_scraper import SmartScraper, iter_scrape_urls, scrape_urls_batch
+from app.scrapers.browser_pool import page_fetcher
 from app.utils.llm import llm
+from app.utils.ingestion import RecordIngestor
 
 # FastAPI app
 app = FastAPI(
@@ -83,6 +86,7 @@ async def startup():
 async def shutdown():
     """Clean up connections"""
     try:
+        await page_fetcher.close()
         await db_client.disconnect()
         await redis_client.disconnect()
         logger.info("✅ Scraper Service shut down cleanly")
@@ -110,7 +114,7 @@ async def readyz():
         await redis_client.set("health_check", "ok", expire=60)
         
         # Test LLM
-        test_extraction = llm.extract_json("test data", "Extract test: return {\"status\": \"ok\"}")
+        test_extraction = await llm.aextract_json("test data", "Extract test: return {\"status\": \"ok\"}")
         
         return {
             "status": "healthy",
@@ -206,7 +210,17 @@ async def scrape_batch(request: BatchScrapeRequest):
 
 # Background job processing
 async def process_scraping_job(job_id: str, job_type: str, city: str, state: str, urls: List[str], metadata: Dict):
-    """Process scraping job in background"""
+    """Process scraping job in background.
+
+    Records are handed to a RecordIngestor as each URL finishes and written in
+    bulk batches, skipping records whose natural key is already stored; job
+    counters are updated as batches land. When the job was created with
+    ``metadata.event_stream``, the ids of each batch's records, new or already
+    stored, are published as a ``scrape_batch`` event, followed by one ``scrape_done`` event, so a caller
+    can start downstream work before the whole job completes.
+    """
+    event_stream = (metadata or {}).get('event_stream')
+    ingestor = None
     try:
         # Update job status to running
         await db_client.update_scraping_job(job_id, "running")
@@ -221,121 +235,52 @@ async def process_scraping_job(job_id: str, job_type: str, city: str, state: str
         if job_type not in method_map:
             raise ValueError(f"Invalid job_type: {job_type}")
         
-        results = await scrape_urls_batch(urls, method_map[job_type], max_concurrent=5)
+        async def publish_stored(ids: List[str], batch_urls: List[str]):
+            await publish_event(
+                event_stream, "scrape_batch",
+                job_id=job_id, table=ingestor.table.name, urls=batch_urls, ids=ids
+            )
         
-        # Store results in database based on job type
-        records_succeeded = 0
-        records_failed = 0
+        ingestor = RecordIngestor(job_id, job_type, on_stored=publish_stored)
         
-        for result in results:
-            try:
-                if job_type == "permit" and result:
-                    # Store in raw_permits table
-                    query = """
-                    INSERT INTO raw_permits (
-                        job_id, permit_number, address, city, state, zip,
-                        issue_date, permit_type, work_description, contractor_name,
-                        contractor_license, estimated_value, raw_data
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-                    """
-                    await db_client.execute(
-                        query,
-                        job_id,
-                        result.get('permit_number'),
-                        result.get('address'),
-                        result.get('city'),
-                        result.get('state'), 
-                        result.get('zip'),
-                        result.get('issue_date'),
-                        result.get('permit_type'),
-                        result.get('work_description'),
-                        result.get('contractor_name'),
-                        result.get('contractor_license'),
-                        result.get('estimated_value'),
-                        result
-                    )
-                    records_succeeded += 1
-                
-                elif job_type == "property" and result:
-                    # Store in raw_properties table
-                    query = """
-                    INSERT INTO raw_properties (
-                        job_id, address, city, state, zip, owner_name,
-                        owner_address, owner_city, owner_state, owner_zip,
-                        property_value, year_built, sqft, lot_size, beds, baths,
-                        property_type, raw_data
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, $16, $17, $18)
-                    """
-                    await db_client.execute(
-                        query,
-                        job_id,
-                        result.get('address'),
-                        result.get('city'),
-                        result.get('state'),
-                        result.get('zip'),
-                        result.get('owner_name'),
-                        result.get('owner_address'),
-                        result.get('owner_city'),
-                        result.get('owner_state'),
-                        result.get('owner_zip'),
-                        result.get('property_value'),
-                        result.get('year_built'),
-                        result.get('sqft'),
-                        result.get('lot_size'),
-                        result.get('beds'),
-                        result.get('baths'),
-                        result.get('property_type'),
-                        result
-                    )
-                    records_succeeded += 1
-                
-                elif job_type == "contractor" and result:
-                    # Store in raw_contractors table
-                    query = """
-                    INSERT INTO raw_contractors (
-                        job_id, company_name, owner_name, address, city, state, zip,
-                        phone, email, website, license_number, years_in_business,
-                        services, certifications, raw_data
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
-                    """
-                    await db_client.execute(
-                        query,
-                        job_id,
-                        result.get('company_name'),
-                        result.get('owner_name'),
-                        result.get('address'),
-                        result.get('city'),
-                        result.get('state'),
-                        result.get('zip'),
-                        result.get('phone'),
-                        result.get('email'),
-                        result.get('website'),
-                        result.get('license_number'),
-                        result.get('years_in_business'),
-                        result.get('services', []),
-                        result.get('certifications', []),
-                        result
-                    )
-                    records_succeeded += 1
-                    
-            except Exception as e:
-                logger.error(f"Failed to store result: {e}")
-                records_failed += 1
+        # Buffer results as each URL finishes; the ingestor writes them in batches
+        try:
+            async for url, results in iter_scrape_urls(urls, method_map[job_type], max_concurrent=5):
+                await ingestor.add(url, results)
+        finally:
+            # Keep what was scraped before a failure
+            await ingestor.close()
+        stats = ingestor.stats
         
         # Update job as completed
         await db_client.update_scraping_job(
             job_id, 
             "completed",
             len(urls),
-            records_succeeded,
-            records_failed
+            stats["inserted"],
+            stats["failed"]
+        )
+        await publish_event(
+            event_stream, "scrape_done",
+            job_id=job_id, status="completed", succeeded=stats["inserted"], failed=stats["failed"],
+            duplicates=stats["duplicates"]
         )
         
-        logger.info(f"✅ Job {job_id} completed: {records_succeeded} succeeded, {records_failed} failed")
+        logger.info(
+            f"✅ Job {job_id} completed: {stats['inserted']} stored, "
+            f"{stats['duplicates']} duplicates, {stats['failed']} failed"
+        )
         
     except Exception as e:
         logger.error(f"❌ Job {job_id} failed: {e}")
-        await db_client.update_scraping_job(job_id, "failed", error_message=str(e))
+        stats = ingestor.stats if ingestor else {"inserted": 0, "failed": 0}
+        await db_client.update_scraping_job(
+            job_id, "failed", stats.get("urls", 0), stats["inserted"], stats["failed"], error_message=str(e)
+        )
+        await publish_event(
+            event_stream, "scrape_done",
+            job_id=job_id, status="failed", succeeded=stats["inserted"], failed=stats["failed"], error=str(e)
+        )
 
 # Create scraping job
 @app.post("/jobs", response_model=JobStatus)
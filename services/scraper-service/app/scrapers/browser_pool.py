@@ -0,0 +1,286 @@
+"""
+Long-lived browser pool and page fetching for scraper-service
+
+Launching a headless browser costs far more than loading a page, so a fixed
+number of crawler contexts is started once and shared by every scrape. Each
+context keeps a crawl session (one reused page) and is recycled after a
+number of uses, an age limit or repeated failures. Pages that render without
+JavaScript are fetched over plain HTTP and never touch a browser.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from bs4 import BeautifulSoup
+from crawl4ai import AsyncWebCrawler
+
+from app.scrapers.politeness import DomainPoliteness
+
+logger = logging.getLogger(__name__)
+
+# Fewer visible characters than this after dropping scripts means the page is rendered client-side
+MIN_STATIC_TEXT = 400
+JS_REQUIRED_MARKERS = ("enable javascript", "requires javascript", "javascript is disabled")
+# Client-rendered pages in a row before a domain goes straight to the browser,
+# and how long it stays there before plain HTTP is tried again
+JS_EVIDENCE_THRESHOLD = 3
+JS_DOMAIN_TTL = float(os.getenv("SCRAPER_JS_DOMAIN_TTL", "21600"))
+MAX_TRACKED_JS_DOMAINS = 10000
+
+
+@dataclass
+class FetchResult:
+    success: bool
+    content: Optional[str] = None
+    error: Optional[str] = None
+    via: str = "browser"
+    # Raw page HTML, used to learn and apply extraction templates
+    html: Optional[str] = None
+
+
+class _BrowserContext:
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler = None
+        self.session_id = None
+        self.started_at = 0.0
+        self.uses = 0
+        self.failures = 0
+
+
+class BrowserPool:
+    """A fixed set of crawler contexts handed out one caller at a time"""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_uses: int = 200,
+        max_age: float = 1800.0,
+        max_failures: int = 3,
+        crawler_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.size = size or int(os.getenv("SCRAPER_BROWSER_CONTEXTS", "3"))
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.max_failures = max_failures
+        self._factory = crawler_factory or (lambda: AsyncWebCrawler(headless=True, verbose=False))
+        self._idle: Optional[asyncio.Queue] = None
+        self._contexts: List[_BrowserContext] = []
+        self.stats = {"launched": 0, "recycled": 0, "crawls": 0, "failures": 0}
+
+    def _queue(self) -> asyncio.Queue:
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+            self._contexts = [_BrowserContext(index) for index in range(self.size)]
+            for context in self._contexts:
+                self._idle.put_nowait(context)
+        return self._idle
+
+    def _needs_recycle(self, context: _BrowserContext) -> bool:
+        return (
+            context.uses >= self.max_uses
+            or context.failures >= self.max_failures
+            or time.monotonic() - context.started_at > self.max_age
+        )
+
+    async def _shutdown(self, context: _BrowserContext):
+        crawler, context.crawler = context.crawler, None
+        if crawler is None:
+            return
+        try:
+            await crawler.__aexit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Browser context {context.index} did not close cleanly: {e}")
+
+    async def _launch(self, context: _BrowserContext):
+        if context.crawler is not None:
+            await self._shutdown(context)
+            self.stats["recycled"] += 1
+        crawler = self._factory()
+        await crawler.__aenter__()
+        context.crawler = crawler
+        context.session_id = f"pool-{context.index}-{uuid.uuid4().hex[:8]}"
+        context.started_at = time.monotonic()
+        context.uses = 0
+        context.failures = 0
+        self.stats["launched"] += 1
+
+    async def crawl(self, url: str, **params):
+        """Run one crawl on an idle context, launching or recycling it first when needed"""
+        idle = self._queue()
+        context = await idle.get()
+        succeeded = False
+        try:
+            if context.crawler is None or self._needs_recycle(context):
+                await self._launch(context)
+            result = await context.crawler.arun(url=url, session_id=context.session_id, **params)
+            succeeded = bool(getattr(result, "success", False))
+            return result
+        finally:
+            context.uses += 1
+            self.stats["crawls"] += 1
+            if succeeded:
+                context.failures = 0
+            else:
+                context.failures += 1
+                self.stats["failures"] += 1
+            idle.put_nowait(context)
+
+    async def close(self):
+        for context in self._contexts:
+            await self._shutdown(context)
+
+
+class PageFetcher:
+    """Fetches page content politely, over plain HTTP where possible and the browser pool otherwise"""
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        politeness: Optional[DomainPoliteness] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.pool = pool or BrowserPool()
+        self.politeness = politeness or DomainPoliteness()
+        self._client = client
+        # Client-rendered pages seen in a row per domain, and domains sent
+        # straight to the browser until the stored time
+        self._js_evidence: "OrderedDict[str, int]" = OrderedDict()
+        self._js_domains: "OrderedDict[str, float]" = OrderedDict()
+        self.stats = {"http": 0, "browser": 0, "blocked": 0}
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=30.0, follow_redirects=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        return self._client
+
+    def _wants_browser(self, url: str, needs_js: Optional[bool], wait_for, js_code) -> bool:
+        if wait_for or js_code or needs_js:
+            return True
+        if needs_js is not None:
+            return False
+        domain = self.politeness.domain_of(url)
+        until = self._js_domains.get(domain)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._js_domains[domain]
+            return False
+        return True
+
+    @staticmethod
+    def _remember(entries: "OrderedDict[str, Any]", domain: str, value: Any):
+        entries[domain] = value
+        entries.move_to_end(domain)
+        while len(entries) > MAX_TRACKED_JS_DOMAINS:
+            entries.popitem(last=False)
+
+    def _record_static(self, domain: str, client_rendered: bool):
+        """Count client-rendered pages; mark the domain once they repeat"""
+        if not client_rendered:
+            self._js_evidence.pop(domain, None)
+            return
+        seen = self._js_evidence.get(domain, 0) + 1
+        if seen < JS_EVIDENCE_THRESHOLD:
+            self._remember(self._js_evidence, domain, seen)
+            return
+        self._js_evidence.pop(domain, None)
+        self._remember(self._js_domains, domain, time.monotonic() + JS_DOMAIN_TTL)
+
+    @staticmethod
+    def _static_text(html: str, css_selector: Optional[str]) -> Optional[str]:
+        """Visible text of a server-rendered page, or None if it looks client-rendered"""
+        soup = BeautifulSoup(html, "lxml")
+        noscript = " ".join(tag.get_text(" ", strip=True).lower() for tag in soup.find_all("noscript"))
+        for tag in soup(["script", "style", "noscript", "template"]):
+            tag.decompose()
+        if css_selector:
+            selected = soup.select(css_selector)
+            if not selected:
+                return None
+            text = "\n".join(node.get_text("\n", strip=True) for node in selected)
+        else:
+            text = soup.get_text("\n", strip=True)
+        if len(text) < MIN_STATIC_TEXT or any(marker in noscript for marker in JS_REQUIRED_MARKERS):
+            return None
+        return text
+
+    async def _fetch_static(
+        self, url: str, headers: Dict[str, str], css_selector: Optional[str]
+    ) -> Tuple[Optional[str], Optional[str], bool]:
+        """(visible text, raw HTML, client-rendered); text is None when the page needs a browser.
+
+        Only a page that loaded but had too little text is evidence that the
+        site renders client-side; errors and non-HTML responses are not.
+        """
+        try:
+            response = await self._http().get(url, headers=headers)
+        except httpx.HTTPError as e:
+            logger.debug(f"Plain HTTP fetch failed for {url}: {e}")
+            return None, None, False
+        if response.status_code >= 400 or "html" not in response.headers.get("content-type", "html"):
+            return None, None, False
+        text = self._static_text(response.text, css_selector)
+        if text is None:
+            return None, None, True
+        return text, response.text, False
+
+    async def fetch(
+        self,
+        url: str,
+        user_agent: Optional[str] = None,
+        bypass_cache: bool = False,
+        wait_for: Optional[str] = None,
+        js_code: Optional[str] = None,
+        css_selector: Optional[str] = None,
+        timeout: int = 30,
+    ) -> FetchResult:
+        if not await self.politeness.allowed(url, self._http()):
+            self.stats["blocked"] += 1
+            return FetchResult(False, error=f"robots.txt disallows {url}", via="robots")
+
+        async with self.politeness.slot(url) as policy:
+            if not self._wants_browser(url, policy.needs_js, wait_for, js_code):
+                headers = dict(policy.as_headers())
+                if user_agent:
+                    headers["User-Agent"] = user_agent
+                text, html, client_rendered = await self._fetch_static(url, headers, css_selector)
+                if policy.needs_js is None:
+                    self._record_static(self.politeness.domain_of(url), client_rendered)
+                if text is not None:
+                    self.stats["http"] += 1
+                    return FetchResult(True, content=text, via="http", html=html)
+
+            params = {"bypass_cache": bypass_cache, "timeout": timeout}
+            if user_agent:
+                params["user_agent"] = user_agent
+            if wait_for:
+                params["wait_for"] = wait_for
+            if js_code:
+                params["js_code"] = js_code
+            if css_selector:
+                params["css_selector"] = css_selector
+            self.stats["browser"] += 1
+            result = await self.pool.crawl(url, **params)
+
+        if result.success:
+            return FetchResult(True, content=result.markdown if result.markdown else result.html, html=result.html)
+        return FetchResult(False, error=getattr(result, "error_message", None) or "crawl failed")
+
+    async def close(self):
+        await self.pool.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+page_fetcher = PageFetcher()
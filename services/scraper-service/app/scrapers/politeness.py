@@ -0,0 +1,158 @@
+"""
+Per-domain politeness for scraper-service
+
+Policies mirror backend/services/etl/politeness.py: a minimum delay between
+requests to a domain, optional robots.txt checks and policy headers. Scraping
+also needs a bound on concurrent pages per domain, and a hint whether the
+site needs a browser at all.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Iterable, Mapping, Optional
+from urllib import robotparser
+from urllib.parse import urlparse
+
+import httpx
+
+
+@dataclass(frozen=True)
+class SitePolitenessPolicy:
+    domain: str
+    delay_seconds: float = 1.0
+    max_concurrent: int = 2
+    headers: Mapping[str, str] = field(default_factory=dict)
+    respect_robots: bool = False
+    user_agent: str = "FishMouthBot/1.0"
+    # None: try plain HTTP first and remember domains whose pages turn out to need JavaScript
+    needs_js: Optional[bool] = None
+
+    def as_headers(self) -> Mapping[str, str]:
+        return MappingProxyType({"User-Agent": self.user_agent, **dict(self.headers)})
+
+
+def default_policy() -> SitePolitenessPolicy:
+    return SitePolitenessPolicy(
+        domain="*",
+        delay_seconds=float(os.getenv("SCRAPER_DOMAIN_DELAY", "1.0")),
+        max_concurrent=int(os.getenv("SCRAPER_DOMAIN_CONCURRENCY", "2")),
+    )
+
+
+@dataclass
+class _DomainState:
+    semaphore: asyncio.Semaphore
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_request: Optional[float] = None
+    robots_loaded_at: Optional[float] = None
+    robots: Optional[robotparser.RobotFileParser] = None
+    # Fetches holding or waiting for a slot; busy state is never evicted
+    active: int = 0
+
+
+class DomainPoliteness:
+    """Concurrency, spacing and robots checks per domain, shared by every fetch path.
+
+    State is kept for at most ``max_domains`` domains; the least recently used
+    idle ones are dropped first, and robots.txt is fetched again after
+    ``robots_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        policies: Iterable[SitePolitenessPolicy] = (),
+        default: Optional[SitePolitenessPolicy] = None,
+        max_domains: Optional[int] = None,
+        robots_ttl: float = 86400.0,
+    ) -> None:
+        self._policies: Dict[str, SitePolitenessPolicy] = {policy.domain: policy for policy in policies}
+        self._default_policy = default or default_policy()
+        self.max_domains = max_domains or int(os.getenv("SCRAPER_MAX_TRACKED_DOMAINS", "5000"))
+        self.robots_ttl = robots_ttl
+        self._domains: "OrderedDict[str, _DomainState]" = OrderedDict()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def policy_for(self, domain: str) -> SitePolitenessPolicy:
+        return self._policies.get(domain) or self._policies.get(f"*.{domain}") or self._default_policy
+
+    @property
+    def tracked_domains(self) -> int:
+        return len(self._domains)
+
+    def _state(self, domain: str, policy: SitePolitenessPolicy) -> _DomainState:
+        state = self._domains.get(domain)
+        if state is None:
+            state = _DomainState(asyncio.Semaphore(max(1, policy.max_concurrent)))
+            self._domains[domain] = state
+        self._domains.move_to_end(domain)
+        self._evict(keep=domain)
+        return state
+
+    def _evict(self, keep: str) -> None:
+        """Drop the least recently used idle domains beyond ``max_domains``, never ``keep``"""
+        excess = len(self._domains) - self.max_domains
+        if excess <= 0:
+            return
+        stale = []
+        for domain, state in self._domains.items():
+            if len(stale) >= excess:
+                break
+            if domain != keep and not state.active:
+                stale.append(domain)
+        for domain in stale:
+            del self._domains[domain]
+
+    async def _wait_for_slot(self, state: _DomainState, policy: SitePolitenessPolicy) -> None:
+        async with state.lock:
+            if state.last_request is not None:
+                elapsed = time.monotonic() - state.last_request
+                if elapsed < policy.delay_seconds:
+                    await asyncio.sleep(policy.delay_seconds - elapsed)
+            state.last_request = time.monotonic()
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncIterator[SitePolitenessPolicy]:
+        """Hold one of the domain's concurrent slots, started no sooner than its delay allows"""
+        domain = self.domain_of(url)
+        policy = self.policy_for(domain)
+        state = self._state(domain, policy)
+        state.active += 1
+        try:
+            async with state.semaphore:
+                await self._wait_for_slot(state, policy)
+                yield policy
+        finally:
+            state.active -= 1
+
+    async def allowed(self, url: str, client: httpx.AsyncClient) -> bool:
+        domain = self.domain_of(url)
+        policy = self.policy_for(domain)
+        if not policy.respect_robots:
+            return True
+        state = self._state(domain, policy)
+        if state.robots_loaded_at is None or time.monotonic() - state.robots_loaded_at > self.robots_ttl:
+            state.active += 1
+            try:
+                parser = robotparser.RobotFileParser()
+                try:
+                    response = await client.get(
+                        f"https://{domain}/robots.txt", headers=policy.as_headers(), timeout=10.0
+                    )
+                    if response.status_code >= 400:
+                        parser = None
+                    else:
+                        parser.parse(response.text.splitlines())
+                except httpx.HTTPError:
+                    parser = None
+            finally:
+                state.active -= 1
+            state.robots, state.robots_loaded_at = parser, time.monotonic()
+        parser = state.robots
+        return parser is None or parser.can_fetch(policy.user_agent, url)
@@ -2,10 +2,8 @@
 Intelligent scraper using Crawl4AI + Local LLM
 """
 import asyncio
-from crawl4ai import AsyncWebCrawler
-from crawl4ai.extraction_strategy import LLMExtractionStrategy
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 import random
 import hashlib
 from datetime import datetime, timedelta
@@ -13,17 +11,40 @@ from datetime import datetime, timedelta
 import sys
 sys.path.append('../../../..')
 from shared.redis_client import redis_client
-from app.utils.llm import llm
+from app.utils.extraction import extractor
+from app.scrapers.browser_pool import PageFetcher, page_fetcher
 
 logger = logging.getLogger(__name__)
 
+def cache_key(url: str) -> str:
+    """Redis key of a URL's cached response"""
+    return f"scrape:{hashlib.md5(url.encode()).hexdigest()}"
+
+async def preload_cached(urls: List[str]) -> Dict[str, Optional[str]]:
+    """Cached responses for many URLs in one MGET (None for misses); empty if Redis is unavailable"""
+    if not urls:
+        return {}
+    try:
+        values = await redis_client.mget([cache_key(url) for url in urls])
+    except Exception as e:
+        logger.warning(f"Cache preload failed: {e}")
+        return {}
+    return dict(zip(urls, values))
+
 class SmartScraper:
     """
     Intelligent scraper using Crawl4AI + Local LLM
     """
     
-    def __init__(self):
-        self.crawler = None
+    def __init__(
+        self,
+        preloaded: Optional[Dict[str, Optional[str]]] = None,
+        fetcher: Optional[PageFetcher] = None
+    ):
+        # Pages come from the process-wide browser pool / HTTP fast path, not a browser per scraper
+        self.fetcher = fetcher or page_fetcher
+        # Cache lookups already answered by a batch preload (None marks a known miss)
+        self.preloaded = dict(preloaded or {})
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -33,32 +54,26 @@ class SmartScraper:
         ]
     
     async def __aenter__(self):
-        """Async context manager entry"""
-        self.crawler = AsyncWebCrawler(
-            headless=True,
-            verbose=False
-        )
-        await self.crawler.__aenter__()
+        """Async context manager entry; browsers are owned by the shared pool"""
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.crawler:
-            await self.crawler.__aexit__(exc_type, exc_val, exc_tb)
+        return None
     
     def _get_cache_key(self, url: str) -> str:
         """Generate cache key for URL"""
-        return f"scrape:{hashlib.md5(url.encode()).hexdigest()}"
+        return cache_key(url)
     
     async def _get_cached(self, url: str) -> Optional[str]:
         """Get cached response"""
-        cache_key = self._get_cache_key(url)
-        return await redis_client.get(cache_key)
+        if url in self.preloaded:
+            return self.preloaded.pop(url)
+        return await redis_client.get(self._get_cache_key(url))
     
     async def _cache_response(self, url: str, content: str, expire_hours: int = 24):
         """Cache response"""
-        cache_key = self._get_cache_key(url)
-        await redis_client.set(cache_key, content, expire=expire_hours * 3600)
+        await redis_client.set(self._get_cache_key(url), content, expire=expire_hours * 3600)
     
     def _get_random_user_agent(self) -> str:
         """Get random user agent"""
@@ -100,7 +115,7 @@ class SmartScraper:
             cached = await self._get_cached(url)
             if cached:
                 logger.info(f"✅ Using cached response for {url}")
-                return llm.extract_json(cached, extraction_prompt)
+                return await extractor.extract(cached, extraction_prompt, url=url)
         
         for attempt in range(max_retries):
             try:
@@ -110,34 +125,27 @@ class SmartScraper:
                 if attempt > 0:
                     await self._smart_delay(2 ** attempt, 2 ** (attempt + 1))
                 
-                # Configure crawl parameters
-                crawl_params = {
-                    'url': url,
-                    'user_agent': self._get_random_user_agent(),
-                    'bypass_cache': not use_cache,
-                    'timeout': 30
-                }
-                
-                # Add optional parameters
-                if wait_for:
-                    crawl_params['wait_for'] = wait_for
-                if js_code:
-                    crawl_params['js_code'] = js_code
-                if css_selector:
-                    crawl_params['css_selector'] = css_selector
-                
-                # Perform crawl
-                result = await self.crawler.arun(**crawl_params)
+                # Fetch over plain HTTP when the page allows it, else on a pooled browser
+                fetched = await self.fetcher.fetch(
+                    url,
+                    user_agent=self._get_random_user_agent(),
+                    bypass_cache=not use_cache,
+                    wait_for=wait_for,
+                    js_code=js_code,
+                    css_selector=css_selector
+                )
                 
-                if result.success:
-                    content = result.markdown if result.markdown else result.html
+                if fetched.success:
+                    content = fetched.content
                     
                     # Cache successful response
                     if use_cache:
                         await self._cache_response(url, content)
                     
-                    # Extract data using AI
-                    extracted_data = llm.extract_json(content, extraction_prompt)
+                    # Cached result, then a learned site template, then the LLM
+                    extracted_data = await extractor.extract(
+                        content, extraction_prompt, url=url, html=fetched.html
+                    )
                     
                     if extracted_data:
                         logger.info(f"✅ Successfully scraped and extracted data from {url}")
@@ -146,7 +154,7 @@ class SmartScraper:
                         logger.warning(f"⚠️  AI extraction failed for {url}")
                         return None
                 else:
-                    logger.error(f"❌ Crawl failed for {url}: {result.error_message}")
+                    logger.error(f"❌ Crawl failed for {url}: {fetched.error}")
             
             except Exception as e:
                 logger.error(f"❌ Scraping attempt {attempt + 1} failed for {url}: {e}")
@@ -251,6 +259,25 @@ class SmartScraper:
         
         return await self.scrape_with_ai(url, extraction_prompt)
 
+async def _scrape_single(
+    url: str,
+    scraper_method: str,
+    preloaded: Optional[Dict[str, Optional[str]]] = None
+) -> List[Dict[str, Any]]:
+    """Scrape one URL with the named SmartScraper method, always returning a list of records"""
+    known = {url: preloaded[url]} if preloaded and url in preloaded else None
+    async with SmartScraper(preloaded=known) as scraper:
+        if scraper_method == "scrape_permits":
+            return await scraper.scrape_permits(url)
+        elif scraper_method == "scrape_property":
+            result = await scraper.scrape_property(url)
+            return [result] if result else []
+        elif scraper_method == "scrape_contractor":
+            result = await scraper.scrape_contractor(url)
+            return [result] if result else []
+        else:
+            return []
+
 # Helper function for batch scraping
 async def scrape_urls_batch(
     urls: List[str],
@@ -261,25 +288,15 @@ async def scrape_urls_batch(
     Scrape multiple URLs concurrently
     """
     
-    async def scrape_single(url: str) -> List[Dict[str, Any]]:
-        async with SmartScraper() as scraper:
-            if scraper_method == "scrape_permits":
-                return await scraper.scrape_permits(url)
-            elif scraper_method == "scrape_property":
-                result = await scraper.scrape_property(url)
-                return [result] if result else []
-            elif scraper_method == "scrape_contractor":
-                result = await scraper.scrape_contractor(url)
-                return [result] if result else []
-            else:
-                return []
+    # One cache round trip for the whole batch instead of one per URL
+    preloaded = await preload_cached(urls)
     
     # Limit concurrency to avoid overwhelming servers
     semaphore = asyncio.Semaphore(max_concurrent)
     
     async def scrape_with_semaphore(url: str):
         async with semaphore:
-            return await scrape_single(url)
+            return await _scrape_single(url, scraper_method, preloaded)
     
     # Execute all scraping tasks
     tasks = [scrape_with_semaphore(url) for url in urls]
@@ -293,4 +310,33 @@ async def scrape_urls_batch(
         elif isinstance(result, list):
             all_results.extend(result)
     
-    return all_results
\ No newline at end of file
+    return all_results
+
+async def iter_scrape_urls(
+    urls: List[str],
+    scraper_method: str = "scrape_permits",
+    max_concurrent: int = 5
+) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Scrape multiple URLs concurrently, yielding (url, records) as each URL finishes
+    so callers can store and hand on results without waiting for the slowest page.
+    URLs that fail are logged and yield no records.
+    """
+    preloaded = await preload_cached(urls)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    
+    async def scrape_with_semaphore(url: str):
+        async with semaphore:
+            try:
+                return url, await _scrape_single(url, scraper_method, preloaded)
+            except Exception as e:
+                logger.error(f"Batch scraping error for {url}: {e}")
+                return url, []
+    
+    tasks = [asyncio.ensure_future(scrape_with_semaphore(url)) for url in urls]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,148 @@
+"""
+Cached, template-first structured extraction for scraper-service
+
+Extraction results are cached in Redis by prompt and content hash, so a page
+served from the scrape cache is never sent to the model twice. When the raw
+HTML is available, a template learned from an earlier LLM run on the same
+domain is tried first (see extraction_templates); the LLM is only called
+when no template exists or the page fails its validation.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import sys
+sys.path.append('../../../..')
+from shared.redis_client import redis_client
+from app.utils.llm import LocalLLM, llm
+from app.utils.extraction_templates import apply_template, learn_template
+
+logger = logging.getLogger(__name__)
+
+RESULT_TTL = int(os.getenv('EXTRACTION_CACHE_TTL', str(7 * 86400)))
+TEMPLATE_TTL = int(os.getenv('EXTRACTION_TEMPLATE_TTL', str(30 * 86400)))
+
+
+def prompt_hash(prompt: str, model: str) -> str:
+    """Results and templates are only reused for the same prompt and model"""
+    return hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()[:16]
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class ExtractionService:
+    """Result cache, then per-domain template, then the LLM"""
+
+    def __init__(self, model: Optional[LocalLLM] = None):
+        self.llm = model or llm
+        # Concurrent extractions of the same content share one model call
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"cache": 0, "template": 0, "llm": 0, "failed": 0, "templates_learned": 0, "template_rejected": 0}
+
+    def _result_key(self, content: str, phash: str) -> str:
+        return f"extract:result:{phash}:{content_hash(content)}"
+
+    @staticmethod
+    def _template_key(url: str, phash: str) -> str:
+        return f"extract:template:{urlparse(url).netloc.lower()}:{phash}"
+
+    async def _cached(self, key: str) -> Optional[Any]:
+        try:
+            return await redis_client.get_json(key)
+        except Exception as e:
+            logger.warning(f"Extraction cache read failed: {e}")
+            return None
+
+    async def _store(self, key: str, value: Any, expire: int):
+        try:
+            await redis_client.set_json(key, value, expire=expire)
+        except Exception as e:
+            logger.warning(f"Extraction cache write failed: {e}")
+
+    async def _from_template(self, url: str, html: str, phash: str) -> Optional[Any]:
+        template = await self._cached(self._template_key(url, phash))
+        if not template:
+            return None
+        data = await asyncio.get_running_loop().run_in_executor(None, apply_template, template, html)
+        if data is None:
+            self.stats["template_rejected"] += 1
+            logger.info(f"Extraction template for {urlparse(url).netloc} did not validate, falling back to LLM")
+        return data
+
+    async def _learn(self, url: str, html: str, data: Any, phash: str):
+        template = await asyncio.get_running_loop().run_in_executor(None, learn_template, html, data)
+        if template:
+            await self._store(self._template_key(url, phash), template, TEMPLATE_TTL)
+            self.stats["templates_learned"] += 1
+            logger.info(f"✅ Learned extraction template for {urlparse(url).netloc}")
+
+    async def _extract(self, content: str, prompt: str, url: Optional[str], html: Optional[str], phash: str, key: str):
+        if url and html:
+            data = await self._from_template(url, html, phash)
+            if data:
+                self.stats["template"] += 1
+                await self._store(key, data, RESULT_TTL)
+                return data
+
+        data = await self.llm.aextract_json(content, prompt)
+        if not data:
+            self.stats["failed"] += 1
+            return None
+        self.stats["llm"] += 1
+        await self._store(key, data, RESULT_TTL)
+        if url and html:
+            try:
+                await self._learn(url, html, data, phash)
+            except Exception as e:
+                logger.warning(f"Template learning failed for {url}: {e}")
+        return data
+
+    async def extract(
+        self,
+        content: str,
+        prompt: str,
+        url: Optional[str] = None,
+        html: Optional[str] = None
+    ) -> Optional[Any]:
+        """
+        Structured data for ``content`` as ``prompt`` asks
+
+        Args:
+            content: Text sent to the LLM (page markdown or visible text)
+            prompt: Instructions for extraction
+            url: Page URL; templates are learned and applied per domain
+            html: Raw page HTML, required for templates
+
+        Returns:
+            Extracted data, or None if extraction failed
+        """
+        phash = prompt_hash(prompt, self.llm.model)
+        key = self._result_key(content, phash)
+        cached = await self._cached(key)
+        if cached:
+            self.stats["cache"] += 1
+            return cached
+
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._extract(content, prompt, url, html, phash, key)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a future nobody else awaits does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+
+extractor = ExtractionService()
@@ -0,0 +1,315 @@
+"""
+Per-site extraction templates learned from LLM output
+
+After the LLM extracts records from a page, the values it returned are
+located in the page's HTML. For list pages the elements of each record share
+a container (a table row, a card), and the containers share a CSS path; each
+field is then a fixed path inside its container. For single-record pages the
+fields are fixed paths from the document root. A template is only kept if
+applying it to the page it was learned from reproduces the LLM's output.
+
+Applying a template is deterministic and needs no model. It is validated
+against the fill rates seen when learning, so a page with a different
+layout is rejected and goes back to the LLM.
+"""
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+TEMPLATE_VERSION = 1
+
+# Share of the LLM's non-null values a new template must reproduce
+MIN_AGREEMENT = 0.9
+# An applied field must be filled at least this share of its learned fill rate
+MIN_FILL_RATIO = 0.8
+# Pages larger than this are not used for learning
+MAX_LEARN_HTML = 2_000_000
+# Element texts longer than this are never field values
+MAX_VALUE_LENGTH = 200
+
+NOISE_TAGS = ["script", "style", "noscript", "template", "head"]
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%B %d, %Y", "%b %d, %Y", "%d %B %Y")
+
+
+def _norm_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().lower().strip(" .,:;")
+
+
+def _to_number(text: str) -> Optional[float]:
+    if not re.search(r"\d", text or ""):
+        return None
+    try:
+        return float(re.sub(r"[^\d.\-]", "", text))
+    except ValueError:
+        return None
+
+
+def _to_date(text: str) -> Optional[str]:
+    text = (text or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _kind_of(value: Any) -> Optional[str]:
+    """How a field's values are matched and converted; None for values a template cannot produce"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str) and value.strip():
+        return "date" if re.fullmatch(r"\d{4}-\d{2}-\d{2}", value.strip()) else "text"
+    return None
+
+
+def _convert(text: str, kind: str) -> Any:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if not text:
+        return None
+    if kind == "number":
+        number = _to_number(text)
+        if number is None:
+            return None
+        return int(number) if number.is_integer() else number
+    if kind == "date":
+        return _to_date(text)
+    return text
+
+
+def _same(a: Any, b: Any) -> bool:
+    if a is None or b is None:
+        return False
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return abs(float(a) - float(b)) < 1e-6
+    return _norm_text(str(a)) == _norm_text(str(b))
+
+
+def _parse(html: str) -> BeautifulSoup:
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(NOISE_TAGS):
+        tag.decompose()
+    return soup
+
+
+class _ValueIndex:
+    """Elements of a page by the normalized text, number and date they show"""
+
+    def __init__(self, soup: BeautifulSoup):
+        self.by_kind: Dict[str, Dict[Any, List]] = {"text": {}, "number": {}, "date": {}}
+        for element in soup.find_all(True):
+            text = element.get_text(" ", strip=True)
+            if not text or len(text) > MAX_VALUE_LENGTH:
+                continue
+            self.by_kind["text"].setdefault(_norm_text(text), []).append(element)
+            number = _to_number(text)
+            if number is not None:
+                self.by_kind["number"].setdefault(round(number, 6), []).append(element)
+            date = _to_date(text)
+            if date:
+                self.by_kind["date"].setdefault(date, []).append(element)
+
+    def find(self, value: Any, kind: str) -> List:
+        """Deepest elements showing ``value``; wrappers with the same text are dropped"""
+        if kind == "number":
+            key = round(float(value), 6)
+        elif kind == "date":
+            key = value.strip()
+        else:
+            key = _norm_text(value)
+        matches = self.by_kind[kind].get(key, [])
+        ids = {id(element) for element in matches}
+        return [
+            element for element in matches
+            if not any(id(child) in ids for child in element.find_all(True))
+        ]
+
+
+def _ancestors(element) -> List:
+    return [element] + [parent for parent in element.parents if parent.name != "[document]"]
+
+
+def _common_ancestor(elements: List):
+    shared = None
+    for element in elements:
+        chain = _ancestors(element)
+        shared = chain if shared is None else [node for node in chain if any(node is other for other in shared)]
+    return shared[0] if shared else None
+
+
+def _relative_path(container, element) -> Optional[str]:
+    """``tag:nth-of-type(k)`` steps from ``container`` down to ``element``"""
+    steps = []
+    node = element
+    while node is not container:
+        if node is None or node.parent is None:
+            return None
+        position = 1 + sum(1 for sibling in node.find_previous_siblings(node.name))
+        steps.append(f"{node.name}:nth-of-type({position})")
+        node = node.parent
+    return " > ".join(reversed(steps)) or None
+
+
+def _container_selector(containers: List) -> Optional[str]:
+    """A CSS path matching every container: shared tags, plus ids and classes common to all"""
+    paths = [list(reversed(_ancestors(container))) for container in containers]
+    if len({len(path) for path in paths}) != 1:
+        return None
+    steps = []
+    for level in zip(*paths):
+        names = {node.name for node in level}
+        if len(names) != 1:
+            return None
+        step = level[0].name
+        ids = {node.get("id") for node in level}
+        if len(ids) == 1 and None not in ids and re.fullmatch(r"[A-Za-z][\w-]*", next(iter(ids))):
+            step += f"#{next(iter(ids))}"
+        classes = set.intersection(*(set(node.get("class") or []) for node in level))
+        step += "".join(f".{name}" for name in sorted(classes) if re.fullmatch(r"-?[_A-Za-z][\w-]*", name))
+        steps.append(step)
+    return " > ".join(steps)
+
+
+def _field_kinds(records: List[Dict[str, Any]]) -> Dict[str, str]:
+    kinds = {}
+    for record in records:
+        for name, value in record.items():
+            if name not in kinds and _kind_of(value):
+                kinds[name] = _kind_of(value)
+    return kinds
+
+
+def _fill_rates(records: List[Dict[str, Any]], fields: List[str]) -> Dict[str, float]:
+    return {
+        name: sum(1 for record in records if record.get(name) is not None) / len(records)
+        for name in fields
+    }
+
+
+def _agreement(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> float:
+    """Share of the expected non-null values reproduced, pairing records in order"""
+    total = sum(1 for record in expected for value in record.values() if value is not None)
+    if not total:
+        return 0.0
+    matched = 0
+    for want, got in zip(expected, actual):
+        matched += sum(1 for name, value in want.items() if value is not None and _same(value, got.get(name)))
+    return matched / total
+
+
+def apply_template(template: Dict[str, Any], html: str) -> Optional[Any]:
+    """Records extracted by ``template``, or None if the page does not validate against it"""
+    if template.get("version") != TEMPLATE_VERSION:
+        return None
+    soup = _parse(html)
+    if template["kind"] == "list":
+        containers = soup.select(template["record_selector"])
+    else:
+        containers = [soup.html] if soup.html else []
+
+    records = []
+    key_field = template["key_field"]
+    for container in containers:
+        record = {name: None for name in template["all_fields"]}
+        for name, spec in template["fields"].items():
+            node = container.select_one(f":scope > {spec['path']}")
+            record[name] = _convert(node.get_text(" ", strip=True), spec["kind"]) if node else None
+        # Header and spacer rows share the container path but carry no key value
+        if record[key_field] is None:
+            continue
+        records.append(record)
+
+    if not records:
+        return None
+    fill = _fill_rates(records, list(template["fields"]))
+    for name, learned in template["fill"].items():
+        if fill.get(name, 0.0) < learned * MIN_FILL_RATIO:
+            return None
+    return records if template["kind"] == "list" else records[0]
+
+
+def learn_template(html: str, data: Any) -> Optional[Dict[str, Any]]:
+    """A template reproducing ``data`` (the LLM's output for this page), or None if none does"""
+    if not html or len(html) > MAX_LEARN_HTML:
+        return None
+    if isinstance(data, dict):
+        kind, records = "object", [data]
+    elif isinstance(data, list) and data and all(isinstance(record, dict) for record in data):
+        kind, records = "list", data
+    else:
+        return None
+
+    all_fields = list(dict.fromkeys(name for record in records for name in record))
+    kinds = _field_kinds(records)
+    if not kinds:
+        return None
+    soup = _parse(html)
+    index = _ValueIndex(soup)
+
+    containers = []
+    located = []
+    for record in records:
+        candidates = {
+            name: index.find(value, kinds[name])
+            for name, value in record.items()
+            if name in kinds and _kind_of(value) == kinds[name]
+        }
+        if kind == "list":
+            # Values that occur once on the page pin down the record's container
+            anchors = [found[0] for found in candidates.values() if len(found) == 1]
+            if len(anchors) < 2:
+                continue
+            container = _common_ancestor(anchors)
+        else:
+            container = soup.html
+        if container is None:
+            continue
+        fields = {}
+        for name, found in candidates.items():
+            inside = [element for element in found if element is container or container in element.parents]
+            if inside and inside[0] is not container:
+                fields[name] = _relative_path(container, inside[0])
+        containers.append(container)
+        located.append(fields)
+
+    if not containers:
+        return None
+    if kind == "list":
+        record_selector = _container_selector(containers)
+        if not record_selector:
+            return None
+    else:
+        record_selector = None
+
+    fields = {}
+    for name in kinds:
+        paths = Counter(found[name] for found in located if found.get(name))
+        if paths:
+            fields[name] = {"path": paths.most_common(1)[0][0], "kind": kinds[name]}
+    if not fields:
+        return None
+
+    fill = _fill_rates(records, list(fields))
+    key_field = max(fields, key=lambda name: (fill[name], -all_fields.index(name)))
+    template = {
+        "version": TEMPLATE_VERSION,
+        "kind": kind,
+        "record_selector": record_selector,
+        "fields": fields,
+        "all_fields": all_fields,
+        "fill": fill,
+        "key_field": key_field,
+    }
+
+    replayed = apply_template(template, html)
+    if replayed is None:
+        return None
+    replayed = replayed if isinstance(replayed, list) else [replayed]
+    if len(replayed) != len(records) or _agreement(records, replayed) < MIN_AGREEMENT:
+        return None
+    return template
@@ -0,0 +1,321 @@
+"""
+Buffered bulk ingestion of scraped records into the raw_* tables
+
+Records are handed over as each URL finishes and written in batches: COPY
+into a temporary staging table, then one INSERT ... SELECT that skips rows
+whose natural key is already stored, returning the ids of both the new rows
+and the stored rows the skipped ones matched. The raw tables have no unique
+constraint on those keys, so the merge holds a per-table advisory lock to
+keep concurrent jobs from inserting the same record twice. Values are
+coerced to the column types first so one malformed field cannot fail a
+whole COPY; a batch that still fails is retried row by row.
+"""
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import sys
+sys.path.append('../../../..')
+from shared.database import db_client
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%B %d, %Y", "%b %d, %Y")
+INT_MAX = 2 ** 31 - 1
+
+
+@dataclass(frozen=True)
+class Column:
+    name: str
+    kind: str = "text"  # text, code, date, numeric, int, text[]
+    # Longest text, or largest absolute number, the column accepts; longer text is
+    # truncated, but a code (state, ZIP, phone) that does not fit is dropped
+    limit: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class RecordTable:
+    name: str
+    columns: Tuple[Column, ...]
+    # Natural key; the first column is NOT NULL in the table
+    key: Tuple[str, ...]
+
+
+RECORD_TABLES = {
+    "permit": RecordTable(
+        "raw_permits",
+        (
+            Column("permit_number", limit=100),
+            Column("address"),
+            Column("city", limit=100),
+            Column("state", "code", 2),
+            Column("zip", "code", 10),
+            Column("issue_date", "date"),
+            Column("permit_type", limit=100),
+            Column("work_description"),
+            Column("contractor_name", limit=200),
+            Column("contractor_license", limit=50),
+            Column("estimated_value", "numeric", 1e10),
+        ),
+        ("address", "permit_number"),
+    ),
+    "property": RecordTable(
+        "raw_properties",
+        (
+            Column("address"),
+            Column("city", limit=100),
+            Column("state", "code", 2),
+            Column("zip", "code", 10),
+            Column("owner_name", limit=200),
+            Column("owner_address"),
+            Column("owner_city", limit=100),
+            Column("owner_state", "code", 2),
+            Column("owner_zip", "code", 10),
+            Column("property_value", "numeric", 1e10),
+            Column("year_built", "int", INT_MAX),
+            Column("sqft", "int", INT_MAX),
+            Column("lot_size", "numeric", 1e8),
+            Column("beds", "int", INT_MAX),
+            Column("baths", "numeric", 100),
+            Column("property_type", limit=50),
+        ),
+        ("address", "city", "state"),
+    ),
+    "contractor": RecordTable(
+        "raw_contractors",
+        (
+            Column("company_name", limit=200),
+            Column("owner_name", limit=200),
+            Column("address"),
+            Column("city", limit=100),
+            Column("state", "code", 2),
+            Column("zip", "code", 10),
+            Column("phone", "code", 20),
+            Column("email", limit=200),
+            Column("website"),
+            Column("license_number", limit=50),
+            Column("years_in_business", "int", INT_MAX),
+            Column("services", "text[]"),
+            Column("certifications", "text[]"),
+        ),
+        ("company_name", "license_number"),
+    ),
+}
+
+
+def _text(value: Any, limit: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    if not text:
+        return None
+    return text[:int(limit)] if limit else text
+
+
+def _number(value: Any) -> Optional[Decimal]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        number = Decimal(str(value)) if isinstance(value, (int, float)) else Decimal(re.sub(r"[^\d.\-]", "", str(value)))
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
+def _date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value, None)
+    if not text:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text[:10] if fmt == "%Y-%m-%d" else text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def coerce(column: Column, value: Any) -> Any:
+    """``value`` as the column's type, or None if it cannot be stored there"""
+    if column.kind == "date":
+        return _date(value)
+    if column.kind in ("numeric", "int"):
+        number = _number(value)
+        if number is None or (column.limit and abs(number) >= column.limit):
+            return None
+        return int(number) if column.kind == "int" else number
+    if column.kind == "text[]":
+        if value is None:
+            return []
+        items = value if isinstance(value, (list, tuple)) else [value]
+        return [text for text in (_text(item, None) for item in items) if text]
+    if column.kind == "code":
+        text = _text(value, None)
+        return text if text and len(text) <= column.limit else None
+    return _text(value, column.limit)
+
+
+class RecordIngestor:
+    """Buffers one job's records and writes them in deduplicated bulk batches"""
+
+    def __init__(
+        self,
+        job_id: str,
+        job_type: str,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        progress_interval: Optional[float] = None,
+        on_stored: Optional[Callable[[List[str], List[str]], Awaitable[Any]]] = None,
+        db=None
+    ):
+        if job_type not in RECORD_TABLES:
+            raise ValueError(f"Invalid job_type: {job_type}")
+        self.job_id = job_id
+        self.table = RECORD_TABLES[job_type]
+        self.batch_size = batch_size or int(os.getenv('INGEST_BATCH_SIZE', '500'))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv('INGEST_FLUSH_SECONDS', '2.0'))
+        self.progress_interval = progress_interval if progress_interval is not None else float(os.getenv('INGEST_PROGRESS_SECONDS', '5.0'))
+        self.on_stored = on_stored
+        self.db = db or db_client
+
+        self.columns = ("job_id",) + tuple(column.name for column in self.table.columns) + ("source_url", "raw_data")
+        self._key_positions = [self.columns.index(name) for name in self.table.key]
+        self._buffer: List[tuple] = []
+        self._buffer_urls: List[str] = []
+        # Natural keys already buffered or written by this job; the database catches the rest
+        self._seen: Set[tuple] = set()
+        self._last_flush = time.monotonic()
+        self._last_progress = time.monotonic()
+        self.stats = {"urls": 0, "received": 0, "inserted": 0, "duplicates": 0, "failed": 0, "batches": 0}
+
+    def _row(self, url: str, record: Dict[str, Any]) -> tuple:
+        values = [coerce(column, record.get(column.name)) for column in self.table.columns]
+        return (self.job_id, *values, url, json.dumps(record, default=str))
+
+    async def add(self, url: str, records: Sequence[Dict[str, Any]]):
+        """Buffer one URL's records, flushing when the batch is full or old enough"""
+        self.stats["urls"] += 1
+        for record in records:
+            if not record:
+                continue
+            self.stats["received"] += 1
+            row = self._row(url, record)
+            key = tuple(row[position] for position in self._key_positions)
+            if key[0] is None:
+                # The first key column is NOT NULL in the table
+                self.stats["failed"] += 1
+                continue
+            if key in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            self._seen.add(key)
+            self._buffer.append(row)
+        if url not in self._buffer_urls:
+            self._buffer_urls.append(url)
+
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+        await self._report_progress()
+
+    def _merge_query(self, staging: str) -> str:
+        columns = ", ".join(self.columns)
+        key = ", ".join(self.table.key)
+        staged_key = ", ".join(f"s.{name}" for name in self.table.key)
+        first, *rest = self.table.key
+        match = " AND ".join(
+            [f"t.{first} = s.{first}"] + [f"t.{name} IS NOT DISTINCT FROM s.{name}" for name in rest]
+        )
+        # Both CTEs read the table as it was before the insert, so a row is
+        # either inserted or matched, never both
+        return f"""
+        WITH incoming AS (
+            SELECT DISTINCT ON ({key}) {columns} FROM {staging}
+        ), existing AS (
+            SELECT DISTINCT ON ({staged_key}) t.id FROM incoming s
+            JOIN {self.table.name} t ON {match}
+            ORDER BY {staged_key}, t.id
+        ), inserted AS (
+            INSERT INTO {self.table.name} ({columns})
+            SELECT {columns} FROM incoming s
+            WHERE NOT EXISTS (SELECT 1 FROM {self.table.name} t WHERE {match})
+            RETURNING id
+        )
+        SELECT id, TRUE AS inserted FROM inserted
+        UNION ALL
+        SELECT id, FALSE AS inserted FROM existing
+        """
+
+    async def _write(self, rows: List[tuple]) -> Tuple[List[str], List[str]]:
+        """Ids of the records inserted, and of the already stored records the rest matched"""
+        staging = f"_ingest_{self.table.name}"
+        async with self.db.transaction() as conn:
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", self.table.name)
+            await conn.execute(
+                f"CREATE TEMP TABLE {staging} (LIKE {self.table.name} INCLUDING DEFAULTS) ON COMMIT DROP"
+            )
+            await conn.copy_records_to_table(staging, records=rows, columns=list(self.columns))
+            merged = await conn.fetch(self._merge_query(staging))
+        inserted = [str(row['id']) for row in merged if row['inserted']]
+        existing = [str(row['id']) for row in merged if not row['inserted']]
+        return inserted, existing
+
+    async def flush(self):
+        """Write the buffered records.
+
+        ``on_stored`` receives the ids of every record in the batch, including
+        records a previous job already stored, so downstream processing of a
+        re-scraped area still sees them.
+        """
+        rows, self._buffer = self._buffer, []
+        urls, self._buffer_urls = self._buffer_urls, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return
+
+        written = len(rows)
+        try:
+            inserted, existing = await self._write(rows)
+        except Exception as e:
+            logger.warning(f"Bulk write of {len(rows)} {self.table.name} rows failed, retrying one by one: {e}")
+            inserted, existing = [], []
+            for row in rows:
+                try:
+                    row_inserted, row_existing = await self._write([row])
+                except Exception as row_error:
+                    logger.error(f"Failed to store result: {row_error}")
+                    self.stats["failed"] += 1
+                    written -= 1
+                else:
+                    inserted.extend(row_inserted)
+                    existing.extend(row_existing)
+
+        self.stats["batches"] += 1
+        self.stats["inserted"] += len(inserted)
+        self.stats["duplicates"] += written - len(inserted)
+        ids = inserted + existing
+        if ids and self.on_stored:
+            await self.on_stored(ids, urls)
+
+    async def _report_progress(self, force: bool = False):
+        if not force and time.monotonic() - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = time.monotonic()
+        try:
+            await self.db.update_scraping_job_progress(
+                self.job_id, self.stats["urls"], self.stats["inserted"], self.stats["failed"]
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update progress of job {self.job_id}: {e}")
+
+    async def close(self):
+        """Write whatever is still buffered"""
+        await self.flush()
@@ -2,8 +2,10 @@
 Local LLM for data extraction using Ollama
 """
 import ollama
+import asyncio
 import json
 import logging
+import os
 from typing import Optional, Dict, Any, List
 import time
 from functools import wraps
@@ -23,6 +25,9 @@ class LocalLLM:
         self.model = model
         self.fallback_model = fallback_model
         self.client = ollama.Client()
+        self.async_client = ollama.AsyncClient()
+        # A local model serves few generations at once; extra callers wait instead of thrashing it
+        self._generation_slots = asyncio.Semaphore(int(os.getenv('LLM_CONCURRENCY', '2')))
         
         # Verify model is available
         self._ensure_model_available()
@@ -43,6 +48,27 @@ class LocalLLM:
             logger.error(f"Failed to ensure model availability: {e}")
             raise
     
+    @staticmethod
+    def _build_prompt(text: str, prompt: str) -> str:
+        return f"""{prompt}
+
+TEXT TO EXTRACT FROM:
+{text[:10000]}  # Limit to 10k chars
+
+IMPORTANT: Return ONLY valid JSON. No markdown, no explanations, just JSON.
+"""
+    
+    @staticmethod
+    def _parse_response(response_text: str) -> Any:
+        # Remove markdown code blocks if present
+        response_text = response_text.strip()
+        if response_text.startswith('```'):
+            # Extract JSON from markdown
+            lines = response_text.split('\n')
+            response_text = '\n'.join(lines[1:-1])
+        
+        return json.loads(response_text)
+    
     def extract_json(
         self,
         text: str,
@@ -63,37 +89,17 @@ class LocalLLM:
         
         for attempt in range(max_retries):
             try:
-                # Create full prompt
-                full_prompt = f"""{prompt}
-
-TEXT TO EXTRACT FROM:
-{text[:10000]}  # Limit to 10k chars
-
-IMPORTANT: Return ONLY valid JSON. No markdown, no explanations, just JSON.
-"""
-                
                 # Call LLM
                 response = self.client.generate(
                     model=self.model,
-                    prompt=full_prompt,
+                    prompt=self._build_prompt(text, prompt),
                     options={
                         'temperature': 0.1,  # Low temperature for consistency
                         'top_p': 0.9,
                     }
                 )
                 
-                response_text = response['response']
-                
-                # Try to parse JSON
-                # Remove markdown code blocks if present
-                response_text = response_text.strip()
-                if response_text.startswith('```'):
-                    # Extract JSON from markdown
-                    lines = response_text.split('\n')
-                    response_text = '\n'.join(lines[1:-1])
-                
-                # Parse JSON
-                data = json.loads(response_text)
+                data = self._parse_response(response['response'])
                 
                 logger.info(f"✅ LLM extraction successful on attempt {attempt + 1}")
                 return data
@@ -120,6 +126,47 @@ IMPORTANT: Return ONLY valid JSON. No markdown, no explanations, just JSON.
         logger.error("❌ All LLM extraction attempts failed")
         return None
     
+    async def aextract_json(
+        self,
+        text: str,
+        prompt: str,
+        max_retries: int = 3
+    ) -> Optional[Any]:
+        """
+        Async variant of extract_json: generation and backoff never block the event loop
+        """
+        model = self.model
+        for attempt in range(max_retries):
+            try:
+                async with self._generation_slots:
+                    response = await self.async_client.generate(
+                        model=model,
+                        prompt=self._build_prompt(text, prompt),
+                        options={
+                            'temperature': 0.1,  # Low temperature for consistency
+                            'top_p': 0.9,
+                        }
+                    )
+                data = self._parse_response(response['response'])
+                logger.info(f"✅ LLM extraction successful on attempt {attempt + 1} ({model})")
+                return data
+            
+            except json.JSONDecodeError as e:
+                logger.warning(f"Failed to parse LLM response as JSON (attempt {attempt + 1}): {e}")
+                if attempt == max_retries - 2:
+                    # Try with fallback model
+                    logger.info(f"Trying fallback model: {self.fallback_model}")
+                    model = self.fallback_model
+                    continue
+            except Exception as e:
+                logger.error(f"LLM extraction failed (attempt {attempt + 1}): {e}")
+            
+            if attempt < max_retries - 1:
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+        
+        logger.error("❌ All LLM extraction attempts failed")
+        return None
+    
     def extract_permits(self, html: str) -> List[Dict[str, Any]]:
         """
         Extract permit data from HTML
@@ -6,12 +6,19 @@ optionally ranks/selects the best screenshots via a local heuristic or an
 OpenRouter vision model when configured. Designed to be safe-by-default and
 legal: no scraping of proprietary providers; uses public APIs within their
 free tiers when tokens are provided.
+
+A scan area can be prefetched in bulk into an in-memory spatial index (see
+spatial_index); nearest-image queries inside a prefetched area are then
+answered without calling Mapillary, and rankings are cached per image set.
 """
 
 from __future__ import annotations
 
-import math
+import asyncio
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
@@ -20,6 +27,8 @@ import httpx
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 
+from spatial_index import ImageIndex, ImageRecord, haversine, tile_bounds, tiles_for_bounds
+
 
 SERVICE_NAME = "street-imagery"
 
@@ -28,12 +37,50 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_VISION_MODEL", "llava-v1.6-34b")
 
+MAPILLARY_URL = "https://graph.mapillary.com/images"
+MAPILLARY_FIELDS = "id,thumb_2048_url,captured_at,compass_angle,computed_geometry"
+# Largest page the images endpoint returns; a full page means the box holds more
+MAPILLARY_PAGE_LIMIT = 2000
+# A full tile is split into quadrants at most this many times
+MAX_SPLIT_DEPTH = 2
+PREFETCH_CONCURRENCY = int(os.getenv("STREET_PREFETCH_CONCURRENCY", "4"))
+MAX_PREFETCH_TILES = int(os.getenv("STREET_MAX_PREFETCH_TILES", "400"))
+RANKING_CACHE_TTL = int(os.getenv("STREET_RANKING_CACHE_TTL", str(7 * 86400)))
+RANKING_CACHE_MAX = int(os.getenv("STREET_RANKING_CACHE_MAX", "20000"))
+
 
 app = FastAPI(
     title="Community Street Imagery Service",
     description="Fetch street-level imagery from community/open sources (Mapillary), rank for value to an address, and return URLs + metadata.",
-    version="0.1.0",
+    version="0.2.0",
+)
+
+image_index = ImageIndex(
+    max_images=int(os.getenv("STREET_INDEX_MAX_IMAGES", "200000")),
+    coverage_ttl=float(os.getenv("STREET_INDEX_TTL", "86400")),
 )
+_client: Optional[httpx.AsyncClient] = None
+counters: Dict[str, int] = {
+    "index_answers": 0, "live_answers": 0, "mapillary_requests": 0,
+    "ranking_cache_hits": 0, "ranking_cache_misses": 0,
+}
+
+
+def _http() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=30.0, limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return _client
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 @app.get("/healthz")
@@ -84,6 +131,29 @@ class CommunityStreetResponse(BaseModel):
     success: bool
     assets: List[CommunityStreetAsset]
     note: Optional[str] = None
+    # "index" when answered from prefetched imagery, "live" when Mapillary was queried
+    source: Optional[str] = None
+
+
+class CommunityPrefetchRequest(BaseModel):
+    south: float = Field(..., ge=-90, le=90)
+    west: float = Field(..., ge=-180, le=180)
+    north: float = Field(..., ge=-90, le=90)
+    east: float = Field(..., ge=-180, le=180)
+    force: bool = Field(False, description="Harvest again even if the area was prefetched recently")
+
+
+class CommunityPrefetchResponse(BaseModel):
+    success: bool
+    tiles_total: int
+    tiles_harvested: int
+    tiles_fresh: int
+    tiles_failed: int
+    tiles_truncated: int = 0
+    tiles_evicted: int = 0
+    images_found: int
+    images_indexed: int
+    note: Optional[str] = None
 
 
 @dataclass
@@ -95,14 +165,42 @@ class Candidate:
     captured_at: Optional[str]
 
 
-def _haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    r = 6371000.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlmb = math.radians(lon2 - lon1)
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
-    return 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def _parse_mapillary(item: Dict[str, Any]) -> Optional[ImageRecord]:
+    thumb = item.get("thumb_2048_url")
+    geom = (item.get("computed_geometry") or {}).get("coordinates") or []
+    if not thumb or len(geom) != 2:
+        return None
+    return ImageRecord(
+        id=str(item.get("id") or thumb),
+        provider="mapillary",
+        url=thumb,
+        lat=float(geom[1]),
+        lon=float(geom[0]),
+        heading=float(item.get("compass_angle") or 0.0),
+        captured_at=item.get("captured_at"),
+    )
+
+
+async def _mapillary_images(params: Dict[str, str]) -> List[ImageRecord]:
+    counters["mapillary_requests"] += 1
+    resp = await _http().get(
+        MAPILLARY_URL, params={"access_token": MAPILLARY_TOKEN, "fields": MAPILLARY_FIELDS, **params}
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    items = data.get("data", []) if isinstance(data, dict) else []
+    parsed = (_parse_mapillary(item) for item in items)
+    return [record for record in parsed if record is not None]
+
+
+def _candidate(record: ImageRecord, distance: float) -> Candidate:
+    return Candidate(
+        provider=record.provider,
+        url=record.url,
+        heading=record.heading,
+        distance_m=round(distance, 2),
+        captured_at=record.captured_at,
+    )
 
 
 async def _fetch_mapillary_candidates(lat: float, lon: float, radius_m: int, max_results: int) -> List[Candidate]:
@@ -110,54 +208,114 @@ async def _fetch_mapillary_candidates(lat: float, lon: float, radius_m: int, max
         return []
     # Mapillary Graph API v4: nearest images with geometry and thumb URL
     # Docs: https://www.mapillary.com/developer/api-documentation
-    fields = "id,thumb_2048_url,captured_at,compass_angle,computed_geometry"
-    params = {
-        "access_token": MAPILLARY_TOKEN,
-        "fields": fields,
-        "limit": str(max_results),
-        "closeto": f"{lon},{lat}",
-    }
-    url = "https://graph.mapillary.com/images"
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        resp = await client.get(url, params=params)
-        try:
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as exc:
-            raise HTTPException(status_code=502, detail=f"Mapillary error: {exc}")
-        data = resp.json()
+    try:
+        records = await _mapillary_images({"limit": str(max_results), "closeto": f"{lon},{lat}"})
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=502, detail=f"Mapillary error: {exc}")
+    # Live results also feed the index, though they do not mark their area as covered
+    image_index.add_many(records)
 
-    items = data.get("data", []) if isinstance(data, dict) else []
     candidates: List[Candidate] = []
-    for item in items:
-        thumb = item.get("thumb_2048_url")
-        geom = (item.get("computed_geometry") or {}).get("coordinates") or []
-        if not thumb or len(geom) != 2:
-            continue
-        img_lon, img_lat = float(geom[0]), float(geom[1])
-        dist = _haversine(lat, lon, img_lat, img_lon)
+    for record in records:
+        dist = haversine(lat, lon, record.lat, record.lon)
         if dist > radius_m:
             continue
-        candidates.append(
-            Candidate(
-                provider="mapillary",
-                url=thumb,
-                heading=float(item.get("compass_angle") or 0.0),
-                distance_m=round(dist, 2),
-                captured_at=item.get("captured_at"),
-            )
-        )
+        candidates.append(_candidate(record, dist))
     return candidates
 
 
+def _indexed_candidates(lat: float, lon: float, radius_m: int, max_results: int) -> List[Candidate]:
+    return [_candidate(record, distance) for record, distance in image_index.nearest(lat, lon, radius_m, max_results)]
+
+
+async def _harvest_box(
+    south: float, west: float, north: float, east: float, depth: int = 0
+) -> Tuple[List[ImageRecord], bool]:
+    """Images in the box, splitting it into quadrants while pages come back full.
+
+    The flag is False when a box was still full at the deepest split, i.e.
+    the images returned are only part of what the box holds.
+    """
+    records = await _mapillary_images({"limit": str(MAPILLARY_PAGE_LIMIT), "bbox": f"{west},{south},{east},{north}"})
+    if len(records) < MAPILLARY_PAGE_LIMIT:
+        return records, True
+    if depth >= MAX_SPLIT_DEPTH:
+        return records, False
+    mid_lat, mid_lon = (south + north) / 2, (west + east) / 2
+    quadrants = [
+        (south, west, mid_lat, mid_lon), (south, mid_lon, mid_lat, east),
+        (mid_lat, west, north, mid_lon), (mid_lat, mid_lon, north, east),
+    ]
+    found: Dict[str, ImageRecord] = {}
+    complete = True
+    for quadrant in quadrants:
+        quadrant_records, quadrant_complete = await _harvest_box(*quadrant, depth=depth + 1)
+        complete = complete and quadrant_complete
+        for record in quadrant_records:
+            found[record.id] = record
+    return list(found.values()), complete
+
+
 def _score_occlusion_and_quality() -> Tuple[float, float]:
     # Lightweight placeholders: in lieu of full CV pipeline, return neutral scores.
     # The backend can apply richer scoring once the image bytes are analyzed.
     return 0.25, 0.65
 
 
+class RankingCache:
+    """Bounded, expiring best-first URL orders keyed by model, location and image set"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+    @staticmethod
+    def key(lat: float, lon: float, candidates: List[Candidate]) -> str:
+        # The prompt names the house, so the order is reused for the same image set seen from ~10m away
+        urls = "\n".join(sorted(c.url for c in candidates))
+        return hashlib.sha256(f"{OPENROUTER_MODEL}|{lat:.4f},{lon:.4f}|{urls}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > self.ttl_seconds:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, ordered: List[str]) -> None:
+        self._entries[key] = (time.time(), ordered)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+ranking_cache = RankingCache(RANKING_CACHE_MAX, RANKING_CACHE_TTL)
+
+
+def _apply_order(candidates: List[Candidate], ordered: List[str]) -> List[Candidate]:
+    url_to_candidate = {c.url: c for c in candidates}
+    ranked: List[Candidate] = [url_to_candidate[u] for u in ordered if u in url_to_candidate]
+    # append any not mentioned to preserve full set
+    for c in candidates:
+        if c not in ranked:
+            ranked.append(c)
+    return ranked
+
+
 async def _rank_with_openrouter(lat: float, lon: float, candidates: List[Candidate]) -> List[Candidate]:
     if not OPENROUTER_API_KEY or not candidates:
         return candidates
+    cache_key = RankingCache.key(lat, lon, candidates)
+    cached = ranking_cache.get(cache_key)
+    if cached is not None:
+        counters["ranking_cache_hits"] += 1
+        return _apply_order(candidates, cached)
+    counters["ranking_cache_misses"] += 1
     # Provide the model with a short list of candidate URLs and ask for top-N order.
     # Many vision models accept image URLs as inputs via multi-part JSON.
     # We will do a simple completion with list of URLs and request a re-ordered list.
@@ -182,10 +340,9 @@ async def _rank_with_openrouter(lat: float, lon: float, candidates: List[Candida
         "Content-Type": "application/json",
     }
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.post(f"{OPENROUTER_BASE_URL}/chat/completions", json=payload, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await _http().post(f"{OPENROUTER_BASE_URL}/chat/completions", json=payload, headers=headers)
+        resp.raise_for_status()
+        data = resp.json()
     except Exception:
         return candidates
 
@@ -199,13 +356,14 @@ async def _rank_with_openrouter(lat: float, lon: float, candidates: List[Candida
     ordered: List[str] = [line.strip() for line in text.splitlines() if line.strip().startswith("http")]
     if not ordered:
         return candidates
-    url_to_candidate = {c.url: c for c in candidates}
-    ranked: List[Candidate] = [url_to_candidate[u] for u in ordered if u in url_to_candidate]
-    # append any not mentioned to preserve full set
-    for c in candidates:
-        if c not in ranked:
-            ranked.append(c)
-    return ranked
+    ranking_cache.put(cache_key, ordered)
+    return _apply_order(candidates, ordered)
+
+
+def _heading_gap(a: float, b: float) -> float:
+    """Angle between two compass headings, so 350 and 5 are 15 degrees apart"""
+    gap = abs(a - b) % 360
+    return min(gap, 360 - gap)
 
 
 def _select_diverse_angles(candidates: List[Candidate], k: int) -> List[Candidate]:
@@ -216,7 +374,7 @@ def _select_diverse_angles(candidates: List[Candidate], k: int) -> List[Candidat
     for c in candidates:
         if len(chosen) >= k:
             break
-        if c.heading is not None and any(abs(c.heading - u) < 30 for u in used):
+        if c.heading is not None and any(_heading_gap(c.heading, u) < 30 for u in used):
             continue
         chosen.append(c)
         if c.heading is not None:
@@ -228,15 +386,21 @@ def _select_diverse_angles(candidates: List[Candidate], k: int) -> List[Candidat
 async def get_community_street_images(payload: CommunityStreetRequest) -> CommunityStreetResponse:
     """Return best street-level images near lat/lon from community sources.
 
-    Selection order: Mapillary → (future: KartaView/Panoramax) → empty.
+    Selection order: prefetched index → Mapillary → (future: KartaView/Panoramax) → empty.
     Optionally uses OpenRouter to re-rank candidates.
     """
     if not MAPILLARY_TOKEN:
         return CommunityStreetResponse(success=True, assets=[], note="No community providers configured (set MAPILLARY_TOKEN)")
 
-    candidates = await _fetch_mapillary_candidates(payload.lat, payload.lon, payload.radius_m, payload.max_results)
+    if image_index.covers(payload.lat, payload.lon, payload.radius_m):
+        source = "index"
+        candidates = _indexed_candidates(payload.lat, payload.lon, payload.radius_m, payload.max_results)
+    else:
+        source = "live"
+        candidates = await _fetch_mapillary_candidates(payload.lat, payload.lon, payload.radius_m, payload.max_results)
+    counters[f"{source}_answers"] += 1
     if not candidates:
-        return CommunityStreetResponse(success=True, assets=[], note="No images found within radius")
+        return CommunityStreetResponse(success=True, assets=[], note="No images found within radius", source=source)
 
     if payload.prefer_openrouter_ranking:
         candidates = await _rank_with_openrouter(payload.lat, payload.lon, candidates)
@@ -258,7 +422,85 @@ async def get_community_street_images(payload: CommunityStreetRequest) -> Commun
             )
         )
 
-    return CommunityStreetResponse(success=True, assets=assets)
+    return CommunityStreetResponse(success=True, assets=assets, source=source)
+
+
+@app.post("/images/community/prefetch", response_model=CommunityPrefetchResponse)
+async def prefetch_community_street_images(payload: CommunityPrefetchRequest) -> CommunityPrefetchResponse:
+    """Harvest image metadata for a whole scan area into the spatial index.
+
+    The box is covered by ~1km tiles; tiles harvested within the index TTL
+    are skipped unless ``force`` is set. Nearest-image queries whose search
+    circle lies inside harvested tiles are then answered from memory.
+    """
+    if payload.south >= payload.north or payload.west >= payload.east:
+        raise HTTPException(status_code=400, detail="Bounding box must have south < north and west < east")
+    tiles = tiles_for_bounds(payload.south, payload.west, payload.north, payload.east)
+    if len(tiles) > MAX_PREFETCH_TILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Bounding box covers {len(tiles)} tiles; split it into areas of at most {MAX_PREFETCH_TILES}",
+        )
+    if not MAPILLARY_TOKEN:
+        return CommunityPrefetchResponse(
+            success=True, tiles_total=len(tiles), tiles_harvested=0, tiles_fresh=0, tiles_failed=0,
+            images_found=0, images_indexed=0, note="No community providers configured (set MAPILLARY_TOKEN)",
+        )
+
+    stale = sorted(tiles) if payload.force else sorted(image_index.stale_tiles(tiles))
+    semaphore = asyncio.Semaphore(PREFETCH_CONCURRENCY)
+
+    async def harvest(tile):
+        async with semaphore:
+            return tile, await _harvest_box(*tile_bounds(tile))
+
+    outcomes = await asyncio.gather(*(harvest(tile) for tile in stale), return_exceptions=True)
+    harvested, truncated, found, indexed = [], 0, 0, 0
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            continue
+        tile, (records, complete) = outcome
+        found += len(records)
+        if complete:
+            indexed += image_index.add_harvest(tile, records)
+            harvested.append(tile)
+        else:
+            # Only part of a dense tile came back; leave it to live lookups
+            image_index.unmark(tile)
+            indexed += image_index.add_many(records)
+            truncated += 1
+    # A prefetch larger than the index evicts its own oldest tiles
+    evicted = sum(1 for tile in harvested if not image_index.is_fresh(tile))
+
+    failed = len(stale) - len(harvested) - truncated
+    notes = []
+    if failed:
+        notes.append(f"{failed} tiles failed")
+    if truncated:
+        notes.append(f"{truncated} tiles too dense to harvest completely")
+    if evicted:
+        notes.append(f"{evicted} tiles evicted because the index is full")
+    return CommunityPrefetchResponse(
+        success=failed == 0,
+        tiles_total=len(tiles),
+        tiles_harvested=len(harvested) - evicted,
+        tiles_fresh=len(tiles) - len(stale),
+        tiles_failed=failed,
+        tiles_truncated=truncated,
+        tiles_evicted=evicted,
+        images_found=found,
+        images_indexed=indexed,
+        note="; ".join(notes) + "; queries there fall back to live lookups" if notes else None,
+    )
+
+
+@app.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    return {
+        "index": image_index.snapshot(),
+        "ranking_cache": {"entries": len(ranking_cache)},
+        **counters,
+    }
 
 
 if __name__ == "__main__":
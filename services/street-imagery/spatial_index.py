@@ -0,0 +1,177 @@
+"""
+In-memory spatial index of community street imagery
+
+Image metadata (location, compass heading, capture time) harvested for a
+scan area is bucketed on a fine lat/lon grid, so nearest-image queries for
+every property in the area are answered from memory. Harvests are recorded
+per coverage tile, a coarser grid: a query is only answered from the index
+when every tile its search circle touches was harvested recently. When the
+index is full, the oldest tiles and their images are dropped first.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# ~110m of latitude per bucket
+BUCKET_DEG = 0.001
+# ~1.1km of latitude per coverage tile
+TILE_DEG = 0.01
+METERS_PER_DEG_LAT = 111_320.0
+
+Cell = Tuple[int, int]
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    r = 6371000.0
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * r * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def cell_of(lat: float, lon: float, size: float) -> Cell:
+    return math.floor(lat / size), math.floor(lon / size)
+
+
+def cells_in_bounds(south: float, west: float, north: float, east: float, size: float) -> Iterator[Cell]:
+    low, high = cell_of(south, west, size), cell_of(north, east, size)
+    for row in range(low[0], high[0] + 1):
+        for col in range(low[1], high[1] + 1):
+            yield row, col
+
+
+def tile_bounds(tile: Cell, size: float = TILE_DEG) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a tile"""
+    return tile[0] * size, tile[1] * size, (tile[0] + 1) * size, (tile[1] + 1) * size
+
+
+def circle_bounds(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    dlat = radius_m / METERS_PER_DEG_LAT
+    dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+@dataclass(frozen=True)
+class ImageRecord:
+    id: str
+    provider: str
+    url: str
+    lat: float
+    lon: float
+    heading: Optional[float]
+    captured_at: Optional[str]
+
+
+class ImageIndex:
+    """Grid-bucketed image metadata plus the coverage tiles it was harvested for"""
+
+    def __init__(self, max_images: int = 200_000, coverage_ttl: float = 86400.0) -> None:
+        self.max_images = max_images
+        self.coverage_ttl = coverage_ttl
+        self._buckets: Dict[Cell, Dict[str, ImageRecord]] = {}
+        self._images: Dict[str, ImageRecord] = {}
+        # Harvest time per coverage tile, oldest first
+        self._tiles: "OrderedDict[Cell, float]" = OrderedDict()
+        self.stats = {"indexed": 0, "evicted_tiles": 0, "evicted_images": 0}
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    @property
+    def tiles(self) -> int:
+        return len(self._tiles)
+
+    def add_many(self, records: Iterable[ImageRecord]) -> int:
+        added = 0
+        for record in records:
+            previous = self._images.get(record.id)
+            if previous is not None:
+                self._buckets.get(cell_of(previous.lat, previous.lon, BUCKET_DEG), {}).pop(record.id, None)
+            else:
+                added += 1
+            self._images[record.id] = record
+            self._buckets.setdefault(cell_of(record.lat, record.lon, BUCKET_DEG), {})[record.id] = record
+        self.stats["indexed"] += added
+        self._evict()
+        return added
+
+    def mark_harvested(self, tiles: Iterable[Cell], at: Optional[float] = None) -> None:
+        at = time.time() if at is None else at
+        for tile in tiles:
+            self._tiles.pop(tile, None)
+            self._tiles[tile] = at
+
+    def add_harvest(self, tile: Cell, records: Iterable[ImageRecord], at: Optional[float] = None) -> int:
+        """Index a complete harvest of ``tile`` and mark it covered.
+
+        The tile is marked before its images are added, so if the index
+        overflows while adding them, eviction drops the tile's mark together
+        with its images instead of leaving a covered tile with no images.
+        """
+        self.mark_harvested([tile], at)
+        return self.add_many(records)
+
+    def unmark(self, tile: Cell) -> None:
+        """Stop answering queries in ``tile`` from the index"""
+        self._tiles.pop(tile, None)
+
+    def is_fresh(self, tile: Cell) -> bool:
+        harvested = self._tiles.get(tile)
+        return harvested is not None and time.time() - harvested <= self.coverage_ttl
+
+    def covers(self, lat: float, lon: float, radius_m: float) -> bool:
+        """Whether every tile the search circle touches was harvested within the TTL"""
+        return all(self.is_fresh(tile) for tile in cells_in_bounds(*circle_bounds(lat, lon, radius_m), TILE_DEG))
+
+    def _drop_tile(self, tile: Cell) -> None:
+        self._tiles.pop(tile, None)
+        for bucket in cells_in_bounds(*tile_bounds(tile), BUCKET_DEG):
+            # Buckets on the tile's far edges belong to the neighbouring tiles
+            if cell_of((bucket[0] + 0.5) * BUCKET_DEG, (bucket[1] + 0.5) * BUCKET_DEG, TILE_DEG) != tile:
+                continue
+            for image_id in self._buckets.pop(bucket, {}):
+                self._images.pop(image_id, None)
+                self.stats["evicted_images"] += 1
+        self.stats["evicted_tiles"] += 1
+
+    def _evict(self) -> None:
+        while len(self._images) > self.max_images:
+            if self._tiles:
+                self._drop_tile(next(iter(self._tiles)))
+                continue
+            # Only live lookups left: drop the images indexed first
+            image_id, record = next(iter(self._images.items()))
+            del self._images[image_id]
+            bucket = cell_of(record.lat, record.lon, BUCKET_DEG)
+            self._buckets.get(bucket, {}).pop(image_id, None)
+            if not self._buckets.get(bucket):
+                self._buckets.pop(bucket, None)
+            self.stats["evicted_images"] += 1
+
+    def nearest(self, lat: float, lon: float, radius_m: float, limit: int) -> List[Tuple[ImageRecord, float]]:
+        """Up to ``limit`` images within ``radius_m``, closest first, with their distances"""
+        found: List[Tuple[ImageRecord, float]] = []
+        for bucket in cells_in_bounds(*circle_bounds(lat, lon, radius_m), BUCKET_DEG):
+            for record in self._buckets.get(bucket, {}).values():
+                distance = haversine(lat, lon, record.lat, record.lon)
+                if distance <= radius_m:
+                    found.append((record, distance))
+        found.sort(key=lambda item: item[1])
+        return found[:limit]
+
+    def stale_tiles(self, tiles: Iterable[Cell]) -> List[Cell]:
+        return [tile for tile in tiles if not self.is_fresh(tile)]
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"images": len(self._images), "buckets": len(self._buckets), "tiles": len(self._tiles), **self.stats}
+
+
+def tiles_for_bounds(south: float, west: float, north: float, east: float) -> Set[Cell]:
+    return set(cells_in_bounds(south, west, north, east, TILE_DEG))
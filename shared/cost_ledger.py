@@ -0,0 +1,296 @@
+"""
+Shared cost ledger with buffered appends and checkpointed daily aggregates
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DayLike = Union[str, date, datetime]
+
+
+def day_key(value: Optional[DayLike] = None) -> str:
+    """Normalise a date/datetime/ISO string to the ledger's ``YYYYMMDD`` key"""
+    if value is None:
+        return datetime.now().strftime("%Y%m%d")
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y%m%d")
+    if len(value) == 8 and value.isdigit():
+        return value
+    return datetime.fromisoformat(value).strftime("%Y%m%d")
+
+
+@dataclass
+class DayAggregate:
+    """Running totals for one day (or a merged range) of ledger entries"""
+    day: str
+    entries: int = 0
+    total_cost: float = 0.0
+    source_usage: Dict[str, int] = field(default_factory=dict)
+    source_cost: Dict[str, float] = field(default_factory=dict)
+    # Bytes of the day's JSONL file already folded into the totals
+    offset: int = 0
+
+    def apply(self, entry: Dict[str, Any]):
+        self.entries += 1
+        self.total_cost += float(entry.get("total_cost") or 0.0)
+        for source in entry.get("sources_used") or ():
+            self.source_usage[source] = self.source_usage.get(source, 0) + 1
+        for source, cost in (entry.get("source_costs") or {}).items():
+            self.source_cost[source] = self.source_cost.get(source, 0.0) + float(cost)
+
+    def merge(self, other: "DayAggregate"):
+        self.entries += other.entries
+        self.total_cost += other.total_cost
+        for source, count in other.source_usage.items():
+            self.source_usage[source] = self.source_usage.get(source, 0) + count
+        for source, cost in other.source_cost.items():
+            self.source_cost[source] = self.source_cost.get(source, 0.0) + cost
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day": self.day,
+            "entries": self.entries,
+            "total_cost": self.total_cost,
+            "source_usage": dict(self.source_usage),
+            "source_cost": dict(self.source_cost),
+            "offset": self.offset,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DayAggregate":
+        return cls(
+            day=data["day"],
+            entries=int(data.get("entries", 0)),
+            total_cost=float(data.get("total_cost", 0.0)),
+            source_usage=dict(data.get("source_usage") or {}),
+            source_cost=dict(data.get("source_cost") or {}),
+            offset=int(data.get("offset", 0)),
+        )
+
+
+class CostLedger:
+    """Append-only cost ledger: ``costs_YYYYMMDD.jsonl`` plus a per-day
+    ``costs_YYYYMMDD.agg.json`` checkpoint.
+
+    Appends are buffered and written in batches; aggregates are maintained in
+    memory as entries are recorded and checkpointed together with the byte
+    offset they cover. Loading a day reads the checkpoint and replays only the
+    tail written after it, so summaries never re-parse a whole day's file.
+    Use one writing process per ledger directory; readers may pass
+    ``read_only=True``. At most ``max_cached_days`` aggregates stay in memory;
+    the least recently used days without unwritten changes are dropped first
+    and reloaded from their checkpoint when asked for again.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        flush_every: int = 200,
+        flush_interval: float = 2.0,
+        checkpoint_interval: float = 30.0,
+        read_only: bool = False,
+        max_cached_days: int = 400,
+    ):
+        self.root = Path(root)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.read_only = read_only
+        self.max_cached_days = max(1, max_cached_days)
+        self._lock = threading.RLock()
+        self._days: "OrderedDict[str, DayAggregate]" = OrderedDict()
+        self._pending: Dict[str, List[str]] = {}
+        self._pending_count = 0
+        self._dirty: set = set()
+        self._last_flush = time.monotonic()
+        self._last_checkpoint = time.monotonic()
+
+    def _entries_path(self, day: str) -> Path:
+        return self.root / f"costs_{day}.jsonl"
+
+    def _checkpoint_path(self, day: str) -> Path:
+        return self.root / f"costs_{day}.agg.json"
+
+    # -- writes -----------------------------------------------------------
+
+    def record(self, entry: Dict[str, Any]) -> DayAggregate:
+        """Buffer one entry and fold it into its day's aggregate.
+
+        ``entry`` needs ``total_cost`` and may carry ``sources_used`` (list),
+        ``source_costs`` (mapping) and ``timestamp`` (ISO, defaults to now).
+        """
+        if self.read_only:
+            raise RuntimeError("CostLedger opened read-only")
+        entry.setdefault("timestamp", datetime.now().isoformat())
+        day = day_key(entry["timestamp"])
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            aggregate = self._day(day)
+            aggregate.apply(entry)
+            self._pending.setdefault(day, []).append(line)
+            self._pending_count += 1
+            self._dirty.add(day)
+            self.maybe_flush()
+            return aggregate
+
+    def maybe_flush(self):
+        """Flush/checkpoint when a batch or interval is due; cheap to call often"""
+        with self._lock:
+            now = time.monotonic()
+            if self._pending_count >= self.flush_every or (
+                self._pending and now - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+            if self._dirty and now - self._last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+
+    def flush(self):
+        """Write buffered entries, one append per day file"""
+        with self._lock:
+            if not self._pending:
+                self._last_flush = time.monotonic()
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            for day, lines in self._pending.items():
+                data = "".join(lines).encode("utf-8")
+                with open(self._entries_path(day), "ab") as handle:
+                    handle.write(data)
+                self._days[day].offset += len(data)
+            self._pending.clear()
+            self._pending_count = 0
+            self._last_flush = time.monotonic()
+
+    def checkpoint(self):
+        """Flush, then persist aggregates for days changed since the last checkpoint"""
+        with self._lock:
+            self.flush()
+            for day in list(self._dirty):
+                path = self._checkpoint_path(day)
+                tmp = path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self._days[day].to_dict()))
+                os.replace(tmp, path)
+            self._dirty.clear()
+            self._last_checkpoint = time.monotonic()
+
+    def close(self):
+        if not self.read_only:
+            self.checkpoint()
+
+    # -- reads ------------------------------------------------------------
+
+    def _day(self, day: str) -> DayAggregate:
+        aggregate = self._days.get(day)
+        if aggregate is None:
+            aggregate = self._load_day(day)
+            self._days[day] = aggregate
+            self._evict(keep=day)
+        elif self.read_only:
+            # Another process owns the file; pick up whatever it appended since
+            entries = self._entries_path(day)
+            size = entries.stat().st_size if entries.exists() else 0
+            if size < aggregate.offset:
+                aggregate = self._days[day] = self._load_day(day)
+            elif size > aggregate.offset:
+                self._replay(entries, aggregate)
+        self._days.move_to_end(day)
+        return aggregate
+
+    def _evict(self, keep: str):
+        """Drop least recently used days, other than ``keep``, whose changes are all written and checkpointed"""
+        excess = len(self._days) - self.max_cached_days
+        if excess <= 0:
+            return
+        clean = []
+        for day in self._days:
+            if len(clean) >= excess:
+                break
+            if day != keep and day not in self._dirty and day not in self._pending:
+                clean.append(day)
+        for day in clean:
+            del self._days[day]
+
+    def _load_day(self, day: str) -> DayAggregate:
+        aggregate = DayAggregate(day=day)
+        checkpoint = self._checkpoint_path(day)
+        if checkpoint.exists():
+            try:
+                aggregate = DayAggregate.from_dict(json.loads(checkpoint.read_text()))
+            except (ValueError, KeyError) as exc:
+                logger.warning(f"Ignoring unreadable cost checkpoint {checkpoint}: {exc}")
+                aggregate = DayAggregate(day=day)
+
+        entries = self._entries_path(day)
+        size = entries.stat().st_size if entries.exists() else 0
+        if size < aggregate.offset:
+            # File was truncated or replaced; the checkpoint no longer applies
+            aggregate = DayAggregate(day=day)
+        if size > aggregate.offset:
+            replayed = self._replay(entries, aggregate)
+            if replayed and not self.read_only:
+                self._dirty.add(day)
+        return aggregate
+
+    @staticmethod
+    def _replay(path: Path, aggregate: DayAggregate) -> int:
+        """Fold complete lines after ``aggregate.offset`` into ``aggregate``"""
+        replayed = 0
+        with open(path, "rb") as handle:
+            handle.seek(aggregate.offset)
+            for raw in handle:
+                if not raw.endswith(b"\n"):
+                    break  # partially written line; picked up on the next load
+                aggregate.offset += len(raw)
+                try:
+                    aggregate.apply(json.loads(raw))
+                    replayed += 1
+                except ValueError:
+                    logger.warning(f"Skipping malformed cost entry in {path}")
+        return replayed
+
+    def day(self, value: Optional[DayLike] = None) -> DayAggregate:
+        """Aggregate for one day (today by default)"""
+        with self._lock:
+            return self._day(day_key(value))
+
+    def days(self, start: DayLike, end: DayLike) -> List[DayAggregate]:
+        """Per-day aggregates for the inclusive range ``start``..``end``"""
+        first = datetime.strptime(day_key(start), "%Y%m%d").date()
+        last = datetime.strptime(day_key(end), "%Y%m%d").date()
+        with self._lock:
+            return [
+                self._day(day_key(first + timedelta(days=offset)))
+                for offset in range((last - first).days + 1)
+            ]
+
+    def summary(self, start: DayLike, end: Optional[DayLike] = None) -> DayAggregate:
+        """Merged aggregate for the inclusive range (a single day if ``end`` is omitted)"""
+        days = self.days(start, end if end is not None else start)
+        if not days:
+            return DayAggregate(day=day_key(start))
+        label = days[0].day if len(days) == 1 else f"{days[0].day}-{days[-1].day}"
+        merged = DayAggregate(day=label)
+        for aggregate in days:
+            merged.merge(aggregate)
+        return merged
+
+
+def iter_billing_rows(days: Iterable[DayAggregate], metric_prefix: str = "imagery") -> Iterable[Dict[str, Any]]:
+    """Flatten aggregates into ``billing_usage``-shaped rows (day, metric, quantity, cost_usd)"""
+    for aggregate in days:
+        day = datetime.strptime(aggregate.day, "%Y%m%d").date()
+        for source, count in sorted(aggregate.source_usage.items()):
+            yield {
+                "day": day,
+                "metric": f"{metric_prefix}.{source}",
+                "quantity": float(count),
+                "cost_usd": aggregate.source_cost.get(source, 0.0),
+            }
@@ -4,7 +4,8 @@ Shared database utilities for all microservices
 import asyncpg
 import os
 import logging
-from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator
 from datetime import datetime
 import json
 
@@ -53,6 +54,15 @@ class DatabaseClient:
             rows = await conn.fetch(query, *args)
             return [dict(row) for row in rows]
     
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[asyncpg.Connection]:
+        """Pooled connection inside a transaction, for multi-statement writes such as COPY"""
+        if not self._pool:
+            await self.connect()
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                yield conn
+    
     async def insert_scraping_job(
         self,
         job_type: str,
@@ -87,6 +97,21 @@ class DatabaseClient:
         """
         await self.execute(query, job_id, status, records_processed, records_succeeded, records_failed, error_message)
     
+    async def update_scraping_job_progress(
+        self,
+        job_id: str,
+        records_processed: int,
+        records_succeeded: int,
+        records_failed: int
+    ) -> None:
+        """Update a running job's counters without changing its status"""
+        query = """
+        UPDATE scraping_jobs
+        SET records_processed = $2, records_succeeded = $3, records_failed = $4
+        WHERE id = $1
+        """
+        await self.execute(query, job_id, records_processed, records_succeeded, records_failed)
+    
     async def log_scraping_error(
         self,
         job_id: str,
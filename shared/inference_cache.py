@@ -0,0 +1,137 @@
+"""
+Content-addressed inference result cache with an LRU memory tier and a disk tier
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def content_hash(data: bytes) -> str:
+    """Stable key for a piece of image content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _safe_segment(value: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in value) or "_"
+
+
+class InferenceResultCache:
+    """Results keyed by ``(content hash, model name, model version)``.
+
+    The memory tier is a bounded LRU; the optional disk tier stores one JSON
+    file per result under ``<root>/<model>/<version>/<hh>/<hash>.json``. The
+    version is part of every key, so activating a new model version turns old
+    entries into misses without any explicit flush; ``purge_stale`` reclaims
+    their disk space. Values must be JSON-serialisable. ``get`` returns a fresh
+    copy so callers may mutate what they receive.
+    """
+
+    digest = staticmethod(content_hash)
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, max_entries: int = 2048):
+        self.root = Path(root) if root else None
+        self.max_entries = max(0, max_entries)
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key: Tuple[str, str, str]) -> Path:
+        digest, model, version = key
+        return self.root / _safe_segment(model) / _safe_segment(version) / digest[:2] / f"{digest}.json"
+
+    def _remember(self, key: Tuple[str, str, str], payload: str):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._memory[key] = payload
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, digest: str, model: str, version: Optional[str], default: Any = None) -> Any:
+        key = (digest, model, str(version or "unknown"))
+        with self._lock:
+            payload = self._memory.get(key, _MISSING)
+            if payload is not _MISSING:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        if payload is _MISSING and self.root is not None:
+            path = self._path(key)
+            try:
+                payload = path.read_text()
+                json.loads(payload)
+            except FileNotFoundError:
+                payload = _MISSING
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Discarding unreadable inference cache entry {path}: {exc}")
+                payload = _MISSING
+            else:
+                self._remember(key, payload)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+        if payload is _MISSING:
+            with self._lock:
+                self.misses += 1
+            return default
+        return json.loads(payload)
+
+    def put(self, digest: str, model: str, version: Optional[str], value: Any):
+        key = (digest, model, str(version or "unknown"))
+        payload = json.dumps(value, default=str)
+        self._remember(key, payload)
+        if self.root is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(payload)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning(f"Could not persist inference cache entry {path}: {exc}")
+
+    def purge_stale(self, model: str, current_version: Optional[str]) -> Dict[str, int]:
+        """Drop entries of ``model`` cached under any version but ``current_version``.
+
+        Returns the number of memory entries and of on-disk version
+        directories removed, separately.
+        """
+        current = str(current_version or "unknown")
+        with self._lock:
+            stale = [key for key in self._memory if key[1] == model and key[2] != current]
+            for key in stale:
+                del self._memory[key]
+        removed_dirs = 0
+        if self.root is not None:
+            model_dir = self.root / _safe_segment(model)
+            if model_dir.is_dir():
+                for version_dir in model_dir.iterdir():
+                    if version_dir.is_dir() and version_dir.name != _safe_segment(current):
+                        shutil.rmtree(version_dir, ignore_errors=True)
+                        removed_dirs += 1
+        return {"memory_entries": len(stale), "version_dirs": removed_dirs}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk": str(self.root) if self.root else None,
+        }
@@ -0,0 +1,76 @@
+"""
+Workflow progress events over Redis streams
+
+A caller that wants to follow work it hands to another service passes a
+stream name along with the request (``event_stream``); the service appends an
+event to that stream as each piece of work finishes. Readers block on XREAD,
+so progress arrives as it happens instead of by polling job status, and
+events written before the reader started are still delivered.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from shared.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+STREAM_TTL_SECONDS = 86400
+STREAM_MAXLEN = 10000
+
+
+async def publish_event(stream: Optional[str], event: str, redis=None, **fields: Any) -> bool:
+    """Append ``event`` with ``fields`` to ``stream``.
+
+    A no-op when no stream was requested. Failures are logged, not raised:
+    events only speed up the reader, which falls back to its own timeouts.
+    """
+    if not stream:
+        return False
+    try:
+        client = redis or await redis_client.client()
+        payload = json.dumps({'event': event, **fields}, default=str)
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.xadd(stream, {'data': payload}, maxlen=STREAM_MAXLEN, approximate=True)
+            pipe.expire(stream, STREAM_TTL_SECONDS)
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to publish {event} event to {stream}: {e}")
+        return False
+
+
+class EventStreamReader:
+    """Reads events from one stream in order, remembering its position"""
+
+    def __init__(self, stream: str, redis=None, last_id: str = '0'):
+        self.stream = stream
+        self.last_id = last_id
+        self._redis = redis
+
+    async def _client(self):
+        if self._redis is None:
+            self._redis = await redis_client.client()
+        return self._redis
+
+    async def read(self, block_ms: int = 5000, count: int = 100) -> List[Dict[str, Any]]:
+        """Events after the last one read, waiting up to ``block_ms`` for the first"""
+        client = await self._client()
+        response = await client.xread({self.stream: self.last_id}, count=count, block=block_ms)
+        events = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                self.last_id = entry_id
+                try:
+                    events.append(json.loads(fields.get('data') or '{}'))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed event {entry_id} on {self.stream}")
+        return events
+
+    async def delete(self) -> None:
+        """Drop the stream once the run that owns it is finished"""
+        try:
+            client = await self._client()
+            await client.delete(self.stream)
+        except Exception as e:
+            logger.warning(f"Failed to delete event stream {self.stream}: {e}")
@@ -2,46 +2,198 @@
 Shared Redis client for all microservices
 """
 import redis.asyncio as redis
+import asyncio
 import json
 import logging
-from typing import Any, Optional, Dict
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 import os
 
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = "redis_client:invalidate"
+
+
+class LocalCache:
+    """Bounded in-process copy of recently read keys, each kept for at most ``ttl`` seconds"""
+
+    def __init__(self, prefixes: Sequence[str], ttl: float = 30.0, max_entries: int = 10000):
+        self.prefixes = tuple(prefixes)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def covers(self, key: str) -> bool:
+        return key.startswith(self.prefixes)
+
+    def lookup(self, key: str) -> Tuple[bool, Optional[str]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def store(self, key: str, value: Optional[str]):
+        if not self.covers(key):
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, keys: Iterable[str]):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
 class RedisClient:
-    """Async Redis client wrapper"""
-    
-    def __init__(self):
-        self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+    """Async Redis client wrapper
+
+    Connections come from a pool sized by ``REDIS_MAX_CONNECTIONS``. Besides
+    single-key commands it offers pipelines/transactions, multi-key and
+    batched list helpers, sorted sets, pub/sub and streams, so callers can
+    group work into one round trip instead of awaiting many small calls.
+
+    Optional client-side caching (``REDIS_LOCAL_CACHE_PREFIXES``, or
+    ``enable_local_cache``) keeps reads of matching keys in process for up to
+    ``REDIS_LOCAL_CACHE_TTL`` seconds. Writes to those keys through a client
+    configured with the same prefixes publish the changed keys in the same
+    round trip, and every caching client drops its copy. Only cache keys that
+    are written through this wrapper.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, max_connections: Optional[int] = None):
+        self.redis_url = redis_url or os.getenv('REDIS_URL', 'redis://localhost:6379')
+        self.max_connections = max_connections or int(os.getenv('REDIS_MAX_CONNECTIONS', '50'))
         self._client = None
-    
+        self._local_cache: Optional[LocalCache] = None
+        self._invalidation_task: Optional[asyncio.Task] = None
+
+        prefixes = [prefix for prefix in os.getenv('REDIS_LOCAL_CACHE_PREFIXES', '').split(',') if prefix]
+        if prefixes:
+            self.enable_local_cache(
+                prefixes,
+                ttl=float(os.getenv('REDIS_LOCAL_CACHE_TTL', '30')),
+                max_entries=int(os.getenv('REDIS_LOCAL_CACHE_SIZE', '10000'))
+            )
+
     async def connect(self):
         """Connect to Redis"""
         if not self._client:
-            self._client = redis.from_url(self.redis_url, decode_responses=True)
+            # The client owns this pool, so closing the client disconnects it
+            self._client = redis.from_url(
+                self.redis_url,
+                max_connections=self.max_connections,
+                decode_responses=True
+            )
             await self._client.ping()
             logger.info("✅ Connected to Redis")
-    
+            if self._local_cache is not None:
+                self._start_invalidation_listener()
+
     async def disconnect(self):
         """Disconnect from Redis"""
+        if self._invalidation_task:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
         if self._client:
-            await self._client.close()
+            await self._client.close(close_connection_pool=True)
             self._client = None
             logger.info("✅ Disconnected from Redis")
-    
-    async def get(self, key: str) -> Optional[str]:
-        """Get value from Redis"""
+
+    async def client(self) -> redis.Redis:
+        """Underlying connected client, for scripts and commands not wrapped here"""
         if not self._client:
             await self.connect()
-        return await self._client.get(key)
-    
+        return self._client
+
+    # Pipelines and transactions
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[Any]:
+        """Queue commands and send them in one round trip with ``await pipe.execute()``.
+
+        Writes queued here bypass local cache invalidation; use ``invalidate``
+        for cached keys changed through a pipeline.
+        """
+        client = await self.client()
+        async with client.pipeline(transaction=transaction) as pipe:
+            yield pipe
+
+    def transaction(self):
+        """Pipeline whose commands run atomically (MULTI/EXEC)"""
+        return self.pipeline(transaction=True)
+
+    # Keys
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get value from Redis"""
+        if self._local_cache is not None and self._local_cache.covers(key):
+            found, value = self._local_cache.lookup(key)
+            if found:
+                return value
+        value = await (await self.client()).get(key)
+        if self._local_cache is not None:
+            self._local_cache.store(key, value)
+        return value
+
     async def set(self, key: str, value: str, expire: Optional[int] = None) -> bool:
         """Set value in Redis with optional expiration"""
-        if not self._client:
-            await self.connect()
-        return await self._client.set(key, value, ex=expire)
-    
+        return (await self._write([key], lambda pipe: pipe.set(key, value, ex=expire)))[0]
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Values of several keys in one round trip, in ``keys`` order"""
+        if not keys:
+            return []
+        values: List[Optional[str]] = [None] * len(keys)
+        missing = []
+        for index, key in enumerate(keys):
+            if self._local_cache is not None and self._local_cache.covers(key):
+                found, value = self._local_cache.lookup(key)
+                if found:
+                    values[index] = value
+                    continue
+            missing.append(index)
+        if missing:
+            fetched = await (await self.client()).mget([keys[index] for index in missing])
+            for index, value in zip(missing, fetched):
+                values[index] = value
+                if self._local_cache is not None:
+                    self._local_cache.store(keys[index], value)
+        return values
+
+    async def mset(self, mapping: Mapping[str, str], expire: Optional[int] = None) -> bool:
+        """Set several keys in one round trip; with ``expire`` each key gets the TTL"""
+        if not mapping:
+            return True
+
+        def queue(pipe):
+            if expire is None:
+                pipe.mset(dict(mapping))
+            else:
+                for key, value in mapping.items():
+                    pipe.set(key, value, ex=expire)
+        
+        return all(await self._write(list(mapping), queue))
+
     async def get_json(self, key: str) -> Optional[Dict[str, Any]]:
         """Get JSON value from Redis"""
         data = await self.get(key)
@@ -51,40 +203,208 @@ class RedisClient:
             except json.JSONDecodeError:
                 logger.error(f"Failed to parse JSON from Redis key: {key}")
         return None
-    
+
     async def set_json(self, key: str, value: Dict[str, Any], expire: Optional[int] = None) -> bool:
         """Set JSON value in Redis"""
         return await self.set(key, json.dumps(value), expire)
-    
-    async def delete(self, key: str) -> int:
-        """Delete key from Redis"""
-        if not self._client:
-            await self.connect()
-        return await self._client.delete(key)
-    
+
+    async def get_many_json(self, keys: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """JSON values of several keys in one round trip; missing or malformed values are None"""
+        results = []
+        for key, data in zip(keys, await self.mget(keys)):
+            try:
+                results.append(json.loads(data) if data else None)
+            except json.JSONDecodeError:
+                logger.error(f"Failed to parse JSON from Redis key: {key}")
+                results.append(None)
+        return results
+
+    async def set_many_json(self, mapping: Mapping[str, Dict[str, Any]], expire: Optional[int] = None) -> bool:
+        """Set several JSON values in one round trip"""
+        return await self.mset({key: json.dumps(value) for key, value in mapping.items()}, expire)
+
+    async def delete(self, *keys: str) -> int:
+        """Delete keys from Redis"""
+        if not keys:
+            return 0
+        return (await self._write(keys, lambda pipe: pipe.delete(*keys)))[0]
+
     async def exists(self, key: str) -> bool:
         """Check if key exists in Redis"""
-        if not self._client:
-            await self.connect()
-        return bool(await self._client.exists(key))
-    
+        return bool(await (await self.client()).exists(key))
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        """Set a key's time to live"""
+        return bool(await (await self.client()).expire(key, seconds))
+
+    # Lists
+
     async def lpush(self, key: str, *values: str) -> int:
         """Push values to left of list"""
-        if not self._client:
-            await self.connect()
-        return await self._client.lpush(key, *values)
-    
-    async def rpop(self, key: str) -> Optional[str]:
-        """Pop value from right of list"""
-        if not self._client:
-            await self.connect()
-        return await self._client.rpop(key)
-    
+        return await (await self.client()).lpush(key, *values)
+
+    async def rpush(self, key: str, *values: str) -> int:
+        """Push values to right of list"""
+        return await (await self.client()).rpush(key, *values)
+
+    async def lpop(self, key: str, count: Optional[int] = None) -> Union[Optional[str], List[str]]:
+        """Pop from left of list; with ``count``, up to that many values in one call"""
+        return await (await self.client()).lpop(key, count)
+
+    async def rpop(self, key: str, count: Optional[int] = None) -> Union[Optional[str], List[str]]:
+        """Pop from right of list; with ``count``, up to that many values in one call"""
+        return await (await self.client()).rpop(key, count)
+
+    async def lrange(self, key: str, start: int = 0, end: int = -1) -> List[str]:
+        """Values of a list between two indexes (inclusive)"""
+        return await (await self.client()).lrange(key, start, end)
+
+    async def lrem(self, key: str, value: str, count: int = 1) -> int:
+        """Remove occurrences of a value from a list"""
+        return await (await self.client()).lrem(key, count, value)
+
     async def llen(self, key: str) -> int:
         """Get length of list"""
-        if not self._client:
-            await self.connect()
-        return await self._client.llen(key)
+        return await (await self.client()).llen(key)
+
+    async def llen_many(self, keys: Sequence[str]) -> Dict[str, int]:
+        """Lengths of several lists in one round trip"""
+        async with self.pipeline() as pipe:
+            for key in keys:
+                pipe.llen(key)
+            return dict(zip(keys, await pipe.execute()))
+
+    # Sorted sets
+
+    async def zadd(self, key: str, mapping: Mapping[str, float], nx: bool = False, xx: bool = False) -> int:
+        """Add members with scores"""
+        return await (await self.client()).zadd(key, dict(mapping), nx=nx, xx=xx)
+
+    async def zrem(self, key: str, *members: str) -> int:
+        """Remove members"""
+        return await (await self.client()).zrem(key, *members)
+
+    async def zcard(self, key: str) -> int:
+        """Number of members"""
+        return await (await self.client()).zcard(key)
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        """Score of a member"""
+        return await (await self.client()).zscore(key, member)
+
+    async def zrangebyscore(
+        self,
+        key: str,
+        min_score: Union[float, str] = '-inf',
+        max_score: Union[float, str] = '+inf',
+        limit: Optional[int] = None,
+        withscores: bool = False
+    ) -> List[Any]:
+        """Members with scores in a range, lowest first, optionally at most ``limit``"""
+        return await (await self.client()).zrangebyscore(
+            key, min_score, max_score,
+            start=0 if limit is not None else None,
+            num=limit,
+            withscores=withscores
+        )
+
+    async def zpopmin(self, key: str, count: int = 1) -> List[Tuple[str, float]]:
+        """Remove and return the lowest scored members"""
+        return await (await self.client()).zpopmin(key, count)
+
+    # Pub/sub
+
+    async def publish(self, channel: str, message: Union[str, Dict[str, Any]]) -> int:
+        """Publish a message (dicts are sent as JSON); returns the number of receivers"""
+        if not isinstance(message, str):
+            message = json.dumps(message)
+        return await (await self.client()).publish(channel, message)
+
+    async def subscribe(self, *channels: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{'channel', 'data'}`` for each message published to ``channels``"""
+        pubsub = (await self.client()).pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*channels)
+        try:
+            async for message in pubsub.listen():
+                if message and message.get('type') == 'message':
+                    yield {'channel': message['channel'], 'data': message['data']}
+        finally:
+            await pubsub.unsubscribe(*channels)
+            await pubsub.close()
+
+    # Streams
+
+    async def xadd(
+        self,
+        stream: str,
+        fields: Mapping[str, Any],
+        maxlen: Optional[int] = None,
+        expire: Optional[int] = None
+    ) -> str:
+        """Append an entry, optionally trimming to about ``maxlen`` entries and refreshing a TTL"""
+        async with self.pipeline() as pipe:
+            pipe.xadd(stream, dict(fields), maxlen=maxlen, approximate=True)
+            if expire:
+                pipe.expire(stream, expire)
+            return (await pipe.execute())[0]
+
+    async def xread(
+        self,
+        streams: Mapping[str, str],
+        count: Optional[int] = None,
+        block_ms: Optional[int] = None
+    ) -> List[Tuple[str, List[Tuple[str, Dict[str, str]]]]]:
+        """Entries after the given id of each stream, waiting up to ``block_ms`` if none yet"""
+        return await (await self.client()).xread(dict(streams), count=count, block=block_ms) or []
+
+    # Client-side caching
+
+    def enable_local_cache(self, prefixes: Sequence[str], ttl: float = 30.0, max_entries: int = 10000):
+        """Cache reads of keys starting with ``prefixes`` in process, invalidated on writes"""
+        self._local_cache = LocalCache(prefixes, ttl=ttl, max_entries=max_entries)
+        if self._client is not None:
+            self._start_invalidation_listener()
+
+    def local_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._local_cache.stats() if self._local_cache is not None else None
+
+    async def invalidate(self, *keys: str):
+        """Announce cached keys changed outside this wrapper's write methods (e.g. in a pipeline)"""
+        await self._write(keys, lambda pipe: None)
+
+    async def _write(self, keys: Sequence[str], queue) -> List[Any]:
+        """Run the commands ``queue`` adds to a pipeline; if any of ``keys`` may be cached,
+        publish them for invalidation in the same round trip"""
+        stale = [key for key in keys if self._local_cache is not None and self._local_cache.covers(key)]
+        client = await self.client()
+        async with client.pipeline(transaction=False) as pipe:
+            queue(pipe)
+            if stale:
+                pipe.publish(INVALIDATION_CHANNEL, json.dumps(stale))
+            results = await pipe.execute()
+        if not stale:
+            return results
+        self._local_cache.evict(stale)
+        return results[:-1]
+
+    def _start_invalidation_listener(self):
+        if self._invalidation_task is None or self._invalidation_task.done():
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self):
+        while True:
+            try:
+                async for message in self.subscribe(INVALIDATION_CHANNEL):
+                    if self._local_cache is not None:
+                        self._local_cache.evict(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries may have been missed while disconnected
+                if self._local_cache is not None:
+                    self._local_cache.clear()
+                logger.warning(f"Cache invalidation listener failed: {e}")
+                await asyncio.sleep(1)
 
 # Global Redis client instance
-redis_client = RedisClient()
\ No newline at end of file
+redis_client = RedisClient()